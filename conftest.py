@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures: the in-process SSH server wired in as the configured targets
+
+A test module picks its target names with SSH_TARGETS (default ("pi",)); every name points at the same server.
+"""
+
+import pytest
+
+from mcp_server import batch, main, mcp_complete_server, ssh_transport
+from mcp_server.config import AppConfig
+from mcp_server.tools import common, gpio_tools, ssh_exec
+from ssh_test_server import SSHTestServer
+
+# Modules that imported load_config by name
+_CONFIG_USERS = (batch, main, mcp_complete_server, common, gpio_tools, ssh_exec)
+
+
+@pytest.fixture
+def ssh_target_names(request):
+    return tuple(getattr(request.module, "SSH_TARGETS", ("pi",)))
+
+
+@pytest.fixture
+def ssh_server(monkeypatch):
+    srv = SSHTestServer()
+    monkeypatch.setattr(ssh_transport, "_pool", ssh_transport.SSHConnectionPool(max_channels=8))
+    yield srv
+    ssh_transport.get_pool().close_all()
+    srv.close()
+
+
+@pytest.fixture
+def ssh_config(monkeypatch, ssh_server, ssh_target_names):
+    cfg = AppConfig(targets={name: ssh_server.make_target() for name in ssh_target_names})
+    for mod in _CONFIG_USERS:
+        monkeypatch.setattr(mod, "load_config", lambda: cfg)
+    return cfg
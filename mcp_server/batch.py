@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .config import load_config
+from .registry import ToolSpec, get_tool
+from .ssh_async import run_blocking
+from .ssh_transport import get_pool
+from .tools.fleet import result_ok
+
+# Batched tool calls: grouped by target over the pooled transport, groups run in parallel
+
+class BatchCall(BaseModel):
+    name: str
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+    id: Optional[str] = Field(default=None, description="Name other calls can refer to in depends_on")
+    depends_on: List[str] = Field(default_factory=list, description="ids of earlier calls that must succeed first")
+
+class BatchRequest(BaseModel):
+    calls: List[BatchCall]
+    ordered: bool = Field(default=True, description="Run calls on the same target one after another, in the order given")
+    stop_on_error: bool = Field(default=False, description="Skip the rest of a target's ordered calls after one fails")
+
+class BatchCallResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    name: str
+    target: Optional[str] = None
+    status: str  # ok | error | skipped
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    start: float = 0.0
+    elapsed: float = 0.0
+
+class BatchResponse(BaseModel):
+    results: List[BatchCallResult]
+    ok: int
+    failed: int
+    skipped: int
+    connect: Dict[str, float]
+    elapsed: float
+
+Invoker = Callable[[ToolSpec, BaseModel], Awaitable[BaseModel]]
+
+def _dependencies(req: BatchRequest) -> List[List[int]]:
+    """Indexes each call waits for; depends_on may only name earlier calls, so there are no cycles"""
+    seen: Dict[str, int] = {}
+    last_on_target: Dict[str, int] = {}
+    deps: List[List[int]] = []
+    for i, call in enumerate(req.calls):
+        wait = []
+        for ref in call.depends_on:
+            if ref not in seen:
+                raise ValueError(f"call {i}: depends_on '{ref}' is not the id of an earlier call")
+            wait.append(seen[ref])
+        target = call.arguments.get("target")
+        if req.ordered and target is not None:
+            if target in last_on_target:
+                wait.append(last_on_target[target])
+            last_on_target[target] = i
+        deps.append(sorted(set(wait)))
+        if call.id is not None:
+            if call.id in seen:
+                raise ValueError(f"call {i}: duplicate id '{call.id}'")
+            seen[call.id] = i
+    return deps
+
+async def _connect(target: str) -> float:
+    # Open (or reuse) the target's pooled transport up front so the groups handshake in parallel
+    start = time.monotonic()
+    cfg = load_config().targets.get(target)
+    if cfg is not None:
+        pool = get_pool()
+        entry = pool.lease(target, cfg) or await run_blocking(pool.acquire, target, cfg,
+                                                              on_abandon=lambda e: pool.release(target, e))
+        pool.release(target, entry)
+    return round(time.monotonic() - start, 3)
+
+async def run_batch(req: BatchRequest, invoke: Invoker) -> BatchResponse:
+    """
+    Run every call as soon as the calls it depends on are done. Calls on one target share its pooled
+    transport; different targets (and unordered calls) run concurrently. A call fails when it raises
+    or its result reports failure (non-zero exit_code or ok: false). A call whose explicit dependency
+    did not succeed is skipped, as are a target's later calls under stop_on_error.
+    """
+    deps = _dependencies(req)
+    started = time.monotonic()
+    targets = list(dict.fromkeys(c.arguments["target"] for c in req.calls if isinstance(c.arguments.get("target"), str)))
+    connect_times: Dict[str, float] = {}
+
+    async def connect(target: str):
+        try:
+            connect_times[target] = await _connect(target)
+        except Exception:
+            connect_times[target] = -1.0  # the calls report the error themselves
+
+    warmup = asyncio.ensure_future(asyncio.gather(*(connect(t) for t in targets)))
+    tasks: List[asyncio.Future] = []
+
+    async def run_call(i: int, call: BatchCall) -> BatchCallResult:
+        res = BatchCallResult(index=i, id=call.id, name=call.name, target=call.arguments.get("target"), status="skipped")
+        for d in deps[i]:
+            prior = await tasks[d]
+            if prior.status != "ok":
+                explicit = req.calls[d].id is not None and req.calls[d].id in call.depends_on
+                if explicit or req.stop_on_error:
+                    res.error = f"call {d} ({prior.name}) did not succeed"
+                    return res
+        await warmup
+        res.start = round(time.monotonic() - started, 3)
+        try:
+            spec = get_tool(call.name)
+            if spec is None:
+                raise ValueError(f"Unknown tool: {call.name}")
+            missing = [f for f in spec.required if f not in call.arguments]
+            if missing:
+                raise ValueError(f"{call.name} missing required parameters: {', '.join(missing)}")
+            res.result = (await invoke(spec, spec.parse(call.arguments))).model_dump()
+            if result_ok(res.result):
+                res.status = "ok"
+            else:
+                code = res.result.get("exit_code")
+                res.status = "error"
+                res.error = res.result.get("error") or (f"exit code {code}" if code else "tool reported failure")
+        except Exception as e:
+            res.status, res.error = "error", str(e) or type(e).__name__
+        res.elapsed = round(time.monotonic() - started - res.start, 3)
+        return res
+
+    for i, call in enumerate(req.calls):
+        tasks.append(asyncio.ensure_future(run_call(i, call)))
+    try:
+        results = list(await asyncio.gather(*tasks))
+    finally:
+        for t in tasks:
+            t.cancel()
+        warmup.cancel()
+    return BatchResponse(
+        results=results,
+        ok=sum(r.status == "ok" for r in results),
+        failed=sum(r.status == "error" for r in results),
+        skipped=sum(r.status == "skipped" for r in results),
+        connect=connect_times,
+        elapsed=round(time.monotonic() - started, 3),
+    )
@@ -29,7 +29,8 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, Optional, Any, List
+import threading
+from typing import Callable, Dict, Optional, Any, List, Tuple
 import yaml
 from pydantic import BaseModel, Field
 
@@ -43,6 +44,8 @@ class TargetConfig(BaseModel):
     private_key_path: str
     known_hosts_path: Optional[str] = None
     connect_timeout: int = 10
+    labels: Dict[str, Any] = Field(default_factory=dict)  # free-form, e.g. role: kiosk, site: lab
+    max_concurrency: Optional[int] = Field(default=None, ge=1)  # tool calls at once on this host; small boards want 1-2
 
 # POLICY SYSTEM DISABLED - Policy configuration classes commented out
 # class SecurityConfig(BaseModel):
@@ -73,50 +76,128 @@ class AppConfig(BaseModel):
 #     allowlist: AllowlistConfig = Field(default_factory=AllowlistConfig)
 #     gpio: GPIOConfig = Field(default_factory=GPIOConfig)
 
+def _selector_matches(labels: Dict[str, Any], clause: str) -> bool:
+    if "!=" in clause:
+        key, value = (p.strip() for p in clause.split("!=", 1))
+        return key not in labels or str(labels[key]) != value
+    if "=" in clause:
+        key, value = (p.strip() for p in clause.split("=", 1))
+        return key in labels and str(labels[key]) == value
+    if clause.startswith("!"):
+        return clause[1:].strip() not in labels
+    return clause in labels
+
+def select_targets(cfg: AppConfig, selector: str) -> List[str]:
+    """
+    Names of the targets whose labels match every comma-separated clause of selector:
+    key=value, key!=value, key (label present) or !key (label absent).
+    """
+    clauses = [c.strip() for c in selector.split(",") if c.strip()]
+    if not clauses:
+        raise ValueError("Empty target selector")
+    return [name for name, t in cfg.targets.items() if all(_selector_matches(t.labels, c) for c in clauses)]
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_dev, st.st_size)
+
+class FileCache:
+    """
+    Parse a file once and serve the parsed object until the file's
+    mtime/inode/size change. Safe to share across threads.
+    """
+
+    def __init__(self, parse: Callable[[str], Any]):
+        self._parse = parse
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int, int, int]], Any]] = {}
+        self.parses = 0
+        self.hits = 0
+
+    def get(self, path: str) -> Any:
+        sig = _file_signature(path)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == sig:
+                self.hits += 1
+                return cached[1]
+        value = self._parse(path)
+        with self._lock:
+            self.parses += 1
+            self._entries[path] = (sig, value)
+        return value
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"parses": self.parses, "hits": self.hits, "files": len(self._entries)}
+
+def _parse_config(path: str) -> AppConfig:
+    with open(path, "r", encoding="utf-8") as f:
+        data: Dict[str, Any] = yaml.safe_load(f) or {}
+    return AppConfig(**data)
+
+_config_cache = FileCache(_parse_config)
+
 def load_config(path: str = CONFIG_PATH) -> AppConfig:
+    # Cached: hosts.yaml is re-parsed only when the file changes on disk
     if not os.path.exists(path):
         raise FileNotFoundError(f"Config file not found: {path}")
+    return _config_cache.get(path)
+
+def reload_config(path: str = CONFIG_PATH) -> AppConfig:
+    """Drop the cached config and parse the file again"""
+    _config_cache.invalidate(path)
+    return load_config(path)
+
+def config_cache_stats() -> Dict[str, int]:
+    return _config_cache.stats()
+
+# GPIO configuration loading (separate from security policies)
+def _policy_obj(gpio_targets: Dict[str, Any]) -> "PolicyConfig":
+    # Minimal policy object with only GPIO config
+    return type('PolicyConfig', (), {
+        'gpio': type('GPIOConfig', (), {
+            'targets': gpio_targets
+        })()
+    })()
+
+# Shared fallback so callers can tell "unchanged" apart by identity
+_EMPTY_POLICIES = _policy_obj({})
+
+def _parse_policies(path: str) -> "PolicyConfig":
     with open(path, "r", encoding="utf-8") as f:
         data: Dict[str, Any] = yaml.safe_load(f) or {}
-    return AppConfig(**data)
 
-# GPIO configuration loading (separate from security policies)
+    # Only load GPIO configuration, ignore security policies
+    gpio_data = data.get('gpio', {}) or {}
+    return _policy_obj(gpio_data.get('targets', {}) or {})
+
+_policy_cache = FileCache(_parse_policies)
+
 def load_policies(path: str = POLICY_PATH) -> "PolicyConfig":
     """
     Load policies configuration for GPIO hardware safety.
     Security policies are disabled, but GPIO config is still needed.
+    Cached like load_config: the same object is returned until the file changes.
     """
     try:
         if not os.path.exists(path):
-            # Return minimal config with just GPIO structure
-            return type('PolicyConfig', (), {
-                'gpio': type('GPIOConfig', (), {
-                    'targets': {}
-                })()
-            })()
-        
-        with open(path, "r", encoding="utf-8") as f:
-            data: Dict[str, Any] = yaml.safe_load(f) or {}
-        
-        # Only load GPIO configuration, ignore security policies
-        gpio_data = data.get('gpio', {})
-        
-        # Create minimal policy object with only GPIO config
-        policy_obj = type('PolicyConfig', (), {
-            'gpio': type('GPIOConfig', (), {
-                'targets': gpio_data.get('targets', {})
-            })()
-        })()
-        
-        return policy_obj
-        
+            return _EMPTY_POLICIES
+        return _policy_cache.get(path)
+
     except Exception as e:
         # If loading fails, return empty GPIO config
         import logging
         log = logging.getLogger("mcp.config")
         log.warning(f"Failed to load GPIO policies from {path}: {e}")
-        return type('PolicyConfig', (), {
-            'gpio': type('GPIOConfig', (), {
-                'targets': {}
-            })()
-        })()
\ No newline at end of file
+        return _EMPTY_POLICIES
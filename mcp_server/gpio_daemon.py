@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import paramiko
+
+from .config import TargetConfig
+from .ssh_transport import TRANSPORT_ERRORS, get_pool
+
+# Resident GPIO agent ("python3 -u <agent_path> --serve") reached over a persistent SSH channel
+GPIO_DAEMON_ENABLED = os.environ.get("MCP_PI_GPIO_DAEMON", "1").lower() not in ("0", "false", "no")
+DAEMON_READY_TIMEOUT = float(os.environ.get("MCP_PI_GPIO_DAEMON_READY_TIMEOUT", "5"))
+DAEMON_REQUEST_TIMEOUT = float(os.environ.get("MCP_PI_GPIO_DAEMON_REQUEST_TIMEOUT", "10"))  # on top of the op's own run time
+DAEMON_INLINE_SECONDS = float(os.environ.get("MCP_PI_GPIO_DAEMON_INLINE_SECONDS", "0.5"))  # longer ops get an agent of their own
+DAEMON_RETRY_AFTER = float(os.environ.get("MCP_PI_GPIO_DAEMON_RETRY_AFTER", "300"))  # back-off after a failed start
+
+log = logging.getLogger("mcp.gpio.daemon")
+
+class DaemonUnavailable(Exception):
+    """The daemon could not be reached and the request was not sent"""
+
+def op_seconds(payload: Dict[str, Any]) -> float:
+    """How long the agent sleeps while running payload (pwm duration, blink periods, macro steps)"""
+    op, d = payload.get("op"), payload.get("data") or {}
+    if op == "pwm":
+        return float(d.get("duration", 0.2))
+    if op == "blink":
+        return int(d.get("count", 5)) * (float(d.get("on_time", 0.5)) + float(d.get("off_time", 0.5)))
+    if op == "macro":
+        return sum(op_seconds(step) for step in d.get("steps", []))
+    return 0.0
+
+def request_timeout(payload: Dict[str, Any]) -> float:
+    return DAEMON_REQUEST_TIMEOUT + op_seconds(payload)
+
+class GPIODaemonSession:
+    def __init__(self, key: str, cfg: TargetConfig, agent_path: str):
+        self.key = key
+        self.cfg = cfg
+        self.agent_path = agent_path
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._buf = b""
+        self._chan: Optional[paramiko.Channel] = None
+        self._entry = get_pool().acquire(key, cfg)
+        try:
+            self._chan = self._entry.client.get_transport().open_session()
+            self._chan.settimeout(DAEMON_READY_TIMEOUT)
+            self._chan.exec_command(f'python3 -u "{agent_path}" --serve')
+            hello = self._read_line(time.monotonic() + DAEMON_READY_TIMEOUT)
+        except Exception as e:
+            self.close()
+            raise DaemonUnavailable(f"gpio agent did not start: {e}")
+        if not hello.get("ready"):
+            self.close()
+            raise DaemonUnavailable(f"gpio agent does not support --serve: {hello.get('error') or hello}")
+
+    def alive(self) -> bool:
+        chan = self._chan
+        return chan is not None and not chan.closed and not chan.exit_status_ready()
+
+    def _read_line(self, deadline: float) -> Dict[str, Any]:
+        # Partial lines stay buffered across a timeout, so a late answer can still be read and skipped
+        while b"\n" not in self._buf:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise socket.timeout()
+            self._chan.settimeout(left)
+            data = self._chan.recv(65536)
+            if not data:
+                raise EOFError("gpio agent closed the channel")
+            self._buf += data
+        line, self._buf = self._buf.split(b"\n", 1)
+        return json.loads(line)
+
+    def request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        One request/response round trip. Raises TimeoutError when the answer is late; the session
+        stays usable, and the late answer is skipped by the next request.
+        """
+        if timeout is None:
+            timeout = request_timeout(payload)
+        with self._lock:
+            if not self.alive():
+                raise DaemonUnavailable("gpio agent channel is closed")
+            self._next_id += 1
+            rid = self._next_id
+            line = json.dumps(dict(payload, id=rid), separators=(",", ":")) + "\n"
+            try:
+                self._chan.settimeout(timeout)
+                self._chan.sendall(line.encode("utf-8"))
+            except TRANSPORT_ERRORS as e:
+                raise DaemonUnavailable(str(e))
+            # From here on the op may have run, so errors propagate instead of falling back
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    resp = self._read_line(deadline)
+                except socket.timeout:
+                    raise TimeoutError(f"gpio agent did not answer within {timeout:g}s")
+                got = resp.pop("id", None)
+                if got == rid:
+                    return resp
+                if not isinstance(got, int) or got > rid:
+                    raise RuntimeError("gpio agent response out of sync")
+
+    def close(self):
+        if self._chan is not None:
+            try:
+                self._chan.close()
+            except Exception:
+                pass
+            self._chan = None
+        if self._entry is not None:
+            get_pool().release(self.key, self._entry)
+            self._entry = None
+
+class GPIODaemonManager:
+    """One resident agent session per target, started lazily and restarted when it dies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, GPIODaemonSession] = {}
+        self._start_locks: Dict[str, threading.Lock] = {}
+        self._unavailable_until: Dict[str, float] = {}
+
+    def request(self, key: str, cfg: TargetConfig, agent_path: str, payload: Dict[str, Any],
+                timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Send one agent request over the resident channel.
+        Returns None when the daemon is unavailable so the caller can spawn the agent instead.
+        """
+        session = self._session(key, cfg, agent_path)
+        if session is None:
+            return None
+        try:
+            return session.request(payload, timeout)
+        except DaemonUnavailable:
+            self._drop(key, session)
+            return None
+        except TimeoutError:
+            raise  # the agent is still running the op; keep its channel
+        except Exception:
+            self._drop(key, session)
+            raise
+
+    def _session(self, key: str, cfg: TargetConfig, agent_path: str) -> Optional[GPIODaemonSession]:
+        with self._lock:
+            start_lock = self._start_locks.setdefault(key, threading.Lock())
+        with start_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+            if session is not None:
+                if session.cfg == cfg and session.agent_path == agent_path and session.alive():
+                    return session
+                self._drop(key, session)
+            if time.monotonic() < self._unavailable_until.get(key, 0.0):
+                return None
+            try:
+                session = GPIODaemonSession(key, cfg, agent_path)
+            except Exception as e:
+                log.warning(f"GPIO daemon unavailable for {key}, using per-call agent: {e}")
+                self._unavailable_until[key] = time.monotonic() + DAEMON_RETRY_AFTER
+                return None
+            with self._lock:
+                self._sessions[key] = session
+                self._unavailable_until.pop(key, None)
+            return session
+
+    def _drop(self, key: str, session: GPIODaemonSession):
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+        for _, session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "enabled": GPIO_DAEMON_ENABLED,
+                "sessions": sorted(k for k, s in self._sessions.items() if s.alive()),
+                "backoff": {k: round(t - now, 1) for k, t in self._unavailable_until.items() if t > now},
+            }
+
+_manager = GPIODaemonManager()
+
+def get_daemon_manager() -> GPIODaemonManager:
+    return _manager
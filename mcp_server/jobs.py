@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .registry import get_tool
+from .scheduler import current_client, get_scheduler
+from .ssh_async import exec_output, exec_tag
+from .tools.common import use_async_client
+from .tools.fleet import result_ok
+
+# Background jobs: long-running tools (deploy_hook, git_pull, migrations) outlive the HTTP request
+JOB_DB_PATH = os.environ.get("MCP_PI_JOB_DB", "data/jobs.db")
+JOB_WORKERS = int(os.environ.get("MCP_PI_JOB_WORKERS", "4"))          # jobs running at once, all targets
+JOB_PER_TARGET = int(os.environ.get("MCP_PI_JOB_PER_TARGET", "1"))     # jobs running at once on one target
+JOB_LOG_BYTES = int(os.environ.get("MCP_PI_JOB_LOG_BYTES", "1048576"))  # log kept per job; oldest output dropped first
+JOB_HISTORY = int(os.environ.get("MCP_PI_JOB_HISTORY", "1000"))         # finished jobs kept in the store
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+log = logging.getLogger("mcp.jobs")
+
+class JobSubmit(BaseModel):
+    tool: str = Field(description="Registered tool to run in the background, e.g. 'deploy_hook'")
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+
+class JobRecord(BaseModel):
+    id: str
+    tool: str
+    target: Optional[str] = None
+    arguments: Dict[str, Any]
+    status: str  # queued | running | succeeded | failed | cancelled
+    created: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class JobLog(BaseModel):
+    id: str
+    status: str
+    entries: List[Dict[str, str]]  # {"stream": "stdout" | "stderr", "data": "..."}
+    offset: int                    # pass back as offset to get only newer entries
+    dropped: int                   # entries discarded to keep the log under the size limit
+
+def kill_command(job_id: str) -> str:
+    # Every remote process the job started inherited MCP_PI_JOB=<id> (see exec_tag); signal them all.
+    # Processes of other users (sudo) are not readable and are left alone. Prints how many were signalled.
+    return (f"pids=$(grep -lzx MCP_PI_JOB={job_id} /proc/[0-9]*/environ 2>/dev/null | cut -d/ -f3); "
+            f'[ -z "$pids" ] || kill -TERM $pids 2>/dev/null; echo $pids | wc -w')
+
+class JobStore:
+    """Jobs in a local SQLite file so results outlive the client and the server process"""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, created REAL, status TEXT, target TEXT,"
+                " record TEXT, log TEXT, dropped INTEGER DEFAULT 0)")
+
+    def save(self, rec: JobRecord, entries: Optional[List[Tuple[str, str]]] = None, dropped: int = 0):
+        logged = json.dumps(entries) if entries is not None else None
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, created, status, target, record, log, dropped) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET status=excluded.status, record=excluded.record,"
+                " log=COALESCE(excluded.log, jobs.log), dropped=excluded.dropped",
+                (rec.id, rec.created, rec.status, rec.target, rec.model_dump_json(), logged, dropped))
+
+    def get(self, job_id: str) -> Optional[Tuple[JobRecord, List[Tuple[str, str]], int]]:
+        with self._lock:
+            row = self._db.execute("SELECT record, log, dropped FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return JobRecord.model_validate_json(row[0]), [tuple(e) for e in json.loads(row[1] or "[]")], row[2]
+
+    def list(self, status: Optional[str] = None, target: Optional[str] = None, limit: int = 50) -> List[JobRecord]:
+        sql, args = "SELECT record FROM jobs WHERE 1=1", []
+        if status:
+            sql += " AND status = ?"
+            args.append(status)
+        if target:
+            sql += " AND target = ?"
+            args.append(target)
+        sql += " ORDER BY created DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [JobRecord.model_validate_json(r[0]) for r in rows]
+
+    def interrupted(self) -> int:
+        # Jobs queued or running when the previous server process stopped
+        marked = 0
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute("SELECT record FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        for (raw,) in rows:
+            rec = JobRecord.model_validate_json(raw)
+            rec.status, rec.error, rec.finished = "failed", "interrupted: server restarted", now
+            self.save(rec)
+            marked += 1
+        return marked
+
+    def prune(self, keep: int):
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND id NOT IN"
+                " (SELECT id FROM jobs ORDER BY created DESC LIMIT ?)", (keep,))
+
+class _Job:
+    """A queued or running job: its record, live log and a wake-up for log/status followers"""
+
+    def __init__(self, rec: JobRecord):
+        self.rec = rec
+        self.entries: List[Tuple[str, str]] = []
+        self.dropped = 0
+        self.size = 0
+        self.task: Optional[asyncio.Task] = None
+        self._decoders = {s: codecs.getincrementaldecoder("utf-8")(errors="replace") for s in ("stdout", "stderr")}
+        self.changed = asyncio.Event()
+
+    def write(self, stream: str, data: bytes, final: bool = False):
+        text = self._decoders[stream].decode(data, final)
+        if not text:
+            return
+        self.entries.append((stream, text))
+        self.size += len(text)
+        while self.size > JOB_LOG_BYTES and len(self.entries) > 1:
+            self.size -= len(self.entries.pop(0)[1])
+            self.dropped += 1
+        self.notify()
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+class JobManager:
+    """
+    Runs submitted tool calls as background tasks on the server's event loop. Each target has a FIFO
+    queue worked by JOB_PER_TARGET consumers; at most JOB_WORKERS jobs run at once overall.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self._live: Dict[str, _Job] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._consumers: List[asyncio.Task] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        n = store.interrupted()
+        if n:
+            log.warning(f"{n} jobs were interrupted by a restart")
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queues.clear()
+            self._consumers.clear()
+            self._slots = asyncio.Semaphore(max(1, JOB_WORKERS))
+
+    async def submit(self, req: JobSubmit) -> JobRecord:
+        spec = get_tool(req.tool)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {req.tool}")
+        missing = [f for f in spec.required if f not in req.arguments]
+        if missing:
+            raise ValueError(f"{req.tool} missing required parameters: {', '.join(missing)}")
+        spec.parse(req.arguments)  # bad arguments fail now, not in the background
+        self._bind()
+        target = req.arguments.get("target")
+        rec = JobRecord(id=uuid.uuid4().hex[:12], tool=req.tool, target=target if isinstance(target, str) else None,
+                        arguments=req.arguments, status="queued", created=time.time())
+        self.store.save(rec, [])
+        job = self._live[rec.id] = _Job(rec)
+        key = rec.target or ""
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+            self._consumers.extend(asyncio.ensure_future(self._consume(self._queues[key]))
+                                   for _ in range(max(1, JOB_PER_TARGET)))
+        self._queues[key].put_nowait(job)
+        return rec
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            job = await queue.get()
+            if job.rec.status != "queued":
+                continue  # cancelled while waiting
+            async with self._slots:
+                if job.rec.status != "queued":
+                    continue
+                job.task = asyncio.ensure_future(self._run(job))
+                await asyncio.wait([job.task])
+
+    async def _run(self, job: _Job):
+        rec = job.rec
+        rec.status, rec.started = "running", time.time()
+        self.store.save(rec)
+        job.notify()
+        exec_output.set(job.write)
+        exec_tag.set(rec.id)
+        current_client.set("jobs")
+        try:
+            spec = get_tool(rec.tool)
+            async with get_scheduler().slot(rec.target, rec.tool):
+                result = await spec.async_handler(spec.parse(rec.arguments))
+            rec.result = result.model_dump()
+            rec.status = "succeeded" if result_ok(rec.result) else "failed"
+        except asyncio.CancelledError:
+            rec.status = "cancelled"
+        except Exception as e:
+            rec.status, rec.error = "failed", str(e) or type(e).__name__
+        finally:
+            rec.finished = time.time()
+            for stream in ("stdout", "stderr"):
+                job.write(stream, b"", final=True)  # flush partial UTF-8 sequences
+            self._finish(job)
+
+    def _finish(self, job: _Job):
+        self.store.save(job.rec, job.entries, job.dropped)
+        self.store.prune(JOB_HISTORY)
+        self._live.pop(job.rec.id, None)
+        job.notify()
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        job = self._live.get(job_id)
+        if job is not None:
+            return job.rec
+        found = self.store.get(job_id)
+        return found[0] if found else None
+
+    def list(self, status: Optional[str] = None, target: Optional[str] = None, limit: int = 50) -> List[JobRecord]:
+        return self.store.list(status, target, limit)
+
+    def logs(self, job_id: str, offset: int = 0) -> Optional[JobLog]:
+        job = self._live.get(job_id)
+        if job is not None:
+            rec, entries, dropped = job.rec, job.entries, job.dropped
+        else:
+            found = self.store.get(job_id)
+            if found is None:
+                return None
+            rec, entries, dropped = found
+        start = max(0, offset - dropped)
+        return JobLog(id=job_id, status=rec.status, entries=[{"stream": s, "data": d} for s, d in entries[start:]],
+                      offset=dropped + len(entries), dropped=dropped)
+
+    async def follow(self, job_id: str, offset: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"stream", "data"} log entries from offset as they arrive, then the finished JobRecord"""
+        while True:
+            job = self._live.get(job_id)
+            changed = job.changed if job is not None else None
+            page = self.logs(job_id, offset)
+            if page is None:
+                raise KeyError(job_id)
+            for entry in page.entries:
+                yield entry
+            offset = page.offset
+            if page.status in FINISHED or changed is None:
+                yield {"done": True, **self.get(job_id).model_dump()}
+                return
+            await changed.wait()
+
+    async def cancel(self, job_id: str) -> Optional[JobRecord]:
+        job = self._live.get(job_id)
+        if job is None:
+            rec = self.get(job_id)
+            if rec is not None:
+                raise ValueError(f"Job {job_id} already {rec.status}")
+            return None
+        if job.task is not None:
+            job.task.cancel()
+            await asyncio.wait([job.task])
+            if job.rec.target is not None and job.rec.status == "cancelled":
+                # Closing the channel does not stop a remote command that is not writing output
+                job.rec.error = await self._kill_remote(job.rec)
+                self.store.save(job.rec)
+        else:
+            job.rec.status, job.rec.finished = "cancelled", time.time()
+            self._finish(job)
+        return job.rec
+
+    async def _kill_remote(self, rec: JobRecord) -> str:
+        try:
+            async with use_async_client(rec.target) as cli:
+                r = await cli.exec(kill_command(rec.id), timeout=10)
+            return f"cancelled; signalled {int(r.stdout.strip() or 0)} remote processes"
+        except Exception as e:
+            return f"cancelled; remote processes may still be running: {str(e) or type(e).__name__}"
+
+def job_event_name(evt: Dict[str, Any]) -> str:
+    return "done" if evt.get("done") else "log"
+
+_manager: Optional[JobManager] = None
+
+def get_jobs() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager(JobStore(JOB_DB_PATH))
+    return _manager
@@ -152,43 +152,44 @@
 from __future__ import annotations
 
 import logging
-from fastapi import FastAPI, HTTPException, Request
+import os
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Any, Dict
+from sse_starlette.sse import EventSourceResponse
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
 from .logging_setup import setup_logging
+from .config import load_config, reload_config, config_cache_stats
+from .ssh_transport import get_pool
+from .gpio_daemon import get_daemon_manager
+from .tmux_control import get_tmux_control
+from .streaming import sse_events
+from .registry import get_tool, tool_schemas
 # from .config import load_policies
 # from .security import build_cors, extract_token, verify_auth, enforce_rate_limit
 # from .allowlist import tool_allowed, ssh_exec_allowed, refresh_policies
 
-from .tools.gpio_tools import (
-    gpio_write, GPIOWriteRequest, TOOL_GPIO_WRITE,
-    gpio_read, GPIOReadRequest, TOOL_GPIO_READ,
-    gpio_pwm, GPIOPWMRequest, TOOL_GPIO_PWM,
-    gpio_blink, GPIOBlinkRequest, TOOL_GPIO_BLINK,
-    macro_run, GPIOMacroRequest, TOOL_GPIO_MACRO_RUN,
-)
-# Existing tool imports (from Parts 1 and 2)
-from .tools.ssh_exec import ssh_exec, SSHExecRequest, TOOL_SCHEMA as SSH_EXEC_SCHEMA
-from .tools.scp_put import scp_put, ScpPutRequest, TOOL_SCHEMA as SCP_PUT_SCHEMA
-from .tools.scp_get import scp_get, ScpGetRequest, TOOL_SCHEMA as SCP_GET_SCHEMA
-from .tools.tmux import (
-    tmux_ensure, tmux_send_keys, tmux_kill,
-    TmuxEnsureRequest, TmuxSendKeysRequest, TmuxKillRequest,
-    TMUX_ENSURE_SCHEMA, TMUX_SEND_KEYS_SCHEMA, TMUX_KILL_SCHEMA
-)
-from .tools.git_tools import (
-    git_status, GitStatusRequest, TOOL_GIT_STATUS,
-    git_checkout, GitCheckoutRequest, TOOL_GIT_CHECKOUT,
-    git_pull, GitPullRequest, TOOL_GIT_PULL,
-    deploy_hook, DeployHookRequest, TOOL_DEPLOY_HOOK
-)
-from .tools.systemd import service_action, ServiceActionRequest, SERVICE_ACTION_SCHEMA
-from .tools.django import (
-    django_manage, DjangoManageRequest, DJANGO_MANAGE_SCHEMA,
-    django_runserver_tmux, DjangoRunserverRequest, DJANGO_RUNSERVER_SCHEMA
-)
+from .tools.gpio_tools import gpio_watch, gpio_watch_event_name, pin_watchers, GPIOWatchRequest
+from .tools.ssh_exec import ssh_exec_stream, ssh_exec_event_name, SSHExecStreamRequest
+from .tools.scp_put import scp_put_stream, active_uploads, ScpPutStreamRequest
+from .tools.scp_get import scp_get_stream, remote_file_info
+from .tools.fleet import fleet_run_stream, fleet_event_name, resolve_targets, FleetRunRequest
+from .tools.tmux import tmux_stream, tmux_stream_event_name, pane_watchers, TmuxStreamRequest
+from .tools.systemd_watch import systemd_watch_stream, systemd_watch_event_name, systemd_watchers, SystemdWatchRequest
+from .tools.journal import journal_stream, journal_event_name, JournalTailRequest
+from .tools.rollout import rollout_stream, rollout_event_name, RolloutRequest
+from .batch import run_batch, BatchRequest
+from .jobs import get_jobs, job_event_name, JobSubmit
+from .scheduler import get_scheduler, scheduled_stream, current_client
+
+# Tools run on the event loop's native SSH path; set MCP_PI_ASYNC_TOOLS=0 to use the threadpool instead
+ASYNC_TOOLS = os.environ.get("MCP_PI_ASYNC_TOOLS", "1").lower() not in ("0", "false", "no")
+
+# Bytes read per step from a spooled multipart file part
+UPLOAD_READ_CHUNK = 262144
 
 # Initialize logging and app
 setup_logging("INFO")
@@ -207,6 +208,20 @@ app.add_middleware(
 # CORS
 # build_cors(app)
 
+class ClientContext:
+    """Tag each request with its caller (X-Client-Id header, else client address) for fair scheduling"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            client_id = dict(scope.get("headers") or []).get(b"x-client-id", b"").decode("latin-1")
+            current_client.set(client_id or (scope.get("client") or ("unknown",))[0])
+        await self.app(scope, receive, send)
+
+app.add_middleware(ClientContext)
+
 class ToolCall(BaseModel):
     name: str
     arguments: Dict[str, Any]
@@ -252,33 +267,21 @@ def _validate_tool_args(tool_name: str, args: Dict[str, Any], required_fields: l
 #     response = await call_next(request)
 #     return response
 
+async def _invoke(spec, req):
+    # Waits for a slot on the call's target first (see scheduler.py)
+    async with get_scheduler().slot(getattr(req, "target", None), spec.name):
+        if ASYNC_TOOLS:
+            return await spec.async_handler(req)
+        return await run_in_threadpool(spec.handler, req)
+
 @app.get("/.well-known/mcp/tools")
 def list_tools():
-    available = [
-        SSH_EXEC_SCHEMA,
-        SCP_PUT_SCHEMA,
-        SCP_GET_SCHEMA,
-        TMUX_ENSURE_SCHEMA,
-        TMUX_SEND_KEYS_SCHEMA,
-        TMUX_KILL_SCHEMA,
-        SERVICE_ACTION_SCHEMA,
-        DJANGO_MANAGE_SCHEMA,
-        DJANGO_RUNSERVER_SCHEMA,
-        TOOL_GIT_STATUS,
-        TOOL_GIT_CHECKOUT,
-        TOOL_GIT_PULL,
-        TOOL_GPIO_WRITE,
-TOOL_GPIO_READ,
-TOOL_GPIO_PWM,
-TOOL_GPIO_BLINK,
-TOOL_GPIO_MACRO_RUN,
-        TOOL_DEPLOY_HOOK,
-    ]
+    available = tool_schemas()
     # # filtered = [t for t in available if tool_allowed(t["name"], target=None)]
     return {"tools": available}
 
 @app.post("/tools")
-def call_tool(body: ToolCall, request: Request):
+async def call_tool(body: ToolCall, request: Request):
     name = body.name
     args = body.arguments or {}
     target = args.get("target")
@@ -306,45 +309,13 @@ def call_tool(body: ToolCall, request: Request):
     # #         raise HTTPException(status_code=403, detail="Command not allowed by policy")
 
     try:
-        if name == "ssh_exec":
-            _validate_tool_args("ssh_exec", args, ["target", "command"])
-            resp = ssh_exec(SSHExecRequest(**args)).model_dump()
-        elif name == "scp_put":
-            resp = scp_put(ScpPutRequest(**args)).model_dump()
-        elif name == "scp_get":
-            resp = scp_get(ScpGetRequest(**args)).model_dump()
-        elif name == "tmux_ensure":
-            resp = tmux_ensure(TmuxEnsureRequest(**args)).model_dump()
-        elif name == "tmux_send_keys":
-            resp = tmux_send_keys(TmuxSendKeysRequest(**args)).model_dump()
-        elif name == "tmux_kill":
-            resp = tmux_kill(TmuxKillRequest(**args)).model_dump()
-        elif name == "systemd_service":
-            resp = service_action(ServiceActionRequest(**args)).model_dump()
-        elif name == "django_manage":
-            resp = django_manage(DjangoManageRequest(**args)).model_dump()
-        elif name == "django_runserver_tmux":
-            resp = django_runserver_tmux(DjangoRunserverRequest(**args)).model_dump()
-        elif name == "git_status":
-            return git_status(GitStatusRequest(**args)).model_dump()
-        elif name == "git_checkout":
-            resp = git_checkout(GitCheckoutRequest(**args)).model_dump()
-        elif name == "git_pull":
-            resp = git_pull(GitPullRequest(**args)).model_dump()
-        elif name == "gpio_write":
-            resp = gpio_write(GPIOWriteRequest(**args)).model_dump()
-        elif name == "gpio_read":
-            resp = gpio_read(GPIOReadRequest(**args)).model_dump()
-        elif name == "gpio_pwm":
-            resp = gpio_pwm(GPIOPWMRequest(**args)).model_dump()
-        elif name == "gpio_blink":
-            resp = gpio_blink(GPIOBlinkRequest(**args)).model_dump()
-        elif name == "macro_run":
-            resp = macro_run(GPIOMacroRequest(**args)).model_dump()
-        elif name == "deploy_hook":
-            resp = deploy_hook(DeployHookRequest(**args)).model_dump()
-        else:
+        spec = get_tool(name)
+        if spec is None:
             raise HTTPException(status_code=404, detail=f"Unknown tool: {name}")
+        if spec.required:
+            _validate_tool_args(name, args, spec.required)
+        result = await _invoke(spec, spec.parse(args))
+        resp = result.model_dump()
 
         _audit("tool_call", {"tool": name, "target": target, "ok": True})
         return resp
@@ -359,7 +330,7 @@ def call_tool(body: ToolCall, request: Request):
           summary="SSH Execute - Run Command on Remote Host",
           description="Execute a shell command on a remote host via SSH. Configured targets are loaded from config/hosts.yaml",
           response_description="Returns command output, error messages, and exit code")
-def call_ssh_exec(args: Dict[str, Any], request: Request):
+async def call_ssh_exec(args: Dict[str, Any], request: Request):
     """
     **SSH Execute Tool**
     
@@ -384,14 +355,49 @@ def call_ssh_exec(args: Dict[str, Any], request: Request):
     - `cwd`: Working directory on remote host (optional)
     - `env`: Environment variables as key-value pairs (optional)
     - `timeout`: Timeout in seconds (optional)
+    - `max_bytes`: Stop the command once this many output bytes have been read (optional)
+    - `tail_bytes`: Keep only the last N bytes of stdout and of stderr (optional)
+    """
+    return await call_tool(ToolCall(name="ssh_exec", arguments=args), request)
+
+@app.post("/tools/ssh_exec/stream",
+          summary="SSH Execute (streaming) - Output as Server-Sent Events",
+          description="Run a command and stream stdout/stderr chunks as they arrive (text/event-stream)",
+          response_description="SSE stream of stdout, stderr and a final exit event")
+async def call_ssh_exec_stream(args: Dict[str, Any], request: Request):
+    """
+    **SSH Execute Stream**
+    
+    Same arguments as `/tools/ssh_exec`; output is streamed instead of buffered.
+    
+    **Events:**
+    - `stdout` / `stderr`: `{"stream": "stdout", "data": "..."}` as chunks arrive
+    - `exit`: `{"exit_code": 0, "stdout_bytes": 1234, "stderr_bytes": 0, "truncated": false}`
+    
+    `max_bytes` stops the command after that much output (`truncated: true`, `exit_code: null`).
+    `tail_bytes` repeats the last N bytes of each stream in the `exit` event (default 0: none).
+    Disconnecting closes the remote channel.
     """
-    return call_tool(ToolCall(name="ssh_exec", arguments=args), request)
+    target = args.get("target")
+    try:
+        _validate_tool_args("ssh_exec", args, ["target", "command"])
+        req = SSHExecStreamRequest(**args)
+        if req.target not in load_config().targets:
+            raise ValueError(f"Unknown target: {req.target}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        _audit("tool_error", {"tool": "ssh_exec_stream", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "ssh_exec_stream", "target": target, "ok": True})
+    return EventSourceResponse(sse_events(scheduled_stream(req.target, "ssh_exec", ssh_exec_stream(req)),
+                                          event_for=ssh_exec_event_name))
 
 @app.post("/tools/scp_put",
           summary="SCP Put - Upload File to Remote Host",
           description="Upload a file to the target via SFTP (content as base64). Use this to transfer files to remote hosts.",
           response_description="Returns upload status, file size, and remote path")
-def call_scp_put(args: Dict[str, Any], request: Request):
+async def call_scp_put(args: Dict[str, Any], request: Request):
     """
     **SCP Put Tool**
     
@@ -413,13 +419,68 @@ def call_scp_put(args: Dict[str, Any], request: Request):
     - `content_b64`: Base64-encoded file content
     - `mode`: Octal file mode, e.g., 420 (0o644) (optional)
     """
-    return call_tool(ToolCall(name="scp_put", arguments=args), request)
+    return await call_tool(ToolCall(name="scp_put", arguments=args), request)
+
+async def _form_file_chunks(upload) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(UPLOAD_READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+@app.post("/tools/scp_put/stream",
+          summary="SCP Put (streaming) - Upload Raw or Multipart Body",
+          description="Upload a file as the raw request body (or a multipart file field) streamed into a pipelined SFTP write. No base64, no full copy in memory.",
+          response_description="Returns file size and remote path once the upload is complete")
+async def call_scp_put_stream(request: Request, target: str, remote_path: str, mode: Optional[int] = None):
+    """
+    **SCP Put Stream**
+    
+    Large files (firmware, SD images) without `content_b64`. Arguments go in the query string.
+    
+    **Examples:**
+    - `curl -T image.img 'http://host/tools/scp_put/stream?target=pi-lan&remote_path=/tmp/image.img'`
+    - `curl -F file=@fw.bin 'http://host/tools/scp_put/stream?target=pi-lan&remote_path=/tmp/fw.bin&mode=420'`
+    
+    A raw body (any content type other than multipart/form-data) is piped straight to the target.
+    Multipart parts are spooled by the form parser first (in memory up to 1 MB, then a temp file).
+    The file is written as `remote_path.part` and renamed when complete, so a failed upload
+    never leaves a truncated file in place. `GET /tools/scp_put/uploads` reports progress.
+    """
+    try:
+        length = request.headers.get("content-length")
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            uploads = [v for v in form.values() if hasattr(v, "read")]
+            if not uploads:
+                raise ValueError("multipart body has no file field")
+            chunks = _form_file_chunks(uploads[0])
+            length = uploads[0].size
+        else:
+            chunks = request.stream()
+        req = ScpPutStreamRequest(target=target, remote_path=remote_path, mode=mode,
+                                  size=int(length) if length is not None else None)
+        async with get_scheduler().slot(target, "scp_put_stream"):
+            result = await scp_put_stream(req, chunks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        _audit("tool_error", {"tool": "scp_put_stream", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "scp_put_stream", "target": target, "ok": True, "size": result.size})
+    return result.model_dump()
+
+@app.get("/tools/scp_put/uploads")
+def scp_put_uploads():
+    """Streamed uploads in progress: bytes written so far, expected size and throughput"""
+    return {"uploads": active_uploads()}
 
 @app.post("/tools/scp_get",
           summary="SCP Get - Download File from Remote Host",
           description="Download a file from the target via SFTP (content as base64). Use this to retrieve files from remote hosts.",
           response_description="Returns file content as base64 and remote path")
-def call_scp_get(args: Dict[str, Any], request: Request):
+async def call_scp_get(args: Dict[str, Any], request: Request):
     """
     **SCP Get Tool**
     
@@ -437,13 +498,359 @@ def call_scp_get(args: Dict[str, Any], request: Request):
     - `target`: Target name from config.targets (e.g., 'pi-lan')
     - `remote_path`: Absolute path of file to read from remote host
     """
-    return call_tool(ToolCall(name="scp_get", arguments=args), request)
+    return await call_tool(ToolCall(name="scp_get", arguments=args), request)
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First (start, end) of a "bytes=" Range header, end inclusive; None means send the whole file.
+    Raises ValueError when the range lies beyond the end of the file. A range whose last byte comes
+    before its first is invalid, so the header is ignored (RFC 9110 14.1.1), not answered with 416.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # other units and multi-range requests get the full body (RFC 9110 allows this)
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+@app.get("/tools/scp_get/stream",
+         summary="SCP Get (streaming) - Download File with Range Support",
+         description="Stream a file from the target as the response body. Supports Range requests, so interrupted downloads can resume.",
+         response_description="The file bytes (200), or the requested range (206)")
+async def call_scp_get_stream(request: Request, target: str, remote_path: str):
+    """
+    **SCP Get Stream**
+    
+    Large files (logs, images) without base64: SFTP reads are prefetched and written straight to the response.
+    
+    **Examples:**
+    - `curl -o app.log 'http://host/tools/scp_get/stream?target=pi-lan&remote_path=/var/log/app.log'`
+    - `curl -C - -o app.log '...'` resumes with `Range: bytes=<size so far>-`
+    
+    `ETag` is derived from size and mtime; send it back as `If-Range` so a resume of a file
+    that changed returns the whole new file instead of a mismatched tail.
+    """
+    try:
+        info = await remote_file_info(target, remote_path)
+    except FileNotFoundError:
+        _audit("tool_error", {"tool": "scp_get_stream", "target": target, "error": "not found"})
+        raise HTTPException(status_code=404, detail=f"No such file: {remote_path}")
+    except Exception as e:
+        _audit("tool_error", {"tool": "scp_get_stream", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": info.etag,
+        "Content-Disposition": f'attachment; filename="{os.path.basename(remote_path)}"',
+    }
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", info.etag) == info.etag:
+        try:
+            byte_range = _parse_range(range_header, info.size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{info.size}"})
+
+    if byte_range is None:
+        start, length, status = 0, info.size, 200
+    else:
+        start, length, status = byte_range[0], byte_range[1] - byte_range[0] + 1, 206
+        headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{info.size}"
+    headers["Content-Length"] = str(length)
+    _audit("tool_call", {"tool": "scp_get_stream", "target": target, "ok": True, "offset": start, "length": length})
+    body = scheduled_stream(target, "scp_get_stream", scp_get_stream(target, remote_path, start, length))
+    return StreamingResponse(body, status_code=status, media_type="application/octet-stream", headers=headers)
+
+@app.post("/tools/sync_dir",
+          summary="Sync Dir - Delta-Sync a Directory to a Remote Host",
+          description="Bring a remote directory up to date with a local one. Only changed blocks (rsync-style rolling checksums) and new files are sent; modes are preserved.",
+          response_description="Returns created/updated/deleted files and the bytes and time saved versus a full upload")
+async def call_sync_dir(args: Dict[str, Any], request: Request):
+    """
+    **Sync Dir Tool**
+    
+    Deploys a directory from the MCP server host without re-uploading unchanged data.
+    The target needs `python3` (override with `MCP_PI_REMOTE_PYTHON`).
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan",
+      "local_dir": "/srv/builds/app",
+      "remote_dir": "/home/pi/app",
+      "exclude": [".git", "__pycache__", "*.pyc"],
+      "delete": false,
+      "dry_run": true
+    }
+    ```
+    
+    **Parameters:**
+    - `target`: Target name from config.targets (e.g., 'pi-lan')
+    - `local_dir`: Directory on the MCP server host to copy from
+    - `remote_dir`: Absolute directory on the remote host to bring up to date
+    - `exclude`: Glob patterns (names or relative paths) to skip (optional)
+    - `delete`: Remove remote files not present locally (optional, default false)
+    - `block_size`: Checksum block size in bytes (optional, default 8192)
+    - `dry_run`: Report what would be sent without changing the target (optional)
+    """
+    return await call_tool(ToolCall(name="sync_dir", arguments=args), request)
+
+@app.post("/tools/fleet_run",
+          summary="Fleet Run - Run a Tool on Many Targets",
+          description="Run one tool across a list of targets or a label selector over hosts.yaml, concurrently. Returns per-target results; failures on some hosts do not fail the call.",
+          response_description="Returns per-target results plus succeeded/failed target lists")
+async def call_fleet_run(args: Dict[str, Any], request: Request):
+    """
+    **Fleet Run Tool**
+    
+    Fans one tool call out to many targets; `target` is filled in per host.
+    
+    **Example JSON:**
+    ```json
+    {
+      "tool": "git_pull",
+      "arguments": {"project_dir": "/home/pi/app", "branch": "main"},
+      "selector": "role=kiosk,site!=lab",
+      "concurrency": 10,
+      "timeout": 120
+    }
+    ```
+    
+    **Parameters:**
+    - `tool`: Any tool that takes a `target`
+    - `arguments`: That tool's arguments, without `target`
+    - `targets`: Target names (optional if `selector` is given)
+    - `selector`: Label selector: `key=value`, `key!=value`, `key`, `!key`, comma-separated (all must match)
+    - `concurrency`: Targets worked on at once (optional, default `MCP_PI_FLEET_CONCURRENCY` or 10)
+    - `timeout`: Seconds allowed per target (optional)
+    
+    A target fails when the tool raises, times out, returns a non-zero `exit_code` or `ok: false`.
+    Use `/tools/fleet_run/stream` to receive each result as its host finishes.
+    """
+    return await call_tool(ToolCall(name="fleet_run", arguments=args), request)
+
+@app.post("/tools/fleet_run/stream",
+          summary="Fleet Run (streaming) - Results as Each Host Finishes",
+          description="Same arguments as /tools/fleet_run; each target's result is sent as a server-sent event when it completes, so fast hosts are not held back by the slowest.",
+          response_description="SSE stream of result events and a final done event")
+async def call_fleet_run_stream(args: Dict[str, Any], request: Request):
+    """
+    **Fleet Run Stream**
+    
+    **Events:**
+    - `result`: `{"target": "pi-3", "ok": true, "elapsed": 1.2, "result": {...}, "error": null}`
+    - `done`: `{"done": true, "succeeded": [...], "failed": [...], "elapsed": 4.8}`
+    
+    Disconnecting cancels the targets that have not finished.
+    """
+    try:
+        _validate_tool_args("fleet_run", args, ["tool"])
+        req = FleetRunRequest(**args)
+        targets = resolve_targets(req)
+    except HTTPException:
+        raise
+    except Exception as e:
+        _audit("tool_error", {"tool": "fleet_run_stream", "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "fleet_run_stream", "fleet_tool": req.tool, "targets": len(targets), "ok": True})
+    return EventSourceResponse(sse_events(fleet_run_stream(req), event_for=fleet_event_name))
+
+@app.post("/tools/rollout_deploy",
+          summary="Rollout Deploy - Canary and Rolling Deploys Across Targets",
+          description="Run deploy_hook across targets in waves (canary first, then batch_size hosts per wave). Each host is health-checked after its deploy; the rollout halts, or rolls back, once failures pass max_failures.",
+          response_description="Returns final status, the wave plan, per-host results and any rollbacks")
+async def call_rollout_deploy(args: Dict[str, Any], request: Request):
+    """
+    **Rollout Deploy Tool**
+    
+    **Example JSON:**
+    ```json
+    {
+      "project_dir": "/home/pi/app",
+      "selector": "role=kiosk",
+      "canary": 1,
+      "batch_size": 5,
+      "max_unavailable": 3,
+      "max_failures": 1,
+      "health": {"service": "app.service", "url": "http://127.0.0.1:8000/health", "retries": 5, "interval": 2},
+      "on_failure": "rollback",
+      "rollback_script": "rollback.sh"
+    }
+    ```
+    
+    **Parameters:**
+    - `project_dir`, `script`, `env`, `timeout`: As for `deploy_hook` (`timeout` is per host)
+    - `targets` / `selector`: Hosts to deploy, as for `fleet_run`; `targets` order is the rollout order
+    - `canary`: Hosts in the first wave (optional, default 1); any failure there halts the rollout
+    - `batch_size`: Hosts per later wave (optional, default 1)
+    - `max_unavailable`: Hosts deploying, or left failed, at once (optional, default `batch_size`)
+    - `max_failures`: Failed hosts tolerated before halting (optional, default 0)
+    - `health`: `service` must be active and/or `url` must answer 2xx/3xx (curl on the target), retried
+    - `on_failure`: `stop` or `rollback` (runs `rollback_script` on every deployed host, latest wave first)
+    
+    A wave starts only after the previous one has deployed and passed its health checks.
+    Use `/tools/rollout_deploy/stream` to follow waves and hosts as they finish.
+    """
+    return await call_tool(ToolCall(name="rollout_deploy", arguments=args), request)
+
+@app.post("/tools/rollout_deploy/stream",
+          summary="Rollout Deploy (streaming) - Follow Waves as They Run",
+          description="Same arguments as /tools/rollout_deploy; wave, host and rollback events are sent as server-sent events as they happen.",
+          response_description="SSE stream of wave, host and rollback events and a final done event")
+async def call_rollout_deploy_stream(args: Dict[str, Any], request: Request):
+    """
+    **Rollout Deploy Stream**
+    
+    **Events:**
+    - `wave`: `{"wave": 1, "targets": ["pi-2", "pi-3"], "canary": false}`
+    - `host`: `{"target": "pi-2", "wave": 1, "ok": true, "elapsed": 41.2, "exit_code": 0, "error": null}`
+    - `rollback`: same shape as `host`, for the rollback script
+    - `done`: `{"status": "completed", "reason": null, "succeeded": [...], "failed": [...], "skipped": [...]}`
+    
+    Disconnecting cancels the hosts still deploying; later waves do not start.
+    """
+    try:
+        _validate_tool_args("rollout_deploy", args, ["project_dir"])
+        req = RolloutRequest(**args)
+    except HTTPException:
+        raise
+    except Exception as e:
+        _audit("tool_error", {"tool": "rollout_deploy_stream", "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "rollout_deploy_stream", "project_dir": req.project_dir, "ok": True})
+    return EventSourceResponse(sse_events(rollout_stream(req), event_for=rollout_event_name))
+
+@app.post("/tools/batch",
+          summary="Batch - Run Many Tool Calls in One Request",
+          description="Run a list of tool calls in one round trip. Calls are grouped by target over one pooled SSH connection each; different targets run in parallel. Returns per-call results and timings.",
+          response_description="Returns one result per call, in request order, plus ok/failed/skipped counts and connect times")
+async def call_batch(body: BatchRequest, request: Request):
+    """
+    **Batch Tool Calls**
+    
+    **Example JSON:**
+    ```json
+    {
+      "calls": [
+        {"name": "git_pull", "arguments": {"target": "pi-lan", "project_dir": "/home/pi/app"}, "id": "pull"},
+        {"name": "systemd_service", "arguments": {"target": "pi-lan", "name": "app.service", "action": "restart"}, "depends_on": ["pull"]},
+        {"name": "ssh_exec", "arguments": {"target": "pi-2", "command": "uptime"}}
+      ],
+      "ordered": true,
+      "stop_on_error": false
+    }
+    ```
+    
+    **Parameters:**
+    - `calls`: Tool calls as for `POST /tools`, each with an optional `id` and `depends_on` (ids of earlier calls)
+    - `ordered`: Run calls on the same target in the order given (optional, default true); false lets them overlap
+    - `stop_on_error`: Skip a target's remaining ordered calls after one fails (optional, default false)
+    
+    Each target's SSH connection is opened once, up front and in parallel, and shared by its calls.
+    A call fails (`error`) when it raises or its result reports failure: a non-zero `exit_code` or `ok: false`.
+    A call whose `depends_on` call failed is reported as `skipped`. One failing call does not fail the batch;
+    per-call `start` and `elapsed` are seconds from the start of the batch.
+    """
+    try:
+        result = await run_batch(body, _invoke)
+    except ValueError as e:
+        _audit("tool_error", {"tool": "batch", "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    for r in result.results:
+        if r.status == "ok":
+            _audit("tool_call", {"tool": r.name, "target": r.target, "ok": True, "batch": True})
+        else:
+            _audit("tool_error", {"tool": r.name, "target": r.target, "error": r.error, "batch": True})
+    return result.model_dump()
+
+@app.post("/jobs", status_code=202,
+          summary="Submit Job - Run a Tool in the Background",
+          description="Queue any tool call as a background job and return its id at once. Use for deploy_hook, git_pull, django_manage migrate and anything else that outlives a proxy timeout.",
+          response_description="Returns the queued job record")
+async def submit_job(body: JobSubmit):
+    """
+    **Submit Job**
+    
+    **Example JSON:**
+    ```json
+    {"tool": "deploy_hook", "arguments": {"target": "pi-lan", "project_dir": "/home/pi/app"}}
+    ```
+    
+    Jobs on the same target run one after another in submit order (`MCP_PI_JOB_PER_TARGET`),
+    at most `MCP_PI_JOB_WORKERS` at once overall. Results and logs are kept in a local SQLite
+    store (`MCP_PI_JOB_DB`), so they can be fetched after the client disconnects.
+    
+    Poll `GET /jobs/{id}`, follow `GET /jobs/{id}/logs/stream`, or cancel with `POST /jobs/{id}/cancel`.
+    """
+    try:
+        rec = await get_jobs().submit(body)
+    except Exception as e:
+        _audit("tool_error", {"tool": body.tool, "error": str(e), "job": True})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("job_submitted", {"job": rec.id, "tool": rec.tool, "target": rec.target})
+    return rec.model_dump()
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, target: Optional[str] = None, limit: int = 50):
+    """Recent jobs, newest first, optionally filtered by status and target"""
+    return {"jobs": [r.model_dump() for r in get_jobs().list(status, target, limit)]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job status, and the tool's result once it has finished"""
+    rec = get_jobs().get(job_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return rec.model_dump()
+
+@app.get("/jobs/{job_id}/logs")
+def get_job_logs(job_id: str, offset: int = 0):
+    """Output the job's commands have produced so far; pass the returned offset back to get only newer entries"""
+    page = get_jobs().logs(job_id, offset)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return page.model_dump()
+
+@app.get("/jobs/{job_id}/logs/stream",
+         summary="Follow Job Logs (streaming)",
+         description="Server-sent `log` events (`{\"stream\": \"stdout\", \"data\": \"...\"}`) as the job's commands produce output, then a `done` event with the finished job record. Disconnecting does not affect the job.")
+async def stream_job_logs(job_id: str, offset: int = 0):
+    if get_jobs().get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return EventSourceResponse(sse_events(get_jobs().follow(job_id, offset), event_for=job_event_name))
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job. A running job's channels are closed and every remote process it
+    started (tagged MCP_PI_JOB=<id>) gets SIGTERM; `error` says how many were signalled.
+    """
+    try:
+        rec = await get_jobs().cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if rec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    _audit("job_cancelled", {"job": rec.id, "tool": rec.tool, "target": rec.target})
+    return rec.model_dump()
 
 @app.post("/tools/tmux/ensure",
           summary="Tmux Ensure - Create or Verify Session",
           description="Ensure a tmux session exists (create if needed). Use this to manage persistent terminal sessions on remote hosts.",
           response_description="Returns session status and creation details")
-def call_tmux_ensure(args: Dict[str, Any], request: Request):
+async def call_tmux_ensure(args: Dict[str, Any], request: Request):
     """
     **Tmux Ensure Tool**
     
@@ -463,13 +870,13 @@ def call_tmux_ensure(args: Dict[str, Any], request: Request):
     - `session`: Session name (suffix); will be prefixed with 'mcp_'
     - `cwd`: Working directory for the session (optional)
     """
-    return call_tool(ToolCall(name="tmux_ensure", arguments=args), request)
+    return await call_tool(ToolCall(name="tmux_ensure", arguments=args), request)
 
 @app.post("/tools/tmux/send_keys",
           summary="Tmux Send Keys - Send Command to Session",
           description="Send keys/command to a tmux session (adds Enter by default). Use this to execute commands in existing tmux sessions.",
           response_description="Returns command execution status and details")
-def call_tmux_send(args: Dict[str, Any], request: Request):
+async def call_tmux_send(args: Dict[str, Any], request: Request):
     """
     **Tmux Send Keys Tool**
     
@@ -491,13 +898,13 @@ def call_tmux_send(args: Dict[str, Any], request: Request):
     - `keys`: Command to send; will append Enter by default
     - `enter`: Whether to append Enter key (optional, defaults to true)
     """
-    return call_tool(ToolCall(name="tmux_send_keys", arguments=args), request)
+    return await call_tool(ToolCall(name="tmux_send_keys", arguments=args), request)
 
 @app.post("/tools/tmux/kill",
           summary="Tmux Kill - Terminate Session",
           description="Kill a tmux session. Use this to clean up and terminate tmux sessions on remote hosts.",
           response_description="Returns session termination status and details")
-def call_tmux_kill(args: Dict[str, Any], request: Request):
+async def call_tmux_kill(args: Dict[str, Any], request: Request):
     """
     **Tmux Kill Tool**
     
@@ -515,13 +922,77 @@ def call_tmux_kill(args: Dict[str, Any], request: Request):
     - `target`: Target name from config.targets (e.g., 'pi-lan')
     - `session`: Session name (suffix); will be prefixed with 'mcp_'
     """
-    return call_tool(ToolCall(name="tmux_kill", arguments=args), request)
+    return await call_tool(ToolCall(name="tmux_kill", arguments=args), request)
+
+@app.post("/tools/tmux/list",
+          summary="Tmux List - Managed Sessions",
+          description="List the tmux sessions this server manages (names start with 'mcp_'). Answered from the control client's cached session list when it is connected.",
+          response_description="Returns session names")
+async def call_tmux_list(args: Dict[str, Any], request: Request):
+    """
+    **Tmux List Tool**
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan"
+    }
+    ```
+    """
+    return await call_tool(ToolCall(name="tmux_list", arguments=args), request)
+
+@app.get("/tools/tmux/control")
+def tmux_control_stats():
+    """Resident `tmux -C` clients per target: cached sessions, replies pending, and targets backing off after a failed start"""
+    return get_tmux_control().stats()
+
+@app.get("/tools/tmux/stream",
+         summary="Tmux Stream - Follow a Session's Output",
+         description="Server-sent `output` events with the pane's output as it is printed, starting with recent scrollback. All viewers of a session share one SSH channel.",
+         response_description="SSE stream of output events and a final done event")
+async def call_tmux_stream(request: Request, target: str, session: str, history: bool = True,
+                           offset: Optional[int] = None, watch: Optional[str] = None, duration: Optional[float] = None):
+    """
+    **Tmux Stream**
+    
+    `curl -N 'http://host/tools/tmux/stream?target=pi-lan&session=runserver'`
+    
+    **Events:**
+    - `output`: `{"data": "...", "offset": 5120, "watch": "3f9c0a1b2d4e"}` (raw pane output, including terminal escapes)
+    - `done`: `{"done": true, "reason": "session ended", "offset": 5120, "watch": "3f9c0a1b2d4e"}`
+    
+    Each event's id is `watch:offset`, so an EventSource that reconnects resumes where it left off.
+    The server keeps the last `MCP_PI_TMUX_RING_CHARS` characters per session, and the pane
+    stays piped for `MCP_PI_TMUX_LINGER` seconds after the last viewer leaves. Resuming from a
+    watch that has since ended starts over from scrollback, with `"reset": true` on the first event;
+    resuming from output that has left the buffer reports the lost characters as `"gap"`.
+    """
+    last_id = request.headers.get("last-event-id")
+    try:
+        if offset is None and last_id:
+            last_watch, _, last_offset = last_id.rpartition(":")
+            if last_offset.isdigit():
+                offset, watch = int(last_offset), last_watch or None
+        req = TmuxStreamRequest(target=target, session=session, history=history, offset=offset, watch=watch, duration=duration)
+        if req.target not in load_config().targets:
+            raise ValueError(f"Unknown target: {req.target}")
+    except Exception as e:
+        _audit("tool_error", {"tool": "tmux_stream", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "tmux_stream", "target": target, "session": session, "ok": True})
+    return EventSourceResponse(sse_events(tmux_stream(req), event_for=tmux_stream_event_name,
+                                          id_for=lambda evt: f"{evt['watch']}:{evt['offset']}"))
+
+@app.get("/tools/tmux/watchers")
+def tmux_watchers():
+    """Panes being followed: subscribers, characters seen and buffered, and why a watch ended"""
+    return {"watchers": pane_watchers()}
 
 @app.post("/tools/systemd",
           summary="Systemd Service - Manage Services",
           description="Manage a systemd service on the target. Use this to start, stop, restart, enable, disable, or check status of services.",
           response_description="Returns service operation status, output, and exit code")
-def call_systemd(args: Dict[str, Any], request: Request):
+async def call_systemd(args: Dict[str, Any], request: Request):
     """
     **Systemd Service Tool**
     
@@ -541,13 +1012,145 @@ def call_systemd(args: Dict[str, Any], request: Request):
     - `name`: systemd service name (e.g., 'nginx.service', 'myapp.service')
     - `action`: One of: start, stop, restart, reload, enable, disable, status
     """
-    return call_tool(ToolCall(name="systemd_service", arguments=args), request)
+    return await call_tool(ToolCall(name="systemd_service", arguments=args), request)
+
+@app.post("/tools/systemd/status_many",
+          summary="Systemd Status Many - Read Several Units at Once",
+          description="Read ActiveState/SubState/MainPID and more for several units with one `systemctl show`. States are cached per target for `MCP_PI_SYSTEMD_STATUS_TTL` seconds, so dashboard polls do not reach the host every time.",
+          response_description="Returns one record per unit, in request order")
+async def call_systemd_status_many(args: Dict[str, Any], request: Request):
+    """
+    **Systemd Status Many Tool**
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan",
+      "names": ["nginx.service", "myproj", "redis-server.service"],
+      "max_age": 5
+    }
+    ```
+    
+    **Parameters:**
+    - `target`: Target name from config.targets (e.g., 'pi-lan')
+    - `names`: Unit names; a name without a suffix means `.service`
+    - `max_age`: Oldest cached state to accept in seconds (optional; 0 always reads the host)
+    
+    Units that do not exist come back with `load_state: "not-found"`. Each record's `age` is
+    how old its state is; `fetched` counts the units this call read from the host.
+    """
+    return await call_tool(ToolCall(name="systemd_status_many", arguments=args), request)
+
+@app.get("/tools/systemd/watch",
+         summary="Systemd Watch - Follow Unit State Changes",
+         description="Server-sent events: a `snapshot` of the units' states, then a `change` event whenever one changes. One SSH channel per target feeds every subscriber, and while it runs `systemd_status_many` answers tracked units from its table.",
+         response_description="SSE stream of snapshot and change events and a final done event")
+async def call_systemd_watch(request: Request, target: str, units: Optional[str] = None,
+                             since: Optional[int] = None, watch: Optional[str] = None, duration: Optional[float] = None):
+    """
+    **Systemd Watch**
+    
+    `curl -N 'http://host/tools/systemd/watch?target=pi-lan&units=nginx,myproj'`
+    
+    **Events:**
+    - `snapshot`: `{"snapshot": [{"name": "nginx.service", "active_state": "active", ...}], "seq": 12, "watch": "3f9c0a1b2d4e"}`
+    - `change`: `{"unit": "myproj.service", "seq": 13, "watch": "3f9c0a1b2d4e", "old": {"active_state": "active", ...}, "new": {...}}`
+    - `done`: `{"done": true, "reason": "duration", "seq": 13, "watch": "3f9c0a1b2d4e"}`
+    
+    `units` is a comma-separated filter (a bare name means `.service`). Each event's id is
+    `watch:seq`, so an EventSource that reconnects gets the changes it missed; if that watch has
+    since ended it gets a fresh snapshot. Changes come from PID 1's journal entries; every
+    `MCP_PI_SYSTEMD_WATCH_RESYNC` seconds all units are read again.
+    """
+    last_id = request.headers.get("last-event-id")
+    try:
+        if since is None and last_id:
+            last_watch, _, last_seq = last_id.rpartition(":")
+            if last_seq.isdigit():
+                since, watch = int(last_seq), last_watch or None
+        req = SystemdWatchRequest(target=target, units=[u for u in (units or "").split(",") if u] or None,
+                                  since=since, watch=watch, duration=duration)
+        if req.target not in load_config().targets:
+            raise ValueError(f"Unknown target: {req.target}")
+    except Exception as e:
+        _audit("tool_error", {"tool": "systemd_watch", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "systemd_watch", "target": target, "ok": True})
+    return EventSourceResponse(sse_events(systemd_watch_stream(req), event_for=systemd_watch_event_name,
+                                          id_for=lambda evt: f"{evt['watch']}:{evt['seq']}"))
+
+@app.get("/tools/systemd/watchers")
+def systemd_watch_list():
+    """Targets being watched: watch id, subscribers, units tracked, last seq, and why a watch ended"""
+    return {"watchers": systemd_watchers()}
+
+@app.post("/tools/journal/tail",
+          summary="Journal Tail - Read Filtered Journal Entries",
+          description="Read systemd journal entries with unit, priority, time and message filters applied on the target. Returns compact entries and a cursor for resuming.",
+          response_description="Returns entries, the last cursor, and whether max_entries cut the read short")
+async def call_journal_tail(args: Dict[str, Any], request: Request):
+    """
+    **Journal Tail Tool**
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan",
+      "units": ["nginx.service"],
+      "priority": "warning",
+      "since": "-1h",
+      "grep": "timeout"
+    }
+    ```
+    
+    Pass the returned `cursor` back as `cursor` to get only entries written since.
+    With `follow`, new entries are read for `duration` seconds (default `MCP_PI_JOURNAL_COLLECT`).
+    """
+    return await call_tool(ToolCall(name="journal_tail", arguments=args), request)
+
+@app.get("/tools/journal/stream",
+         summary="Journal Stream - Follow Journal Entries",
+         description="Server-sent `entry` events, one per journal entry, filtered on the target. With follow, new entries are sent as they are written.",
+         response_description="SSE stream of entry events and a final done event")
+async def call_journal_stream(request: Request, target: str, units: Optional[str] = None, priority: Optional[str] = None,
+                              since: Optional[str] = None, grep: Optional[str] = None, lines: Optional[int] = None,
+                              cursor: Optional[str] = None, follow: bool = True, duration: Optional[float] = None,
+                              max_entries: Optional[int] = None):
+    """
+    **Journal Stream**
+    
+    `curl -N 'http://host/tools/journal/stream?target=pi-lan&units=nginx,myproj&priority=err'`
+    
+    **Events:**
+    - `entry`: `{"ts": 1792296000.123, "priority": 3, "unit": "myproj.service", "ident": "python", "pid": 812, "message": "...", "cursor": "s=..."}`
+    - `done`: `{"done": true, "reason": "end", "cursor": "s=...", "count": 42}`
+    
+    `units` is comma-separated. Each event's id is its journal cursor, so an EventSource that
+    reconnects continues after the last entry it got instead of receiving the history again.
+    A follow holds one of the target's `MCP_PI_POOL_MAX_STREAMS` stream slots, not an exec slot;
+    past that cap the stream ends at once with a `done` event whose reason says so.
+    """
+    last_id = request.headers.get("last-event-id")
+    try:
+        req = JournalTailRequest(target=target, units=[u for u in (units or "").split(",") if u] or None,
+                                 priority=priority, since=since, grep=grep, lines=lines,
+                                 cursor=cursor or last_id or None, follow=follow, duration=duration, max_entries=max_entries)
+        if req.target not in load_config().targets:
+            raise ValueError(f"Unknown target: {req.target}")
+    except Exception as e:
+        _audit("tool_error", {"tool": "journal_stream", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "journal_stream", "target": target, "ok": True})
+    stream = journal_stream(req)
+    if not req.follow:
+        stream = scheduled_stream(req.target, "journal_tail", stream)
+    return EventSourceResponse(sse_events(stream, event_for=journal_event_name, id_for=lambda evt: evt.get("cursor") or ""))
 
 @app.post("/tools/django/manage",
           summary="Django Manage - Run Management Commands",
           description="Run python manage.py with given args (migrate, collectstatic, etc.). Use this to execute Django management commands on remote hosts.",
           response_description="Returns command output, error messages, and exit code")
-def call_django_manage(args: Dict[str, Any], request: Request):
+async def call_django_manage(args: Dict[str, Any], request: Request):
     """
     **Django Manage Tool**
     
@@ -575,13 +1178,13 @@ def call_django_manage(args: Dict[str, Any], request: Request):
     - `env`: Environment variables as key-value pairs (optional)
     - `timeout`: Timeout in seconds (optional)
     """
-    return call_tool(ToolCall(name="django_manage", arguments=args), request)
+    return await call_tool(ToolCall(name="django_manage", arguments=args), request)
 
 @app.post("/tools/django/runserver_tmux",
           summary="Django Runserver - Start Dev Server in Tmux",
           description="Run Django dev server in a tmux session (sends Ctrl-C first, then runserver). Use this to start Django development servers on remote hosts.",
           response_description="Returns server startup status and session details")
-def call_django_runserver(args: Dict[str, Any], request: Request):
+async def call_django_runserver(args: Dict[str, Any], request: Request):
     """
     **Django Runserver Tool**
     
@@ -611,7 +1214,7 @@ def call_django_runserver(args: Dict[str, Any], request: Request):
     - `env`: Environment variables as key-value pairs (optional)
     - `timeout`: Timeout in seconds (optional)
     """
-    return call_tool(ToolCall(name="django_runserver_tmux", arguments=args), request)
+    return await call_tool(ToolCall(name="django_runserver_tmux", arguments=args), request)
 
 @app.get("/")
 def root():
@@ -658,6 +1261,24 @@ def openapi_spec_options():
 def health():
     return {"status": "ok"}
 
+@app.get("/scheduler/stats")
+def scheduler_stats():
+    """Per-target slots in use, queue depth by lane, and how long calls waited for a slot"""
+    return get_scheduler().stats()
+
+@app.post("/config/reload")
+def config_reload():
+    # Force a re-parse of hosts.yaml (normally picked up automatically on change)
+    cfg = reload_config()
+    return {"targets": sorted(cfg.targets.keys()), "cache": config_cache_stats()}
+
+@app.on_event("shutdown")
+def close_ssh_pool():
+    # Stop resident GPIO agents and tmux control clients, then close pooled SSH transports so targets don't see half-open sessions
+    get_daemon_manager().close_all()
+    get_tmux_control().close_all()
+    get_pool().close_all()
+
 @app.get("/gpio/examples")
 def gpio_examples():
     """
@@ -768,7 +1389,7 @@ def gpio_examples():
           summary="Git Status - Check Repository Status",
           description="Get git status for a project directory. Use this to check the current state of git repositories on remote hosts.",
           response_description="Returns git status output, error messages, and exit code")
-def call_git_status(args: Dict[str, Any], request: Request):
+async def call_git_status(args: Dict[str, Any], request: Request):
     """
     **Git Status Tool**
     
@@ -788,13 +1409,13 @@ def call_git_status(args: Dict[str, Any], request: Request):
     - `project_dir`: Remote project directory containing the git repo
     - `short`: If true, runs 'git status --short --branch' else full 'git status' (optional, defaults to true)
     """
-    return call_tool(ToolCall(name="git_status", arguments=args), request)
+    return await call_tool(ToolCall(name="git_status", arguments=args), request)
 
 @app.post("/tools/git/checkout",
           summary="Git Checkout - Switch Branch or Tag",
           description="Checkout a branch or tag in the git repo. Use this to switch between different branches or tags on remote hosts.",
           response_description="Returns checkout operation output, error messages, and exit code")
-def call_git_checkout(args: Dict[str, Any], request: Request):
+async def call_git_checkout(args: Dict[str, Any], request: Request):
     """
     **Git Checkout Tool**
     
@@ -816,13 +1437,13 @@ def call_git_checkout(args: Dict[str, Any], request: Request):
     - `ref`: Branch or tag to checkout, e.g., 'main' or 'v1.2.3'
     - `create_branch`: If true, create a new branch from current HEAD (optional, defaults to false)
     """
-    return call_tool(ToolCall(name="git_checkout", arguments=args), request)
+    return await call_tool(ToolCall(name="git_checkout", arguments=args), request)
 
 @app.post("/tools/git/pull",
           summary="Git Pull - Update Repository",
           description="Pull updates from remote; optional fetch --all/prune and reset --hard. Use this to update git repositories on remote hosts.",
           response_description="Returns pull operation output, error messages, and exit code")
-def call_git_pull(args: Dict[str, Any], request: Request):
+async def call_git_pull(args: Dict[str, Any], request: Request):
     """
     **Git Pull Tool**
     
@@ -848,13 +1469,13 @@ def call_git_pull(args: Dict[str, Any], request: Request):
     - `fetch_all`: If true, runs 'git fetch --all --prune' first (optional, defaults to false)
     - `reset_hard`: If true, 'git reset --hard <remote>/<branch>' after fetch (optional, defaults to false)
     """
-    return call_tool(ToolCall(name="git_pull", arguments=args), request)
+    return await call_tool(ToolCall(name="git_pull", arguments=args), request)
 
 @app.post("/tools/deploy/hook",
           summary="Deploy Hook - Run Deployment Script",
           description="Run a controlled deploy script in the project directory (e.g., migrations, collectstatic, restart). Use this to execute deployment scripts on remote hosts.",
           response_description="Returns deployment script output, error messages, and exit code")
-def call_deploy_hook(args: Dict[str, Any], request: Request):
+async def call_deploy_hook(args: Dict[str, Any], request: Request):
     """
     **Deploy Hook Tool**
     
@@ -881,14 +1502,14 @@ def call_deploy_hook(args: Dict[str, Any], request: Request):
     - `env`: Extra environment variables as key-value pairs (optional)
     - `timeout`: Timeout seconds for the full deploy (optional, defaults to 600)
     """
-    return call_tool(ToolCall(name="deploy_hook", arguments=args), request)
+    return await call_tool(ToolCall(name="deploy_hook", arguments=args), request)
 
 
 @app.post("/tools/gpio/write", 
           summary="GPIO Write - Set Pin HIGH/LOW",
           description="Set a GPIO pin to HIGH (1) or LOW (0). Use this to control LEDs, relays, or other digital outputs.",
           response_description="Returns success status and operation details")
-def call_gpio_write(args: Dict[str, Any], request: Request):
+async def call_gpio_write(args: Dict[str, Any], request: Request):
     """
     **GPIO Write Tool**
     
@@ -912,13 +1533,13 @@ def call_gpio_write(args: Dict[str, Any], request: Request):
     - `mode`: "BCM" or "BOARD" (optional, defaults to BCM)
     - `direction`: "out" (optional, defaults to "out")
     """
-    return call_tool(ToolCall(name="gpio_write", arguments=args), request)
+    return await call_tool(ToolCall(name="gpio_write", arguments=args), request)
 
 @app.post("/tools/gpio/read",
           summary="GPIO Read - Read Pin State",
           description="Read the current state of a GPIO pin. Use this to read button states, sensor outputs, or other digital inputs.",
           response_description="Returns the pin value (0 or 1) and operation details")
-def call_gpio_read(args: Dict[str, Any], request: Request):
+async def call_gpio_read(args: Dict[str, Any], request: Request):
     """
     **GPIO Read Tool**
     
@@ -942,13 +1563,13 @@ def call_gpio_read(args: Dict[str, Any], request: Request):
     - `direction`: "in" (optional, defaults to "in")
     - `pull`: "up", "down", or "off" (optional)
     """
-    return call_tool(ToolCall(name="gpio_read", arguments=args), request)
+    return await call_tool(ToolCall(name="gpio_read", arguments=args), request)
 
 @app.post("/tools/gpio/pwm",
           summary="GPIO PWM - Pulse Width Modulation",
           description="Control PWM on a GPIO pin. Use this for motor speed control, servo positioning, or LED brightness control.",
           response_description="Returns PWM operation status and details")
-def call_gpio_pwm(args: Dict[str, Any], request: Request):
+async def call_gpio_pwm(args: Dict[str, Any], request: Request):
     """
     **GPIO PWM Tool**
     
@@ -974,13 +1595,13 @@ def call_gpio_pwm(args: Dict[str, Any], request: Request):
     - `duration`: Duration in seconds (default: 0.2)
     - `mode`: "BCM" or "BOARD" (optional, defaults to BCM)
     """
-    return call_tool(ToolCall(name="gpio_pwm", arguments=args), request)
+    return await call_tool(ToolCall(name="gpio_pwm", arguments=args), request)
 
 @app.post("/tools/gpio/blink",
           summary="GPIO Blink - LED Blinking",
           description="Blink a GPIO pin (LED) a specified number of times with custom timing. Perfect for status indicators and attention-grabbing patterns.",
           response_description="Returns blink operation status and completion details")
-def call_gpio_blink(args: Dict[str, Any], request: Request):
+async def call_gpio_blink(args: Dict[str, Any], request: Request):
     """
     **GPIO Blink Tool**
     
@@ -1006,13 +1627,108 @@ def call_gpio_blink(args: Dict[str, Any], request: Request):
     - `off_time`: Seconds LED is OFF (default: 0.5)
     - `mode`: "BCM" or "BOARD" (optional, defaults to BCM)
     """
-    return call_tool(ToolCall(name="gpio_blink", arguments=args), request)
+    return await call_tool(ToolCall(name="gpio_blink", arguments=args), request)
+
+@app.post("/tools/gpio/read_many",
+          summary="GPIO Read Many - Read Several Pins at Once",
+          description="Read several GPIO pins in a single call. All pins are validated against the policy up front and read with one agent request.",
+          response_description="Returns a pin -> value map and per-pin errors")
+async def call_gpio_read_many(args: Dict[str, Any], request: Request):
+    """
+    **GPIO Read Many Tool**
+    
+    Reads several GPIO pins in one round-trip.
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan",
+      "pins": [17, 18, 22, 23],
+      "mode": "BCM",
+      "pull": "down"
+    }
+    ```
+    
+    **Parameters:**
+    - `target`: Target name from config (use "pi-lan")
+    - `pins`: List of GPIO pin numbers
+    - `mode`: "BCM" or "BOARD" (optional, defaults to BCM)
+    - `pull`: "up", "down", or "off" applied to every pin (optional)
+    """
+    return await call_tool(ToolCall(name="gpio_read_many", arguments=args), request)
+
+@app.post("/tools/gpio/write_many",
+          summary="GPIO Write Many - Set Several Pins at Once",
+          description="Set several GPIO pins HIGH/LOW in a single call. All pins are validated against the policy up front and written with one agent request.",
+          response_description="Returns the written pin -> value map and per-pin errors")
+async def call_gpio_write_many(args: Dict[str, Any], request: Request):
+    """
+    **GPIO Write Many Tool**
+    
+    Sets several GPIO pins in one round-trip.
+    
+    **Example JSON:**
+    ```json
+    {
+      "target": "pi-lan",
+      "values": {"17": 1, "22": 0, "23": true},
+      "mode": "BCM"
+    }
+    ```
+    
+    **Parameters:**
+    - `target`: Target name from config (use "pi-lan")
+    - `values`: Map of pin number -> 0/1 or true/false
+    - `mode`: "BCM" or "BOARD" (optional, defaults to BCM)
+    """
+    return await call_tool(ToolCall(name="gpio_write_many", arguments=args), request)
+
+@app.get("/tools/gpio/watch",
+         summary="GPIO Watch - Stream Pin Changes (SSE)",
+         description="Stream timestamped, delta-encoded pin changes as server-sent events. The agent samples the pins (or listens for edges) on the target and pushes only changes over one persistent channel.",
+         response_description="text/event-stream of snapshot/delta/heartbeat/end events")
+async def call_gpio_watch(request: Request, target: str, pins: str, mode: Optional[str] = None, pull: Optional[str] = None,
+                          rate_hz: float = 20.0, edge: bool = False, bounce_ms: Optional[int] = None,
+                          duration: Optional[float] = None, heartbeat: float = 5.0):
+    """
+    **GPIO Watch Stream**
+    
+    Subscribes to pin changes instead of polling `gpio_read`.
+    
+    **Example:**
+    `GET /tools/gpio/watch?target=pi-lan&pins=17,27&edge=true&bounce_ms=20`
+    
+    **Events:**
+    - `snapshot`: `{"t": 0, "s": {"17": 0, "27": 1}}` (t is ms since start)
+    - `delta`: `{"t": 412, "d": {"17": 1}}` (only pins that changed)
+    - `heartbeat`: `{"t": 5000}`
+    - `end`: `{"t": 9000, "end": true}` when `duration` elapses
+    
+    Subscribers to the same pins and settings share one agent process and channel; `t` counts
+    from each subscriber's own snapshot.
+    """
+    try:
+        req = GPIOWatchRequest(
+            target=target, pins=[int(p) for p in pins.split(",") if p.strip()], mode=mode, pull=pull,
+            rate_hz=rate_hz, edge=edge, bounce_ms=bounce_ms, duration=duration, heartbeat=heartbeat,
+        )
+        watch = gpio_watch(req)
+    except Exception as e:
+        _audit("tool_error", {"tool": "gpio_watch", "target": target, "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit("tool_call", {"tool": "gpio_watch", "target": target, "ok": True})
+    return EventSourceResponse(sse_events(watch, event_for=gpio_watch_event_name))
+
+@app.get("/tools/gpio/watchers")
+def gpio_watch_list():
+    """Pin sets being watched: subscribers, deltas seen, and why a watch ended"""
+    return {"watchers": pin_watchers()}
 
 @app.post("/tools/gpio/macro_run",
           summary="GPIO Macro - Complex Sequences",
           description="Run a sequence of GPIO operations (write, read, pwm, blink) in order. Perfect for complex automation and coordinated device control.",
           response_description="Returns macro execution status and results for each step")
-def call_gpio_macro(args: Dict[str, Any], request: Request):
+async def call_gpio_macro(args: Dict[str, Any], request: Request):
     """
     **GPIO Macro Tool**
     
@@ -1065,4 +1781,4 @@ def call_gpio_macro(args: Dict[str, Any], request: Request):
     - `pwm`: PWM control
     - `blink`: Blink LED
     """
-    return call_tool(ToolCall(name="macro_run", arguments=args), request)
\ No newline at end of file
+    return await call_tool(ToolCall(name="macro_run", arguments=args), request)
\ No newline at end of file
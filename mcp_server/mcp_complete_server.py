@@ -4,556 +4,98 @@ Compatible with Claude Desktop and other MCP clients
 """
 
 import asyncio
+import os
 import sys
 import base64
+import json
+import time
+from functools import partial
+from urllib.parse import urlparse, parse_qs
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.stdio import stdio_server
 import mcp.types as types
 
 # Import all the tool functions and schemas
 from .config import load_config
 from .ssh_transport import SSHClientWrapper
-from .tools.ssh_exec import ssh_exec, SSHExecRequest
-from .tools.scp_put import scp_put, ScpPutRequest
-from .tools.scp_get import scp_get, ScpGetRequest
-from .tools.tmux import tmux_ensure, tmux_send_keys, tmux_kill, TmuxEnsureRequest, TmuxSendKeysRequest, TmuxKillRequest
+from .registry import TOOL_REGISTRY, ToolSpec, get_tool
+from .tools.ssh_exec import ssh_exec_async, ssh_exec_stream, SSHExecRequest, SSHExecStreamRequest, SSHExecResponse
+from .tools.scp_put import scp_put_async, ScpPutRequest
+from .tools.scp_get import scp_get_async, scp_get_range_async, ScpGetRequest, ScpGetRangeRequest
+from .tools.tmux import tmux_ensure_async, tmux_send_keys_async, tmux_kill_async, TmuxEnsureRequest, TmuxSendKeysRequest, TmuxKillRequest
+from .tools.tmux import tmux_stream, TmuxStreamRequest, TMUX_COLLECT, SESSION_PREFIX
 from .tools.git_tools import (
-    git_status, git_checkout, git_pull, deploy_hook, 
-    GitStatusRequest, GitCheckoutRequest, GitPullRequest, DeployHookRequest,
-    TOOL_GIT_STATUS, TOOL_GIT_CHECKOUT, TOOL_GIT_PULL, TOOL_DEPLOY_HOOK
+    git_status_async, git_checkout_async, git_pull_async, deploy_hook_async,
+    GitStatusRequest, GitCheckoutRequest, GitPullRequest, DeployHookRequest
 )
 from .tools.gpio_tools import (
-    gpio_write, gpio_read, gpio_pwm, gpio_blink, macro_run,
+    gpio_write_async, gpio_read_async, gpio_pwm_async, gpio_blink_async, macro_run_async,
+    gpio_read_many_async, gpio_write_many_async,
     GPIOWriteRequest, GPIOReadRequest, GPIOPWMRequest, GPIOBlinkRequest, GPIOMacroRequest,
-    TOOL_GPIO_WRITE, TOOL_GPIO_READ, TOOL_GPIO_PWM, TOOL_GPIO_BLINK, TOOL_GPIO_MACRO_RUN
+    GPIOReadManyRequest, GPIOWriteManyRequest, GPIOWatchRequest, gpio_sample
 )
-from .tools.systemd import service_action, ServiceActionRequest
-from .tools.django import django_manage, django_runserver_tmux, DjangoManageRequest, DjangoRunserverRequest
+from .tools.systemd import service_action_async, ServiceActionRequest, systemd_status_many_async, ServiceStatusManyRequest
+from .tools.systemd_watch import systemd_watch_stream, SystemdWatchRequest, SYSTEMD_WATCH_COLLECT
+from .tools.journal import journal_stream, JournalTailRequest, JOURNAL_COLLECT, JOURNAL_MAX_ENTRIES
+from .tools.fleet import fleet_run_stream, resolve_targets, FleetRunRequest
+from .tools.rollout import rollout_stream, RolloutRequest
+from .scheduler import get_scheduler
+from .tools.django import django_manage_async, django_runserver_tmux_async, DjangoManageRequest, DjangoRunserverRequest
 
 # Initialize MCP Server
 server = Server("mcp-complete-server")
 
+# MCP tool list, built once from the shared registry so it cannot drift from the HTTP schemas
+MCP_TOOLS = [
+    types.Tool(name=spec.name, description=spec.schema["description"], inputSchema=spec.schema["input_schema"])
+    for spec in TOOL_REGISTRY.values()
+]
+
 @server.list_tools()
 async def list_tools() -> list[types.Tool]:
-    """List all available tools from the FastAPI server"""
+    """List all available tools"""
+    return MCP_TOOLS
+
+# Output kept for the final result when ssh_exec streams progress notifications
+MCP_EXEC_TAIL_BYTES = int(os.environ.get("MCP_PI_EXEC_TAIL_BYTES", "65536"))
+
+# Longest window a gpio:// resource read may sample for
+GPIO_RESOURCE_MAX_DURATION = 30.0
+
+@server.list_resource_templates()
+async def list_resource_templates() -> list[types.ResourceTemplate]:
+    """GPIO pin event windows exposed as resources"""
     return [
-        # SSH Execution
-        types.Tool(
-            name="ssh_exec",
-            description="Execute a shell command on a remote host via SSH. Configured targets are loaded from config/hosts.yaml",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets (e.g., 'pi-lan')"
-                    },
-                    "command": {
-                        "type": "string",
-                        "description": "Shell command to run on remote host"
-                    },
-                    "cwd": {
-                        "type": "string",
-                        "description": "Working directory on remote host (optional)"
-                    },
-                    "env": {
-                        "type": "object",
-                        "description": "Environment variables as key-value pairs (optional)",
-                        "additionalProperties": {"type": "string"}
-                    },
-                    "timeout": {
-                        "type": "integer",
-                        "description": "Timeout in seconds (optional)"
-                    }
-                },
-                "required": ["target", "command"]
-            }
-        ),
-        
-        # File Transfer - Upload
-        types.Tool(
-            name="scp_put",
-            description="Upload a file to the target via SFTP (content as base64)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "remote_path": {
-                        "type": "string",
-                        "description": "Absolute path to write on remote host"
-                    },
-                    "content_b64": {
-                        "type": "string",
-                        "description": "Base64-encoded file content"
-                    },
-                    "mode": {
-                        "type": "integer",
-                        "description": "Octal file mode, e.g., 0o644 (optional)"
-                    }
-                },
-                "required": ["target", "remote_path", "content_b64"]
-            }
-        ),
-        
-        # File Transfer - Download
-        types.Tool(
-            name="scp_get",
-            description="Download a file from the target via SFTP (content as base64)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "remote_path": {
-                        "type": "string",
-                        "description": "Absolute path of file to read from remote host"
-                    }
-                },
-                "required": ["target", "remote_path"]
-            }
-        ),
-        
-        # Tmux Management
-        types.Tool(
-            name="tmux_ensure",
-            description="Ensure a tmux session exists (create if needed). Sessions are prefixed with 'mcp_'",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "session": {
-                        "type": "string",
-                        "description": "Session name (suffix); will be prefixed with 'mcp_'"
-                    },
-                    "cwd": {
-                        "type": "string",
-                        "description": "Working directory for the session (optional)"
-                    }
-                },
-                "required": ["target", "session"]
-            }
-        ),
-        
-        types.Tool(
-            name="tmux_send_keys",
-            description="Send keys/command to a tmux session (adds Enter by default)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "session": {
-                        "type": "string",
-                        "description": "Session name (suffix); will be prefixed with 'mcp_'"
-                    },
-                    "keys": {
-                        "type": "string",
-                        "description": "Command to send; will append Enter by default"
-                    },
-                    "enter": {
-                        "type": "boolean",
-                        "description": "Whether to append Enter key (default: true)"
-                    }
-                },
-                "required": ["target", "session", "keys"]
-            }
-        ),
-        
-        types.Tool(
-            name="tmux_kill",
-            description="Kill a tmux session",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "session": {
-                        "type": "string",
-                        "description": "Session name (suffix); will be prefixed with 'mcp_'"
-                    }
-                },
-                "required": ["target", "session"]
-            }
-        ),
-        
-        # Systemd Service Management
-        types.Tool(
-            name="systemd_service",
-            description="Manage a systemd service on the target",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "name": {
-                        "type": "string",
-                        "description": "systemd service name (e.g., myproj.service)"
-                    },
-                    "action": {
-                        "type": "string",
-                        "enum": ["start", "stop", "restart", "reload", "enable", "disable", "status"],
-                        "description": "Action to perform on the service"
-                    }
-                },
-                "required": ["target", "name", "action"]
-            }
-        ),
-        
-        # Django Management
-        types.Tool(
-            name="django_manage",
-            description="Run python manage.py with given args (migrate, collectstatic, etc.)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project working directory (contains manage.py)"
-                    },
-                    "manage_args": {
-                        "type": "string",
-                        "description": "Arguments to manage.py, e.g., 'migrate' or 'collectstatic --noinput'"
-                    },
-                    "venv_path": {
-                        "type": "string",
-                        "description": "Remote virtualenv bin path, e.g., /home/pi/apps/myproj/.venv/bin (optional)"
-                    },
-                    "env": {
-                        "type": "object",
-                        "description": "Environment variables as key-value pairs (optional)",
-                        "additionalProperties": {"type": "string"}
-                    },
-                    "timeout": {
-                        "type": "integer",
-                        "description": "Timeout in seconds (optional)"
-                    }
-                },
-                "required": ["target", "project_dir", "manage_args"]
-            }
-        ),
-        
-        types.Tool(
-            name="django_runserver_tmux",
-            description="Run Django dev server in a tmux session (sends Ctrl-C first, then runserver)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project working directory (contains manage.py)"
-                    },
-                    "session": {
-                        "type": "string",
-                        "description": "Tmux session suffix to use (will be prefixed with 'mcp_')"
-                    },
-                    "host": {
-                        "type": "string",
-                        "description": "Host to bind to (default: 0.0.0.0)"
-                    },
-                    "port": {
-                        "type": "integer",
-                        "description": "Port to bind to (default: 8000)"
-                    },
-                    "extra_args": {
-                        "type": "string",
-                        "description": "Extra args, e.g., --settings=... (optional)"
-                    },
-                    "venv_path": {
-                        "type": "string",
-                        "description": "Remote virtualenv bin path (optional)"
-                    },
-                    "env": {
-                        "type": "object",
-                        "description": "Environment variables as key-value pairs (optional)",
-                        "additionalProperties": {"type": "string"}
-                    },
-                    "timeout": {
-                        "type": "integer",
-                        "description": "Timeout in seconds (optional)"
-                    }
-                },
-                "required": ["target", "project_dir", "session"]
-            }
-        ),
-        
-        # Git Tools
-        types.Tool(
-            name="git_status",
-            description="Get git repository status on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project directory containing the git repo"
-                    },
-                    "short": {
-                        "type": "boolean",
-                        "description": "If true, runs 'git status --short --branch' else full 'git status'"
-                    }
-                },
-                "required": ["target", "project_dir"]
-            }
-        ),
-        
-        types.Tool(
-            name="git_checkout",
-            description="Checkout a git branch or tag on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project directory containing the git repo"
-                    },
-                    "branch_or_tag": {
-                        "type": "string",
-                        "description": "Branch name or tag to checkout"
-                    }
-                },
-                "required": ["target", "project_dir", "branch_or_tag"]
-            }
-        ),
-        
-        types.Tool(
-            name="git_pull",
-            description="Pull latest changes from git repository on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project directory containing the git repo"
-                    },
-                    "branch": {
-                        "type": "string",
-                        "description": "Branch to pull (default: current branch)"
-                    }
-                },
-                "required": ["target", "project_dir"]
-            }
-        ),
-        
-        types.Tool(
-            name="deploy_hook",
-            description="Execute deployment hook on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "project_dir": {
-                        "type": "string",
-                        "description": "Remote project directory"
-                    },
-                    "hook_script": {
-                        "type": "string",
-                        "description": "Path to deployment hook script"
-                    },
-                    "env": {
-                        "type": "object",
-                        "description": "Environment variables for the hook",
-                        "additionalProperties": {"type": "string"}
-                    }
-                },
-                "required": ["target", "project_dir", "hook_script"]
-            }
-        ),
-        
-        # GPIO Tools
-        types.Tool(
-            name="gpio_write",
-            description="Write to a GPIO pin on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "pin": {
-                        "type": "integer",
-                        "description": "GPIO pin number"
-                    },
-                    "value": {
-                        "type": "integer",
-                        "description": "Value to write (0 or 1)"
-                    },
-                    "mode": {
-                        "type": "string",
-                        "description": "GPIO mode (BCM or BOARD)"
-                    }
-                },
-                "required": ["target", "pin", "value"]
-            }
-        ),
-        
-        types.Tool(
-            name="gpio_read",
-            description="Read from a GPIO pin on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "pin": {
-                        "type": "integer",
-                        "description": "GPIO pin number"
-                    },
-                    "mode": {
-                        "type": "string",
-                        "description": "GPIO mode (BCM or BOARD)"
-                    }
-                },
-                "required": ["target", "pin"]
-            }
-        ),
-        
-        types.Tool(
-            name="gpio_pwm",
-            description="Set PWM on a GPIO pin on remote host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "pin": {
-                        "type": "integer",
-                        "description": "GPIO pin number"
-                    },
-                    "frequency": {
-                        "type": "number",
-                        "description": "PWM frequency in Hz"
-                    },
-                    "duty_cycle": {
-                        "type": "number",
-                        "description": "Duty cycle (0.0 to 1.0)"
-                    },
-                    "mode": {
-                        "type": "string",
-                        "description": "GPIO mode (BCM or BOARD)"
-                    }
-                },
-                "required": ["target", "pin", "frequency", "duty_cycle"]
-            }
-        ),
-        
-        types.Tool(
-            name="gpio_blink",
-            description="Blink a GPIO pin (LED) a specified number of times",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "pin": {
-                        "type": "integer",
-                        "description": "GPIO pin number"
-                    },
-                    "count": {
-                        "type": "integer",
-                        "description": "Number of blinks",
-                        "default": 5
-                    },
-                    "on_time": {
-                        "type": "number",
-                        "description": "Seconds LED is ON",
-                        "default": 0.5
-                    },
-                    "off_time": {
-                        "type": "number",
-                        "description": "Seconds LED is OFF",
-                        "default": 0.5
-                    },
-                    "mode": {
-                        "type": "string",
-                        "description": "GPIO mode (BCM or BOARD)"
-                    }
-                },
-                "required": ["target", "pin"]
-            }
-        ),
-        
-        types.Tool(
-            name="macro_run",
-            description="Run a validated sequence of GPIO operations: write/read/pwm/blink",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Target name from config.targets"
-                    },
-                    "steps": {
-                        "type": "array",
-                        "description": "Array of GPIO operations to execute",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "op": {
-                                    "type": "string",
-                                    "description": "Operation type: write, read, pwm, or blink"
-                                },
-                                "data": {
-                                    "type": "object",
-                                    "description": "Operation-specific data"
-                                }
-                            },
-                            "required": ["op", "data"]
-                        }
-                    },
-                    "mode": {
-                        "type": "string",
-                        "description": "GPIO mode (BCM or BOARD)"
-                    }
-                },
-                "required": ["target", "steps"]
-            }
+        types.ResourceTemplate(
+            uriTemplate="gpio://{target}/watch/{pins}",
+            name="gpio_watch",
+            description="Timestamped, delta-encoded pin events sampled on the target for a short window. "
+                        "pins is a comma list (e.g. 17,27); query: duration (s, default 2), rate_hz, edge, pull, mode",
+            mimeType="application/json",
         )
     ]
 
+@server.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    """Sample a gpio://{target}/watch/{pins} window and return its events"""
+    parsed = urlparse(str(uri))
+    parts = [p for p in parsed.path.split("/") if p]
+    if parsed.scheme != "gpio" or len(parts) != 2 or parts[0] != "watch":
+        raise ValueError(f"Unknown resource: {uri}")
+    q = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    req = GPIOWatchRequest(
+        target=parsed.netloc,
+        pins=[int(p) for p in parts[1].split(",") if p.strip()],
+        mode=q.get("mode"),
+        pull=q.get("pull"),
+        rate_hz=float(q.get("rate_hz", 20.0)),
+        edge=q.get("edge", "false").lower() in ("1", "true", "yes"),
+        duration=min(float(q.get("duration", 2.0)), GPIO_RESOURCE_MAX_DURATION),
+    )
+    events = await gpio_sample(req)
+    return [ReadResourceContents(content=json.dumps({"target": req.target, "events": events}), mime_type="application/json")]
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
     """Handle tool calls from MCP clients"""
@@ -562,55 +104,52 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
         # Load configuration
         cfg = load_config()
         
-        # Route to appropriate tool handler
-        if name == "ssh_exec":
-            return await _handle_ssh_exec(arguments, cfg)
-        elif name == "scp_put":
-            return await _handle_scp_put(arguments, cfg)
-        elif name == "scp_get":
-            return await _handle_scp_get(arguments, cfg)
-        elif name == "tmux_ensure":
-            return await _handle_tmux_ensure(arguments, cfg)
-        elif name == "tmux_send_keys":
-            return await _handle_tmux_send_keys(arguments, cfg)
-        elif name == "tmux_kill":
-            return await _handle_tmux_kill(arguments, cfg)
-        elif name == "systemd_service":
-            return await _handle_systemd_service(arguments, cfg)
-        elif name == "django_manage":
-            return await _handle_django_manage(arguments, cfg)
-        elif name == "django_runserver_tmux":
-            return await _handle_django_runserver(arguments, cfg)
-        elif name == "git_status":
-            return await _handle_git_status(arguments, cfg)
-        elif name == "git_checkout":
-            return await _handle_git_checkout(arguments, cfg)
-        elif name == "git_pull":
-            return await _handle_git_pull(arguments, cfg)
-        elif name == "deploy_hook":
-            return await _handle_deploy_hook(arguments, cfg)
-        elif name == "gpio_write":
-            return await _handle_gpio_write(arguments, cfg)
-        elif name == "gpio_read":
-            return await _handle_gpio_read(arguments, cfg)
-        elif name == "gpio_pwm":
-            return await _handle_gpio_pwm(arguments, cfg)
-        elif name == "gpio_blink":
-            return await _handle_gpio_blink(arguments, cfg)
-        elif name == "macro_run":
-            return await _handle_macro_run(arguments, cfg)
-        else:
+        # Route to the tool's text formatter; tools without one return their JSON result
+        spec = get_tool(name)
+        if spec is None:
             return [types.TextContent(
                 type="text",
-                text=f"Error: Unknown tool '{name}'. Available tools: ssh_exec, scp_put, scp_get, tmux_ensure, tmux_send_keys, tmux_kill, systemd_service, django_manage, django_runserver_tmux, git_status, git_checkout, git_pull, deploy_hook, gpio_write, gpio_read, gpio_pwm, gpio_blink, macro_run"
+                text=f"Error: Unknown tool '{name}'. Available tools: {', '.join(TOOL_REGISTRY)}"
             )]
+        handler = _FORMATTERS.get(name)
+        async with get_scheduler().slot((arguments or {}).get("target"), name):
+            if handler is None:
+                return await _handle_generic(spec, arguments, cfg)
+            return await handler(arguments, cfg)
     
+    # MCP request cancellation arrives as CancelledError (not an Exception) and closes the remote channel
     except Exception as e:
         return [types.TextContent(
             type="text",
             text=f"Error executing tool '{name}': {str(e)}"
         )]
 
+def _progress_token():
+    try:
+        meta = server.request_context.meta
+    except LookupError:
+        return None
+    return meta.progressToken if meta is not None else None
+
+async def _stream_ssh_exec(arguments: dict, token) -> SSHExecResponse:
+    """Run ssh_exec sending each output chunk as a progress notification; the result keeps only the tail"""
+    ctx = server.request_context
+    req = SSHExecStreamRequest(**{"tail_bytes": MCP_EXEC_TAIL_BYTES, **arguments})
+    sent = 0
+    summary = {}
+    async for evt in ssh_exec_stream(req):
+        if "stream" not in evt:
+            summary = evt
+            continue
+        sent += len(evt["data"])
+        message = evt["data"] if evt["stream"] == "stdout" else f"[stderr] {evt['data']}"
+        await ctx.session.send_progress_notification(token, progress=sent, message=message,
+                                                     related_request_id=ctx.request_id)
+    exit_code = summary.get("exit_code")
+    return SSHExecResponse(stdout=summary.get("stdout", ""), stderr=summary.get("stderr", ""),
+                           exit_code=exit_code if exit_code is not None else -1,
+                           truncated=summary.get("truncated", False))
+
 async def _handle_ssh_exec(arguments: dict, cfg) -> list[types.TextContent]:
     """Handle SSH execution tool"""
     req = SSHExecRequest(**arguments)
@@ -622,11 +161,17 @@ async def _handle_ssh_exec(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = ssh_exec(req)
+    token = _progress_token()
+    if token is None:
+        result = await ssh_exec_async(req)
+    else:
+        result = await _stream_ssh_exec(arguments, token)
     
     response_text = f"Command: {req.command}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
     response_text += f"Exit Code: {result.exit_code}\n\n"
+    if result.truncated:
+        response_text += "Output truncated (max_bytes reached, command stopped)\n\n"
     
     if result.stdout:
         response_text += f"STDOUT:\n{result.stdout}\n\n"
@@ -647,7 +192,7 @@ async def _handle_scp_put(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = scp_put(req)
+    result = await scp_put_async(req)
     
     response_text = f"File uploaded successfully!\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
@@ -669,7 +214,7 @@ async def _handle_scp_get(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = scp_get(req)
+    result = await scp_get_async(req)
     
     response_text = f"File downloaded successfully!\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
@@ -678,6 +223,28 @@ async def _handle_scp_get(arguments: dict, cfg) -> list[types.TextContent]:
     
     return [types.TextContent(type="text", text=response_text)]
 
+async def _handle_scp_get_range(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle byte-range file download tool"""
+    req = ScpGetRangeRequest(**arguments)
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    result = await scp_get_range_async(req)
+    
+    response_text = f"Target: {req.target} ({cfg.targets[req.target].host})\n"
+    response_text += f"Remote Path: {result.remote_path}\n"
+    response_text += f"Bytes: {result.offset}-{result.offset + result.length} of {result.size}\n"
+    if not result.eof:
+        response_text += f"More data: call again with offset={result.offset + result.length}\n"
+    response_text += f"Content (Base64): {result.content_b64}\n"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
 async def _handle_tmux_ensure(arguments: dict, cfg) -> list[types.TextContent]:
     """Handle tmux session ensure tool"""
     req = TmuxEnsureRequest(**arguments)
@@ -689,7 +256,7 @@ async def _handle_tmux_ensure(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = tmux_ensure(req)
+    result = await tmux_ensure_async(req)
     
     response_text = f"Tmux Session: {result.session}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
@@ -709,7 +276,7 @@ async def _handle_tmux_send_keys(arguments: dict, cfg) -> list[types.TextContent
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = tmux_send_keys(req)
+    result = await tmux_send_keys_async(req)
     
     response_text = f"Tmux Session: {result.session}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
@@ -730,7 +297,7 @@ async def _handle_tmux_kill(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = tmux_kill(req)
+    result = await tmux_kill_async(req)
     
     response_text = f"Tmux Session: {result.session}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
@@ -739,6 +306,44 @@ async def _handle_tmux_kill(arguments: dict, cfg) -> list[types.TextContent]:
     
     return [types.TextContent(type="text", text=response_text)]
 
+async def _handle_tmux_stream(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle tmux pane reads; new output is also sent as progress notifications while it arrives"""
+    req = TmuxStreamRequest(**{"duration": TMUX_COLLECT, **arguments})
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    token = _progress_token()
+    parts = []
+    summary = {}
+    reset, gap = False, 0
+    async for evt in tmux_stream(req):
+        reset, gap = reset or evt.get("reset", False), gap + evt.get("gap", 0)
+        if evt.get("done"):
+            summary = evt
+            continue
+        parts.append(evt["data"])
+        if token is not None:
+            ctx = server.request_context
+            await ctx.session.send_progress_notification(token, progress=evt["offset"], message=evt["data"],
+                                                         related_request_id=ctx.request_id)
+    
+    response_text = f"Tmux Session: {SESSION_PREFIX}{req.session}\n"
+    response_text += f"Offset: {summary.get('offset')}, watch: {summary.get('watch')} (pass both back to read only newer output)\n"
+    if reset:
+        response_text += "Reset: the earlier watch had ended, so output starts over from scrollback\n"
+    elif gap:
+        response_text += f"Gap: {gap} characters after the offset were no longer buffered\n"
+    if summary.get("reason") != "duration":
+        response_text += f"Ended: {summary.get('reason')}\n"
+    response_text += f"\n{''.join(parts)}"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
 async def _handle_systemd_service(arguments: dict, cfg) -> list[types.TextContent]:
     """Handle systemd service management tool"""
     req = ServiceActionRequest(**arguments)
@@ -750,7 +355,7 @@ async def _handle_systemd_service(arguments: dict, cfg) -> list[types.TextConten
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = service_action(req)
+    result = await service_action_async(req)
     
     response_text = f"Service: {result.name}\n"
     response_text += f"Action: {result.action}\n"
@@ -766,6 +371,130 @@ async def _handle_systemd_service(arguments: dict, cfg) -> list[types.TextConten
     
     return [types.TextContent(type="text", text=response_text)]
 
+async def _handle_systemd_status_many(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle batched unit status reads, one line per unit"""
+    req = ServiceStatusManyRequest(**arguments)
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    result = await systemd_status_many_async(req)
+    
+    response_text = f"Target: {req.target} ({cfg.targets[req.target].host})\n"
+    response_text += f"Read from host: {result.fetched} of {len(result.units)} units\n\n"
+    for u in result.units:
+        if u.load_state == "not-found":
+            response_text += f"{u.name}: not found\n"
+            continue
+        response_text += f"{u.id or u.name}: {u.active_state} ({u.sub_state})"
+        if u.main_pid:
+            response_text += f", pid {u.main_pid}"
+        if u.unit_file_state:
+            response_text += f", {u.unit_file_state}"
+        if u.n_restarts:
+            response_text += f", {u.n_restarts} restarts"
+        response_text += "\n"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
+def _unit_line(u: dict) -> str:
+    line = f"{u['name']}: {u.get('active_state')} ({u.get('sub_state')})"
+    if u.get("main_pid"):
+        line += f", pid {u['main_pid']}"
+    return line
+
+async def _handle_systemd_watch(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle unit state watching; each change is also sent as a progress notification when it happens"""
+    req = SystemdWatchRequest(**{"duration": SYSTEMD_WATCH_COLLECT, **arguments})
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    token = _progress_token()
+    units = {}
+    changes = []
+    summary = {}
+    async for evt in systemd_watch_stream(req):
+        if evt.get("done"):
+            summary = evt
+            continue
+        if "snapshot" in evt:
+            units = {u["name"]: u for u in evt["snapshot"]}
+            continue
+        units[evt["unit"]] = evt["new"]
+        old = evt["old"] or {}
+        change = f"{evt['unit']}: {old.get('active_state')} ({old.get('sub_state')}) -> {evt['new']['active_state']} ({evt['new']['sub_state']})"
+        changes.append(change)
+        if token is not None:
+            ctx = server.request_context
+            await ctx.session.send_progress_notification(token, progress=evt["seq"], message=change,
+                                                         related_request_id=ctx.request_id)
+    
+    response_text = f"Target: {req.target} ({cfg.targets[req.target].host})\n"
+    response_text += f"Seq: {summary.get('seq')}, watch: {summary.get('watch')} (pass both back as since and watch to get only later changes)\n"
+    if summary.get("reason") != "duration":
+        response_text += f"Ended: {summary.get('reason')}\n"
+    response_text += f"\nChanges ({len(changes)}):\n"
+    response_text += "".join(f"{c}\n" for c in changes)
+    if units:
+        response_text += "\nUnits:\n"
+        response_text += "".join(f"{_unit_line(u)}\n" for _, u in sorted(units.items()))
+    
+    return [types.TextContent(type="text", text=response_text)]
+
+def _journal_line(e: dict) -> str:
+    line = time.strftime("%b %d %H:%M:%S", time.localtime(e["ts"]))
+    line += f" {e.get('ident') or e.get('unit') or '-'}"
+    if e.get("pid"):
+        line += f"[{e['pid']}]"
+    return f"{line}: {e['message']}"
+
+async def _handle_journal_tail(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle journal reads; while following, each entry is also sent as a progress notification"""
+    req = JournalTailRequest(**{"max_entries": JOURNAL_MAX_ENTRIES, **arguments})
+    if req.follow and req.duration is None:
+        req.duration = JOURNAL_COLLECT
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    token = _progress_token() if req.follow else None
+    lines = []
+    summary = {}
+    async for evt in journal_stream(req):
+        if evt.get("done"):
+            summary = evt
+            continue
+        lines.append(_journal_line(evt))
+        if token is not None:
+            ctx = server.request_context
+            await ctx.session.send_progress_notification(token, progress=len(lines), message=lines[-1],
+                                                         related_request_id=ctx.request_id)
+    
+    response_text = f"Target: {req.target} ({cfg.targets[req.target].host})\n"
+    response_text += f"Entries: {summary.get('count')}"
+    if summary.get("reason") == "max_entries":
+        response_text += f" (stopped at max_entries={req.max_entries})"
+    response_text += "\n"
+    response_text += f"Cursor: {summary.get('cursor')} (pass as cursor to read only newer entries)\n"
+    if summary.get("reason") not in ("end", "duration", "max_entries"):
+        response_text += f"Error: {summary.get('reason')}\n"
+    response_text += "\n" + "".join(f"{line}\n" for line in lines)
+    
+    return [types.TextContent(type="text", text=response_text)]
+
 async def _handle_django_manage(arguments: dict, cfg) -> list[types.TextContent]:
     """Handle Django management tool"""
     req = DjangoManageRequest(**arguments)
@@ -777,7 +506,7 @@ async def _handle_django_manage(arguments: dict, cfg) -> list[types.TextContent]
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = django_manage(req)
+    result = await django_manage_async(req)
     
     response_text = f"Django Management Command: {req.manage_args}\n"
     response_text += f"Project Directory: {req.project_dir}\n"
@@ -803,7 +532,7 @@ async def _handle_django_runserver(arguments: dict, cfg) -> list[types.TextConte
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = django_runserver_tmux(req)
+    result = await django_runserver_tmux_async(req)
     
     response_text = f"Django Runserver\n"
     response_text += f"Session: {result.session}\n"
@@ -826,7 +555,7 @@ async def _handle_git_status(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = git_status(req)
+    result = await git_status_async(req)
     
     response_text = f"Git Status\n"
     response_text += f"Project Directory: {req.project_dir}\n"
@@ -852,10 +581,10 @@ async def _handle_git_checkout(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = git_checkout(req)
+    result = await git_checkout_async(req)
     
     response_text = f"Git Checkout\n"
-    response_text += f"Branch/Tag: {req.branch_or_tag}\n"
+    response_text += f"Branch/Tag: {req.ref}\n"
     response_text += f"Project Directory: {req.project_dir}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
     response_text += f"Exit Code: {result.exit_code}\n\n"
@@ -879,7 +608,7 @@ async def _handle_git_pull(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = git_pull(req)
+    result = await git_pull_async(req)
     
     response_text = f"Git Pull\n"
     response_text += f"Branch: {req.branch or 'current'}\n"
@@ -906,10 +635,10 @@ async def _handle_deploy_hook(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = deploy_hook(req)
+    result = await deploy_hook_async(req)
     
     response_text = f"Deploy Hook\n"
-    response_text += f"Hook Script: {req.hook_script}\n"
+    response_text += f"Hook Script: {req.script}\n"
     response_text += f"Project Directory: {req.project_dir}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
     response_text += f"Exit Code: {result.exit_code}\n\n"
@@ -933,14 +662,14 @@ async def _handle_gpio_write(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = gpio_write(req)
+    result = await gpio_write_async(req)
     
     response_text = f"GPIO Write\n"
     response_text += f"Pin: {req.pin}\n"
     response_text += f"Value: {req.value}\n"
     response_text += f"Mode: {req.mode or 'default'}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
-    response_text += f"Success: {result.success}\n"
+    response_text += f"Success: {result.ok}\n"
     if result.error:
         response_text += f"Error: {result.error}\n"
     
@@ -957,14 +686,14 @@ async def _handle_gpio_read(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = gpio_read(req)
+    result = await gpio_read_async(req)
     
     response_text = f"GPIO Read\n"
     response_text += f"Pin: {req.pin}\n"
     response_text += f"Mode: {req.mode or 'default'}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
-    response_text += f"Value: {result.value}\n"
-    response_text += f"Success: {result.success}\n"
+    response_text += f"Value: {(result.result or {}).get('value')}\n"
+    response_text += f"Success: {result.ok}\n"
     if result.error:
         response_text += f"Error: {result.error}\n"
     
@@ -981,15 +710,15 @@ async def _handle_gpio_pwm(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = gpio_pwm(req)
+    result = await gpio_pwm_async(req)
     
     response_text = f"GPIO PWM\n"
     response_text += f"Pin: {req.pin}\n"
-    response_text += f"Frequency: {req.frequency} Hz\n"
-    response_text += f"Duty Cycle: {req.duty_cycle}\n"
+    response_text += f"Frequency: {req.freq} Hz\n"
+    response_text += f"Duty Cycle: {req.duty}%\n"
     response_text += f"Mode: {req.mode or 'default'}\n"
     response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
-    response_text += f"Success: {result.success}\n"
+    response_text += f"Success: {result.ok}\n"
     if result.error:
         response_text += f"Error: {result.error}\n"
     
@@ -1006,7 +735,7 @@ async def _handle_gpio_blink(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = gpio_blink(req)
+    result = await gpio_blink_async(req)
     
     response_text = f"GPIO Blink\n"
     response_text += f"Pin: {req.pin}\n"
@@ -1034,7 +763,7 @@ async def _handle_macro_run(arguments: dict, cfg) -> list[types.TextContent]:
             text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
         )]
     
-    result = macro_run(req)
+    result = await macro_run_async(req)
     
     response_text = f"GPIO Macro Run\n"
     response_text += f"Steps: {len(req.steps)} operations\n"
@@ -1047,6 +776,137 @@ async def _handle_macro_run(arguments: dict, cfg) -> list[types.TextContent]:
     
     return [types.TextContent(type="text", text=response_text)]
 
+async def _handle_gpio_many(arguments: dict, cfg, read: bool) -> list[types.TextContent]:
+    """Handle batched GPIO read/write tools"""
+    req = GPIOReadManyRequest(**arguments) if read else GPIOWriteManyRequest(**arguments)
+    
+    if req.target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{req.target}'. Available targets: {available_targets}"
+        )]
+    
+    result = await (gpio_read_many_async(req) if read else gpio_write_many_async(req))
+    
+    response_text = f"GPIO {'Read' if read else 'Write'} Many\n"
+    response_text += f"Mode: {req.mode or 'default'}\n"
+    response_text += f"Target: {req.target} ({cfg.targets[req.target].host})\n"
+    response_text += f"Success: {result.ok}\n"
+    for pin, value in result.values.items():
+        response_text += f"Pin {pin}: {value}\n"
+    for pin, err in result.errors.items():
+        response_text += f"Pin {pin} error: {err}\n"
+    if result.error:
+        response_text += f"Error: {result.error}\n"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
+async def _handle_fleet_run(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle fleet fan-out tool; each finished host is sent as a progress notification"""
+    req = FleetRunRequest(**arguments)
+    total = len(resolve_targets(req))
+    token = _progress_token()
+    
+    lines = []
+    summary = {}
+    async for evt in fleet_run_stream(req):
+        if evt.get("done"):
+            summary = evt
+            continue
+        status = "ok" if evt["ok"] else f"FAILED: {evt['error'] or json.dumps(evt['result'], default=str)[:500]}"
+        line = f"{evt['target']}: {status} ({evt['elapsed']}s)"
+        lines.append(line)
+        if token is not None:
+            ctx = server.request_context
+            await ctx.session.send_progress_notification(token, progress=len(lines), total=total, message=line,
+                                                         related_request_id=ctx.request_id)
+    
+    response_text = f"Fleet: {req.tool} on {total} targets in {summary.get('elapsed')}s\n"
+    response_text += f"Succeeded: {len(summary.get('succeeded', []))}, Failed: {len(summary.get('failed', []))}\n\n"
+    response_text += "\n".join(lines) + "\n"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
+async def _handle_rollout_deploy(arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle rolling deploy; each wave start and finished host is sent as a progress notification"""
+    req = RolloutRequest(**arguments)
+    token = _progress_token()
+    
+    lines = []
+    summary = {}
+    finished = 0
+    async for evt in rollout_stream(req):
+        kind = evt["event"]
+        if kind == "done":
+            summary = evt
+            continue
+        if kind == "wave":
+            line = f"Wave {evt['wave']}{' (canary)' if evt['canary'] else ''}: {', '.join(evt['targets'])}"
+        else:
+            finished += 1
+            status = "ok" if evt["ok"] else f"FAILED: {evt['error']}"
+            line = f"  {'rollback ' if kind == 'rollback' else ''}{evt['target']}: {status} ({evt['elapsed']}s)"
+        lines.append(line)
+        if token is not None:
+            ctx = server.request_context
+            await ctx.session.send_progress_notification(token, progress=finished, message=line,
+                                                         related_request_id=ctx.request_id)
+    
+    response_text = f"Rollout: {summary.get('status')} in {summary.get('elapsed')}s\n"
+    if summary.get("reason"):
+        response_text += f"Reason: {summary['reason']}\n"
+    response_text += f"Succeeded: {len(summary.get('succeeded', []))}, Failed: {len(summary.get('failed', []))}, Skipped: {len(summary.get('skipped', []))}\n\n"
+    response_text += "\n".join(lines) + "\n"
+    
+    return [types.TextContent(type="text", text=response_text)]
+
+async def _handle_generic(spec: ToolSpec, arguments: dict, cfg) -> list[types.TextContent]:
+    """Handle any registered tool without a dedicated formatter"""
+    req = spec.parse(arguments)
+    
+    target = getattr(req, "target", None)
+    if target is not None and target not in cfg.targets:
+        available_targets = ", ".join(cfg.targets.keys())
+        return [types.TextContent(
+            type="text",
+            text=f"Error: Unknown target '{target}'. Available targets: {available_targets}"
+        )]
+    
+    result = await spec.async_handler(req)
+    return [types.TextContent(type="text", text=json.dumps(result.model_dump(), indent=2, default=str))]
+
+# Tool name -> text formatter
+_FORMATTERS = {
+    "ssh_exec": _handle_ssh_exec,
+    "scp_put": _handle_scp_put,
+    "scp_get": _handle_scp_get,
+    "scp_get_range": _handle_scp_get_range,
+    "tmux_ensure": _handle_tmux_ensure,
+    "tmux_send_keys": _handle_tmux_send_keys,
+    "tmux_kill": _handle_tmux_kill,
+    "tmux_stream": _handle_tmux_stream,
+    "systemd_service": _handle_systemd_service,
+    "systemd_status_many": _handle_systemd_status_many,
+    "systemd_watch": _handle_systemd_watch,
+    "journal_tail": _handle_journal_tail,
+    "django_manage": _handle_django_manage,
+    "django_runserver_tmux": _handle_django_runserver,
+    "git_status": _handle_git_status,
+    "git_checkout": _handle_git_checkout,
+    "git_pull": _handle_git_pull,
+    "deploy_hook": _handle_deploy_hook,
+    "gpio_write": _handle_gpio_write,
+    "gpio_read": _handle_gpio_read,
+    "gpio_pwm": _handle_gpio_pwm,
+    "gpio_blink": _handle_gpio_blink,
+    "macro_run": _handle_macro_run,
+    "gpio_read_many": partial(_handle_gpio_many, read=True),
+    "gpio_write_many": partial(_handle_gpio_many, read=False),
+    "fleet_run": _handle_fleet_run,
+    "rollout_deploy": _handle_rollout_deploy,
+}
+
 async def main():
     """Main entry point for the MCP server"""
     async with stdio_server() as (read_stream, write_stream):
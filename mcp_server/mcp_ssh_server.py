@@ -76,7 +76,7 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
         
         # Execute SSH command
         target_cfg = cfg.targets[req.target]
-        with SSHClientWrapper(target_cfg) as cli:
+        with SSHClientWrapper(target_cfg, name=req.target) as cli:
             result = cli.exec(req.command, cwd=req.cwd, env=req.env, timeout=req.timeout)
             
             # Format response
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from .tools.ssh_exec import ssh_exec, ssh_exec_async, SSHExecRequest, TOOL_SCHEMA as SSH_EXEC_SCHEMA
+from .tools.scp_put import scp_put, scp_put_async, ScpPutRequest, TOOL_SCHEMA as SCP_PUT_SCHEMA
+from .tools.scp_get import (
+    scp_get, scp_get_async, ScpGetRequest, TOOL_SCHEMA as SCP_GET_SCHEMA,
+    scp_get_range, scp_get_range_async, ScpGetRangeRequest, SCP_GET_RANGE_SCHEMA
+)
+from .tools.fleet import fleet_run, fleet_run_async, FleetRunRequest, TOOL_SCHEMA as FLEET_RUN_SCHEMA
+from .tools.rollout import rollout_deploy, rollout_deploy_async, RolloutRequest, TOOL_SCHEMA as ROLLOUT_DEPLOY_SCHEMA
+from .tools.sync_dir import sync_dir, sync_dir_async, SyncDirRequest, TOOL_SCHEMA as SYNC_DIR_SCHEMA
+from .tools.tmux import (
+    tmux_ensure, tmux_send_keys, tmux_kill, tmux_list, tmux_stream_collect,
+    tmux_ensure_async, tmux_send_keys_async, tmux_kill_async, tmux_list_async, tmux_stream_async,
+    TmuxEnsureRequest, TmuxSendKeysRequest, TmuxKillRequest, TmuxListRequest, TmuxStreamRequest,
+    TMUX_ENSURE_SCHEMA, TMUX_SEND_KEYS_SCHEMA, TMUX_KILL_SCHEMA, TMUX_LIST_SCHEMA, TMUX_STREAM_SCHEMA
+)
+from .tools.systemd import (
+    service_action, service_action_async, ServiceActionRequest, SERVICE_ACTION_SCHEMA,
+    systemd_status_many, systemd_status_many_async, ServiceStatusManyRequest, SYSTEMD_STATUS_MANY_SCHEMA
+)
+from .tools.systemd_watch import systemd_watch_collect, systemd_watch_async, SystemdWatchRequest, SYSTEMD_WATCH_SCHEMA
+from .tools.journal import journal_tail, journal_tail_async, JournalTailRequest, JOURNAL_TAIL_SCHEMA
+from .tools.django import (
+    django_manage, django_manage_async, DjangoManageRequest, DJANGO_MANAGE_SCHEMA,
+    django_runserver_tmux, django_runserver_tmux_async, DjangoRunserverRequest, DJANGO_RUNSERVER_SCHEMA
+)
+from .tools.git_tools import (
+    git_status, git_status_async, GitStatusRequest, TOOL_GIT_STATUS,
+    git_checkout, git_checkout_async, GitCheckoutRequest, TOOL_GIT_CHECKOUT,
+    git_pull, git_pull_async, GitPullRequest, TOOL_GIT_PULL,
+    deploy_hook, deploy_hook_async, DeployHookRequest, TOOL_DEPLOY_HOOK
+)
+from .tools.gpio_tools import (
+    gpio_write, gpio_write_async, GPIOWriteRequest, TOOL_GPIO_WRITE,
+    gpio_read, gpio_read_async, GPIOReadRequest, TOOL_GPIO_READ,
+    gpio_pwm, gpio_pwm_async, GPIOPWMRequest, TOOL_GPIO_PWM,
+    gpio_blink, gpio_blink_async, GPIOBlinkRequest, TOOL_GPIO_BLINK,
+    macro_run, macro_run_async, GPIOMacroRequest, TOOL_GPIO_MACRO_RUN,
+    gpio_read_many, gpio_read_many_async, GPIOReadManyRequest, TOOL_GPIO_READ_MANY,
+    gpio_write_many, gpio_write_many_async, GPIOWriteManyRequest, TOOL_GPIO_WRITE_MANY,
+)
+
+class ToolSpec:
+    """One registered tool: request model, sync and async handlers and the schema advertised to clients"""
+    __slots__ = ("name", "request_model", "handler", "async_handler", "schema", "required")
+
+    def __init__(self, schema: Dict[str, Any], request_model: Type[BaseModel], handler: Callable[[Any], Any],
+                 async_handler: Callable[[Any], Awaitable[Any]]):
+        self.name: str = schema["name"]
+        self.request_model = request_model
+        self.handler = handler
+        self.async_handler = async_handler
+        self.schema = _with_field_descriptions(schema, request_model)
+        self.required = list(schema.get("input_schema", {}).get("required", []))
+
+    def parse(self, args: Optional[Dict[str, Any]]) -> BaseModel:
+        return self.request_model(**(args or {}))
+
+def _with_field_descriptions(schema: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    # Fill missing property descriptions from the request model's Field(description=...)
+    schema = copy.deepcopy(schema)
+    props = schema.get("input_schema", {}).get("properties", {})
+    for prop, prop_schema in props.items():
+        field = model.model_fields.get(prop)
+        if field is not None and field.description and "description" not in prop_schema:
+            prop_schema["description"] = field.description
+    return schema
+
+# name -> ToolSpec, in advertised order; built once at import
+TOOL_REGISTRY: Dict[str, ToolSpec] = {}
+
+def register(schema: Dict[str, Any], request_model: Type[BaseModel], handler: Callable[[Any], Any],
+             async_handler: Callable[[Any], Awaitable[Any]]) -> ToolSpec:
+    spec = ToolSpec(schema, request_model, handler, async_handler)
+    if spec.name in TOOL_REGISTRY:
+        raise ValueError(f"Tool already registered: {spec.name}")
+    TOOL_REGISTRY[spec.name] = spec
+    return spec
+
+def get_tool(name: str) -> Optional[ToolSpec]:
+    return TOOL_REGISTRY.get(name)
+
+def tool_schemas() -> List[Dict[str, Any]]:
+    return [spec.schema for spec in TOOL_REGISTRY.values()]
+
+for _schema, _model, _handler, _async_handler in (
+    (SSH_EXEC_SCHEMA, SSHExecRequest, ssh_exec, ssh_exec_async),
+    (SCP_PUT_SCHEMA, ScpPutRequest, scp_put, scp_put_async),
+    (SCP_GET_SCHEMA, ScpGetRequest, scp_get, scp_get_async),
+    (SCP_GET_RANGE_SCHEMA, ScpGetRangeRequest, scp_get_range, scp_get_range_async),
+    (SYNC_DIR_SCHEMA, SyncDirRequest, sync_dir, sync_dir_async),
+    (TMUX_ENSURE_SCHEMA, TmuxEnsureRequest, tmux_ensure, tmux_ensure_async),
+    (TMUX_SEND_KEYS_SCHEMA, TmuxSendKeysRequest, tmux_send_keys, tmux_send_keys_async),
+    (TMUX_KILL_SCHEMA, TmuxKillRequest, tmux_kill, tmux_kill_async),
+    (TMUX_LIST_SCHEMA, TmuxListRequest, tmux_list, tmux_list_async),
+    (TMUX_STREAM_SCHEMA, TmuxStreamRequest, tmux_stream_collect, tmux_stream_async),
+    (SERVICE_ACTION_SCHEMA, ServiceActionRequest, service_action, service_action_async),
+    (SYSTEMD_STATUS_MANY_SCHEMA, ServiceStatusManyRequest, systemd_status_many, systemd_status_many_async),
+    (SYSTEMD_WATCH_SCHEMA, SystemdWatchRequest, systemd_watch_collect, systemd_watch_async),
+    (JOURNAL_TAIL_SCHEMA, JournalTailRequest, journal_tail, journal_tail_async),
+    (DJANGO_MANAGE_SCHEMA, DjangoManageRequest, django_manage, django_manage_async),
+    (DJANGO_RUNSERVER_SCHEMA, DjangoRunserverRequest, django_runserver_tmux, django_runserver_tmux_async),
+    (TOOL_GIT_STATUS, GitStatusRequest, git_status, git_status_async),
+    (TOOL_GIT_CHECKOUT, GitCheckoutRequest, git_checkout, git_checkout_async),
+    (TOOL_GIT_PULL, GitPullRequest, git_pull, git_pull_async),
+    (TOOL_GPIO_WRITE, GPIOWriteRequest, gpio_write, gpio_write_async),
+    (TOOL_GPIO_READ, GPIOReadRequest, gpio_read, gpio_read_async),
+    (TOOL_GPIO_PWM, GPIOPWMRequest, gpio_pwm, gpio_pwm_async),
+    (TOOL_GPIO_BLINK, GPIOBlinkRequest, gpio_blink, gpio_blink_async),
+    (TOOL_GPIO_MACRO_RUN, GPIOMacroRequest, macro_run, macro_run_async),
+    (TOOL_GPIO_READ_MANY, GPIOReadManyRequest, gpio_read_many, gpio_read_many_async),
+    (TOOL_GPIO_WRITE_MANY, GPIOWriteManyRequest, gpio_write_many, gpio_write_many_async),
+    (TOOL_DEPLOY_HOOK, DeployHookRequest, deploy_hook, deploy_hook_async),
+    (FLEET_RUN_SCHEMA, FleetRunRequest, fleet_run, fleet_run_async),
+    (ROLLOUT_DEPLOY_SCHEMA, RolloutRequest, rollout_deploy, rollout_deploy_async),
+):
+    register(_schema, _model, _handler, _async_handler)
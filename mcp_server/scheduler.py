@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .config import load_config
+
+# Admission control in front of tool execution: per-target and global caps, priority lanes, fair order
+SCHED_GLOBAL = int(os.environ.get("MCP_PI_SCHED_GLOBAL", "32"))                     # tool calls running at once, all targets
+SCHED_PER_TARGET = int(os.environ.get("MCP_PI_SCHED_PER_TARGET", "4"))              # per target, unless hosts.yaml sets max_concurrency
+SCHED_PRIORITY_RESERVE = int(os.environ.get("MCP_PI_SCHED_PRIORITY_RESERVE", "1"))  # extra per-target slots only the priority lane uses
+
+PRIORITY, NORMAL, BULK = 0, 1, 2
+LANES = {PRIORITY: "priority", NORMAL: "normal", BULK: "bulk"}
+BULK_TOOLS = {"scp_put", "scp_put_stream", "scp_get", "scp_get_range", "scp_get_stream", "sync_dir"}
+
+# Who is calling (client address or X-Client-Id); calls are interleaved per (client, tool) flow
+current_client: ContextVar[str] = ContextVar("current_client", default="local")
+
+def tool_lane(tool: str) -> int:
+    if tool.startswith("gpio_") or tool == "macro_run":
+        return PRIORITY
+    if tool in BULK_TOOLS:
+        return BULK
+    return NORMAL
+
+def _target_limit(target: str) -> int:
+    try:
+        cfg = load_config().targets.get(target)
+    except FileNotFoundError:
+        cfg = None
+    if cfg is not None and cfg.max_concurrency:
+        return cfg.max_concurrency
+    return SCHED_PER_TARGET
+
+class _Waiter:
+    __slots__ = ("lane", "flow", "seq", "fut", "queued_at", "granted")
+
+    def __init__(self, lane: int, flow: Tuple[str, str], seq: int, fut: asyncio.Future):
+        self.lane = lane
+        self.flow = flow
+        self.seq = seq
+        self.fut = fut
+        self.queued_at = time.monotonic()
+        self.granted = False
+
+class _TargetState:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.inflight = 0
+        self.peak = 0
+        self.waiters: List[_Waiter] = []
+        self.calls = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+def _wake(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+class Scheduler:
+    """
+    Each call waits for a slot on its target before it runs. A freed slot goes to the waiting call
+    with the best (lane, flow turn, arrival): GPIO before normal calls before bulk transfers, and
+    within a lane flows take turns, so one client's burst queues behind itself only. The priority
+    lane may use SCHED_PRIORITY_RESERVE slots beyond the target's limit, so a pin toggle is not
+    stuck behind long uploads. Safe to use from several event loops (threadpool fleet runs).
+    """
+
+    def __init__(self, global_limit: int = SCHED_GLOBAL, reserve: int = SCHED_PRIORITY_RESERVE,
+                 limit_for: Callable[[str], int] = _target_limit):
+        self.global_limit = max(1, global_limit)
+        self.reserve = max(0, reserve)
+        self._limit_for = limit_for
+        self._lock = threading.Lock()
+        self._targets: Dict[str, _TargetState] = {}
+        self._inflight = 0
+        self._seq = 0
+        self._turns: Dict[Tuple[str, str], int] = {}  # flow -> slots granted, the fair-share clock
+        self._clock = 0
+
+    def _state(self, target: str) -> _TargetState:
+        limit = max(1, self._limit_for(target))  # re-read so hosts.yaml edits apply to the next call
+        st = self._targets.get(target)
+        if st is None:
+            st = self._targets[target] = _TargetState(limit)
+        st.limit = limit
+        return st
+
+    def _dispatch(self):
+        # Called with the lock held: grant slots while any waiter fits under its caps
+        while self._inflight < self.global_limit:
+            best: Optional[Tuple[Tuple[int, int, int], _TargetState, _Waiter]] = None
+            for st in self._targets.values():
+                for w in st.waiters:
+                    cap = st.limit + (self.reserve if w.lane == PRIORITY else 0)
+                    if st.inflight >= cap:
+                        continue
+                    key = (w.lane, self._turns[w.flow], w.seq)
+                    if best is None or key < best[0]:
+                        best = (key, st, w)
+            if best is None:
+                return
+            _, st, w = best
+            st.waiters.remove(w)
+            st.inflight += 1
+            st.peak = max(st.peak, st.inflight)
+            self._inflight += 1
+            self._clock = self._turns[w.flow]
+            self._turns[w.flow] += 1
+            waited = time.monotonic() - w.queued_at
+            st.calls += 1
+            if waited > 0.001:
+                st.waited += 1
+            st.wait_total += waited
+            st.wait_max = max(st.wait_max, waited)
+            w.granted = True
+            w.fut.get_loop().call_soon_threadsafe(_wake, w.fut)
+
+    def _release(self, target: str):
+        st = self._targets[target]
+        st.inflight -= 1
+        self._inflight -= 1
+        self._dispatch()
+        if len(self._turns) > 1024:
+            # A flow at or behind the clock restarts at the clock anyway, so forgetting it is lossless
+            queued = {w.flow for s in self._targets.values() for w in s.waiters}
+            self._turns = {f: n for f, n in self._turns.items() if n > self._clock or f in queued}
+
+    async def acquire(self, target: str, tool: str):
+        flow = (current_client.get(), tool)
+        fut = asyncio.get_running_loop().create_future()
+        with self._lock:
+            st = self._state(target)
+            self._seq += 1
+            # A new or idle flow joins at the current clock instead of cashing in turns it never queued for
+            self._turns[flow] = max(self._turns.get(flow, 0), self._clock)
+            w = _Waiter(tool_lane(tool), flow, self._seq, fut)
+            st.waiters.append(w)
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                if w.granted:
+                    self._release(target)
+                else:
+                    st.waiters.remove(w)
+            raise
+
+    def release(self, target: str):
+        with self._lock:
+            self._release(target)
+
+    @asynccontextmanager
+    async def slot(self, target: Optional[str], tool: str):
+        """Hold a slot on target for the duration of the block; calls without a target are not limited"""
+        if not isinstance(target, str):
+            yield
+            return
+        await self.acquire(target, tool)
+        try:
+            yield
+        finally:
+            self.release(target)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            targets = {}
+            for name, st in self._targets.items():
+                queued = {lane: 0 for lane in LANES.values()}
+                oldest = 0.0
+                now = time.monotonic()
+                for w in st.waiters:
+                    queued[LANES[w.lane]] += 1
+                    oldest = max(oldest, now - w.queued_at)
+                targets[name] = {
+                    "limit": st.limit, "inflight": st.inflight, "peak": st.peak, "queued": queued,
+                    "oldest_wait": round(oldest, 3), "calls": st.calls, "waited": st.waited,
+                    "wait_avg": round(st.wait_total / st.calls, 4) if st.calls else 0.0,
+                    "wait_max": round(st.wait_max, 3),
+                }
+            return {
+                "global": {"limit": self.global_limit, "inflight": self._inflight,
+                           "queued": sum(len(st.waiters) for st in self._targets.values())},
+                "priority_reserve": self.reserve,
+                "targets": targets,
+            }
+
+async def scheduled_stream(target: Optional[str], tool: str, items: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Hold a slot on target while a streamed response is produced"""
+    try:
+        async with get_scheduler().slot(target, tool):
+            async for item in items:
+                yield item
+    finally:
+        await items.aclose()
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+import paramiko
+
+from .ssh_transport import READ_CHUNK, SSHClientWrapper, SSHResult, get_pool, iter_channel, send_input
+
+# Worker threads for the short blocking steps (handshake, channel open, SFTP); commands themselves use none
+BLOCKING_WORKERS = int(os.environ.get("MCP_PI_ASYNC_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=max(1, BLOCKING_WORKERS), thread_name_prefix="ssh-async")
+
+# When set (by the job runner), receives ("stdout" | "stderr", bytes) from every exec()/exec_stream() in the task as it arrives
+exec_output: ContextVar[Optional[Callable[[str, bytes], None]]] = ContextVar("exec_output", default=None)
+
+# When set (by the job runner), every exec()/exec_stream() in the task runs with MCP_PI_JOB=<tag> in its
+# environment, which its remote child processes inherit, so they can be found and signalled later
+exec_tag: ContextVar[Optional[str]] = ContextVar("exec_tag", default=None)
+
+def _tagged(env: Optional[dict]) -> Optional[dict]:
+    tag = exec_tag.get()
+    return dict(env or {}, MCP_PI_JOB=tag) if tag else env
+
+async def run_blocking(func, *args, on_abandon=None):
+    """
+    Run a blocking call on the bounded worker pool. If the awaiting task is cancelled the call
+    still finishes, and on_abandon receives its result so leases and channels are not leaked.
+    """
+    fut = asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        if on_abandon is not None:
+            def _done(f):
+                if not f.cancelled() and f.exception() is None:
+                    on_abandon(f.result())
+            fut.add_done_callback(_done)
+        raise
+
+_END = object()
+
+async def iterate_blocking(items: Iterator[Any]) -> AsyncIterator[Any]:
+    """Drive a blocking iterator (file reads, SFTP prefetch) from the event loop, one item per worker call"""
+    try:
+        while True:
+            item = await run_blocking(next, items, _END)
+            if item is _END:
+                return
+            yield item
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            try:
+                await run_blocking(close)
+            except ValueError:
+                pass  # still running on the worker after a cancel; it stops at its next step
+
+async def aiter_channel(chan: paramiko.Channel, timeout: Optional[float] = None) -> AsyncIterator[Tuple[str, bytes]]:
+    """
+    Yield ("stdout" | "stderr", bytes) as data arrives on either stream until EOF, without blocking
+    the event loop. Paramiko signals buffered data on the channel's fileno() pipe, which the loop watches.
+    timeout is the longest wait for new data.
+    """
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    fd = chan.fileno()
+    try:
+        loop.add_reader(fd, ready.set)
+    except NotImplementedError:
+        # Loops without add_reader (Windows proactor): pull chunks through a worker thread
+        chunks = iter_channel(chan, timeout)
+        while True:
+            chunk = await run_blocking(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    try:
+        while True:
+            ready.clear()
+            # Check EOF before draining so data that raced ahead of it is still collected
+            done = chan.eof_received or chan.closed
+            while chan.recv_ready():
+                yield "stdout", chan.recv(READ_CHUNK)
+            while chan.recv_stderr_ready():
+                yield "stderr", chan.recv_stderr(READ_CHUNK)
+            if done:
+                break
+            try:
+                await asyncio.wait_for(ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise socket.timeout(f"no output for {timeout}s")
+    finally:
+        loop.remove_reader(fd)
+
+async def read_channel(chan: paramiko.Channel, sink: Optional[Callable[[str, bytes], None]] = None,
+                       timeout: Optional[float] = None) -> Tuple[bytes, bytes]:
+    """Collect a channel's stdout and stderr until EOF, passing each chunk to sink as well"""
+    parts = {"stdout": [], "stderr": []}
+    async for name, data in aiter_channel(chan, timeout):
+        parts[name].append(data)
+        if sink is not None:
+            sink(name, data)
+    return b"".join(parts["stdout"]), b"".join(parts["stderr"])
+
+def _close_channel(streams):
+    try:
+        streams[1].channel.close()
+    except Exception:
+        pass
+
+class AsyncSSHClientWrapper(SSHClientWrapper):
+    """
+    Awaitable counterpart of SSHClientWrapper sharing the same transport pool and channel limits.
+    exec() holds no thread while the remote command runs; only the SSH handshake (when the pool
+    has no live transport), channel open and SFTP calls are handed to worker threads.
+    """
+
+    async def __aenter__(self):
+        pool = get_pool()
+        entry = pool.lease(self.key, self.cfg)
+        if entry is None:
+            entry = await run_blocking(pool.acquire, self.key, self.cfg,
+                                       on_abandon=lambda e: pool.release(self.key, e))
+        self._entry = entry
+        self._client = entry.client
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+    async def exec(self, command: str, cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[int] = None,
+                   input_data: Optional[bytes] = None) -> SSHResult:
+        if not self._client:
+            raise RuntimeError("SSH client not connected")
+
+        full_cmd = self._build_command(command, cwd, _tagged(env))
+        sink = exec_output.get()
+
+        async with self._slot():
+            stdin, stdout, stderr = await run_blocking(self._open_channel, full_cmd, timeout, on_abandon=_close_channel)
+            chan = stdout.channel
+            try:
+                if input_data is not None:
+                    await run_blocking(send_input, chan, input_data)
+                # timeout is the longest wait for new output, as in the sync exec
+                out, err = await read_channel(chan, sink, timeout)
+                if chan.exit_status_ready():
+                    exit_code = chan.recv_exit_status()
+                else:
+                    exit_code = await run_blocking(chan.recv_exit_status)
+            finally:
+                # Also runs on cancellation, which stops the remote command's channel
+                chan.close()
+        return SSHResult(out.decode("utf-8", errors="replace"), err.decode("utf-8", errors="replace"), exit_code)
+
+    async def exec_stream(self, command: str, cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[float] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run a command and yield ("stdout" | "stderr", bytes) chunks as they arrive, then ("exit", exit_code).
+        timeout is the longest wait for new output; closing the generator early stops the remote command.
+        """
+        if not self._client:
+            raise RuntimeError("SSH client not connected")
+
+        full_cmd = self._build_command(command, cwd, _tagged(env))
+        sink = exec_output.get()
+
+        async with self._slot():
+            stdin, stdout, stderr = await run_blocking(self._open_channel, full_cmd, timeout, on_abandon=_close_channel)
+            chan = stdout.channel
+            try:
+                async for chunk in aiter_channel(chan, timeout):
+                    if sink is not None:
+                        sink(*chunk)
+                    yield chunk
+                if chan.exit_status_ready():
+                    yield "exit", chan.recv_exit_status()
+                else:
+                    yield "exit", await run_blocking(chan.recv_exit_status)
+            finally:
+                chan.close()
+
+    async def exec_many(self, commands: List[str], cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[int] = None) -> List[SSHResult]:
+        """Run several commands concurrently, one channel each; channel slots bound the fan-out"""
+        return list(await asyncio.gather(*(self.exec(c, cwd=cwd, env=env, timeout=timeout) for c in commands)))
+
+    async def put_bytes(self, data: bytes, remote_path: str, mode: Optional[int] = None):
+        await run_blocking(SSHClientWrapper.put_bytes, self, data, remote_path, mode)
+
+    async def put_stream(self, chunks: AsyncIterable[bytes], remote_path: str, mode: Optional[int] = None,
+                         progress: Optional[Callable[[int], None]] = None) -> int:
+        """Awaitable put_stream: chunks come from the event loop, each pipelined write runs on a worker"""
+        f = await run_blocking(self.open_upload, remote_path,
+                               on_abandon=lambda f: self.abort_upload(f, remote_path))
+        size = 0
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                await run_blocking(f.write, chunk)
+                size += len(chunk)
+                if progress is not None:
+                    progress(size)
+            await run_blocking(self.finish_upload, f, remote_path, mode)
+        except BaseException:
+            await run_blocking(self.abort_upload, f, remote_path)
+            raise
+        return size
+
+    async def stat(self, remote_path: str) -> paramiko.SFTPAttributes:
+        return await run_blocking(SSHClientWrapper.stat, self, remote_path)
+
+    async def get_stream(self, remote_path: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Awaitable get_stream: each prefetched block is taken on a worker thread"""
+        async for block in iterate_blocking(SSHClientWrapper.get_stream(self, remote_path, offset, length)):
+            yield block
+
+    async def get_bytes(self, remote_path: str) -> bytes:
+        return await run_blocking(SSHClientWrapper.get_bytes, self, remote_path)
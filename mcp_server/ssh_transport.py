@@ -1,76 +1,506 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import paramiko
+import select
 import socket
-from typing import Optional, Tuple
+import stat
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 from .config import TargetConfig
 
+# Connection pool tuning (process-wide)
+POOL_MAX_SIZE = int(os.environ.get("MCP_PI_POOL_MAX_SIZE", "16"))         # max pooled transports
+POOL_IDLE_TTL = float(os.environ.get("MCP_PI_POOL_IDLE_TTL", "300"))      # seconds before an idle transport is closed
+POOL_KEEPALIVE = int(os.environ.get("MCP_PI_POOL_KEEPALIVE", "30"))       # transport keepalive interval, 0 disables
+POOL_MAX_CHANNELS = int(os.environ.get("MCP_PI_POOL_MAX_CHANNELS", "8"))  # concurrent channels per target (sshd MaxSessions is 10)
+POOL_CHANNEL_WAIT = float(os.environ.get("MCP_PI_POOL_CHANNEL_WAIT", "60"))  # seconds to wait for a free channel before failing
+POOL_MAX_STREAMS = int(os.environ.get("MCP_PI_POOL_MAX_STREAMS", "8"))    # long-lived stream channels per target, on a transport of their own
+
+# Pool key suffix of the transport that carries a target's long-lived streams (watchers, follows),
+# so they never take the channel slots that exec and SFTP calls wait for
+STREAM_KEY_SUFFIX = "#streams"
+
+# Errors that mean the underlying transport is gone and a reconnect may help
+TRANSPORT_ERRORS = (paramiko.SSHException, EOFError, socket.error)
+
+# Bytes taken from a channel buffer per recv() call
+READ_CHUNK = 32768
+
+# SFTP transfer tuning: bytes per read/write request (OpenSSH accepts up to 255 KiB) and
+# reads kept in flight per download
+SFTP_BLOCK_SIZE = int(os.environ.get("MCP_PI_SFTP_BLOCK_SIZE", "32768"))
+SFTP_MAX_REQUESTS = int(os.environ.get("MCP_PI_SFTP_MAX_REQUESTS", "64"))
+
+# Suffix of the temporary file a streamed upload writes before it is renamed into place
+UPLOAD_SUFFIX = ".part"
+
+class ChannelsExhausted(RuntimeError):
+    """Every channel (or stream) slot of a target stayed in use for the whole wait"""
+
 class SSHResult:
     def __init__(self, stdout: str, stderr: str, exit_code: int):
         self.stdout = stdout
         self.stderr = stderr
         self.exit_code = exit_code
 
+def _connect(cfg: TargetConfig) -> paramiko.SSHClient:
+    client = paramiko.SSHClient()
+    # Auto-add policy is convenient for dev; harden in Part 3 using known_hosts
+    if cfg.known_hosts_path:
+        client.load_host_keys(cfg.known_hosts_path)
+        client.set_missing_host_key_policy(paramiko.RejectPolicy())
+    else:
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+    pkey = paramiko.Ed25519Key.from_private_key_file(cfg.private_key_path)
+    client.connect(
+        hostname=cfg.host,
+        port=cfg.port,
+        username=cfg.username,
+        pkey=pkey,
+        timeout=cfg.connect_timeout,
+        auth_timeout=cfg.connect_timeout,
+        banner_timeout=cfg.connect_timeout,
+    )
+    transport = client.get_transport()
+    if transport is not None and POOL_KEEPALIVE > 0:
+        transport.set_keepalive(POOL_KEEPALIVE)
+    return client
+
+def iter_channel(chan: paramiko.Channel, timeout: Optional[float] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield ("stdout" | "stderr", bytes) as data arrives on either stream until EOF.
+    Draining both together keeps a full stderr buffer from stalling the channel window.
+    timeout is the longest wait for new data, like paramiko's per-read timeout.
+    """
+    while True:
+        # Check EOF before draining so data that raced ahead of it is still collected
+        done = chan.eof_received or chan.closed
+        while chan.recv_ready():
+            yield "stdout", chan.recv(READ_CHUNK)
+        while chan.recv_stderr_ready():
+            yield "stderr", chan.recv_stderr(READ_CHUNK)
+        if done:
+            return
+        readable, _, _ = select.select([chan], [], [], timeout)
+        if not readable:
+            raise socket.timeout(f"no output for {timeout}s")
+
+class _PoolEntry:
+    def __init__(self, cfg: TargetConfig, client: paramiko.SSHClient):
+        self.cfg = cfg
+        self.client = client
+        self.users = 0
+        self.retired = False
+        self.last_used = time.monotonic()
+
+    def alive(self) -> bool:
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # Cheap round-trip-free probe: fails fast if the socket is dead
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def close(self):
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+class SSHConnectionPool:
+    """
+    Process-wide pool of authenticated SSH transports keyed by target name.
+    Callers share one transport per target and open a fresh channel per command;
+    concurrent channels per target are bounded by a semaphore.
+    """
+
+    def __init__(self, max_size: int = POOL_MAX_SIZE, idle_ttl: float = POOL_IDLE_TTL,
+                 max_channels: int = POOL_MAX_CHANNELS, channel_wait: float = POOL_CHANNEL_WAIT,
+                 max_streams: int = POOL_MAX_STREAMS):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.max_channels = max(1, max_channels)
+        self.channel_wait = channel_wait
+        self.max_streams = max(1, max_streams)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _PoolEntry] = {}
+        self._connect_locks: Dict[str, threading.Lock] = {}
+        self._slots: Dict[str, _Permits] = {}
+        self._channels: Dict[str, int] = {}
+        self.connects = 0
+        self.reuses = 0
+
+    def acquire(self, key: str, cfg: TargetConfig) -> _PoolEntry:
+        entry = self._lease_existing(key, cfg)
+        if entry is not None:
+            return entry
+
+        # One handshake per target: concurrent callers wait here and then share
+        # the transport; the pool lock is not held so other targets are unaffected
+        with self._connect_lock(key):
+            entry = self._lease_existing(key, cfg)
+            if entry is not None:
+                return entry
+            client = _connect(cfg)
+            with self._lock:
+                self.connects += 1
+                entry = _PoolEntry(cfg, client)
+                if self._make_room_locked():
+                    self._entries[key] = entry
+                else:
+                    # Pool full of busy transports: use this one once, then close it
+                    entry.retired = True
+                entry.users += 1
+                entry.last_used = time.monotonic()
+                return entry
+
+    def lease(self, key: str, cfg: TargetConfig) -> Optional[_PoolEntry]:
+        """Lease the pooled transport if one is ready; never connects (safe on an event loop)"""
+        return self._lease_existing(key, cfg)
+
+    def _lease_existing(self, key: str, cfg: TargetConfig) -> Optional[_PoolEntry]:
+        with self._lock:
+            self._reap_locked()
+            entry = self._entries.get(key)
+            if entry is not None and (entry.cfg != cfg or not entry.alive()):
+                # Target config changed or transport died: drop it and reconnect
+                self._retire_locked(key, entry)
+                entry = None
+            if entry is not None:
+                entry.users += 1
+                entry.last_used = time.monotonic()
+                self.reuses += 1
+            return entry
+
+    def _connect_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._connect_locks.setdefault(key, threading.Lock())
+
+    def channel_slot(self, key: str) -> "_ChannelSlot":
+        with self._lock:
+            sem = self._slots.get(key)
+            if sem is None:
+                sem = self._slots[key] = _Permits(self.max_channels)
+        return _ChannelSlot(self, key, sem, self.max_channels, self.channel_wait, "channel")
+
+    def stream_slot(self, key: str) -> "_ChannelSlot":
+        """A slot for a channel that stays open indefinitely; fails at once instead of queueing"""
+        with self._lock:
+            sem = self._slots.get(key)
+            if sem is None:
+                sem = self._slots[key] = _Permits(self.max_streams)
+        return _ChannelSlot(self, key, sem, self.max_streams, 0, "stream")
+
+    def _count_channel(self, key: str, delta: int):
+        with self._lock:
+            self._channels[key] = self._channels.get(key, 0) + delta
+
+    def release(self, key: str, entry: _PoolEntry, discard: bool = False):
+        with self._lock:
+            entry.users = max(0, entry.users - 1)
+            entry.last_used = time.monotonic()
+            if discard:
+                self._retire_locked(key, entry)
+            elif entry.retired and entry.users == 0:
+                entry.close()
+
+    def invalidate(self, key: str, entry: _PoolEntry):
+        with self._lock:
+            self._retire_locked(key, entry)
+
+    def close_all(self):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                self._retire_locked(key, entry)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "idle_ttl": self.idle_ttl,
+                "connects": self.connects,
+                "reuses": self.reuses,
+                "max_channels": self.max_channels,
+                "channel_wait": self.channel_wait,
+                "max_streams": self.max_streams,
+                "targets": {k: {"users": e.users, "channels": self._channels.get(k, 0),
+                                "idle_for": round(time.monotonic() - e.last_used, 3)}
+                            for k, e in self._entries.items()},
+            }
+
+    def _retire_locked(self, key: str, entry: _PoolEntry):
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.retired = True
+        if entry.users == 0:
+            entry.close()
+
+    def _reap_locked(self):
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.users == 0 and now - entry.last_used > self.idle_ttl:
+                self._retire_locked(key, entry)
+
+    def _make_room_locked(self) -> bool:
+        while len(self._entries) >= self.max_size:
+            idle = [(e.last_used, k) for k, e in self._entries.items() if e.users == 0]
+            if not idle:
+                return False
+            _, lru_key = min(idle)
+            self._retire_locked(lru_key, self._entries[lru_key])
+        return True
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+class _Waiter:
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+class _Permits:
+    """
+    Counting semaphore that hands permits to waiters strictly in arrival order, whether they
+    block a thread or await on an event loop, so neither kind can overtake the other.
+    """
+
+    def __init__(self, count: int):
+        self._lock = threading.Lock()
+        self._free = count
+        self._waiters: Deque[_Waiter] = deque()
+
+    def _take_locked(self) -> bool:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return True
+        return False
+
+    def _settle(self, w: _Waiter) -> bool:
+        # The wait ended: keep a permit handed over meanwhile, otherwise leave the queue
+        with self._lock:
+            if w.granted:
+                return True
+            self._waiters.remove(w)
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._take_locked():
+                return True
+            event = threading.Event()
+            w = _Waiter(event.set)
+            self._waiters.append(w)
+        event.wait(timeout)
+        return self._settle(w)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_locked():
+                return True
+            fut = loop.create_future()
+            w = _Waiter(lambda: loop.call_soon_threadsafe(_resolve, fut))
+            self._waiters.append(w)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self._settle(w):
+                self.release()
+            raise
+        return self._settle(w)
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                w = self._waiters.popleft()
+                w.granted = True
+                w.wake()
+            else:
+                self._free += 1
+
+class _ChannelSlot:
+    # Holds one of the target's channel permits for the lifetime of a channel
+    def __init__(self, pool: SSHConnectionPool, key: str, permits: _Permits, limit: int, wait: float, kind: str):
+        self._pool = pool
+        self._key = key
+        self._permits = permits
+        self._limit = limit
+        self._wait = wait
+        self._kind = kind
+
+    def _exhausted(self) -> ChannelsExhausted:
+        return ChannelsExhausted(f"{self._kind} slots exhausted on {self._key}: all {self._limit} "
+                                 f"stayed in use for {self._wait:g}s")
+
+    def __enter__(self):
+        if not self._permits.acquire(self._wait):
+            raise self._exhausted()
+        self._pool._count_channel(self._key, 1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._pool._count_channel(self._key, -1)
+        self._permits.release()
+
+    async def __aenter__(self):
+        # Waits on the event loop, in the same queue as threads, so no thread is held
+        if not await self._permits.acquire_async(self._wait):
+            raise self._exhausted()
+        self._pool._count_channel(self._key, 1)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+_pool = SSHConnectionPool()
+
+def get_pool() -> SSHConnectionPool:
+    return _pool
+
+def send_input(chan: paramiko.Channel, data: bytes):
+    # All of data on the command's stdin, then EOF
+    chan.sendall(data)
+    chan.shutdown_write()
+
 class SSHClientWrapper:
-    def __init__(self, cfg: TargetConfig):
+    def __init__(self, cfg: TargetConfig, name: Optional[str] = None, streams: bool = False):
         self.cfg = cfg
+        # Pool key: the target name when known, otherwise the connection identity.
+        # streams=True is for channels that stay open: they get their own transport and stream slots
+        self.key = (name or f"{cfg.username}@{cfg.host}:{cfg.port}") + (STREAM_KEY_SUFFIX if streams else "")
+        self.name = name
+        self.streams = streams
+        self._entry: Optional[_PoolEntry] = None
         self._client: Optional[paramiko.SSHClient] = None
+        self._sftp: Optional[paramiko.SFTPClient] = None
 
     def __enter__(self):
-        self._client = paramiko.SSHClient()
-        # Auto-add policy is convenient for dev; harden in Part 3 using known_hosts
-        if self.cfg.known_hosts_path:
-            self._client.load_host_keys(self.cfg.known_hosts_path)
-            self._client.set_missing_host_key_policy(paramiko.RejectPolicy())
-        else:
-            self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        pkey = paramiko.Ed25519Key.from_private_key_file(self.cfg.private_key_path)
-        self._client.connect(
-            hostname=self.cfg.host,
-            port=self.cfg.port,
-            username=self.cfg.username,
-            pkey=pkey,
-            timeout=self.cfg.connect_timeout,
-            auth_timeout=self.cfg.connect_timeout,
-            banner_timeout=self.cfg.connect_timeout,
-        )
+        self._entry = _pool.acquire(self.key, self.cfg)
+        self._client = self._entry.client
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        if self._client:
-            self._client.close()
+        if self._sftp:
+            try:
+                self._sftp.close()
+            except Exception:
+                pass
+            self._sftp = None
+        if self._entry:
+            broken = exc_type is not None and issubclass(exc_type, TRANSPORT_ERRORS) and not self._entry.alive()
+            _pool.release(self.key, self._entry, discard=broken)
+        self._entry = None
         self._client = None
 
-    def exec(self, command: str, cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[int] = None) -> SSHResult:
-        if not self._client:
-            raise RuntimeError("SSH client not connected")
+    def _reconnect(self):
+        # Drop the stale transport and take a fresh one from the pool
+        if self._entry:
+            _pool.release(self.key, self._entry, discard=True)
+        self._entry = None
+        self._client = None
+        self._sftp = None
+        self.__enter__()
+
+    def _open_channel(self, full_cmd: str, timeout: Optional[int]) -> Tuple[paramiko.ChannelFile, paramiko.ChannelFile, paramiko.ChannelFile]:
+        try:
+            return self._client.exec_command(full_cmd, timeout=timeout)
+        except TRANSPORT_ERRORS:
+            # Nothing ran yet, so one retry on a fresh transport is safe
+            self._reconnect()
+            return self._client.exec_command(full_cmd, timeout=timeout)
+
+    def _slot(self) -> _ChannelSlot:
+        return _pool.stream_slot(self.key) if self.streams else _pool.channel_slot(self.key)
 
+    def _build_command(self, command: str, cwd: Optional[str], env: Optional[dict]) -> str:
         prefix = ""
         if env:
             exports = " ".join([f'{k}="{str(v).replace(chr(34), chr(92)+chr(34))}"' for k, v in env.items()])
             prefix += f"export {exports}; "
         if cwd:
             prefix += f"cd {cwd} && "
+        return prefix + command
 
-        full_cmd = prefix + command
+    def exec(self, command: str, cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[int] = None,
+             input_data: Optional[bytes] = None) -> SSHResult:
+        """input_data is sent on stdin, then EOF, before the output is read (for commands that read stdin first)"""
+        if not self._client:
+            raise RuntimeError("SSH client not connected")
 
-        stdin, stdout, stderr = self._client.exec_command(full_cmd, timeout=timeout)
-        out = stdout.read().decode("utf-8", errors="replace")
-        err = stderr.read().decode("utf-8", errors="replace")
-        exit_code = stdout.channel.recv_exit_status()
+        full_cmd = self._build_command(command, cwd, env)
+
+        with self._slot():
+            stdin, stdout, stderr = self._open_channel(full_cmd, timeout)
+            if input_data is not None:
+                send_input(stdout.channel, input_data)
+            parts: Dict[str, List[bytes]] = {"stdout": [], "stderr": []}
+            for name, data in iter_channel(stdout.channel, timeout):
+                parts[name].append(data)
+            exit_code = stdout.channel.recv_exit_status()
+        out = b"".join(parts["stdout"]).decode("utf-8", errors="replace")
+        err = b"".join(parts["stderr"]).decode("utf-8", errors="replace")
         return SSHResult(out, err, exit_code)
 
+    def exec_stream(self, command: str, cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[float] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Run a command and yield ("stdout" | "stderr", bytes) chunks as they arrive, then ("exit", exit_code).
+        Closing the generator early closes the channel, which stops the remote command.
+        """
+        if not self._client:
+            raise RuntimeError("SSH client not connected")
+        with self._slot():
+            stdin, stdout, stderr = self._open_channel(self._build_command(command, cwd, env), timeout)
+            chan = stdout.channel
+            try:
+                yield from iter_channel(chan, timeout)
+                yield "exit", chan.recv_exit_status()
+            finally:
+                chan.close()
+
+    def exec_many(self, commands: List[str], cwd: Optional[str] = None, env: Optional[dict] = None, timeout: Optional[int] = None) -> List[SSHResult]:
+        """Run several commands concurrently, one channel each, over this target's transport"""
+        if not self._client:
+            raise RuntimeError("SSH client not connected")
+        if len(commands) <= 1:
+            return [self.exec(c, cwd=cwd, env=env, timeout=timeout) for c in commands]
+        workers = min(len(commands), _pool.max_channels)
+
+        def run(command: str) -> SSHResult:
+            # A lease per worker: if the transport drops, each reconnect releases only its own lease,
+            # so no worker's client is closed or swapped out from under another
+            with SSHClientWrapper(self.cfg, name=self.name, streams=self.streams) as cli:
+                return cli.exec(command, cwd=cwd, env=env, timeout=timeout)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"ssh-{self.key}") as ex:
+            return list(ex.map(run, commands))
+
     def sftp(self) -> paramiko.SFTPClient:
         if not self._client:
             raise RuntimeError("SSH client not connected")
-        return self._client.open_sftp()
+        if not self._sftp:
+            try:
+                self._sftp = self._client.open_sftp()
+            except TRANSPORT_ERRORS:
+                self._reconnect()
+                self._sftp = self._client.open_sftp()
+        return self._sftp
 
-    def put_bytes(self, data: bytes, remote_path: str, mode: Optional[int] = None):
-        s = self.sftp()
-        
-        # Ensure parent directory exists
-        import os
+    def _ensure_parent(self, s: paramiko.SFTPClient, remote_path: str):
         parent_dir = os.path.dirname(remote_path)
         if parent_dir and parent_dir != '/':
             try:
@@ -78,15 +508,102 @@ class SSHClientWrapper:
             except FileNotFoundError:
                 # Create parent directories recursively
                 self._mkdir_p(s, parent_dir)
-        
-        with s.file(remote_path, "wb") as f:
+
+    def _open_file(self, remote_path: str, mode: str) -> paramiko.SFTPFile:
+        f = self.sftp().file(remote_path, mode)
+        f.MAX_REQUEST_SIZE = SFTP_BLOCK_SIZE
+        return f
+
+    def put_bytes(self, data: bytes, remote_path: str, mode: Optional[int] = None):
+        # Written in place: an existing file keeps its mode, owner and links, and device or sysfs paths work
+        s = self.sftp()
+        self._ensure_parent(s, remote_path)
+        with self._open_file(remote_path, "wb") as f:
+            f.set_pipelined(True)
             f.write(data)
         if mode is not None:
             s.chmod(remote_path, mode)
-    
+
+    def _upload_target(self, remote_path: str) -> Tuple[str, Optional[paramiko.SFTPAttributes]]:
+        """The file an upload to remote_path replaces (a symlink's target), and its attributes if it exists"""
+        s = self.sftp()
+        try:
+            st = s.lstat(remote_path)
+            if stat.S_ISLNK(st.st_mode):
+                remote_path = s.normalize(remote_path)
+                st = s.stat(remote_path)
+            return remote_path, st
+        except IOError:
+            return remote_path, None
+
+    def open_upload(self, remote_path: str) -> paramiko.SFTPFile:
+        """Open remote_path + UPLOAD_SUFFIX for a pipelined write; finish with finish_upload or abort_upload"""
+        path, _ = self._upload_target(remote_path)
+        self._ensure_parent(self.sftp(), path)
+        f = self._open_file(path + UPLOAD_SUFFIX, "wb")
+        # Writes go out without waiting for each ack (paramiko collects them every ~100 requests);
+        # errors surface at close()
+        f.set_pipelined(True)
+        return f
+
+    def finish_upload(self, f: paramiko.SFTPFile, remote_path: str, mode: Optional[int] = None):
+        s = self.sftp()
+        path, old = self._upload_target(remote_path)
+        tmp = path + UPLOAD_SUFFIX
+        f.close()
+        # The new file takes over the old one's mode and, where the server allows it, its owner
+        if mode is None and old is not None:
+            mode = stat.S_IMODE(old.st_mode)
+        if mode is not None:
+            s.chmod(tmp, mode)
+        if old is not None:
+            try:
+                s.chown(tmp, old.st_uid, old.st_gid)
+            except IOError:
+                pass
+        try:
+            s.posix_rename(tmp, path)
+        except IOError:
+            # Servers without the posix-rename extension: plain rename refuses to overwrite
+            try:
+                s.remove(path)
+            except IOError:
+                pass
+            s.rename(tmp, path)
+
+    def abort_upload(self, f: paramiko.SFTPFile, remote_path: str):
+        try:
+            f.close()
+        except Exception:
+            pass
+        try:
+            self.sftp().remove(self._upload_target(remote_path)[0] + UPLOAD_SUFFIX)
+        except Exception:
+            pass
+
+    def put_stream(self, chunks: Iterable[bytes], remote_path: str, mode: Optional[int] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Write chunks to remote_path as they come, holding one chunk at a time, and return the size.
+        The file appears under its final name only once complete; a failed upload leaves nothing behind.
+        An existing file's mode carries over, and a symlink stays a link: the file it points to is replaced.
+        """
+        f = self.open_upload(remote_path)
+        size = 0
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+                if progress is not None:
+                    progress(size)
+            self.finish_upload(f, remote_path, mode)
+        except BaseException:
+            self.abort_upload(f, remote_path)
+            raise
+        return size
+
     def _mkdir_p(self, sftp, remote_path):
         """Create remote directory recursively"""
-        import os
         if remote_path == '/' or remote_path == '':
             return
         try:
@@ -100,7 +617,31 @@ class SSHClientWrapper:
             except OSError:
                 pass  # Directory might already exist
 
+    def stat(self, remote_path: str) -> paramiko.SFTPAttributes:
+        return self.sftp().stat(remote_path)
+
+    def get_stream(self, remote_path: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yield the file (or length bytes from offset) in SFTP_BLOCK_SIZE blocks. Reads are prefetched a
+        window of SFTP_MAX_REQUESTS blocks at a time, so a slow link costs one round trip per window
+        instead of one per block, and memory stays bounded by the window.
+        """
+        window = max(1, SFTP_MAX_REQUESTS) * SFTP_BLOCK_SIZE
+        with self._open_file(remote_path, "rb") as f:
+            end = f.stat().st_size
+            if length is not None:
+                end = min(end, offset + length)
+            f.seek(offset)
+            pos = offset
+            while pos < end:
+                stop = min(pos + window, end)
+                f.prefetch(stop)
+                while pos < stop:
+                    block = f.read(min(SFTP_BLOCK_SIZE, stop - pos))
+                    if not block:
+                        return  # file shrank underneath us
+                    pos += len(block)
+                    yield block
+
     def get_bytes(self, remote_path: str) -> bytes:
-        s = self.sftp()
-        with s.file(remote_path, "rb") as f:
-            return f.read()
\ No newline at end of file
+        return b"".join(self.get_stream(remote_path))
\ No newline at end of file
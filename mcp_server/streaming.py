@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Union
+
+from starlette.concurrency import run_in_threadpool
+
+# Server-sent events helpers shared by the streaming endpoints
+
+log = logging.getLogger("mcp.streaming")
+
+def _next_or_none(it: Iterator[Any]) -> Any:
+    try:
+        return next(it)
+    except StopIteration:
+        return None
+
+async def _items(stream: Union[Iterator[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(stream, "__anext__"):
+        async for item in stream:
+            yield item
+        return
+    while True:
+        item = await run_in_threadpool(_next_or_none, stream)
+        if item is None:
+            return
+        yield item
+
+async def sse_events(stream: Union[Iterator[Dict[str, Any]], AsyncIterator[Dict[str, Any]]], event: str = "message",
+                     event_for: Optional[Callable[[Dict[str, Any]], str]] = None,
+                     id_for: Optional[Callable[[Dict[str, Any]], Any]] = None) -> AsyncIterator[Dict[str, str]]:
+    """
+    Yield items from an async iterator, or a blocking one pulled in the threadpool, as SSE events.
+    If the client disconnects, the stream's aclose()/close() runs so the remote command stops.
+    A failure mid-stream is reported as a final "error" event, since the HTTP status is already sent.
+    id_for sets each event's id, which browsers send back as Last-Event-ID when they reconnect.
+    """
+    try:
+        async for item in _items(stream):
+            evt = {"event": event_for(item) if event_for else event,
+                   "data": json.dumps(item, separators=(",", ":"))}
+            if id_for is not None:
+                evt["id"] = str(id_for(item))
+            yield evt
+    except Exception as e:
+        log.warning(f"stream failed: {e}")
+        yield {"event": "error", "data": json.dumps({"ok": False, "error": str(e)}, separators=(",", ":"))}
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        else:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import logging
+import os
+import shlex
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+import paramiko
+
+from .config import TargetConfig
+from .ssh_transport import TRANSPORT_ERRORS, get_pool
+
+# Resident "tmux -C" client per target: ensure/send/kill/list are lines on one channel, no exec per call
+TMUX_CONTROL_ENABLED = os.environ.get("MCP_PI_TMUX_CONTROL", "1").lower() not in ("0", "false", "no")
+TMUX_CONTROL_READY_TIMEOUT = float(os.environ.get("MCP_PI_TMUX_CONTROL_READY_TIMEOUT", "5"))
+TMUX_CONTROL_TIMEOUT = float(os.environ.get("MCP_PI_TMUX_CONTROL_TIMEOUT", "10"))          # longest wait for a reply
+TMUX_CONTROL_RETRY_AFTER = float(os.environ.get("MCP_PI_TMUX_CONTROL_RETRY_AFTER", "300"))  # back-off after a failed start
+
+# The control client has to be attached to something; this session only hosts it
+CONTROL_SESSION = "mcp__control"
+LIST_SESSIONS = "list-sessions -F '#{session_name}'"
+
+# Control characters sent as tmux key names; everything else is typed literally with send-keys -l
+_KEY_NAMES = {"\r": "Enter", "\n": "Enter", "\t": "Tab", "\x1b": "Escape", "\x7f": "BSpace"}
+
+log = logging.getLogger("mcp.tmux.control")
+
+T = TypeVar("T")
+
+class ControlUnavailable(Exception):
+    """The control client could not be reached and the command was not sent"""
+
+def command_line(args: Sequence[str]) -> str:
+    # shlex quoting is also valid tmux command syntax (single quotes are literal in both)
+    return " ".join(shlex.quote(a) for a in args)
+
+def key_commands(pane: str, keys: str, enter: bool = True) -> List[List[str]]:
+    """
+    send-keys argument lists that type keys into pane: printable runs literally, control
+    characters (C-c, Enter, Escape, ...) as key names, then Enter when asked.
+    """
+    cmds: List[List[str]] = []
+    text, names = "", []
+
+    def flush():
+        nonlocal text, names
+        if text:
+            cmds.append(["send-keys", "-t", pane, "-l", "--", text])
+        if names:
+            cmds.append(["send-keys", "-t", pane] + names)
+        text, names = "", []
+
+    for ch in keys:
+        name = _KEY_NAMES.get(ch)
+        if name is None and ord(ch) < 32:
+            name = f"C-{chr(ord(ch) + 96)}"
+        if name is None:
+            if names:
+                flush()
+            text += ch
+        else:
+            if text:
+                flush()
+            names.append(name)
+    if enter:
+        if text:
+            flush()
+        names.append("Enter")
+    flush()
+    return cmds
+
+class _Reply:
+    __slots__ = ("done", "ok", "lines", "then", "error")
+
+    def __init__(self, then: Optional[Callable[[bool, List[str]], None]] = None):
+        self.done = threading.Event()
+        self.ok = False
+        self.lines: List[str] = []
+        self.then = then
+        self.error: Optional[str] = None
+
+class TmuxControlSession:
+    """
+    A `tmux -C` client on one persistent channel. Commands are written as lines and tmux answers
+    each, in order, with a %begin/%end (or %error) block. The session list is cached and refreshed
+    whenever tmux announces %sessions-changed, so ensure() of a known session costs no round trip.
+    """
+
+    def __init__(self, key: str, cfg: TargetConfig):
+        self.key = key
+        self.cfg = cfg
+        self.sessions: Set[str] = set()
+        self._lock = threading.Lock()  # lines are written in the order their replies are queued
+        self._replies: Deque[_Reply] = deque()
+        self._closed: Optional[str] = None
+        self._refreshing = False
+        self._chan: Optional[paramiko.Channel] = None
+        self._entry = get_pool().acquire(key, cfg)
+        try:
+            self._chan = self._entry.client.get_transport().open_session()
+            self._chan.exec_command(f"tmux -C new-session -A -s {CONTROL_SESSION}")
+            self._stdout = self._chan.makefile("rb")
+            self._refreshing = True  # the list below is the first refresh
+            threading.Thread(target=self._read, name=f"tmux-control-{key}", daemon=True).start()
+            # Pane output of the host session is not needed (tmux < 3.2 rejects the flag, which is fine)
+            self.run(["refresh-client -f no-output", LIST_SESSIONS], [None, self._set_sessions],
+                     timeout=TMUX_CONTROL_READY_TIMEOUT)
+        except Exception as e:
+            self.close()
+            raise ControlUnavailable(f"tmux control mode did not start: {e}")
+
+    def alive(self) -> bool:
+        return self._closed is None
+
+    def _read(self):
+        block: Optional[str] = None  # command number of the reply being read
+        mine = False
+        lines: List[str] = []
+        reason = "tmux exited"
+        try:
+            for raw in iter(self._stdout.readline, b""):
+                line = raw.decode("utf-8", errors="replace").rstrip("\n")
+                parts = line.split(" ")
+                if block is not None:
+                    if parts[0] in ("%end", "%error") and len(parts) == 4 and parts[2] == block:
+                        if mine:
+                            self._complete(parts[0] == "%end", lines)
+                        block, lines = None, []
+                    elif mine:
+                        lines.append(line)
+                elif parts[0] == "%begin" and len(parts) == 4:
+                    # Flag 1 marks replies to this client's commands; the attach itself replies with 0
+                    block, mine = parts[2], parts[3].isdigit() and int(parts[3]) & 1 == 1
+                elif parts[0] in ("%sessions-changed", "%session-renamed"):
+                    self._refresh()
+                elif parts[0] == "%exit":
+                    reason = line
+                    break
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+        finally:
+            chan = self._chan
+            if reason == "tmux exited" and chan is not None and chan.recv_stderr_ready():
+                reason = chan.recv_stderr(4096).decode("utf-8", errors="replace").strip() or reason
+            self._shutdown(reason)
+
+    def _complete(self, ok: bool, lines: List[str]):
+        with self._lock:
+            reply = self._replies.popleft() if self._replies else None
+        if reply is None:
+            return
+        reply.ok, reply.lines = ok, lines
+        if reply.then is not None:
+            try:
+                reply.then(ok, lines)
+            except Exception:
+                log.exception("tmux control reply handler failed")
+        reply.done.set()
+
+    def _set_sessions(self, ok: bool, lines: List[str]):
+        self._refreshing = False
+        if ok:
+            self.sessions = set(lines)
+
+    def _refresh(self):
+        if self._refreshing:
+            return  # the queued list-sessions runs after this change, so it already covers it
+        self._refreshing = True
+        try:
+            self._send([LIST_SESSIONS], [self._set_sessions])
+        except ControlUnavailable:
+            pass
+
+    def _send(self, cmds: List[str], thens: Sequence[Optional[Callable[[bool, List[str]], None]]]) -> List[_Reply]:
+        if any("\n" in c or "\r" in c for c in cmds):
+            raise ControlUnavailable("command spans lines")
+        with self._lock:
+            if self._closed is not None:
+                raise ControlUnavailable(f"tmux control channel is closed: {self._closed}")
+            replies = [_Reply(t) for t in thens]
+            self._replies.extend(replies)
+            try:
+                self._chan.sendall(("\n".join(cmds) + "\n").encode("utf-8"))
+            except TRANSPORT_ERRORS as e:
+                for r in replies:
+                    self._replies.remove(r)
+                raise ControlUnavailable(str(e))
+        return replies
+
+    def run(self, cmds: List[str], thens: Optional[Sequence[Optional[Callable[[bool, List[str]], None]]]] = None,
+            timeout: float = TMUX_CONTROL_TIMEOUT) -> List[Tuple[bool, str]]:
+        """Send commands in one write and return (ok, output or error) for each, in order"""
+        replies = self._send(cmds, thens or [None] * len(cmds))
+        deadline = time.monotonic() + timeout
+        out = []
+        for r in replies:
+            # From here on the command may have run, so failures propagate instead of falling back
+            if not r.done.wait(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f"tmux did not answer within {timeout}s")
+            if r.error is not None:
+                raise RuntimeError(f"tmux control channel closed: {r.error}")
+            out.append((r.ok, "\n".join(r.lines)))
+        return out
+
+    def ensure(self, session: str, cwd: Optional[str] = None) -> Tuple[bool, str]:
+        if session in self.sessions:
+            return True, "ensured"
+        args = ["new-session", "-d", "-s", session] + (["-c", cwd] if cwd else [])
+        ok, out = self.run([command_line(args)], [lambda ok, _: ok and self.sessions.add(session)])[0]
+        if ok or out.startswith("duplicate session"):
+            return True, "ensured"
+        return False, out
+
+    def send_keys(self, session: str, keys: str, enter: bool = True) -> Tuple[bool, str]:
+        results = self.run([command_line(a) for a in key_commands(f"={session}:", keys, enter)])
+        errors = [out for ok, out in results if not ok]
+        return not errors, errors[0] if errors else ""
+
+    def kill(self, session: str) -> Tuple[bool, str]:
+        return self.run([command_line(["kill-session", "-t", f"={session}"])],
+                        [lambda ok, _: ok and self.sessions.discard(session)])[0]
+
+    def list(self) -> List[str]:
+        return sorted(s for s in self.sessions if s != CONTROL_SESSION)
+
+    def _shutdown(self, reason: str):
+        with self._lock:
+            if self._closed is None:
+                self._closed = reason
+            pending = list(self._replies)
+            self._replies.clear()
+        for r in pending:
+            r.error = reason
+            r.done.set()
+
+    def close(self):
+        self._shutdown("closed")
+        if self._chan is not None:
+            try:
+                self._chan.close()
+            except Exception:
+                pass
+            self._chan = None
+        if self._entry is not None:
+            get_pool().release(self.key, self._entry)
+            self._entry = None
+
+class TmuxControlManager:
+    """One control client per target, started lazily and restarted when it dies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, TmuxControlSession] = {}
+        self._start_locks: Dict[str, threading.Lock] = {}
+        self._unavailable_until: Dict[str, float] = {}
+
+    def request(self, key: str, cfg: TargetConfig, op: Callable[[TmuxControlSession], T]) -> Optional[T]:
+        """
+        Run op against the target's control client.
+        Returns None when control mode is unavailable so the caller can exec tmux instead.
+        """
+        session = self._session(key, cfg)
+        if session is None:
+            return None
+        try:
+            return op(session)
+        except ControlUnavailable:
+            self._drop(key, session)
+            return None
+        except Exception:
+            if not session.alive():
+                self._drop(key, session)
+            raise
+
+    def _session(self, key: str, cfg: TargetConfig) -> Optional[TmuxControlSession]:
+        with self._lock:
+            start_lock = self._start_locks.setdefault(key, threading.Lock())
+        with start_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+            if session is not None:
+                if session.cfg == cfg and session.alive():
+                    return session
+                self._drop(key, session)
+            if time.monotonic() < self._unavailable_until.get(key, 0.0):
+                return None
+            try:
+                session = TmuxControlSession(key, cfg)
+            except Exception as e:
+                log.warning(f"tmux control mode unavailable for {key}, using tmux per call: {e}")
+                self._unavailable_until[key] = time.monotonic() + TMUX_CONTROL_RETRY_AFTER
+                return None
+            with self._lock:
+                self._sessions[key] = session
+                self._unavailable_until.pop(key, None)
+            return session
+
+    def _drop(self, key: str, session: TmuxControlSession):
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+        for _, session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "enabled": TMUX_CONTROL_ENABLED,
+                "targets": {k: {"sessions": s.list(), "pending": len(s._replies)}
+                            for k, s in self._sessions.items() if s.alive()},
+                "backoff": {k: round(t - now, 1) for k, t in self._unavailable_until.items() if t > now},
+            }
+
+_manager = TmuxControlManager()
+
+def get_tmux_control() -> TmuxControlManager:
+    return _manager
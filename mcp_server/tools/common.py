@@ -3,12 +3,19 @@ from typing import Dict, Any
 from pydantic import BaseModel, Field
 from ..config import load_config
 from ..ssh_transport import SSHClientWrapper
+from ..ssh_async import AsyncSSHClientWrapper
 
 class TargetedRequest(BaseModel):
     target: str = Field(description="Target name from config.targets")
 
-def use_client(target: str) -> SSHClientWrapper:
+def use_client(target: str, streams: bool = False) -> SSHClientWrapper:
     cfg = load_config()
     if target not in cfg.targets:
         raise ValueError(f"Unknown target: {target}")
-    return SSHClientWrapper(cfg.targets[target])
\ No newline at end of file
+    return SSHClientWrapper(cfg.targets[target], name=target, streams=streams)
+
+def use_async_client(target: str, streams: bool = False) -> AsyncSSHClientWrapper:
+    cfg = load_config()
+    if target not in cfg.targets:
+        raise ValueError(f"Unknown target: {target}")
+    return AsyncSSHClientWrapper(cfg.targets[target], name=target, streams=streams)
\ No newline at end of file
@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import Optional, Dict
 from pydantic import BaseModel, Field
 
-from .common import TargetedRequest, use_client
+from .common import TargetedRequest, use_client, use_async_client
 
 class DjangoBase(TargetedRequest):
     project_dir: str = Field(description="Remote project working directory (contains manage.py)")
@@ -30,6 +30,12 @@ def django_manage(req: DjangoManageRequest) -> DjangoManageResponse:
         r = cli.exec(f'{prefix}python manage.py {req.manage_args}', cwd=req.project_dir, env=req.env, timeout=req.timeout)
         return DjangoManageResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
 
+async def django_manage_async(req: DjangoManageRequest) -> DjangoManageResponse:
+    async with use_async_client(req.target) as cli:
+        prefix = _mk_prefix(req.venv_path)
+        r = await cli.exec(f'{prefix}python manage.py {req.manage_args}', cwd=req.project_dir, env=req.env, timeout=req.timeout)
+        return DjangoManageResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
+
 DJANGO_MANAGE_SCHEMA = {
     "name": "django_manage",
     "description": "Run python manage.py with given args (migrate, collectstatic, etc.)",
@@ -78,9 +84,20 @@ def django_runserver_tmux(req: DjangoRunserverRequest) -> DjangoRunserverRespons
     cmd = f'{_mk_prefix(req.venv_path)}python manage.py runserver {req.host}:{req.port}'
     if req.extra_args:
         cmd += f" {req.extra_args}"
-    # Clear existing command: send C-c and then run fresh
-    tmux_send_keys(TmuxSendKeysRequest(target=req.target, session=req.session, keys="\x03", enter=False))
-    run = tmux_send_keys(TmuxSendKeysRequest(target=req.target, session=req.session, keys=cmd, enter=True))
+    # Clear existing command: C-c, then run fresh (one send-keys round trip)
+    run = tmux_send_keys(TmuxSendKeysRequest(target=req.target, session=req.session, keys="\x03" + cmd, enter=True))
+    return DjangoRunserverResponse(ok=run.ok, session=ensure.session, detail=run.detail)
+
+async def django_runserver_tmux_async(req: DjangoRunserverRequest) -> DjangoRunserverResponse:
+    from .tmux import tmux_ensure_async, tmux_send_keys_async, TmuxEnsureRequest, TmuxSendKeysRequest  # local import to avoid cycle
+    ensure = await tmux_ensure_async(TmuxEnsureRequest(target=req.target, session=req.session, cwd=req.project_dir))
+    if not ensure.ok:
+        return DjangoRunserverResponse(ok=False, session=ensure.session, detail=ensure.detail)
+
+    cmd = f'{_mk_prefix(req.venv_path)}python manage.py runserver {req.host}:{req.port}'
+    if req.extra_args:
+        cmd += f" {req.extra_args}"
+    run = await tmux_send_keys_async(TmuxSendKeysRequest(target=req.target, session=req.session, keys="\x03" + cmd, enter=True))
     return DjangoRunserverResponse(ok=run.ok, session=ensure.session, detail=run.detail)
 
 DJANGO_RUNSERVER_SCHEMA = {
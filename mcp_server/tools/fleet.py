@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from ..config import load_config, select_targets
+from ..scheduler import get_scheduler
+
+# Targets worked on at once when the request does not say
+FLEET_CONCURRENCY = int(os.environ.get("MCP_PI_FLEET_CONCURRENCY", "10"))
+
+class FleetRunRequest(BaseModel):
+    tool: str = Field(description="Registered tool to run on every selected target, e.g. 'git_pull'")
+    arguments: Dict[str, Any] = Field(default_factory=dict, description="Tool arguments, without target")
+    targets: Optional[List[str]] = Field(default=None, description="Target names from config.targets")
+    selector: Optional[str] = Field(default=None, description="Label selector over hosts.yaml, e.g. 'role=kiosk,site!=lab'; filters targets when both are given")
+    concurrency: Optional[int] = Field(default=None, ge=1, description=f"Targets worked on at once (default {FLEET_CONCURRENCY})")
+    timeout: Optional[float] = Field(default=None, gt=0, description="Time limit per target in seconds")
+
+class FleetTargetResult(BaseModel):
+    target: str
+    ok: bool
+    elapsed: float
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class FleetRunResponse(BaseModel):
+    tool: str
+    results: List[FleetTargetResult]
+    succeeded: List[str]
+    failed: List[str]
+    elapsed: float
+
+def _tool_spec(name: str):
+    from ..registry import get_tool  # the registry imports this module to list fleet_run
+    spec = get_tool(name)
+    if spec is None:
+        raise ValueError(f"Unknown tool: {name}")
+    if "target" not in spec.request_model.model_fields:
+        raise ValueError(f"Tool {name} does not run against a single target")
+    return spec
+
+async def run_scheduled(spec, req):
+    async with get_scheduler().slot(req.target, spec.name):
+        return await spec.async_handler(req)
+
+def pick_targets(targets: Optional[List[str]], selector: Optional[str], tool: str = "fleet_run") -> List[str]:
+    """Target names from an explicit list, a label selector, or the list filtered by the selector"""
+    cfg = load_config()
+    if not targets and not selector:
+        raise ValueError(f"{tool} needs targets or selector")
+    if targets:
+        unknown = [t for t in targets if t not in cfg.targets]
+        if unknown:
+            raise ValueError(f"Unknown targets: {', '.join(unknown)}")
+        names = list(dict.fromkeys(targets))
+        if selector:
+            selected = set(select_targets(cfg, selector))
+            names = [n for n in names if n in selected]
+    else:
+        names = select_targets(cfg, selector)
+    if not names:
+        raise ValueError("No targets selected")
+    return names
+
+def resolve_targets(req: FleetRunRequest) -> List[str]:
+    return pick_targets(req.targets, req.selector)
+
+def result_ok(result: Dict[str, Any]) -> bool:
+    # Tools report failure as a non-zero exit_code or ok: false rather than raising
+    if result.get("exit_code") not in (None, 0):
+        return False
+    return result.get("ok") is not False
+
+async def fleet_run_stream(req: FleetRunRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one FleetTargetResult dict per target as soon as that target finishes, then a summary
+    {"done": true, "succeeded": [...], "failed": [...]}. Closing the stream cancels unfinished targets.
+    """
+    spec = _tool_spec(req.tool)
+    names = resolve_targets(req)
+    spec.parse(dict(req.arguments, target=names[0]))  # bad arguments fail once, not once per target
+    limit = asyncio.Semaphore(req.concurrency or FLEET_CONCURRENCY)
+    started = time.monotonic()
+
+    async def run_one(name: str) -> FleetTargetResult:
+        async with limit:
+            start = time.monotonic()
+            try:
+                call = run_scheduled(spec, spec.parse(dict(req.arguments, target=name)))
+                result = (await asyncio.wait_for(call, req.timeout) if req.timeout else await call).model_dump()
+                ok, error = result_ok(result), None
+            except asyncio.TimeoutError:
+                result, ok, error = None, False, f"timed out after {req.timeout}s"
+            except Exception as e:
+                result, ok, error = None, False, str(e) or type(e).__name__
+            return FleetTargetResult(target=name, ok=ok, elapsed=round(time.monotonic() - start, 3),
+                                     result=result, error=error)
+
+    tasks = [asyncio.ensure_future(run_one(n)) for n in names]
+    succeeded: List[str] = []
+    failed: List[str] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            r = await next_done
+            (succeeded if r.ok else failed).append(r.target)
+            yield r.model_dump()
+    finally:
+        for t in tasks:
+            t.cancel()
+    yield {"done": True, "succeeded": succeeded, "failed": failed, "elapsed": round(time.monotonic() - started, 3)}
+
+def fleet_event_name(evt: Dict[str, Any]) -> str:
+    return "done" if evt.get("done") else "result"
+
+async def fleet_run_async(req: FleetRunRequest) -> FleetRunResponse:
+    started = time.monotonic()
+    by_target: Dict[str, FleetTargetResult] = {}
+    async for evt in fleet_run_stream(req):
+        if not evt.get("done"):
+            by_target[evt["target"]] = FleetTargetResult(**evt)
+    results = [by_target[n] for n in resolve_targets(req) if n in by_target]
+    return FleetRunResponse(tool=req.tool, results=results,
+                            succeeded=[r.target for r in results if r.ok],
+                            failed=[r.target for r in results if not r.ok],
+                            elapsed=round(time.monotonic() - started, 3))
+
+def fleet_run(req: FleetRunRequest) -> FleetRunResponse:
+    # Blocking entry point (threadpool mode): the fan-out still runs on its own event loop
+    return asyncio.run(fleet_run_async(req))
+
+TOOL_SCHEMA = {
+    "name": "fleet_run",
+    "description": "Run one tool on many targets concurrently (by name list or label selector); per-target results, partial failures reported",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "tool": {"type": "string"},
+            "arguments": {"type": "object"},
+            "targets": {"type": "array", "items": {"type": "string"}},
+            "selector": {"type": "string"},
+            "concurrency": {"type": "integer", "minimum": 1},
+            "timeout": {"type": "number"},
+        },
+        "required": ["tool"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "tool": {"type": "string"},
+            "results": {"type": "array", "items": {
+                "type": "object",
+                "properties": {
+                    "target": {"type": "string"},
+                    "ok": {"type": "boolean"},
+                    "elapsed": {"type": "number"},
+                    "result": {"type": "object"},
+                    "error": {"type": "string"},
+                },
+            }},
+            "succeeded": {"type": "array", "items": {"type": "string"}},
+            "failed": {"type": "array", "items": {"type": "string"}},
+            "elapsed": {"type": "number"},
+        },
+        "required": ["tool", "results", "succeeded", "failed"]
+    }
+}
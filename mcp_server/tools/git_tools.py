@@ -4,7 +4,7 @@ from pydantic import BaseModel, Field, validator
 
 from ..config import load_config
 from ..ssh_transport import SSHClientWrapper
-from .common import TargetedRequest, use_client
+from .common import TargetedRequest, use_client, use_async_client
 
 # Shared validation helpers
 SAFE_BRANCH_TAG = r"^[A-Za-z0-9._/\-]+$"  # simple safe pattern (no spaces, no shell metachars)
@@ -31,6 +31,12 @@ def git_status(req: GitStatusRequest) -> GitStatusResponse:
         r = cli.exec(cmd, cwd=req.project_dir)
         return GitStatusResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
 
+async def git_status_async(req: GitStatusRequest) -> GitStatusResponse:
+    async with use_async_client(req.target) as cli:
+        cmd = "git status --short --branch" if req.short else "git status"
+        r = await cli.exec(cmd, cwd=req.project_dir)
+        return GitStatusResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
+
 TOOL_GIT_STATUS = {
     "name": "git_status",
     "description": "Get git status for a project directory.",
@@ -74,6 +80,12 @@ def git_checkout(req: GitCheckoutRequest) -> GitCheckoutResponse:
         r = cli.exec(cmd, cwd=req.project_dir)
         return GitCheckoutResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code, ref=req.ref)
 
+async def git_checkout_async(req: GitCheckoutRequest) -> GitCheckoutResponse:
+    async with use_async_client(req.target) as cli:
+        cmd = f"git checkout -b {req.ref}" if req.create_branch else f"git checkout {req.ref}"
+        r = await cli.exec(cmd, cwd=req.project_dir)
+        return GitCheckoutResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code, ref=req.ref)
+
 TOOL_GIT_CHECKOUT = {
     "name": "git_checkout",
     "description": "Checkout a branch or tag in the git repo.",
@@ -120,32 +132,40 @@ class GitPullResponse(BaseModel):
     exit_code: int
     branch: Optional[str] = None
 
+def _git_pull_steps(req: GitPullRequest) -> List[tuple]:
+    # (command, timeout) in order; each must succeed before the next runs
+    steps = []
+    if req.fetch_all:
+        steps.append(("git fetch --all --prune", 120))
+    if req.reset_hard and req.branch:
+        steps.append((f"git reset --hard {req.remote}/{req.branch}", 60))
+    steps.append((f"git pull {req.remote} {req.branch}" if req.branch else "git pull", 120))
+    return steps
+
 def git_pull(req: GitPullRequest) -> GitPullResponse:
     with use_client(req.target) as cli:
         out_parts: List[str] = []
         err_parts: List[str] = []
         code = 0
-
-        if req.fetch_all:
-            r = cli.exec("git fetch --all --prune", cwd=req.project_dir, timeout=120)
+        for cmd, timeout in _git_pull_steps(req):
+            r = cli.exec(cmd, cwd=req.project_dir, timeout=timeout)
             out_parts.append(r.stdout); err_parts.append(r.stderr)
             code = max(code, r.exit_code)
             if r.exit_code != 0:
-                return GitPullResponse(stdout="".join(out_parts), stderr="".join(err_parts), exit_code=code, branch=req.branch)
+                break
+        return GitPullResponse(stdout="".join(out_parts), stderr="".join(err_parts), exit_code=code, branch=req.branch)
 
-        if req.reset_hard and req.branch:
-            r = cli.exec(f"git reset --hard {req.remote}/{req.branch}", cwd=req.project_dir, timeout=60)
+async def git_pull_async(req: GitPullRequest) -> GitPullResponse:
+    async with use_async_client(req.target) as cli:
+        out_parts: List[str] = []
+        err_parts: List[str] = []
+        code = 0
+        for cmd, timeout in _git_pull_steps(req):
+            r = await cli.exec(cmd, cwd=req.project_dir, timeout=timeout)
             out_parts.append(r.stdout); err_parts.append(r.stderr)
             code = max(code, r.exit_code)
             if r.exit_code != 0:
-                return GitPullResponse(stdout="".join(out_parts), stderr="".join(err_parts), exit_code=code, branch=req.branch)
-
-        if req.branch:
-            r = cli.exec(f"git pull {req.remote} {req.branch}", cwd=req.project_dir, timeout=120)
-        else:
-            r = cli.exec("git pull", cwd=req.project_dir, timeout=120)
-        out_parts.append(r.stdout); err_parts.append(r.stderr)
-        code = max(code, r.exit_code)
+                break
         return GitPullResponse(stdout="".join(out_parts), stderr="".join(err_parts), exit_code=code, branch=req.branch)
 
 TOOL_GIT_PULL = {
@@ -197,6 +217,13 @@ def deploy_hook(req: DeployHookRequest) -> DeployHookResponse:
         r = cli.exec(f'{prefix}bash -e ./{req.script}', cwd=req.project_dir, timeout=req.timeout)
         return DeployHookResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code, script_path=f"{req.project_dir}/{req.script}")
 
+async def deploy_hook_async(req: DeployHookRequest) -> DeployHookResponse:
+    async with use_async_client(req.target) as cli:
+        prefix = _mk_env_prefix(req.env)
+        await cli.exec(f"chmod +x {req.script}", cwd=req.project_dir)
+        r = await cli.exec(f'{prefix}bash -e ./{req.script}', cwd=req.project_dir, timeout=req.timeout)
+        return DeployHookResponse(stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code, script_path=f"{req.project_dir}/{req.script}")
+
 TOOL_DEPLOY_HOOK = {
     "name": "deploy_hook",
     "description": "Run a controlled deploy script in the project directory (e.g., migrations, collectstatic, restart).",
@@ -1,10 +1,14 @@
 from __future__ import annotations
-import json, base64
-from typing import Optional, Dict, Any, List
+import asyncio, codecs, json, base64, os
+from collections import deque
+from types import MappingProxyType
+from typing import Optional, Dict, Any, AsyncIterator, Deque, List, Tuple
 from pydantic import BaseModel, Field, validator
 
 from ..ssh_transport import SSHClientWrapper
-from .common import TargetedRequest, use_client
+from ..ssh_async import run_blocking
+from ..gpio_daemon import DAEMON_INLINE_SECONDS, GPIO_DAEMON_ENABLED, get_daemon_manager, op_seconds, request_timeout
+from .common import TargetedRequest, use_client, use_async_client
 from ..config import load_config
 
 # Validation helpers
@@ -16,43 +20,166 @@ def _b64(obj: Dict[str, Any]) -> str:
     raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
     return base64.b64encode(raw).decode("utf-8")
 
+# Capability bits for the compiled policy index
+CAPABILITY_BITS = {"read": 1, "write": 2, "pwm": 4}
+
+def _cap_names(mask: int) -> List[str]:
+    return sorted(name for name, bit in CAPABILITY_BITS.items() if mask & bit)
+
+class GPIOTargetPolicy:
+    """
+    Immutable, precompiled GPIO policy for one target: allowed pins per mode
+    as frozensets and a capability bitmask per pin, for O(1) validation.
+    """
+    __slots__ = ("raw", "default_mode", "agent_path", "allowed", "caps")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self.default_mode = str(raw.get("default_mode", "BCM")).upper()
+        self.agent_path = raw.get("agent_path")
+        self.allowed = MappingProxyType({
+            str(mode).upper(): frozenset(int(p) for p in (pins or []))
+            for mode, pins in (raw.get("allowed_pins") or {}).items()
+        })
+        caps: Dict[int, int] = {}
+        for pin, names in (raw.get("capabilities") or {}).items():
+            mask = 0
+            for name in names or []:
+                mask |= CAPABILITY_BITS.get(str(name), 0)
+            caps[int(pin)] = mask
+        self.caps = MappingProxyType(caps)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("GPIOTargetPolicy is immutable")
+        object.__setattr__(self, name, value)
+
+    def validate(self, pin: int, mode: Optional[str], needed_cap: str) -> str:
+        mode = (mode or self.default_mode).upper()
+        if mode not in SAFE_MODE:
+            raise ValueError("mode must be BCM or BOARD")
+        if pin not in self.allowed.get(mode, frozenset()):
+            raise ValueError(f"pin {pin} not allowed for mode {mode}")
+        mask = self.caps.get(pin, 0)
+        if not mask & CAPABILITY_BITS.get(needed_cap, 0):
+            raise ValueError(f"pin {pin} lacks capability '{needed_cap}' (has: {_cap_names(mask)})")
+        return mode
+
+# (source policies object, compiled index); replaced as a whole on change
+_policy_index: Tuple[Any, Dict[str, GPIOTargetPolicy]] = (None, {})
+
+def _compile_policies(policies: Any) -> Dict[str, GPIOTargetPolicy]:
+    index: Dict[str, GPIOTargetPolicy] = {}
+    gpio = getattr(policies, "gpio", None)
+    for target, raw in (getattr(gpio, "targets", None) or {}).items():
+        if not raw:
+            continue
+        try:
+            index[target] = GPIOTargetPolicy(raw)
+        except Exception as e:
+            import logging
+            logging.getLogger("mcp.gpio").warning(f"Invalid GPIO policy for {target}: {e}")
+    return MappingProxyType(index)
+
+def _gpio_index() -> Dict[str, GPIOTargetPolicy]:
+    global _policy_index
+    # load_policies() returns the same object until policies.yaml changes,
+    # so recompiling happens only on an actual file change
+    from ..config import load_policies
+    policies = load_policies()
+    source, index = _policy_index
+    if policies is not source:
+        index = _compile_policies(policies)
+        _policy_index = (policies, index)  # atomic swap
+    return index
+
+def _target_policy(target: str) -> GPIOTargetPolicy:
+    pol = _gpio_index().get(target)
+    if pol is None:
+        raise ValueError(f"GPIO policy missing for target {target}")
+    return pol
+
 def _get_gpio_policy(target: str) -> Dict[str, Any]:
     # Load GPIO config (separate from security policies)
     # GPIO configuration is hardware safety, not security policy
     try:
-        from ..config import load_policies
-        policies = load_policies()
-        
-        # Check if policies has gpio config
-        if hasattr(policies, 'gpio') and policies.gpio and hasattr(policies.gpio, 'targets'):
-            gpio_cfg = policies.gpio.targets.get(target, {})
-            return gpio_cfg
+        pol = _gpio_index().get(target)
+        if pol is not None:
+            return pol.raw
     except Exception as e:
         # If policy loading fails, log and continue with empty config
         import logging
         log = logging.getLogger("mcp.gpio")
         log.warning(f"Failed to load GPIO policy for {target}: {e}")
-    
+
     # Return empty config if no GPIO policy found
     return {}
 
 def _validate_pin(target: str, pin: int, mode: str, needed_cap: str):
-    pol = _get_gpio_policy(target)
-    if not pol:
-        raise ValueError(f"GPIO policy missing for target {target}")
-    default_mode = pol.get("default_mode", "BCM").upper()
-    mode = (mode or default_mode).upper()
-    if mode not in SAFE_MODE:
-        raise ValueError("mode must be BCM or BOARD")
-    allowed_map = pol.get("allowed_pins", {})
-    allowed = allowed_map.get(mode, [])
-    if int(pin) not in [int(p) for p in allowed]:
-        raise ValueError(f"pin {pin} not allowed for mode {mode}")
-    caps = pol.get("capabilities", {})
-    c = set(caps.get(str(pin), []))
-    if needed_cap not in c:
-        raise ValueError(f"pin {pin} lacks capability '{needed_cap}' (has: {sorted(list(c))})")
-    return mode, pol
+    pol = _target_policy(target)
+    return pol.validate(int(pin), mode, needed_cap), pol.raw
+
+def _daemon_target(target: str, pol: Dict[str, Any], payload: Dict[str, Any]):
+    # Prefer the resident agent (no interpreter start per op); "daemon: false" in the policy opts out.
+    # The agent runs one op at a time, so a blink, PWM run or macro longer than DAEMON_INLINE_SECONDS
+    # gets an agent of its own instead of making reads and writes queue behind it.
+    if GPIO_DAEMON_ENABLED and pol.get("daemon", True) and op_seconds(payload) <= DAEMON_INLINE_SECONDS:
+        return load_config().targets.get(target)
+    return None
+
+# Async callers queue for the resident channel on the event loop, so at most one worker thread per
+# target waits on it instead of one parked thread per queued request
+_daemon_gates: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+
+def _daemon_gate(target: str) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    gate = _daemon_gates.get(target)
+    if gate is None or gate[0] is not loop:
+        gate = _daemon_gates[target] = (loop, asyncio.Lock())
+    return gate[1]
+
+def _agent_output(r) -> Dict[str, Any]:
+    try:
+        return json.loads(r.stdout or "{}")
+    except Exception:
+        return {"ok": False, "error": "invalid agent output", "raw": r.stdout}
+
+def _agent_response(out: Dict[str, Any], stderr: str) -> GPIOSimpleResponse:
+    if out.get("ok"):
+        return GPIOSimpleResponse(ok=True, result=out)
+    return GPIOSimpleResponse(ok=False, error=out.get("error") or stderr)
+
+def _run_agent(target: str, pol: Dict[str, Any], payload: Dict[str, Any]) -> GPIOSimpleResponse:
+    agent = pol.get("agent_path")
+    if not agent:
+        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
+    out = None
+    stderr = ""
+    target_cfg = _daemon_target(target, pol, payload)
+    if target_cfg is not None:
+        out = get_daemon_manager().request(target, target_cfg, agent, payload)
+    if out is None:
+        with use_client(target) as cli:
+            r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"', timeout=request_timeout(payload))
+            out, stderr = _agent_output(r), r.stderr
+    return _agent_response(out, stderr)
+
+async def _run_agent_async(target: str, pol: Dict[str, Any], payload: Dict[str, Any]) -> GPIOSimpleResponse:
+    agent = pol.get("agent_path")
+    if not agent:
+        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
+    out = None
+    stderr = ""
+    target_cfg = _daemon_target(target, pol, payload)
+    if target_cfg is not None:
+        # The resident channel is shared and serialized per target, so its round-trip stays in a worker thread
+        async with _daemon_gate(target):
+            out = await run_blocking(get_daemon_manager().request, target, target_cfg, agent, payload)
+    if out is None:
+        async with use_async_client(target) as cli:
+            r = await cli.exec(f'python3 "{agent}" "{_b64(payload)}"', timeout=request_timeout(payload))
+            out, stderr = _agent_output(r), r.stderr
+    return _agent_response(out, stderr)
 
 class GPIOWriteRequest(TargetedRequest):
     pin: int
@@ -79,7 +206,7 @@ class GPIOSimpleResponse(BaseModel):
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
-def gpio_write(req: GPIOWriteRequest) -> GPIOSimpleResponse:
+def _write_payload(req: GPIOWriteRequest):
     mode, pol = _validate_pin(req.target, int(req.pin), req.mode or "", "write")
     payload = {
         "op": "write",
@@ -90,18 +217,13 @@ def gpio_write(req: GPIOWriteRequest) -> GPIOSimpleResponse:
             "direction": "out"
         }
     }
-    agent = pol.get("agent_path")
-    if not agent:
-        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
-    with use_client(req.target) as cli:
-        r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"', cwd=".")
-        try:
-            out = json.loads(r.stdout or "{}")
-        except Exception:
-            out = {"ok": False, "error": "invalid agent output", "raw": r.stdout}
-        if out.get("ok"):
-            return GPIOSimpleResponse(ok=True, result=out)
-        return GPIOSimpleResponse(ok=False, error=out.get("error") or r.stderr)
+    return pol, payload
+
+def gpio_write(req: GPIOWriteRequest) -> GPIOSimpleResponse:
+    return _run_agent(req.target, *_write_payload(req))
+
+async def gpio_write_async(req: GPIOWriteRequest) -> GPIOSimpleResponse:
+    return await _run_agent_async(req.target, *_write_payload(req))
 
 TOOL_GPIO_WRITE = {
     "name": "gpio_write",
@@ -151,7 +273,7 @@ class GPIOReadRequest(TargetedRequest):
             raise ValueError("pull must be up/down/off")
         return v
 
-def gpio_read(req: GPIOReadRequest) -> GPIOSimpleResponse:
+def _read_payload(req: GPIOReadRequest):
     mode, pol = _validate_pin(req.target, int(req.pin), req.mode or "", "read")
     payload = {
         "op": "read",
@@ -162,18 +284,13 @@ def gpio_read(req: GPIOReadRequest) -> GPIOSimpleResponse:
             "pull": req.pull
         }
     }
-    agent = pol.get("agent_path")
-    if not agent:
-        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
-    with use_client(req.target) as cli:
-        r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"')
-        try:
-            out = json.loads(r.stdout or "{}")
-        except Exception:
-            out = {"ok": False, "error": "invalid agent output", "raw": r.stdout}
-        if out.get("ok"):
-            return GPIOSimpleResponse(ok=True, result=out)
-        return GPIOSimpleResponse(ok=False, error=out.get("error") or r.stderr)
+    return pol, payload
+
+def gpio_read(req: GPIOReadRequest) -> GPIOSimpleResponse:
+    return _run_agent(req.target, *_read_payload(req))
+
+async def gpio_read_async(req: GPIOReadRequest) -> GPIOSimpleResponse:
+    return await _run_agent_async(req.target, *_read_payload(req))
 
 TOOL_GPIO_READ = {
     "name": "gpio_read",
@@ -205,7 +322,7 @@ class GPIOPWMRequest(TargetedRequest):
             raise ValueError("duty must be in [0,100]")
         return v
 
-def gpio_pwm(req: GPIOPWMRequest) -> GPIOSimpleResponse:
+def _pwm_payload(req: GPIOPWMRequest):
     mode, pol = _validate_pin(req.target, int(req.pin), req.mode or "", "pwm")
     payload = {
         "op": "pwm",
@@ -217,18 +334,13 @@ def gpio_pwm(req: GPIOPWMRequest) -> GPIOSimpleResponse:
             "mode": mode
         }
     }
-    agent = pol.get("agent_path")
-    if not agent:
-        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
-    with use_client(req.target) as cli:
-        r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"')
-        try:
-            out = json.loads(r.stdout or "{}")
-        except Exception:
-            out = {"ok": False, "error": "invalid agent output", "raw": r.stdout}
-        if out.get("ok"):
-            return GPIOSimpleResponse(ok=True, result=out)
-        return GPIOSimpleResponse(ok=False, error=out.get("error") or r.stderr)
+    return pol, payload
+
+def gpio_pwm(req: GPIOPWMRequest) -> GPIOSimpleResponse:
+    return _run_agent(req.target, *_pwm_payload(req))
+
+async def gpio_pwm_async(req: GPIOPWMRequest) -> GPIOSimpleResponse:
+    return await _run_agent_async(req.target, *_pwm_payload(req))
 
 TOOL_GPIO_PWM = {
     "name": "gpio_pwm",
@@ -275,7 +387,7 @@ class GPIOBlinkRequest(TargetedRequest):
             raise ValueError("mode must be BCM or BOARD")
         return v.upper()
 
-def gpio_blink(req: GPIOBlinkRequest) -> GPIOSimpleResponse:
+def _blink_payload(req: GPIOBlinkRequest):
     mode, pol = _validate_pin(req.target, int(req.pin), req.mode or "", "write")
     payload = {
         "op": "blink",
@@ -287,18 +399,13 @@ def gpio_blink(req: GPIOBlinkRequest) -> GPIOSimpleResponse:
             "mode": mode
         }
     }
-    agent = pol.get("agent_path")
-    if not agent:
-        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
-    with use_client(req.target) as cli:
-        r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"')
-        try:
-            out = json.loads(r.stdout or "{}")
-        except Exception:
-            out = {"ok": False, "error": "invalid agent output", "raw": r.stdout}
-        if out.get("ok"):
-            return GPIOSimpleResponse(ok=True, result=out)
-        return GPIOSimpleResponse(ok=False, error=out.get("error") or r.stderr)
+    return pol, payload
+
+def gpio_blink(req: GPIOBlinkRequest) -> GPIOSimpleResponse:
+    return _run_agent(req.target, *_blink_payload(req))
+
+async def gpio_blink_async(req: GPIOBlinkRequest) -> GPIOSimpleResponse:
+    return await _run_agent_async(req.target, *_blink_payload(req))
 
 TOOL_GPIO_BLINK = {
     "name": "gpio_blink",
@@ -318,32 +425,458 @@ TOOL_GPIO_BLINK = {
     "output_schema": TOOL_GPIO_WRITE["output_schema"]
 }
 
+# Batched multi-pin read/write: one policy pass, one agent payload
+class GPIOReadManyRequest(TargetedRequest):
+    pins: List[int] = Field(description="Pins to read")
+    mode: Optional[str] = Field(default=None, description="BCM or BOARD; default from policy")
+    pull: Optional[str] = Field(default=None, description="up/down/off applied to every pin")
+
+    @validator("pins")
+    def _val_pins(cls, v):
+        if not v:
+            raise ValueError("pins must not be empty")
+        return v
+
+    @validator("mode")
+    def _val_mode(cls, v):
+        if v is None: return v
+        if v.upper() not in SAFE_MODE:
+            raise ValueError("mode must be BCM or BOARD")
+        return v.upper()
+
+    @validator("pull")
+    def _val_pull(cls, v):
+        if v is None: return v
+        if v not in SAFE_PULL:
+            raise ValueError("pull must be up/down/off")
+        return v
+
+class GPIOWriteManyRequest(TargetedRequest):
+    values: Dict[int, int | bool] = Field(description="Map of pin -> 0/1 or false/true")
+    mode: Optional[str] = Field(default=None, description="BCM or BOARD; default from policy")
+
+    @validator("values")
+    def _val_values(cls, v):
+        if not v:
+            raise ValueError("values must not be empty")
+        return v
+
+    @validator("mode")
+    def _val_mode(cls, v):
+        if v is None: return v
+        if v.upper() not in SAFE_MODE:
+            raise ValueError("mode must be BCM or BOARD")
+        return v.upper()
+
+class GPIOManyResponse(BaseModel):
+    ok: bool
+    values: Dict[int, int] = Field(default_factory=dict)
+    errors: Dict[int, str] = Field(default_factory=dict)
+    error: Optional[str] = None
+
+def _validate_pins(target: str, pins: List[int], mode: Optional[str], needed_cap: str):
+    pol = _target_policy(target)
+    mode = (mode or pol.default_mode).upper()
+    if mode not in SAFE_MODE:
+        raise ValueError("mode must be BCM or BOARD")
+    errors = []
+    for pin in pins:
+        try:
+            pol.validate(int(pin), mode, needed_cap)
+        except ValueError as e:
+            errors.append(str(e))
+    if errors:
+        raise ValueError("; ".join(errors))
+    return mode, pol.raw
+
+def _many_response(pins: List[int], resp: GPIOSimpleResponse) -> GPIOManyResponse:
+    if not resp.ok:
+        return GPIOManyResponse(ok=False, error=resp.error)
+    steps = (resp.result or {}).get("steps") or []
+    values: Dict[int, int] = {}
+    errors: Dict[int, str] = {}
+    # Agent returns one result per step, in request order
+    for i, pin in enumerate(pins):
+        step = steps[i] if i < len(steps) and isinstance(steps[i], dict) else {}
+        if step.get("ok") is False:
+            errors[pin] = step.get("error") or "failed"
+        elif step.get("value") is not None:
+            values[pin] = int(step["value"])
+        else:
+            errors[pin] = "no value returned"
+    return GPIOManyResponse(ok=not errors, values=values, errors=errors)
+
+def _read_many_payload(req: GPIOReadManyRequest):
+    pins = [int(p) for p in req.pins]
+    mode, pol = _validate_pins(req.target, pins, req.mode, "read")
+    payload = {
+        "op": "macro",
+        "data": {
+            "steps": [
+                {"op": "read", "data": {"pin": pin, "mode": mode, "direction": "in", "pull": req.pull}}
+                for pin in pins
+            ]
+        }
+    }
+    return pins, pol, payload
+
+def gpio_read_many(req: GPIOReadManyRequest) -> GPIOManyResponse:
+    pins, pol, payload = _read_many_payload(req)
+    return _many_response(pins, _run_agent(req.target, pol, payload))
+
+async def gpio_read_many_async(req: GPIOReadManyRequest) -> GPIOManyResponse:
+    pins, pol, payload = _read_many_payload(req)
+    return _many_response(pins, await _run_agent_async(req.target, pol, payload))
+
+def _write_many_payload(req: GPIOWriteManyRequest):
+    pins = [int(p) for p in req.values]
+    mode, pol = _validate_pins(req.target, pins, req.mode, "write")
+    payload = {
+        "op": "macro",
+        "data": {
+            "steps": [
+                {"op": "write", "data": {
+                    "pin": pin,
+                    "value": 1 if (v is True or int(v) == 1) else 0,
+                    "mode": mode,
+                    "direction": "out"
+                }}
+                for pin, v in ((int(p), v) for p, v in req.values.items())
+            ]
+        }
+    }
+    return pins, pol, payload
+
+def gpio_write_many(req: GPIOWriteManyRequest) -> GPIOManyResponse:
+    pins, pol, payload = _write_many_payload(req)
+    return _many_response(pins, _run_agent(req.target, pol, payload))
+
+async def gpio_write_many_async(req: GPIOWriteManyRequest) -> GPIOManyResponse:
+    pins, pol, payload = _write_many_payload(req)
+    return _many_response(pins, await _run_agent_async(req.target, pol, payload))
+
+GPIO_MANY_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ok": {"type": "boolean"},
+        "values": {"type": "object", "additionalProperties": {"type": "integer"}},
+        "errors": {"type": "object", "additionalProperties": {"type": "string"}},
+        "error": {"type": "string"}
+    },
+    "required": ["ok", "values"]
+}
+
+TOOL_GPIO_READ_MANY = {
+    "name": "gpio_read_many",
+    "description": "Read several GPIO pins in one call; returns a pin -> value map.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "pins": {"type": "array", "items": {"type": "integer"}},
+            "mode": {"type": "string"},
+            "pull": {"type": "string"}
+        },
+        "required": ["target", "pins"]
+    },
+    "output_schema": GPIO_MANY_OUTPUT_SCHEMA
+}
+
+TOOL_GPIO_WRITE_MANY = {
+    "name": "gpio_write_many",
+    "description": "Set several GPIO pins HIGH/LOW in one call.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "values": {"type": "object", "additionalProperties": {"type": ["integer", "boolean"]}},
+            "mode": {"type": "string"}
+        },
+        "required": ["target", "values"]
+    },
+    "output_schema": GPIO_MANY_OUTPUT_SCHEMA
+}
+
+# Streaming pin sampling / edge events: one persistent channel per target and pin set, shared by subscribers
+GPIO_WATCH_LINGER = float(os.environ.get("MCP_PI_GPIO_WATCH_LINGER", "10"))  # seconds a watch outlives its last subscriber
+GPIO_WATCH_EVENTS = int(os.environ.get("MCP_PI_GPIO_WATCH_EVENTS", "1000"))  # recent deltas kept for slow subscribers
+
+class GPIOWatchRequest(TargetedRequest):
+    pins: List[int] = Field(description="Pins to watch")
+    mode: Optional[str] = Field(default=None, description="BCM or BOARD; default from policy")
+    pull: Optional[str] = Field(default=None, description="up/down/off applied to every pin")
+    rate_hz: float = Field(default=20.0, description="Sampling rate in Hz (ignored when edge=true)")
+    edge: bool = Field(default=False, description="Use hardware edge detection instead of sampling")
+    bounce_ms: Optional[int] = Field(default=None, description="Edge debounce in ms")
+    duration: Optional[float] = Field(default=None, description="Stop after N seconds; default runs until the client disconnects")
+    heartbeat: float = Field(default=5.0, gt=0, description="Seconds between keep-alive events when nothing changes")
+
+    @validator("pins")
+    def _val_pins(cls, v):
+        if not v:
+            raise ValueError("pins must not be empty")
+        return v
+
+    @validator("rate_hz")
+    def _val_rate(cls, v):
+        if v <= 0 or v > 1000:
+            raise ValueError("rate_hz must be in (0, 1000]")
+        return v
+
+    @validator("mode")
+    def _val_mode(cls, v):
+        if v is None: return v
+        if v.upper() not in SAFE_MODE:
+            raise ValueError("mode must be BCM or BOARD")
+        return v.upper()
+
+    @validator("pull")
+    def _val_pull(cls, v):
+        if v is None: return v
+        if v not in SAFE_PULL:
+            raise ValueError("pull must be up/down/off")
+        return v
+
+class PinWatcher:
+    """
+    One agent --watch channel shared by every subscriber to the same pins and sampling settings.
+    Keeps the latest pin values and recent deltas, numbered so each subscriber forwards only
+    what it has not seen. The agent clock (ms since its snapshot) is kept for delta timestamps.
+    """
+
+    def __init__(self, key: Tuple, target: str, command: str):
+        self.key = key
+        self.target = target
+        self.command = command
+        self.state: Optional[Dict[str, int]] = None   # set once the agent's snapshot arrived
+        self.origin = 0.0                             # loop time of the agent's t=0
+        self.seq = 0
+        self.events: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=max(1, GPIO_WATCH_EVENTS))
+        self.ended: Optional[str] = None
+        self.error: Optional[str] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self._linger: Optional[asyncio.TimerHandle] = None
+        self.task = asyncio.ensure_future(self._pump())
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def _event(self, evt: Dict[str, Any]):
+        if evt.get("ok") is False:
+            self.error = evt.get("error") or "gpio agent error"
+        elif "s" in evt:
+            self.origin = self.loop.time() - evt.get("t", 0) / 1000
+            self.state = dict(evt["s"])
+            self._notify()
+        elif "d" in evt and self.state is not None:
+            self.state.update(evt["d"])
+            self.seq += 1
+            self.events.append((self.seq, evt))
+            self._notify()
+
+    async def _pump(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        try:
+            async with use_async_client(self.target, streams=True) as cli:
+                chunks = cli.exec_stream(self.command)
+                try:
+                    async for name, data in chunks:
+                        if name != "stdout":
+                            continue
+                        *lines, pending = (pending + decoder.decode(data)).split("\n")
+                        for line in lines:
+                            try:
+                                self._event(json.loads(line))
+                            except ValueError:
+                                continue  # ignore non-JSON noise on stdout
+                finally:
+                    await chunks.aclose()
+            self.ended = self.error or "watch ended"
+        except asyncio.CancelledError:
+            self.ended = "stopped"
+        except Exception as e:
+            self.error = self.error or str(e) or type(e).__name__
+            self.ended = self.error
+        finally:
+            if _pin_watchers.get(self.key) is self:
+                del _pin_watchers[self.key]
+            self._notify()
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Deltas after seq, or None when some are no longer buffered"""
+        if self.events and seq < self.events[0][0] - 1:
+            return None
+        return [evt for n, evt in self.events if n > seq]
+
+    def subscribe(self):
+        self.subscribers += 1
+        if self._linger is not None:
+            self._linger.cancel()
+            self._linger = None
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and self.ended is None:
+            self._linger = self.loop.call_later(GPIO_WATCH_LINGER, self._stop_if_idle)
+
+    def _stop_if_idle(self):
+        if self.subscribers == 0:
+            self.task.cancel()
+
+_pin_watchers: Dict[Tuple, PinWatcher] = {}
+
+def _watch_spec(req: GPIOWatchRequest) -> Tuple[Tuple, str]:
+    # (sharing key, agent command); validates pins and policy before anything is started
+    pins = sorted({int(p) for p in req.pins})
+    mode, pol = _validate_pins(req.target, pins, req.mode, "read")
+    agent = pol.get("agent_path")
+    if not agent:
+        raise ValueError("agent_path missing in policy")
+    if req.target not in load_config().targets:
+        raise ValueError(f"Unknown target: {req.target}")
+    data = {
+        "pins": pins,
+        "mode": mode,
+        "pull": req.pull,
+        "rate_hz": float(req.rate_hz),
+        "edge": bool(req.edge),
+        "bounce_ms": req.bounce_ms,
+        "duration": None,  # the channel closes when the last subscriber has gone
+        "heartbeat": 5.0,
+    }
+    key = (req.target, agent, tuple(pins), mode, req.pull, data["rate_hz"], data["edge"], req.bounce_ms)
+    return key, f'python3 -u "{agent}" --watch "{_b64(data)}"'
+
+def _pin_watcher(key: Tuple, target: str, command: str) -> PinWatcher:
+    w = _pin_watchers.get(key)
+    if w is None or w.ended is not None or w.loop is not asyncio.get_running_loop():
+        w = _pin_watchers[key] = PinWatcher(key, target, command)
+    return w
+
+def pin_watchers() -> List[Dict[str, Any]]:
+    return [{"target": k[0], "pins": list(k[2]), "edge": k[6], "rate_hz": k[5], "subscribers": w.subscribers,
+             "deltas": w.seq, "ended": w.ended} for k, w in _pin_watchers.items()]
+
+async def _watch_events(req: GPIOWatchRequest, key: Tuple, command: str) -> AsyncIterator[Dict[str, Any]]:
+    watcher = _pin_watcher(key, req.target, command)
+    watcher.subscribe()
+    loop = asyncio.get_running_loop()
+    start = loop.time()  # reset when the first snapshot goes out, which is t=0
+    deadline = start + req.duration if req.duration else None
+    last_emit = start
+    seq: Optional[int] = None
+
+    def ms(at: float) -> int:
+        return max(0, int((at - start) * 1000))
+
+    try:
+        while True:
+            changed = watcher.changed
+            if watcher.state is not None:
+                deltas = watcher.since(seq) if seq is not None else None
+                if deltas is None:
+                    # First event, or this subscriber fell too far behind: current values
+                    if seq is None:
+                        start = loop.time()
+                    seq = watcher.seq
+                    yield {"t": ms(loop.time()), "s": dict(watcher.state)}
+                    last_emit = loop.time()
+                    deltas = []
+                for evt in deltas:
+                    seq += 1
+                    yield {"t": ms(watcher.origin + evt["t"] / 1000), "d": evt["d"]}
+                    last_emit = loop.time()
+            if watcher.ended is not None:
+                if watcher.error is not None:
+                    yield {"ok": False, "error": watcher.error}
+                else:
+                    yield {"t": ms(loop.time()), "end": True}
+                return
+            # Heartbeats start with the snapshot; until then only the deadline wakes us
+            wake = last_emit + req.heartbeat if watcher.state is not None else None
+            if deadline is not None:
+                wake = deadline if wake is None else min(wake, deadline)
+            try:
+                await asyncio.wait_for(changed.wait(), None if wake is None else max(0.0, wake - loop.time()))
+            except asyncio.TimeoutError:
+                now = loop.time()
+                if deadline is not None and now >= deadline:
+                    yield {"t": ms(now), "end": True}
+                    return
+                if watcher.state is not None and now - last_emit >= req.heartbeat:
+                    yield {"t": ms(now)}
+                    last_emit = now
+    finally:
+        watcher.unsubscribe()
+
+def gpio_watch(req: GPIOWatchRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Validate the request and return its events: {"t", "s"} snapshot, then {"t", "d"} deltas,
+    {"t"} heartbeats and a final {"t", "end"} (or {"ok": false, "error"}). t is ms since the snapshot.
+    """
+    key, command = _watch_spec(req)
+    return _watch_events(req, key, command)
+
+def gpio_watch_event_name(evt: Dict[str, Any]) -> str:
+    if evt.get("ok") is False:
+        return "error"
+    if "s" in evt:
+        return "snapshot"
+    if "d" in evt:
+        return "delta"
+    if evt.get("end"):
+        return "end"
+    return "heartbeat"
+
+async def gpio_sample(req: GPIOWatchRequest, max_events: int = 1000) -> List[Dict[str, Any]]:
+    """Collect watch events for a bounded window (req.duration is required)"""
+    if not req.duration:
+        raise ValueError("duration is required for a sampled window")
+    events: List[Dict[str, Any]] = []
+    watch = gpio_watch(req)
+    try:
+        async for evt in watch:
+            events.append(evt)
+            if len(events) >= max_events or evt.get("end") or evt.get("ok") is False:
+                break
+    finally:
+        await watch.aclose()
+    return events
+
 # Macro run: sequence of steps with validation
 class MacroStep(BaseModel):
     op: str  # "write" | "read" | "pwm" | "blink"
     data: Dict[str, Any]
 
+# Capability each macro op needs
+MACRO_OP_CAPS = {"write": "write", "read": "read", "pwm": "pwm", "blink": "write"}
+
 class GPIOMacroRequest(TargetedRequest):
     steps: List[MacroStep]
     mode: Optional[str] = None
 
-def macro_run(req: GPIOMacroRequest) -> GPIOSimpleResponse:
-    pol = _get_gpio_policy(req.target)
-    if not pol:
+def _macro_payload(req: GPIOMacroRequest):
+    # Returns (policy, payload), or a GPIOSimpleResponse when a step is rejected
+    index_pol = _gpio_index().get(req.target)
+    if index_pol is None:
         return GPIOSimpleResponse(ok=False, error=f"GPIO policy missing for target {req.target}")
-    default_mode = pol.get("default_mode", "BCM").upper()
-    mode = (req.mode or default_mode).upper()
-    # Validate each step against pin allowlist and capability
+    pol = index_pol.raw
+    mode = (req.mode or index_pol.default_mode).upper()
+    # Validate each step against pin allowlist and capability (one compiled policy for all steps)
     for st in req.steps:
         op = st.op
         d = st.data or {}
         pin = int(d.get("pin", -1))
         if pin < 0:
             return GPIOSimpleResponse(ok=False, error=f"invalid pin in step {st}")
-        cap = "write" if op == "write" else ("read" if op == "read" else ("pwm" if op == "pwm" else ("write" if op == "blink" else None)))
+        cap = MACRO_OP_CAPS.get(op)
         if not cap:
             return GPIOSimpleResponse(ok=False, error=f"unknown op {op}")
-        _validate_pin(req.target, pin, d.get("mode") or mode, cap)
+        index_pol.validate(pin, d.get("mode") or mode, cap)
 
     payload = {
         "op": "macro",
@@ -351,18 +884,19 @@ def macro_run(req: GPIOMacroRequest) -> GPIOSimpleResponse:
             "steps": [s.model_dump() for s in req.steps]
         }
     }
-    agent = pol.get("agent_path")
-    if not agent:
-        return GPIOSimpleResponse(ok=False, error="agent_path missing in policy")
-    with use_client(req.target) as cli:
-        r = cli.exec(f'python3 "{agent}" "{_b64(payload)}"')
-        try:
-            out = json.loads(r.stdout or "{}")
-        except Exception:
-            out = {"ok": False, "error": "invalid agent output", "raw": r.stdout}
-        if out.get("ok"):
-            return GPIOSimpleResponse(ok=True, result=out)
-        return GPIOSimpleResponse(ok=False, error=out.get("error") or r.stderr)
+    return pol, payload
+
+def macro_run(req: GPIOMacroRequest) -> GPIOSimpleResponse:
+    call = _macro_payload(req)
+    if isinstance(call, GPIOSimpleResponse):
+        return call
+    return _run_agent(req.target, *call)
+
+async def macro_run_async(req: GPIOMacroRequest) -> GPIOSimpleResponse:
+    call = _macro_payload(req)
+    if isinstance(call, GPIOSimpleResponse):
+        return call
+    return await _run_agent_async(req.target, *call)
 
 TOOL_GPIO_MACRO_RUN = {
     "name": "macro_run",
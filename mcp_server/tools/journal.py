@@ -0,0 +1,206 @@
+from __future__ import annotations
+import asyncio
+import codecs
+import json
+import os
+import shlex
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from ..ssh_transport import ChannelsExhausted
+from .common import TargetedRequest, use_async_client
+
+# Journal reads: journalctl filters on the target and prints one JSON record per line, parsed as it arrives
+JOURNAL_LINES = int(os.environ.get("MCP_PI_JOURNAL_LINES", "100"))                   # recent entries to start from without since/cursor
+JOURNAL_MAX_ENTRIES = int(os.environ.get("MCP_PI_JOURNAL_MAX_ENTRIES", "1000"))      # most entries a tool call returns
+JOURNAL_MESSAGE_CHARS = int(os.environ.get("MCP_PI_JOURNAL_MESSAGE_CHARS", "2000"))  # longer messages are cut
+JOURNAL_COLLECT = float(os.environ.get("MCP_PI_JOURNAL_COLLECT", "5"))               # default follow time for a tool call
+
+# Only these fields leave the target (__CURSOR and __REALTIME_TIMESTAMP are always sent)
+OUTPUT_FIELDS = ("MESSAGE", "PRIORITY", "_SYSTEMD_UNIT", "SYSLOG_IDENTIFIER", "_PID")
+
+_LEVEL = r"(emerg|alert|crit|err|warning|notice|info|debug|[0-7])"
+
+class JournalTailRequest(TargetedRequest):
+    units: Optional[List[str]] = Field(default=None, description="Only entries from these units (journalctl -u, globs allowed)")
+    priority: Optional[str] = Field(default=None, pattern=rf"^{_LEVEL}(\.\.{_LEVEL})?$", description="Least severe level to include (e.g. 'err', '3'), or a range like 'warning..err'")
+    since: Optional[str] = Field(default=None, description="Start time as journalctl reads it, e.g. '-1h', 'today', '2026-10-18 04:00'")
+    grep: Optional[str] = Field(default=None, description="Only entries whose message matches this pattern (journalctl -g; case-insensitive when all lowercase)")
+    lines: Optional[int] = Field(default=None, ge=0, description=f"Recent entries to start from when neither since nor cursor is set (default {JOURNAL_LINES})")
+    cursor: Optional[str] = Field(default=None, description="Resume after this cursor from an earlier call: only newer entries, since and lines are ignored")
+    follow: bool = Field(default=False, description="Keep reading new entries as they are written")
+    duration: Optional[float] = Field(default=None, gt=0, description=f"Seconds to follow; SSE streams run until disconnect when unset, tool calls default to {JOURNAL_COLLECT}")
+    max_entries: Optional[int] = Field(default=None, ge=1, description=f"Stop after this many entries (tool calls default to {JOURNAL_MAX_ENTRIES})")
+
+class JournalEntry(BaseModel):
+    ts: float                        # seconds since the epoch
+    priority: Optional[int] = None
+    unit: Optional[str] = None
+    ident: Optional[str] = None
+    pid: Optional[int] = None
+    message: str
+
+class JournalTailResponse(BaseModel):
+    entries: List[JournalEntry]
+    cursor: Optional[str]            # pass back as cursor to get only later entries
+    truncated: bool = False          # max_entries was reached
+    error: Optional[str] = None
+
+def journal_command(req: JournalTailRequest) -> str:
+    args = ["journalctl", "-o", "json", "--all", "--no-pager", "-q", f"--output-fields={','.join(OUTPUT_FIELDS)}"]
+    args += [f"--unit={u}" for u in req.units or []]
+    if req.priority:
+        args.append(f"--priority={req.priority}")
+    if req.grep:
+        args.append(f"--grep={req.grep}")
+    # journalctl refuses since together with a cursor, and -n would seek away from the cursor
+    if req.cursor:
+        args.append(f"--after-cursor={req.cursor}")
+    elif req.since:
+        args.append(f"--since={req.since}")
+    else:
+        args.append(f"--lines={JOURNAL_LINES if req.lines is None else req.lines}")
+    if req.follow:
+        args.append("--follow")
+    return " ".join(shlex.quote(a) for a in args)
+
+def _field(value: Any) -> Optional[str]:
+    # A field set twice comes as a list of values; binary or non-UTF-8 data as a list of byte values
+    if isinstance(value, list):
+        if value and all(isinstance(v, int) for v in value):
+            return bytes(value).decode("utf-8", errors="replace")
+        return _field(value[0]) if value else None
+    return value
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(_field(value))
+    except (TypeError, ValueError):
+        return None
+
+def parse_entry(line: str) -> Optional[Dict[str, Any]]:
+    """One `journalctl -o json` line as a compact entry with its cursor, or None if it is not a record"""
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(rec, dict) or "__CURSOR" not in rec:
+        return None
+    message = _field(rec.get("MESSAGE")) or ""
+    entry = {
+        "ts": (_int(rec.get("__REALTIME_TIMESTAMP")) or 0) / 1e6,
+        "priority": _int(rec.get("PRIORITY")),
+        "unit": _field(rec.get("_SYSTEMD_UNIT")),
+        "ident": _field(rec.get("SYSLOG_IDENTIFIER")),
+        "pid": _int(rec.get("_PID")),
+        "message": message[:JOURNAL_MESSAGE_CHARS],
+        "cursor": rec["__CURSOR"],
+    }
+    return {k: v for k, v in entry.items() if v is not None}
+
+async def journal_stream(req: JournalTailRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {"ts", "priority", "unit", "ident", "pid", "message", "cursor"} per journal entry as
+    journalctl prints it (fields it lacks are left out), then {"done": true, "reason": ..., "cursor", "count"}.
+    reason is "end", "duration", "max_entries" or journalctl's error.
+    A follow has no natural end, so it runs on the target's stream slots (MCP_PI_POOL_MAX_STREAMS);
+    when those are all taken it ends at once with the exhaustion as its reason.
+    """
+    cli_ctx = use_async_client(req.target, streams=req.follow)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + req.duration if req.duration else None
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    err = []
+    cursor, count, reason = req.cursor, 0, "end"
+    try:
+        async with cli_ctx as cli:
+            chunks = cli.exec_stream(journal_command(req))
+            try:
+                while reason == "end":
+                    try:
+                        name, data = await asyncio.wait_for(chunks.__anext__(), deadline - loop.time() if deadline else None)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        reason = "duration"
+                        break
+                    if name == "stderr":
+                        err.append(data)
+                        continue
+                    if name == "exit":
+                        if data != 0:
+                            reason = b"".join(err).decode("utf-8", errors="replace").strip() or f"exit {data}"
+                        continue
+                    *lines, pending = (pending + decoder.decode(data)).split("\n")
+                    for line in lines:
+                        entry = parse_entry(line)
+                        if entry is None:
+                            continue
+                        cursor = entry["cursor"]
+                        count += 1
+                        yield entry
+                        if req.max_entries is not None and count >= req.max_entries:
+                            reason = "max_entries"
+                            break
+            finally:
+                await chunks.aclose()
+    except ChannelsExhausted as e:
+        reason = str(e)
+    yield {"done": True, "reason": reason, "cursor": cursor, "count": count}
+
+def journal_event_name(evt: Dict[str, Any]) -> str:
+    return "done" if evt.get("done") else "entry"
+
+async def journal_tail_async(req: JournalTailRequest) -> JournalTailResponse:
+    update = {}
+    if req.max_entries is None:
+        update["max_entries"] = JOURNAL_MAX_ENTRIES
+    if req.follow and req.duration is None:
+        update["duration"] = JOURNAL_COLLECT
+    req = req.model_copy(update=update)
+    entries: List[JournalEntry] = []
+    summary: Dict[str, Any] = {}
+    async for evt in journal_stream(req):
+        if evt.get("done"):
+            summary = evt
+        else:
+            entries.append(JournalEntry(**evt))
+    reason = summary.get("reason")
+    return JournalTailResponse(entries=entries, cursor=summary.get("cursor"), truncated=reason == "max_entries",
+                               error=reason if reason not in ("end", "duration", "max_entries") else None)
+
+def journal_tail(req: JournalTailRequest) -> JournalTailResponse:
+    # Blocking entry point (threadpool mode)
+    return asyncio.run(journal_tail_async(req))
+
+JOURNAL_TAIL_SCHEMA = {
+    "name": "journal_tail",
+    "description": "Read systemd journal entries from a target, filtered there by unit, priority, time and message pattern. Returns compact entries and a cursor; pass the cursor back to get only newer entries. With follow, keeps reading new entries for `duration` seconds.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "units": {"type": "array", "items": {"type": "string"}},
+            "priority": {"type": "string"},
+            "since": {"type": "string"},
+            "grep": {"type": "string"},
+            "lines": {"type": "integer", "minimum": 0},
+            "cursor": {"type": "string"},
+            "follow": {"type": "boolean"},
+            "duration": {"type": "number"},
+            "max_entries": {"type": "integer", "minimum": 1},
+        },
+        "required": ["target"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "entries": {"type": "array", "items": {"type": "object"}},
+            "cursor": {"type": "string"},
+            "truncated": {"type": "boolean"},
+            "error": {"type": "string"},
+        },
+        "required": ["entries"]
+    }
+}
@@ -0,0 +1,264 @@
+from __future__ import annotations
+import asyncio
+import shlex
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from ..scheduler import get_scheduler
+from .common import use_async_client
+from .fleet import pick_targets
+from .git_tools import deploy_hook_async, DeployHookRequest
+
+# Rolling / canary deploys: deploy_hook in waves, each wave health-gated before the next starts
+
+VALID_ON_FAILURE = {"stop", "rollback"}
+
+class HealthCheck(BaseModel):
+    service: Optional[str] = Field(default=None, description="systemd unit that must be active, e.g. 'myproj.service'")
+    url: Optional[str] = Field(default=None, description="URL fetched with curl on the target; must answer 2xx/3xx")
+    retries: int = Field(default=5, ge=1, description="Attempts before the host counts as unhealthy")
+    interval: float = Field(default=2.0, ge=0, description="Seconds between attempts")
+    timeout: int = Field(default=5, ge=1, description="Seconds allowed per attempt")
+
+class RolloutRequest(BaseModel):
+    project_dir: str = Field(description="Remote project directory containing deploy.sh")
+    script: str = Field(default="deploy.sh", description="Hook script filename inside project_dir")
+    env: Optional[Dict[str, str]] = Field(default=None, description="Extra environment variables")
+    timeout: Optional[int] = Field(default=600, description="Timeout seconds for each host's deploy")
+    targets: Optional[List[str]] = Field(default=None, description="Target names from config.targets, in rollout order")
+    selector: Optional[str] = Field(default=None, description="Label selector over hosts.yaml, e.g. 'role=kiosk'")
+    canary: int = Field(default=1, ge=0, description="Hosts in the first wave; any failure there halts the rollout (0 = no canary)")
+    batch_size: int = Field(default=1, ge=1, description="Hosts per wave after the canary")
+    max_unavailable: Optional[int] = Field(default=None, ge=1, description="Hosts deploying or left failed at once (default batch_size)")
+    max_failures: int = Field(default=0, ge=0, description="Failed hosts tolerated before the rollout halts")
+    health: Optional[HealthCheck] = Field(default=None, description="Check each host must pass after its deploy")
+    on_failure: str = Field(default="stop", description="stop | rollback")
+    rollback_script: Optional[str] = Field(default=None, description="Script inside project_dir run on every deployed host when rolling back")
+
+class RolloutHostResult(BaseModel):
+    target: str
+    wave: int
+    ok: bool
+    elapsed: float
+    exit_code: Optional[int] = None
+    error: Optional[str] = None
+
+class RolloutResponse(BaseModel):
+    status: str  # completed | halted | rolled_back
+    reason: Optional[str] = None
+    waves: List[List[str]]
+    results: List[RolloutHostResult]
+    rollbacks: List[RolloutHostResult]
+    succeeded: List[str]
+    failed: List[str]
+    skipped: List[str]
+    elapsed: float
+
+def _check(req: RolloutRequest):
+    if req.on_failure not in VALID_ON_FAILURE:
+        raise ValueError(f"Invalid on_failure: {req.on_failure}")
+    if req.on_failure == "rollback" and not req.rollback_script:
+        raise ValueError("on_failure=rollback needs rollback_script")
+    if req.health is not None and not (req.health.service or req.health.url):
+        raise ValueError("health needs service or url")
+
+def plan_waves(names: List[str], canary: int, batch_size: int) -> List[List[str]]:
+    waves = [names[:canary]] if canary else []
+    rest = names[len(waves[0]) if waves else 0:]
+    waves.extend(rest[i:i + batch_size] for i in range(0, len(rest), batch_size))
+    return waves
+
+def _tail(text: str, limit: int = 300) -> str:
+    text = text.strip()
+    return text[-limit:]
+
+def _health_command(health: HealthCheck) -> str:
+    checks = []
+    if health.service:
+        checks.append(f"systemctl is-active --quiet {shlex.quote(health.service)}")
+    if health.url:
+        checks.append(f"curl -fsS -o /dev/null --max-time {health.timeout} {shlex.quote(health.url)}")
+    return " && ".join(checks)
+
+async def check_health(target: str, health: HealthCheck) -> Optional[str]:
+    """None once the host passes, else the last attempt's error"""
+    cmd = _health_command(health)
+    detail = ""
+    async with use_async_client(target) as cli:
+        for attempt in range(health.retries):
+            if attempt:
+                await asyncio.sleep(health.interval)
+            try:
+                r = await cli.exec(cmd, timeout=health.timeout + 5)
+            except Exception as e:
+                detail = str(e) or type(e).__name__
+                continue
+            if r.exit_code == 0:
+                return None
+            detail = _tail(r.stderr or r.stdout) or f"exit {r.exit_code}"
+    return detail
+
+async def _run_script(req: RolloutRequest, target: str, wave: int, script: str, health: Optional[HealthCheck]) -> RolloutHostResult:
+    start = time.monotonic()
+    res = RolloutHostResult(target=target, wave=wave, ok=False, elapsed=0.0)
+    try:
+        async with get_scheduler().slot(target, "deploy_hook"):
+            d = await deploy_hook_async(DeployHookRequest(target=target, project_dir=req.project_dir, script=script,
+                                                          env=req.env, timeout=req.timeout))
+        res.exit_code = d.exit_code
+        if d.exit_code != 0:
+            res.error = f"{script} exited {d.exit_code}: {_tail(d.stderr or d.stdout)}"
+        elif health is not None:
+            async with get_scheduler().slot(target, "rollout_health"):
+                detail = await check_health(target, health)
+            if detail is not None:
+                res.error = f"health check failed: {detail}"
+        res.ok = res.error is None
+    except Exception as e:
+        res.error = str(e) or type(e).__name__
+    res.elapsed = round(time.monotonic() - start, 3)
+    return res
+
+async def _run_wave(hosts: List[str], limit: int, run) -> AsyncIterator[RolloutHostResult]:
+    sem = asyncio.Semaphore(limit)
+
+    async def one(name: str) -> RolloutHostResult:
+        async with sem:
+            return await run(name)
+
+    tasks = [asyncio.ensure_future(one(n)) for n in hosts]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for t in tasks:
+            t.cancel()
+
+async def rollout_stream(req: RolloutRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Deploy wave by wave, yielding {"event": "wave"} when a wave starts, one {"event": "host"} per host
+    as it finishes (deploy plus health check), {"event": "rollback"} per rolled-back host, then
+    {"event": "done", "status": ...}. Within a wave at most max_unavailable hosts are down at once,
+    counting hosts a tolerated failure left broken. Closing the stream cancels the hosts in flight.
+    """
+    _check(req)
+    names = pick_targets(req.targets, req.selector, tool="rollout_deploy")
+    waves = plan_waves(names, req.canary, req.batch_size)
+    max_unavailable = req.max_unavailable or req.batch_size
+    started = time.monotonic()
+    succeeded: List[str] = []
+    failed: List[str] = []
+    reason = None
+
+    for n, hosts in enumerate(waves):
+        limit = max_unavailable - len(failed)
+        if limit < 1:
+            reason = f"{len(failed)} failed hosts reached max_unavailable={max_unavailable}"
+            break
+        yield {"event": "wave", "wave": n, "targets": hosts, "canary": n == 0 and req.canary > 0}
+        async for r in _run_wave(hosts, limit, lambda t: _run_script(req, t, n, req.script, req.health)):
+            (succeeded if r.ok else failed).append(r.target)
+            yield {"event": "host", **r.model_dump()}
+        wave_failed = [h for h in hosts if h in failed]
+        if wave_failed and n == 0 and req.canary > 0:
+            reason = f"canary failed on {', '.join(wave_failed)}"
+            break
+        if len(failed) > req.max_failures:
+            reason = f"{len(failed)} failed hosts exceeded max_failures={req.max_failures}"
+            break
+
+    status = "completed" if reason is None else "halted"
+    done = set(succeeded) | set(failed)
+    if reason is not None and req.on_failure == "rollback":
+        # Every host that ran the deploy, latest wave first
+        deployed = [h for h in reversed(names) if h in done]
+        wave_of = {h: n for n, hosts in enumerate(waves) for h in hosts}
+        async for r in _run_wave(deployed, max_unavailable,
+                                 lambda t: _run_script(req, t, wave_of[t], req.rollback_script, None)):
+            yield {"event": "rollback", **r.model_dump()}
+        status = "rolled_back"
+    yield {"event": "done", "status": status, "reason": reason, "waves": waves,
+           "succeeded": succeeded, "failed": failed, "skipped": [h for h in names if h not in done],
+           "elapsed": round(time.monotonic() - started, 3)}
+
+def rollout_event_name(evt: Dict[str, Any]) -> str:
+    return evt["event"]
+
+async def rollout_deploy_async(req: RolloutRequest) -> RolloutResponse:
+    results: List[RolloutHostResult] = []
+    rollbacks: List[RolloutHostResult] = []
+    summary: Dict[str, Any] = {}
+    async for evt in rollout_stream(req):
+        kind = evt.pop("event")
+        if kind == "host":
+            results.append(RolloutHostResult(**evt))
+        elif kind == "rollback":
+            rollbacks.append(RolloutHostResult(**evt))
+        elif kind == "done":
+            summary = evt
+    return RolloutResponse(results=results, rollbacks=rollbacks, **summary)
+
+def rollout_deploy(req: RolloutRequest) -> RolloutResponse:
+    # Blocking entry point (threadpool mode): the waves still run on their own event loop
+    return asyncio.run(rollout_deploy_async(req))
+
+_HOST_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "target": {"type": "string"},
+        "wave": {"type": "integer"},
+        "ok": {"type": "boolean"},
+        "elapsed": {"type": "number"},
+        "exit_code": {"type": "integer"},
+        "error": {"type": "string"},
+    },
+}
+
+TOOL_SCHEMA = {
+    "name": "rollout_deploy",
+    "description": "Rolling/canary deploy: run deploy_hook across targets in health-gated waves, halting or rolling back when failures pass a threshold",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "project_dir": {"type": "string"},
+            "script": {"type": "string"},
+            "env": {"type": "object", "additionalProperties": {"type": "string"}},
+            "timeout": {"type": "integer"},
+            "targets": {"type": "array", "items": {"type": "string"}},
+            "selector": {"type": "string"},
+            "canary": {"type": "integer", "minimum": 0},
+            "batch_size": {"type": "integer", "minimum": 1},
+            "max_unavailable": {"type": "integer", "minimum": 1},
+            "max_failures": {"type": "integer", "minimum": 0},
+            "health": {
+                "type": "object",
+                "properties": {
+                    "service": {"type": "string"},
+                    "url": {"type": "string"},
+                    "retries": {"type": "integer", "minimum": 1},
+                    "interval": {"type": "number"},
+                    "timeout": {"type": "integer", "minimum": 1},
+                },
+            },
+            "on_failure": {"type": "string", "enum": sorted(VALID_ON_FAILURE)},
+            "rollback_script": {"type": "string"},
+        },
+        "required": ["project_dir"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": ["completed", "halted", "rolled_back"]},
+            "reason": {"type": "string"},
+            "waves": {"type": "array", "items": {"type": "array", "items": {"type": "string"}}},
+            "results": {"type": "array", "items": _HOST_RESULT_SCHEMA},
+            "rollbacks": {"type": "array", "items": _HOST_RESULT_SCHEMA},
+            "succeeded": {"type": "array", "items": {"type": "string"}},
+            "failed": {"type": "array", "items": {"type": "string"}},
+            "skipped": {"type": "array", "items": {"type": "string"}},
+            "elapsed": {"type": "number"},
+        },
+        "required": ["status", "waves", "results", "succeeded", "failed", "skipped"]
+    }
+}
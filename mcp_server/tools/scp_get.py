@@ -1,8 +1,13 @@
 from __future__ import annotations
 import base64
+import os
+from typing import AsyncIterator, Optional
 from pydantic import BaseModel, Field
 
-from .common import TargetedRequest, use_client
+from .common import TargetedRequest, use_client, use_async_client
+
+# Largest byte range scp_get_range returns in one call (it is base64 in JSON)
+MAX_RANGE_BYTES = int(os.environ.get("MCP_PI_SCP_RANGE_MAX", str(4 * 1024 * 1024)))
 
 class ScpGetRequest(TargetedRequest):
     remote_path: str = Field(description="Absolute path of file to read from remote host")
@@ -11,12 +16,69 @@ class ScpGetResponse(BaseModel):
     remote_path: str
     content_b64: str
 
+class ScpGetRangeRequest(TargetedRequest):
+    remote_path: str = Field(description="Absolute path of file to read from remote host")
+    offset: int = Field(default=0, ge=0, description="First byte to read")
+    length: Optional[int] = Field(default=None, ge=0, description=f"Bytes to read (default and maximum: {MAX_RANGE_BYTES})")
+
+class ScpGetRangeResponse(BaseModel):
+    remote_path: str
+    offset: int
+    length: int
+    size: int
+    eof: bool
+    content_b64: str
+
+class RemoteFileInfo(BaseModel):
+    remote_path: str
+    size: int
+    mtime: int
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.size:x}-{self.mtime:x}"'
+
 def scp_get(req: ScpGetRequest) -> ScpGetResponse:
     cli = use_client(req.target)
     with cli:
         data = cli.get_bytes(req.remote_path)
     return ScpGetResponse(remote_path=req.remote_path, content_b64=base64.b64encode(data).decode("ascii"))
 
+async def scp_get_async(req: ScpGetRequest) -> ScpGetResponse:
+    async with use_async_client(req.target) as cli:
+        data = await cli.get_bytes(req.remote_path)
+    return ScpGetResponse(remote_path=req.remote_path, content_b64=base64.b64encode(data).decode("ascii"))
+
+def _range_length(req: ScpGetRangeRequest) -> int:
+    return MAX_RANGE_BYTES if req.length is None else min(req.length, MAX_RANGE_BYTES)
+
+def _range_response(req: ScpGetRangeRequest, size: int, data: bytes) -> ScpGetRangeResponse:
+    return ScpGetRangeResponse(remote_path=req.remote_path, offset=req.offset, length=len(data), size=size,
+                               eof=req.offset + len(data) >= size, content_b64=base64.b64encode(data).decode("ascii"))
+
+def scp_get_range(req: ScpGetRangeRequest) -> ScpGetRangeResponse:
+    with use_client(req.target) as cli:
+        size = cli.stat(req.remote_path).st_size
+        data = b"".join(cli.get_stream(req.remote_path, req.offset, _range_length(req)))
+    return _range_response(req, size, data)
+
+async def scp_get_range_async(req: ScpGetRangeRequest) -> ScpGetRangeResponse:
+    async with use_async_client(req.target) as cli:
+        size = (await cli.stat(req.remote_path)).st_size
+        data = b"".join([block async for block in cli.get_stream(req.remote_path, req.offset, _range_length(req))])
+    return _range_response(req, size, data)
+
+async def remote_file_info(target: str, remote_path: str) -> RemoteFileInfo:
+    async with use_async_client(target) as cli:
+        st = await cli.stat(remote_path)
+    return RemoteFileInfo(remote_path=remote_path, size=st.st_size, mtime=int(st.st_mtime or 0))
+
+async def scp_get_stream(target: str, remote_path: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Stream a file, or length bytes from offset, without holding it in memory"""
+    async with use_async_client(target) as cli:
+        async for block in cli.get_stream(remote_path, offset, length):
+            yield block
+
 TOOL_SCHEMA = {
     "name": "scp_get",
     "description": "Download a file from the target via SFTP (content as base64)",
@@ -36,4 +98,31 @@ TOOL_SCHEMA = {
         },
         "required": ["remote_path", "content_b64"]
     }
-}
\ No newline at end of file
+}
+
+SCP_GET_RANGE_SCHEMA = {
+    "name": "scp_get_range",
+    "description": "Read a byte range of a file on the target via SFTP (content as base64); page through large files with offset",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "remote_path": {"type": "string"},
+            "offset": {"type": "integer", "minimum": 0},
+            "length": {"type": "integer", "minimum": 0},
+        },
+        "required": ["target", "remote_path"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "remote_path": {"type": "string"},
+            "offset": {"type": "integer"},
+            "length": {"type": "integer"},
+            "size": {"type": "integer"},
+            "eof": {"type": "boolean"},
+            "content_b64": {"type": "string"},
+        },
+        "required": ["remote_path", "offset", "length", "size", "eof", "content_b64"]
+    }
+}
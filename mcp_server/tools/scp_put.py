@@ -1,15 +1,22 @@
 from __future__ import annotations
 import base64
-from typing import Optional
+import itertools
+import time
+from typing import Any, AsyncIterable, Dict, List, Optional
 from pydantic import BaseModel, Field
 
-from .common import TargetedRequest, use_client
+from .common import TargetedRequest, use_client, use_async_client
 
 class ScpPutRequest(TargetedRequest):
     remote_path: str = Field(description="Absolute path to write on remote host")
     content_b64: str = Field(description="Base64-encoded file content")
     mode: Optional[int] = Field(default=None, description="Octal file mode, e.g., 0o644")
 
+class ScpPutStreamRequest(TargetedRequest):
+    remote_path: str = Field(description="Absolute path to write on remote host")
+    mode: Optional[int] = Field(default=None, description="Octal file mode, e.g., 0o644")
+    size: Optional[int] = Field(default=None, description="Expected size in bytes, when known (Content-Length)")
+
 class ScpPutResponse(BaseModel):
     remote_path: str
     size: int
@@ -22,6 +29,42 @@ def scp_put(req: ScpPutRequest) -> ScpPutResponse:
         cli.put_bytes(data, req.remote_path, req.mode)
     return ScpPutResponse(remote_path=req.remote_path, size=len(data), mode=req.mode)
 
+async def scp_put_async(req: ScpPutRequest) -> ScpPutResponse:
+    data = base64.b64decode(req.content_b64)
+    async with use_async_client(req.target) as cli:
+        await cli.put_bytes(data, req.remote_path, req.mode)
+    return ScpPutResponse(remote_path=req.remote_path, size=len(data), mode=req.mode)
+
+# Streamed uploads in flight: id -> progress record
+_uploads: Dict[int, Dict[str, Any]] = {}
+_upload_ids = itertools.count(1)
+
+async def scp_put_stream(req: ScpPutStreamRequest, chunks: AsyncIterable[bytes]) -> ScpPutResponse:
+    """Upload a file from an async byte stream (e.g. a request body) without holding it in memory"""
+    upload_id = next(_upload_ids)
+    record = {"id": upload_id, "target": req.target, "remote_path": req.remote_path,
+              "bytes": 0, "size": req.size, "started": time.time()}
+    _uploads[upload_id] = record
+
+    def progress(n: int):
+        record["bytes"] = n
+
+    try:
+        async with use_async_client(req.target) as cli:
+            size = await cli.put_stream(chunks, req.remote_path, req.mode, progress=progress)
+    finally:
+        _uploads.pop(upload_id, None)
+    return ScpPutResponse(remote_path=req.remote_path, size=size, mode=req.mode)
+
+def active_uploads() -> List[Dict[str, Any]]:
+    """Progress of the streamed uploads in flight, with bytes written so far and throughput"""
+    now = time.time()
+    out = []
+    for record in list(_uploads.values()):
+        elapsed = max(now - record["started"], 1e-6)
+        out.append(dict(record, elapsed=round(elapsed, 3), bytes_per_sec=int(record["bytes"] / elapsed)))
+    return out
+
 TOOL_SCHEMA = {
     "name": "scp_put",
     "description": "Upload a file to the target via SFTP (content as base64)",
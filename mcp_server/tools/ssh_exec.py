@@ -1,9 +1,11 @@
 from __future__ import annotations
+import codecs
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 
 from ..config import load_config
 from ..ssh_transport import SSHClientWrapper
+from ..ssh_async import AsyncSSHClientWrapper
 
 class SSHExecRequest(BaseModel):
     target: str = Field(description="Target name from config.targets (e.g., 'pi-lan')")
@@ -11,21 +13,126 @@ class SSHExecRequest(BaseModel):
     cwd: Optional[str] = Field(default=None, description="Working directory on remote host")
     env: Optional[Dict[str, str]] = Field(default=None, description="Environment variables")
     timeout: Optional[int] = Field(default=None, description="Timeout in seconds")
+    max_bytes: Optional[int] = Field(default=None, description="Stop the command once this many output bytes have been read")
+    tail_bytes: Optional[int] = Field(default=None, description="Keep only the last N bytes of stdout and of stderr")
+
+class SSHExecStreamRequest(SSHExecRequest):
+    tail_bytes: Optional[int] = Field(default=0, description="Last N bytes of stdout/stderr to repeat in the final event (0: none)")
 
 class SSHExecResponse(BaseModel):
     stdout: str
     stderr: str
     exit_code: int
+    truncated: bool = False
 
-def ssh_exec(req: SSHExecRequest) -> SSHExecResponse:
+class _OutputCollector:
+    """Applies max_bytes / tail_bytes to stdout and stderr chunks and decodes them incrementally"""
+
+    def __init__(self, max_bytes: Optional[int], tail_bytes: Optional[int]):
+        self.max_bytes = max_bytes
+        self.tail_bytes = tail_bytes  # None keeps everything, 0 keeps nothing
+        self.sizes = {"stdout": 0, "stderr": 0}
+        self.kept = {"stdout": bytearray(), "stderr": bytearray()}
+        self._decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in self.sizes}
+        self.truncated = False
+        self.exit_code: Optional[int] = None
+
+    def feed(self, name: str, data: Any) -> Optional[str]:
+        """Record one chunk (or ("exit", code)); returns its text, cut at the cap, or None past it"""
+        if name == "exit":
+            self.exit_code = data
+            return None
+        if self.max_bytes is not None:
+            room = self.max_bytes - self.sizes["stdout"] - self.sizes["stderr"]
+            if len(data) > room:
+                # Callers stop the command as soon as truncated is set
+                self.truncated = True
+                if room <= 0:
+                    return None
+                data = data[:room]
+        self.sizes[name] += len(data)
+        if self.tail_bytes != 0:
+            kept = self.kept[name]
+            kept += data
+            if self.tail_bytes is not None and len(kept) > self.tail_bytes:
+                del kept[:-self.tail_bytes]
+        return self._decoders[name].decode(data)
+
+    def text(self, name: str) -> str:
+        return bytes(self.kept[name]).decode("utf-8", errors="replace")
+
+    def summary(self) -> Dict[str, Any]:
+        out = {
+            "exit_code": self.exit_code,
+            "stdout_bytes": self.sizes["stdout"],
+            "stderr_bytes": self.sizes["stderr"],
+            "truncated": self.truncated,
+        }
+        if self.tail_bytes != 0:
+            out["stdout"] = self.text("stdout")
+            out["stderr"] = self.text("stderr")
+        return out
+
+def _response(col: _OutputCollector) -> SSHExecResponse:
+    exit_code = col.exit_code if col.exit_code is not None else -1
+    return SSHExecResponse(stdout=col.text("stdout"), stderr=col.text("stderr"), exit_code=exit_code, truncated=col.truncated)
+
+def _target_cfg(target: str):
     cfg = load_config()
-    if req.target not in cfg.targets:
-        raise ValueError(f"Unknown target: {req.target}")
+    if target not in cfg.targets:
+        raise ValueError(f"Unknown target: {target}")
+    return cfg.targets[target]
+
+def ssh_exec(req: SSHExecRequest) -> SSHExecResponse:
+    target_cfg = _target_cfg(req.target)
+    col = _OutputCollector(req.max_bytes, req.tail_bytes)
+    with SSHClientWrapper(target_cfg, name=req.target) as cli:
+        chunks = cli.exec_stream(req.command, cwd=req.cwd, env=req.env, timeout=req.timeout)
+        try:
+            for name, data in chunks:
+                col.feed(name, data)
+                if col.truncated:
+                    break
+        finally:
+            chunks.close()
+    return _response(col)
+
+async def ssh_exec_stream(req: SSHExecRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {"stream": "stdout" | "stderr", "data": text} events as output arrives, then a final
+    summary event with exit_code, byte counts, truncated and (unless tail_bytes is 0) the kept output.
+    """
+    target_cfg = _target_cfg(req.target)
+    col = _OutputCollector(req.max_bytes, req.tail_bytes)
+    async with AsyncSSHClientWrapper(target_cfg, name=req.target) as cli:
+        chunks = cli.exec_stream(req.command, cwd=req.cwd, env=req.env, timeout=req.timeout)
+        try:
+            async for name, data in chunks:
+                text = col.feed(name, data)
+                if text:
+                    yield {"stream": name, "data": text}
+                if col.truncated:
+                    break
+        finally:
+            await chunks.aclose()
+    yield col.summary()
+
+async def ssh_exec_async(req: SSHExecRequest) -> SSHExecResponse:
+    target_cfg = _target_cfg(req.target)
+    col = _OutputCollector(req.max_bytes, req.tail_bytes)
+    async with AsyncSSHClientWrapper(target_cfg, name=req.target) as cli:
+        chunks = cli.exec_stream(req.command, cwd=req.cwd, env=req.env, timeout=req.timeout)
+        try:
+            async for name, data in chunks:
+                col.feed(name, data)
+                if col.truncated:
+                    break
+        finally:
+            await chunks.aclose()
+    return _response(col)
 
-    target_cfg = cfg.targets[req.target]
-    with SSHClientWrapper(target_cfg) as cli:
-        result = cli.exec(req.command, cwd=req.cwd, env=req.env, timeout=req.timeout)
-        return SSHExecResponse(stdout=result.stdout, stderr=result.stderr, exit_code=result.exit_code)
+def ssh_exec_event_name(evt: Dict[str, Any]) -> str:
+    return evt.get("stream") or "exit"
 
 # Tool schema (MCP-style description)
 TOOL_SCHEMA = {
@@ -39,6 +146,8 @@ TOOL_SCHEMA = {
             "cwd": {"type": "string"},
             "env": {"type": "object", "additionalProperties": {"type": "string"}},
             "timeout": {"type": "integer"},
+            "max_bytes": {"type": "integer"},
+            "tail_bytes": {"type": "integer"},
         },
         "required": ["target", "command"]
     },
@@ -47,7 +156,8 @@ TOOL_SCHEMA = {
         "properties": {
             "stdout": {"type": "string"},
             "stderr": {"type": "string"},
-            "exit_code": {"type": "integer"}
+            "exit_code": {"type": "integer"},
+            "truncated": {"type": "boolean"}
         },
         "required": ["stdout", "stderr", "exit_code"]
     }
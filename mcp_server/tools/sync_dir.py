@@ -0,0 +1,477 @@
+from __future__ import annotations
+import base64
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import posixpath
+import shlex
+import stat
+import struct
+import time
+import uuid
+from itertools import accumulate
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+from ..ssh_async import iterate_blocking, run_blocking
+from .common import TargetedRequest, use_client, use_async_client
+
+# Interpreter on the target that computes checksums and applies the delta
+REMOTE_PYTHON = os.environ.get("MCP_PI_REMOTE_PYTHON", "python3")
+
+# Bytes per literal record when a whole file is sent
+_LITERAL_CHUNK = 1024 * 1024
+
+# Bytes of a changed file searched for remote blocks at a time; a file whose first window has none
+# is sent whole instead of rolling the checksum through all of it
+_DELTA_WINDOW = 256 * 1024
+
+# Prefix of the bundle and the part files written next to the synced files; the scan skips leftovers
+_BUNDLE_PREFIX = ".mcp-sync-"
+
+class SyncDirRequest(TargetedRequest):
+    local_dir: str = Field(description="Directory on the MCP server host to copy from")
+    remote_dir: str = Field(description="Absolute directory on the remote host to bring up to date")
+    exclude: List[str] = Field(default_factory=list, description="Glob patterns (file/dir names or relative paths) to skip, e.g. '.git', '*.pyc'")
+    delete: bool = Field(default=False, description="Remove remote files that do not exist in local_dir")
+    block_size: int = Field(default=8192, ge=512, le=1048576, description="Checksum block size in bytes")
+    dry_run: bool = Field(default=False, description="Compute and report the transfer without changing the target")
+
+class SyncDirResponse(BaseModel):
+    remote_dir: str
+    dry_run: bool
+    files_total: int
+    unchanged: int
+    created: List[str]
+    updated: List[str]
+    mode_changed: List[str]
+    deleted: List[str]
+    bytes_total: int
+    bytes_sent: int
+    bytes_saved: int
+    saved_pct: float
+    elapsed: float
+    upload_bytes_per_sec: Optional[int] = None
+    time_saved_est: Optional[float] = None
+
+# Runs on the target: "scan" lists files, "blocks" returns per-block checksums, "apply" rebuilds
+# files from a bundle of copy/literal records. Checksums must match _weak/_strong below.
+_REMOTE_HELPER = r'''
+import base64, fnmatch, hashlib, json, os, stat, struct, sys
+from itertools import accumulate
+args = json.loads(sys.stdin.buffer.read())
+root = args["root"]
+def excluded(rel):
+    parts = rel.split("/")
+    return any(fnmatch.fnmatch(rel, p) or any(fnmatch.fnmatch(n, p) for n in parts) for p in args.get("exclude", []))
+def weak(b):
+    return (sum(b) & 0xffff) | ((sum(accumulate(b)) & 0xffff) << 16)
+if args["op"] == "scan":
+    files = {}
+    for d, dirs, names in os.walk(root):
+        dirs[:] = [n for n in dirs if not excluded(os.path.relpath(os.path.join(d, n), root).replace(os.sep, "/"))]
+        for n in names:
+            p = os.path.join(d, n)
+            rel = os.path.relpath(p, root).replace(os.sep, "/")
+            st = os.lstat(p)
+            if not stat.S_ISREG(st.st_mode) or n.startswith(args["skip"]) or excluded(rel):
+                continue
+            h = hashlib.blake2b(digest_size=16)
+            with open(p, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            files[rel] = [st.st_size, stat.S_IMODE(st.st_mode), h.hexdigest()]
+    print(json.dumps({"files": files}))
+elif args["op"] == "blocks":
+    bs = args["block_size"]
+    out = {}
+    for rel in args["paths"]:
+        sigs = []
+        with open(os.path.join(root, rel), "rb") as f:
+            for b in iter(lambda: f.read(bs), b""):
+                sigs.append([weak(b), hashlib.blake2b(b, digest_size=8).hexdigest()])
+        out[rel] = sigs
+    print(json.dumps({"blocks": out}))
+elif args["op"] == "apply":
+    bs = args["block_size"]
+    applied = 0
+    src = open(args["bundle"], "rb")
+    try:
+        for header in iter(src.readline, b""):
+            entry = json.loads(header)
+            path = os.path.join(root, entry["path"])
+            if entry["kind"] == "delete":
+                if os.path.lexists(path):
+                    os.remove(path)
+            elif entry["kind"] == "chmod":
+                os.chmod(path, entry["mode"])
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                old = open(path, "rb") if os.path.exists(path) else None
+                # Named with the prefix the scan skips, so a leftover is never reported as a synced file
+                tmp = os.path.join(os.path.dirname(path), args["skip"] + os.path.basename(path) + ".part")
+                try:
+                    with open(tmp, "wb") as out:
+                        while True:
+                            op = src.read(1)
+                            if op == b"C":
+                                idx, count = struct.unpack(">QI", src.read(12))
+                                old.seek(idx * bs)
+                                out.write(old.read(count * bs))
+                            elif op == b"D":
+                                (n,) = struct.unpack(">I", src.read(4))
+                                out.write(src.read(n))
+                            else:
+                                break
+                    os.chmod(tmp, entry["mode"])
+                    os.replace(tmp, path)
+                finally:
+                    if old:
+                        old.close()
+                    if os.path.lexists(tmp):
+                        os.remove(tmp)
+            applied += 1
+    finally:
+        src.close()
+        os.remove(args["bundle"])
+    print(json.dumps({"applied": applied}))
+'''
+
+def _helper_command() -> str:
+    script = base64.b64encode(_REMOTE_HELPER.encode("utf-8")).decode("ascii")
+    return f"{REMOTE_PYTHON} -c {shlex.quote('import base64,sys;exec(base64.b64decode(sys.argv[1]))')} {script}"
+
+def _remote_args(op: str, root: str, **kwargs) -> bytes:
+    # Arguments go on stdin: a long path list would pass the kernel's 128 KiB limit on one argv string
+    return json.dumps(dict(kwargs, op=op, root=root)).encode("utf-8")
+
+def _remote_result(r) -> Dict[str, Any]:
+    if r.exit_code != 0:
+        raise RuntimeError(f"sync_dir helper failed ({r.exit_code}): {r.stderr.strip()[-500:]}")
+    return json.loads(r.stdout)
+
+def _weak(block: bytes) -> int:
+    # rsync-style checksum: a = sum of bytes, b = sum of prefix sums, both mod 2^16
+    return (sum(block) & 0xffff) | ((sum(accumulate(block)) & 0xffff) << 16)
+
+def _strong(block: bytes) -> str:
+    return hashlib.blake2b(block, digest_size=8).hexdigest()
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _excluded(rel: str, patterns: List[str]) -> bool:
+    parts = rel.split("/")
+    return any(fnmatch.fnmatch(rel, p) or any(fnmatch.fnmatch(n, p) for n in parts) for p in patterns)
+
+def _scan_local(root: str, exclude: List[str]) -> Dict[str, Tuple[str, int, int]]:
+    """rel path -> (local path, size, mode) for the regular files under root"""
+    if not os.path.isdir(root):
+        raise ValueError(f"local_dir is not a directory: {root}")
+    files = {}
+    for d, dirs, names in os.walk(root):
+        dirs[:] = [n for n in dirs if not _excluded(os.path.relpath(os.path.join(d, n), root).replace(os.sep, "/"), exclude)]
+        for n in names:
+            p = os.path.join(d, n)
+            rel = os.path.relpath(p, root).replace(os.sep, "/")
+            st = os.lstat(p)
+            if stat.S_ISREG(st.st_mode) and not _excluded(rel, exclude):
+                files[rel] = (p, st.st_size, stat.S_IMODE(st.st_mode))
+    return files
+
+def iter_delta(f: BinaryIO, sigs: List[List[Any]], remote_size: int, block_size: int) -> Iterator[Tuple[str, Any]]:
+    """
+    ("copy", (first_block, count)) and ("data", bytes) records that rebuild the file read from f from
+    the remote blocks described by sigs. The weak checksum rolls one byte at a time, so blocks are
+    found again after insertions and deletions, not only at their old offsets. f is read a window at
+    a time; when the first window holds no remote block, the rest is sent as data without rolling.
+    """
+    run: Optional[Tuple[int, int]] = None  # adjacent copies are merged into one record
+
+    # Only full blocks roll; a short last block can only match the end of the file
+    short = remote_size % block_size
+    full = len(sigs) - 1 if short else len(sigs)
+    table: Dict[int, List[int]] = {}
+    for idx in range(full):
+        table.setdefault(sigs[idx][0], []).append(idx)
+
+    window = max(_DELTA_WINDOW, 2 * block_size)
+    buf = f.read(window)
+    eof = len(buf) < window
+    dropped = 0  # bytes of the file before buf[0]
+    pos = lit = 0
+    matched = whole = False
+    weak = a = b = None
+    while table:
+        if pos + block_size >= len(buf) and not eof:
+            # Keep the unsent bytes and read on; the rolled byte is always in buf
+            more = f.read(window)
+            eof = len(more) < window
+            dropped += lit
+            buf = buf[lit:] + more
+            pos -= lit
+            lit = 0
+            continue
+        if pos + block_size > len(buf):
+            break
+        if not matched and dropped + pos >= window:
+            whole = True
+            break
+        if weak is None:
+            block = buf[pos:pos + block_size]
+            a = sum(block) & 0xffff
+            b = sum(accumulate(block)) & 0xffff
+            weak = a | (b << 16)
+        candidates = table.get(weak)
+        if candidates:
+            strong = _strong(buf[pos:pos + block_size])
+            match = next((idx for idx in candidates if sigs[idx][1] == strong), None)
+            if match is not None:
+                if lit < pos:
+                    if run:
+                        yield "copy", run
+                        run = None
+                    yield "data", buf[lit:pos]
+                if run and sum(run) == match:
+                    run = (run[0], run[1] + 1)
+                else:
+                    if run:
+                        yield "copy", run
+                    run = (match, 1)
+                matched = True
+                pos += block_size
+                lit = pos
+                weak = None
+                continue
+        # Roll the window one byte forward
+        if pos + block_size < len(buf):
+            out_byte, in_byte = buf[pos], buf[pos + block_size]
+            a = (a - out_byte + in_byte) & 0xffff
+            b = (b - block_size * out_byte + a) & 0xffff
+            weak = a | (b << 16)
+        pos += 1
+        if pos - lit >= _LITERAL_CHUNK:
+            if run:
+                yield "copy", run
+                run = None
+            yield "data", buf[lit:pos]
+            lit = pos
+
+    # The unsent rest as data, holding back what may be the remote's short last block
+    tail = 0 if whole else short
+    pending = buf[lit:]
+    for chunk in ([] if eof else iter(lambda: f.read(_LITERAL_CHUNK), b"")):
+        pending += chunk
+        if len(pending) > _LITERAL_CHUNK + tail:
+            if run:
+                yield "copy", run
+                run = None
+            yield "data", pending[:len(pending) - tail]
+            pending = pending[len(pending) - tail:]
+    last = tail and len(pending) >= tail and _strong(pending[len(pending) - tail:]) == sigs[-1][1]
+    if last:
+        pending = pending[:len(pending) - tail]
+    if pending:
+        if run:
+            yield "copy", run
+            run = None
+        yield "data", pending
+    if last:
+        if run and sum(run) == len(sigs) - 1:
+            run = (run[0], run[1] + 1)
+        else:
+            if run:
+                yield "copy", run
+            run = (len(sigs) - 1, 1)
+    if run:
+        yield "copy", run
+
+def delta_ops(data: bytes, sigs: List[List[Any]], remote_size: int, block_size: int) -> List[Tuple[str, Any]]:
+    """iter_delta over data held in memory"""
+    return list(iter_delta(io.BytesIO(data), sigs, remote_size, block_size))
+
+def _encode(ops: Iterable[Tuple[str, Any]]) -> Iterator[bytes]:
+    for kind, value in ops:
+        if kind == "copy":
+            yield b"C" + struct.pack(">QI", *value)
+        else:
+            for i in range(0, len(value), _LITERAL_CHUNK):
+                chunk = value[i:i + _LITERAL_CHUNK]
+                yield b"D" + struct.pack(">I", len(chunk)) + chunk
+    yield b"E"
+
+def _file_records(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_LITERAL_CHUNK), b""):
+            yield b"D" + struct.pack(">I", len(chunk)) + chunk
+    yield b"E"
+
+class _SyncPlan:
+    """Compares the two trees and produces the bundle the remote helper applies; no I/O on the target"""
+
+    def __init__(self, req: SyncDirRequest):
+        self.req = req
+        self.started = time.monotonic()
+        self.local = _scan_local(req.local_dir, req.exclude)
+        self.remote: Dict[str, List[Any]] = {}
+        self.sigs: Dict[str, List[List[Any]]] = {}
+        self.created: List[str] = []
+        self.updated: List[str] = []
+        self.mode_changed: List[str] = []
+        self.deleted: List[str] = []
+        self.unchanged = 0
+        self.bytes_sent = 0
+        self.bundle_path = posixpath.join(req.remote_dir, f"{_BUNDLE_PREFIX}{uuid.uuid4().hex}")
+
+    def scan_args(self) -> bytes:
+        return _remote_args("scan", self.req.remote_dir, exclude=self.req.exclude, skip=_BUNDLE_PREFIX)
+
+    def compare(self, scan: Dict[str, Any]) -> List[str]:
+        """Classify every file; returns the changed files whose remote block checksums are needed"""
+        self.remote = scan["files"]
+        for rel, (path, size, mode) in sorted(self.local.items()):
+            theirs = self.remote.get(rel)
+            if theirs is None:
+                self.created.append(rel)
+            elif theirs[0] != size or theirs[2] != _file_digest(path):
+                self.updated.append(rel)
+            elif theirs[1] != mode:
+                self.mode_changed.append(rel)
+            else:
+                self.unchanged += 1
+        if self.req.delete:
+            self.deleted = sorted(set(self.remote) - set(self.local))
+        return [rel for rel in self.updated if self.remote[rel][0] > 0]
+
+    def blocks_args(self, paths: List[str]) -> bytes:
+        return _remote_args("blocks", self.req.remote_dir, paths=paths, block_size=self.req.block_size)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.mode_changed or self.deleted)
+
+    def bundle(self) -> Iterator[bytes]:
+        for chunk in self._bundle():
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def _bundle(self) -> Iterator[bytes]:
+        def header(rel: str, kind: str, **extra) -> bytes:
+            return json.dumps(dict(extra, path=rel, kind=kind)).encode("utf-8") + b"\n"
+
+        for rel in self.created:
+            path, _, mode = self.local[rel]
+            yield header(rel, "file", mode=mode)
+            yield from _file_records(path)
+        for rel in self.updated:
+            path, _, mode = self.local[rel]
+            yield header(rel, "file", mode=mode)
+            with open(path, "rb") as f:
+                yield from _encode(iter_delta(f, self.sigs.get(rel, []), self.remote[rel][0], self.req.block_size))
+        for rel in self.mode_changed:
+            yield header(rel, "chmod", mode=self.local[rel][2])
+        for rel in self.deleted:
+            yield header(rel, "delete")
+
+    def count_bundle(self):
+        for _ in self.bundle():
+            pass
+
+    def apply_args(self) -> bytes:
+        return _remote_args("apply", self.req.remote_dir, bundle=self.bundle_path, block_size=self.req.block_size,
+                            skip=_BUNDLE_PREFIX)
+
+    def response(self, upload_seconds: Optional[float]) -> SyncDirResponse:
+        total = sum(size for _, size, _ in self.local.values())
+        saved = max(0, total - self.bytes_sent)
+        rate = int(self.bytes_sent / upload_seconds) if upload_seconds else None
+        return SyncDirResponse(
+            remote_dir=self.req.remote_dir, dry_run=self.req.dry_run, files_total=len(self.local),
+            unchanged=self.unchanged, created=self.created, updated=self.updated,
+            mode_changed=self.mode_changed, deleted=self.deleted,
+            bytes_total=total, bytes_sent=self.bytes_sent, bytes_saved=saved,
+            saved_pct=round(100.0 * saved / total, 1) if total else 0.0,
+            elapsed=round(time.monotonic() - self.started, 3),
+            upload_bytes_per_sec=rate,
+            time_saved_est=round(saved / rate, 3) if rate else None,
+        )
+
+def sync_dir(req: SyncDirRequest) -> SyncDirResponse:
+    plan = _SyncPlan(req)
+    upload_seconds = None
+    helper = _helper_command()
+    with use_client(req.target) as cli:
+        need = plan.compare(_remote_result(cli.exec(helper, input_data=plan.scan_args())))
+        if need:
+            plan.sigs = _remote_result(cli.exec(helper, input_data=plan.blocks_args(need)))["blocks"]
+        if req.dry_run:
+            plan.count_bundle()
+        elif plan.changed:
+            start = time.monotonic()
+            cli.put_stream(plan.bundle(), plan.bundle_path)
+            upload_seconds = time.monotonic() - start
+            _remote_result(cli.exec(helper, input_data=plan.apply_args()))
+    return plan.response(upload_seconds)
+
+async def sync_dir_async(req: SyncDirRequest) -> SyncDirResponse:
+    plan = await run_blocking(_SyncPlan, req)
+    upload_seconds = None
+    helper = _helper_command()
+    async with use_async_client(req.target) as cli:
+        scan = _remote_result(await cli.exec(helper, input_data=plan.scan_args()))
+        need = await run_blocking(plan.compare, scan)
+        if need:
+            plan.sigs = _remote_result(await cli.exec(helper, input_data=plan.blocks_args(need)))["blocks"]
+        if req.dry_run:
+            await run_blocking(plan.count_bundle)
+        elif plan.changed:
+            start = time.monotonic()
+            await cli.put_stream(iterate_blocking(plan.bundle()), plan.bundle_path)
+            upload_seconds = time.monotonic() - start
+            _remote_result(await cli.exec(helper, input_data=plan.apply_args()))
+    return plan.response(upload_seconds)
+
+TOOL_SCHEMA = {
+    "name": "sync_dir",
+    "description": "Bring a remote directory up to date with a local one, sending only changed blocks (rsync-style rolling checksums) and new files; preserves modes",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "local_dir": {"type": "string"},
+            "remote_dir": {"type": "string"},
+            "exclude": {"type": "array", "items": {"type": "string"}},
+            "delete": {"type": "boolean"},
+            "block_size": {"type": "integer", "minimum": 512, "maximum": 1048576},
+            "dry_run": {"type": "boolean"},
+        },
+        "required": ["target", "local_dir", "remote_dir"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "remote_dir": {"type": "string"},
+            "dry_run": {"type": "boolean"},
+            "files_total": {"type": "integer"},
+            "unchanged": {"type": "integer"},
+            "created": {"type": "array", "items": {"type": "string"}},
+            "updated": {"type": "array", "items": {"type": "string"}},
+            "mode_changed": {"type": "array", "items": {"type": "string"}},
+            "deleted": {"type": "array", "items": {"type": "string"}},
+            "bytes_total": {"type": "integer"},
+            "bytes_sent": {"type": "integer"},
+            "bytes_saved": {"type": "integer"},
+            "saved_pct": {"type": "number"},
+            "elapsed": {"type": "number"},
+            "upload_bytes_per_sec": {"type": "integer"},
+            "time_saved_est": {"type": "number"},
+        },
+        "required": ["remote_dir", "files_total", "bytes_total", "bytes_sent", "bytes_saved"]
+    }
+}
@@ -1,7 +1,33 @@
 from __future__ import annotations
+import os
+import re
+import shlex
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
 
-from .common import TargetedRequest, use_client
+from .common import TargetedRequest, use_client, use_async_client
+
+# Unit states read by systemd_status_many are kept this long, so dashboards polling many units share one read
+SYSTEMD_STATUS_TTL = float(os.environ.get("MCP_PI_SYSTEMD_STATUS_TTL", "2"))
+
+# systemctl show property -> UnitStatus field
+STATUS_PROPERTIES = {
+    "Id": "id",
+    "Description": "description",
+    "LoadState": "load_state",
+    "ActiveState": "active_state",
+    "SubState": "sub_state",
+    "UnitFileState": "unit_file_state",
+    "MainPID": "main_pid",
+    "ExecMainStatus": "exec_main_status",
+    "NRestarts": "n_restarts",
+    "MemoryCurrent": "memory_current",
+    "ActiveEnterTimestamp": "active_enter_timestamp",
+}
+_INT_FIELDS = {"main_pid", "exec_main_status", "n_restarts", "memory_current"}
+_UNIT_NAME = re.compile(r"^[A-Za-z0-9:_.@\\-]+$")
 
 class ServiceRequest(TargetedRequest):
     name: str = Field(description="systemd service name (e.g., myproj.service)")
@@ -17,16 +43,198 @@ class ServiceResponse(BaseModel):
     stderr: str
     exit_code: int
 
+class ServiceStatusManyRequest(TargetedRequest):
+    names: List[str] = Field(min_length=1, description="Units to read, e.g. ['nginx.service', 'myproj']; a bare name means .service")
+    max_age: Optional[float] = Field(default=None, ge=0, description=f"Oldest cached state to accept, in seconds (default {SYSTEMD_STATUS_TTL}); 0 skips the cache. Units a running systemd watcher tracks are always current")
+
+class UnitStatus(BaseModel):
+    name: str                                  # as requested
+    id: Optional[str] = None                   # unit systemd resolved it to, e.g. nginx -> nginx.service
+    description: Optional[str] = None
+    load_state: Optional[str] = None           # loaded | not-found | masked | ...
+    active_state: Optional[str] = None         # active | inactive | failed | activating | ...
+    sub_state: Optional[str] = None            # running | exited | dead | ...
+    unit_file_state: Optional[str] = None      # enabled | disabled | static | ...
+    main_pid: Optional[int] = None             # 0 when nothing is running
+    exec_main_status: Optional[int] = None
+    n_restarts: Optional[int] = None
+    memory_current: Optional[int] = None       # bytes; None without memory accounting
+    active_enter_timestamp: Optional[str] = None
+    age: float = 0.0                           # seconds since this state was read from the host
+
+class ServiceStatusManyResponse(BaseModel):
+    units: List[UnitStatus]
+    fetched: int  # units read from the host by this call; the rest came from the cache
+
 VALID_ACTIONS = {"start", "stop", "restart", "reload", "enable", "disable", "status"}
 
+class UnitStateCache:
+    """
+    Last read state of each unit, per target. Entries older than the caller's max_age are read
+    again; actions through systemd_service drop the unit's entry so the next poll sees the change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[float, UnitStatus]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, target: str, names: List[str], max_age: float) -> Tuple[Dict[str, UnitStatus], List[str]]:
+        now = time.monotonic()
+        found: Dict[str, UnitStatus] = {}
+        missing: List[str] = []
+        with self._lock:
+            for name in names:
+                cached = self._entries.get((target, name))
+                if cached is not None and now - cached[0] <= max_age:
+                    found[name] = cached[1].model_copy(update={"age": round(now - cached[0], 3)})
+                elif name not in missing:
+                    missing.append(name)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def store(self, target: str, units: List[UnitStatus], read_at: float):
+        with self._lock:
+            for u in units:
+                self._entries[(target, u.name)] = (read_at, u)
+
+    def invalidate(self, target: str, name: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == target and (name is None or _same_unit(k[1], name))]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"units": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+_status_cache = UnitStateCache()
+
+def get_status_cache() -> UnitStateCache:
+    return _status_cache
+
+def unit_id(name: str) -> str:
+    # systemctl treats a name without a type suffix as a service
+    return name if "." in name else f"{name}.service"
+
+def _same_unit(a: str, b: str) -> bool:
+    return unit_id(a) == unit_id(b)
+
+def _show_command(names: List[str]) -> str:
+    for name in names:
+        if not _UNIT_NAME.match(name):
+            raise ValueError(f"Invalid unit name: {name!r}")
+    return f"systemctl show --no-pager --property={','.join(STATUS_PROPERTIES)} -- {' '.join(shlex.quote(n) for n in names)}"
+
+def unit_status(name: str, props: Dict[str, str]) -> UnitStatus:
+    fields: Dict[str, object] = {"name": name}
+    for prop, field in STATUS_PROPERTIES.items():
+        value = props.get(prop)
+        if value is None or value == "" or value == "[not set]":
+            continue
+        if field in _INT_FIELDS:
+            try:
+                n = int(value)
+            except ValueError:
+                continue
+            if n == 2 ** 64 - 1:  # systemd's "infinity"/unset for counters
+                continue
+            fields[field] = n
+        else:
+            fields[field] = value
+    return UnitStatus(**fields)
+
+def parse_blocks(text: str) -> List[Dict[str, str]]:
+    """KEY=value blocks of `systemctl show` output, one per unit (blank line between units)"""
+    blocks: List[Dict[str, str]] = []
+    current: Dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append(current)
+                current = {}
+            continue
+        key, sep, value = line.partition("=")
+        if sep:
+            current[key] = value
+    if current:
+        blocks.append(current)
+    return blocks
+
+def parse_show(names: List[str], stdout: str) -> List[UnitStatus]:
+    """Split `systemctl show` output for several units (in argument order) into UnitStatus records for names"""
+    blocks = parse_blocks(stdout)
+    if len(blocks) != len(names):
+        # Should not happen, but never attribute one unit's state to another: match by resolved name
+        by_id = {b.get("Id"): b for b in blocks}
+        return [unit_status(n, by_id.get(n) or by_id.get(f"{n}.service") or {}) for n in names]
+    return [unit_status(n, b) for n, b in zip(names, blocks)]
+
+def _read_failed(r) -> RuntimeError:
+    return RuntimeError(f"systemctl show failed (exit {r.exit_code}): {(r.stderr or r.stdout).strip()}")
+
+def _status_response(req: ServiceStatusManyRequest, found: Dict[str, UnitStatus], fetched: List[UnitStatus]) -> ServiceStatusManyResponse:
+    found.update((u.name, u) for u in fetched)
+    return ServiceStatusManyResponse(units=[found[n] for n in req.names], fetched=len(fetched))
+
+def systemd_status_many(req: ServiceStatusManyRequest) -> ServiceStatusManyResponse:
+    from .systemd_watch import watched_units  # local import to avoid cycle
+    cache = get_status_cache()
+    live = watched_units(req.target, req.names)  # kept current by a running watcher: no read needed
+    found, missing = cache.lookup(req.target, [n for n in req.names if n not in live],
+                                  SYSTEMD_STATUS_TTL if req.max_age is None else req.max_age)
+    found.update(live)
+    fetched: List[UnitStatus] = []
+    if missing:
+        cmd = _show_command(missing)
+        with use_client(req.target) as cli:
+            read_at = time.monotonic()
+            r = cli.exec(cmd)
+        if r.exit_code != 0 and not r.stdout.strip():
+            raise _read_failed(r)
+        fetched = parse_show(missing, r.stdout)
+        cache.store(req.target, fetched, read_at)
+    return _status_response(req, found, fetched)
+
+async def systemd_status_many_async(req: ServiceStatusManyRequest) -> ServiceStatusManyResponse:
+    from .systemd_watch import watched_units  # local import to avoid cycle
+    cache = get_status_cache()
+    live = watched_units(req.target, req.names)  # kept current by a running watcher: no read needed
+    found, missing = cache.lookup(req.target, [n for n in req.names if n not in live],
+                                  SYSTEMD_STATUS_TTL if req.max_age is None else req.max_age)
+    found.update(live)
+    fetched: List[UnitStatus] = []
+    if missing:
+        cmd = _show_command(missing)
+        async with use_async_client(req.target) as cli:
+            read_at = time.monotonic()
+            r = await cli.exec(cmd)
+        if r.exit_code != 0 and not r.stdout.strip():
+            raise _read_failed(r)
+        fetched = parse_show(missing, r.stdout)
+        cache.store(req.target, fetched, read_at)
+    return _status_response(req, found, fetched)
+
 def service_action(req: ServiceActionRequest) -> ServiceResponse:
     if req.action not in VALID_ACTIONS:
         raise ValueError(f"Invalid action: {req.action}")
+    if req.action != "status":
+        get_status_cache().invalidate(req.target, req.name)
     cli = use_client(req.target)
     with cli:
         r = cli.exec(f"systemctl {req.action} {req.name}")
         return ServiceResponse(ok=(r.exit_code == 0), name=req.name, action=req.action, stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
 
+async def service_action_async(req: ServiceActionRequest) -> ServiceResponse:
+    if req.action not in VALID_ACTIONS:
+        raise ValueError(f"Invalid action: {req.action}")
+    if req.action != "status":
+        get_status_cache().invalidate(req.target, req.name)
+    async with use_async_client(req.target) as cli:
+        r = await cli.exec(f"systemctl {req.action} {req.name}")
+        return ServiceResponse(ok=(r.exit_code == 0), name=req.name, action=req.action, stdout=r.stdout, stderr=r.stderr, exit_code=r.exit_code)
+
 SERVICE_ACTION_SCHEMA = {
     "name": "systemd_service",
     "description": "Manage a systemd service on the target.",
@@ -47,4 +255,47 @@ SERVICE_ACTION_SCHEMA = {
         },
         "required": ["ok", "name", "action", "exit_code"]
     }
-}
\ No newline at end of file
+}
+
+SYSTEMD_STATUS_MANY_SCHEMA = {
+    "name": "systemd_status_many",
+    "description": "Read the state of several systemd units with one systemctl call. Results are cached briefly per target, so repeated polls do not reach the host.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "names": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+            "max_age": {"type": "number", "minimum": 0},
+        },
+        "required": ["target", "names"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "units": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "id": {"type": "string"},
+                        "description": {"type": "string"},
+                        "load_state": {"type": "string"},
+                        "active_state": {"type": "string"},
+                        "sub_state": {"type": "string"},
+                        "unit_file_state": {"type": "string"},
+                        "main_pid": {"type": "integer"},
+                        "exec_main_status": {"type": "integer"},
+                        "n_restarts": {"type": "integer"},
+                        "memory_current": {"type": "integer"},
+                        "active_enter_timestamp": {"type": "string"},
+                        "age": {"type": "number"},
+                    },
+                    "required": ["name", "age"]
+                }
+            },
+            "fetched": {"type": "integer"},
+        },
+        "required": ["units", "fetched"]
+    }
+}
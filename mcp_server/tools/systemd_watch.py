@@ -0,0 +1,272 @@
+from __future__ import annotations
+import asyncio
+import codecs
+import os
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+from .common import TargetedRequest, use_async_client
+from .systemd import STATUS_PROPERTIES, UnitStatus, unit_id, unit_status
+
+# Unit state watcher: one long-lived channel per target pushes state changes instead of clients polling
+SYSTEMD_WATCH_TYPES = [t for t in os.environ.get("MCP_PI_SYSTEMD_WATCH_TYPES", "service").split(",") if t]  # unit types tracked
+SYSTEMD_WATCH_RESYNC = int(os.environ.get("MCP_PI_SYSTEMD_WATCH_RESYNC", "60"))      # seconds between full re-reads, catches missed events
+SYSTEMD_WATCH_LINGER = float(os.environ.get("MCP_PI_SYSTEMD_WATCH_LINGER", "300"))  # seconds a watcher outlives its last subscriber
+SYSTEMD_WATCH_EVENTS = int(os.environ.get("MCP_PI_SYSTEMD_WATCH_EVENTS", "1000"))   # recent changes kept for resuming subscribers
+SYSTEMD_WATCH_COLLECT = float(os.environ.get("MCP_PI_SYSTEMD_WATCH_COLLECT", "5"))  # default follow time for a tool call
+
+# A change in any of these is published; memory and timestamps alone only update the table
+CHANGE_FIELDS = ("load_state", "active_state", "sub_state", "unit_file_state", "main_pid", "exec_main_status", "n_restarts")
+
+SYNCED = "@@synced"
+
+class SystemdWatchRequest(TargetedRequest):
+    units: Optional[List[str]] = Field(default=None, description="Units to report (a bare name means .service); all tracked units when unset")
+    since: Optional[int] = Field(default=None, ge=0, description="Resume after this seq from an earlier event: only newer changes, no snapshot")
+    watch: Optional[str] = Field(default=None, description="The watch id that came with since; since is ignored (and a snapshot sent) unless it matches the running watch")
+    duration: Optional[float] = Field(default=None, gt=0, description=f"Seconds to follow; SSE streams run until disconnect when unset, tool calls default to {SYSTEMD_WATCH_COLLECT}")
+
+class SystemdWatchResponse(BaseModel):
+    units: List[UnitStatus]         # state of the requested units when the call ended
+    changes: List[Dict[str, Any]]   # {"unit", "seq", "old", "new"} in the order they happened
+    seq: int                        # pass back as since to get only later changes
+    watch: Optional[str] = None     # pass back with seq; seqs only mean something within one watch
+    ended: Optional[str] = None
+
+def _watch_script() -> str:
+    # Full read of the tracked units, then one `systemctl show` per unit PID 1 logs about.
+    # The ticker forces a full re-read now and then, so a missed journal entry heals by itself.
+    props = ",".join(STATUS_PROPERTIES)
+    types = ",".join(SYSTEMD_WATCH_TYPES)
+    pattern = "|".join(f"*.{t}" for t in SYSTEMD_WATCH_TYPES)
+    return (
+        f"show_all() {{ u=$(systemctl list-units --all --plain --no-legend --no-pager --type={types} | awk '{{print $1}}'); "
+        f"[ -z \"$u\" ] || systemctl show --no-pager --property={props} -- $u; echo; echo {SYNCED}; }}; "
+        f"show_all; "
+        f"{{ journalctl -f -q -n 0 _PID=1 -o cat --output-fields=UNIT & while sleep {SYSTEMD_WATCH_RESYNC}; do echo @@all; done; }} | "
+        f"while read -r u; do case \"$u\" in @@all) show_all ;; {pattern}) "
+        f"systemctl show --no-pager --property={props} -- \"$u\"; echo ;; esac; done"
+    )
+
+def _state(u: UnitStatus) -> Dict[str, Any]:
+    return {f: getattr(u, f) for f in CHANGE_FIELDS}
+
+class SystemdWatcher:
+    """
+    Keeps a table of unit states for one target, fed by a single persistent channel, and publishes
+    each state change to subscribers. Status reads of tracked units become dictionary lookups.
+    Events are numbered (seq) so a subscriber can resume after a reconnect; id tells one watch of a
+    target from the next, since every watcher numbers from 0.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self.id = uuid.uuid4().hex[:12]
+        self.units: Dict[str, UnitStatus] = {}
+        self.synced = False
+        self.seq = 0
+        self.events: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=max(1, SYSTEMD_WATCH_EVENTS))
+        self.ended: Optional[str] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self._block: Dict[str, str] = {}
+        self._linger: Optional[asyncio.TimerHandle] = None
+        self.task = asyncio.ensure_future(self._pump())
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def _line(self, line: str):
+        if line and line != SYNCED:
+            key, sep, value = line.partition("=")
+            if sep:
+                self._block[key] = value
+            return
+        block, self._block = self._block, {}
+        if block.get("Id"):
+            self._apply(unit_status(block["Id"], block))
+        if line == SYNCED and not self.synced:
+            self.synced = True
+            self._notify()
+
+    def _apply(self, u: UnitStatus):
+        old = self.units.get(u.name)
+        self.units[u.name] = u
+        if not self.synced or (old is not None and _state(old) == _state(u)):
+            return
+        self.seq += 1
+        self.events.append((self.seq, {"unit": u.name, "seq": self.seq, "watch": self.id,
+                                       "old": _state(old) if old is not None else None, "new": u.model_dump()}))
+        self._notify()
+
+    async def _pump(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        err = []
+        try:
+            async with use_async_client(self.target, streams=True) as cli:
+                chunks = cli.exec_stream(_watch_script())
+                try:
+                    async for name, data in chunks:
+                        if name == "stdout":
+                            *lines, pending = (pending + decoder.decode(data)).split("\n")
+                            for line in lines:
+                                self._line(line)
+                        elif name == "stderr":
+                            err.append(data)
+                        elif data != 0:
+                            self.ended = b"".join(err).decode("utf-8", errors="replace").strip() or f"exit {data}"
+                finally:
+                    await chunks.aclose()
+            self.ended = self.ended or "watch ended"
+        except asyncio.CancelledError:
+            self.ended = "stopped"
+        except Exception as e:
+            self.ended = str(e) or type(e).__name__
+        finally:
+            if _watchers.get(self.target) is self:
+                del _watchers[self.target]
+            self._notify()
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Changes after seq, or None when some are no longer buffered (or seq is past this watcher's)"""
+        if seq > self.seq or (self.events and seq < self.events[0][0] - 1):
+            return None
+        return [evt for n, evt in self.events if n > seq]
+
+    def subscribe(self):
+        self.subscribers += 1
+        if self._linger is not None:
+            self._linger.cancel()
+            self._linger = None
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and self.ended is None:
+            self._linger = self.loop.call_later(SYSTEMD_WATCH_LINGER, self._stop_if_idle)
+
+    def _stop_if_idle(self):
+        if self.subscribers == 0:
+            self.task.cancel()
+
+_watchers: Dict[str, SystemdWatcher] = {}
+
+def watch_systemd(target: str) -> SystemdWatcher:
+    w = _watchers.get(target)
+    if w is None or w.ended is not None or w.loop is not asyncio.get_running_loop():
+        w = _watchers[target] = SystemdWatcher(target)
+    return w
+
+def watched_units(target: str, names: List[str]) -> Dict[str, UnitStatus]:
+    """Current state of the names a running, synced watcher tracks (safe to call from any thread)"""
+    w = _watchers.get(target)
+    if w is None or not w.synced or w.ended is not None:
+        return {}
+    found = {}
+    for name in names:
+        u = w.units.get(unit_id(name))
+        if u is not None:
+            found[name] = u.model_copy(update={"name": name})
+    return found
+
+def systemd_watchers() -> Dict[str, Any]:
+    return {t: {"watch": w.id, "subscribers": w.subscribers, "units": len(w.units), "synced": w.synced, "seq": w.seq, "ended": w.ended}
+            for t, w in _watchers.items()}
+
+async def systemd_watch_stream(req: SystemdWatchRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {"snapshot": [...units], "seq": n, "watch": id} once the watcher has read every unit, then
+    {"unit", "seq", "watch", "old", "new"} for each state change, then {"done": true, "reason": ...}.
+    With since and the watch it came from, the snapshot is skipped and changes after that seq are
+    replayed first. A snapshot is sent instead if they are no longer buffered or that watch has ended.
+    """
+    use_async_client(req.target)  # unknown targets fail here, before a watcher is made
+    wanted = {unit_id(n) for n in req.units} if req.units else None
+    watcher = watch_systemd(req.target)
+    watcher.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + req.duration if req.duration else None
+    # A seq counted by another watch of this target says nothing about this one's changes
+    seq = req.since if req.watch == watcher.id else None
+    try:
+        while True:
+            changed = watcher.changed
+            if watcher.synced:
+                events = watcher.since(seq) if seq is not None else None
+                if events is None:
+                    units = [u.model_dump() for name, u in sorted(watcher.units.items()) if wanted is None or name in wanted]
+                    seq = watcher.seq
+                    yield {"snapshot": units, "seq": seq, "watch": watcher.id}
+                    events = []
+                for evt in events:
+                    seq = evt["seq"]
+                    if wanted is None or evt["unit"] in wanted:
+                        yield evt
+            if watcher.ended is not None:
+                yield {"done": True, "reason": watcher.ended, "seq": seq or 0, "watch": watcher.id}
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), deadline - loop.time() if deadline else None)
+            except asyncio.TimeoutError:
+                yield {"done": True, "reason": "duration", "seq": seq or 0, "watch": watcher.id}
+                return
+    finally:
+        watcher.unsubscribe()
+
+def systemd_watch_event_name(evt: Dict[str, Any]) -> str:
+    if evt.get("done"):
+        return "done"
+    return "snapshot" if "snapshot" in evt else "change"
+
+async def systemd_watch_async(req: SystemdWatchRequest) -> SystemdWatchResponse:
+    if req.duration is None:
+        req = req.model_copy(update={"duration": SYSTEMD_WATCH_COLLECT})
+    units: Dict[str, Dict[str, Any]] = {}
+    changes: List[Dict[str, Any]] = []
+    seq, ended, watch = req.since or 0, None, None
+    async for evt in systemd_watch_stream(req):
+        seq, watch = evt["seq"], evt["watch"]
+        if evt.get("done"):
+            ended = evt["reason"] if evt["reason"] != "duration" else None
+        elif "snapshot" in evt:
+            units = {u["name"]: u for u in evt["snapshot"]}
+        else:
+            changes.append(evt)
+            units[evt["unit"]] = evt["new"]
+    return SystemdWatchResponse(units=[UnitStatus(**u) for _, u in sorted(units.items())], changes=changes, seq=seq,
+                                watch=watch, ended=ended)
+
+def systemd_watch_collect(req: SystemdWatchRequest) -> SystemdWatchResponse:
+    # Blocking entry point (threadpool mode): the watcher lives only as long as this call's event loop
+    return asyncio.run(systemd_watch_async(req))
+
+SYSTEMD_WATCH_SCHEMA = {
+    "name": "systemd_watch",
+    "description": "Follow systemd unit state changes on a target for `duration` seconds: the current state of the units, then every change as it happens. Pass the returned seq back as since, with the returned watch, to get only later changes; a watch that has ended gets a fresh snapshot instead.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "units": {"type": "array", "items": {"type": "string"}},
+            "since": {"type": "integer", "minimum": 0},
+            "watch": {"type": "string"},
+            "duration": {"type": "number"},
+        },
+        "required": ["target"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {
+            "units": {"type": "array", "items": {"type": "object"}},
+            "changes": {"type": "array", "items": {"type": "object"}},
+            "seq": {"type": "integer"},
+            "watch": {"type": "string"},
+            "ended": {"type": "string"},
+        },
+        "required": ["units", "changes", "seq"]
+    }
+}
@@ -1,11 +1,30 @@
 from __future__ import annotations
-from typing import Optional
+import asyncio
+import codecs
+import os
+import shlex
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
 from pydantic import BaseModel, Field
 
-from .common import TargetedRequest, use_client
+from ..ssh_async import run_blocking
+from ..tmux_control import (
+    CONTROL_SESSION, LIST_SESSIONS, TMUX_CONTROL_ENABLED, TmuxControlSession,
+    command_line, get_tmux_control, key_commands,
+)
+from .common import TargetedRequest, use_client, use_async_client
 
 SESSION_PREFIX = "mcp_"
 
+T = TypeVar("T")
+
+# Pane streaming: one pipe-pane channel per watched session, fanned out to every subscriber
+TMUX_RING_CHARS = int(os.environ.get("MCP_PI_TMUX_RING_CHARS", "262144"))  # recent output kept for late subscribers
+TMUX_SCROLLBACK = int(os.environ.get("MCP_PI_TMUX_SCROLLBACK", "200"))     # pane history lines captured when a watch starts
+TMUX_LINGER = float(os.environ.get("MCP_PI_TMUX_LINGER", "30"))            # seconds an unwatched pane keeps its channel
+TMUX_COLLECT = float(os.environ.get("MCP_PI_TMUX_COLLECT", "2"))           # default follow time for a tool call
+
 class TmuxEnsureRequest(TargetedRequest):
     session: str = Field(description="Session name (suffix); will be prefixed with 'mcp_'")
     cwd: Optional[str] = None
@@ -18,20 +37,59 @@ class TmuxSendKeysRequest(TargetedRequest):
 class TmuxKillRequest(TargetedRequest):
     session: str
 
+class TmuxListRequest(TargetedRequest):
+    pass
+
+class TmuxStreamRequest(TargetedRequest):
+    session: str
+    history: bool = Field(default=True, description="Start with the buffered recent output (pane scrollback first)")
+    offset: Optional[int] = Field(default=None, ge=0, description="Resume after this offset from an earlier event; overrides history")
+    watch: Optional[str] = Field(default=None, description="The watch id that came with offset; a different or expired watch restarts from history")
+    duration: Optional[float] = Field(default=None, gt=0, description=f"Seconds to follow; SSE streams run until disconnect when unset, tool calls default to {TMUX_COLLECT}")
+
 class TmuxResponse(BaseModel):
     ok: bool
     session: str
     detail: str
 
+class TmuxListResponse(BaseModel):
+    sessions: List[str]
+
+class TmuxStreamResponse(BaseModel):
+    session: str
+    output: str
+    offset: int
+    watch: Optional[str] = None   # pass back with offset; offsets only mean something within one watch
+    reset: bool = False           # the offset was from another watch, so output restarts from history
+    gap: int = 0                  # characters between the offset and the oldest buffered output that were lost
+    ended: Optional[str] = None
+
 def _full_session(name: str) -> str:
     return f"{SESSION_PREFIX}{name}"
 
+def _control(target: str, op: Callable[[TmuxControlSession], T]) -> Optional[T]:
+    # Through the target's resident tmux -C client; None means control mode is off or down, so exec tmux
+    if not TMUX_CONTROL_ENABLED:
+        return None
+    cli = use_client(target)
+    return get_tmux_control().request(cli.key, cli.cfg, op)
+
+def _send_keys_command(sess: str, keys: str, enter: bool) -> str:
+    # The same send-keys list the control client uses, as one tmux invocation (`\;` separates commands)
+    return "tmux " + " \\; ".join(command_line(args) for args in key_commands(f"={sess}:", keys, enter))
+
+def _listed(names: List[str]) -> TmuxListResponse:
+    return TmuxListResponse(sessions=sorted(n for n in names if n.startswith(SESSION_PREFIX) and n != CONTROL_SESSION))
+
 def tmux_ensure(req: TmuxEnsureRequest) -> TmuxResponse:
     sess = _full_session(req.session)
+    done = _control(req.target, lambda ctl: ctl.ensure(sess, req.cwd))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
     cli = use_client(req.target)
     with cli:
         # Check session exists
-        exists = cli.exec(f"tmux has-session -t {sess}", timeout=5)
+        exists = cli.exec(f"tmux has-session -t ={sess}", timeout=5)
         if exists.exit_code != 0:
             # Create session with shell
             create = cli.exec(f"tmux new-session -d -s {sess}", cwd=req.cwd)
@@ -41,23 +99,246 @@ def tmux_ensure(req: TmuxEnsureRequest) -> TmuxResponse:
 
 def tmux_send_keys(req: TmuxSendKeysRequest) -> TmuxResponse:
     sess = _full_session(req.session)
+    done = _control(req.target, lambda ctl: ctl.send_keys(sess, req.keys, req.enter))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
     cli = use_client(req.target)
     with cli:
-        cmd = f"tmux send-keys -t {sess} {repr(req.keys)}"
-        if req.enter:
-            cmd += " Enter"
-        r = cli.exec(cmd)
+        r = cli.exec(_send_keys_command(sess, req.keys, req.enter))
         ok = (r.exit_code == 0)
         return TmuxResponse(ok=ok, session=sess, detail=r.stderr or r.stdout)
 
 def tmux_kill(req: TmuxKillRequest) -> TmuxResponse:
     sess = _full_session(req.session)
+    done = _control(req.target, lambda ctl: ctl.kill(sess))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
     cli = use_client(req.target)
     with cli:
-        r = cli.exec(f"tmux kill-session -t {sess}")
+        r = cli.exec(f"tmux kill-session -t ={sess}")
         ok = (r.exit_code == 0)
         return TmuxResponse(ok=ok, session=sess, detail=r.stderr or r.stdout)
 
+def tmux_list(req: TmuxListRequest) -> TmuxListResponse:
+    names = _control(req.target, lambda ctl: ctl.list())
+    if names is None:
+        with use_client(req.target) as cli:
+            r = cli.exec(f"tmux {LIST_SESSIONS}", timeout=5)
+            names = r.stdout.split() if r.exit_code == 0 else []  # no server running: no sessions
+    return _listed(names)
+
+async def tmux_ensure_async(req: TmuxEnsureRequest) -> TmuxResponse:
+    sess = _full_session(req.session)
+    # The control channel is shared and serialized per target, so its round-trip stays in a worker thread
+    done = await run_blocking(_control, req.target, lambda ctl: ctl.ensure(sess, req.cwd))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
+    async with use_async_client(req.target) as cli:
+        exists = await cli.exec(f"tmux has-session -t ={sess}", timeout=5)
+        if exists.exit_code != 0:
+            create = await cli.exec(f"tmux new-session -d -s {sess}", cwd=req.cwd)
+            if create.exit_code != 0:
+                return TmuxResponse(ok=False, session=sess, detail=create.stderr or create.stdout)
+        return TmuxResponse(ok=True, session=sess, detail="ensured")
+
+async def tmux_send_keys_async(req: TmuxSendKeysRequest) -> TmuxResponse:
+    sess = _full_session(req.session)
+    done = await run_blocking(_control, req.target, lambda ctl: ctl.send_keys(sess, req.keys, req.enter))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
+    async with use_async_client(req.target) as cli:
+        r = await cli.exec(_send_keys_command(sess, req.keys, req.enter))
+        return TmuxResponse(ok=(r.exit_code == 0), session=sess, detail=r.stderr or r.stdout)
+
+async def tmux_kill_async(req: TmuxKillRequest) -> TmuxResponse:
+    sess = _full_session(req.session)
+    done = await run_blocking(_control, req.target, lambda ctl: ctl.kill(sess))
+    if done is not None:
+        return TmuxResponse(ok=done[0], session=sess, detail=done[1])
+    async with use_async_client(req.target) as cli:
+        r = await cli.exec(f"tmux kill-session -t ={sess}")
+        return TmuxResponse(ok=(r.exit_code == 0), session=sess, detail=r.stderr or r.stdout)
+
+async def tmux_list_async(req: TmuxListRequest) -> TmuxListResponse:
+    names = await run_blocking(_control, req.target, lambda ctl: ctl.list())
+    if names is None:
+        async with use_async_client(req.target) as cli:
+            r = await cli.exec(f"tmux {LIST_SESSIONS}", timeout=5)
+            names = r.stdout.split() if r.exit_code == 0 else []
+    return _listed(names)
+
+def _watch_command(sess: str) -> str:
+    # Scrollback first, then live pane output through a FIFO; the EXIT trap detaches the pipe again.
+    # cat sees EOF when the pane closes, so the channel ends with the session.
+    # Targets are exact (=name), so mcp_a never falls through to mcp_ab.
+    s, p = shlex.quote(f"={sess}"), shlex.quote(f"={sess}:")
+    return (
+        f"tmux has-session -t {s} 2>/dev/null || {{ echo {shlex.quote('no tmux session ' + sess)} >&2; exit 3; }}; "
+        f"tmux capture-pane -p -J -S -{TMUX_SCROLLBACK} -t {p}; "
+        f"f=$(mktemp -u /tmp/mcp_tmux.XXXXXX) && mkfifo -m 600 \"$f\" || exit 4; "
+        f"trap 'tmux pipe-pane -t {p} 2>/dev/null; rm -f \"$f\"' EXIT; trap 'exit 0' HUP INT TERM PIPE; "
+        f"tmux pipe-pane -t {p} \"exec cat > $f\" && cat \"$f\""
+    )
+
+class PaneWatcher:
+    """
+    Follows one tmux pane over a single persistent channel and keeps the last TMUX_RING_CHARS of
+    its output, so any number of subscribers (and late joiners) share one pipe-pane.
+    Offsets count characters since the watch started; id tells one watch of a pane from the next.
+    """
+
+    def __init__(self, target: str, session: str):
+        self.target = target
+        self.session = session
+        self.id = uuid.uuid4().hex[:12]
+        self.chunks: Deque[Tuple[int, str]] = deque()  # (offset, text)
+        self.size = 0
+        self.offset = 0
+        self.ended: Optional[str] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._linger: Optional[asyncio.TimerHandle] = None
+        self.task = asyncio.ensure_future(self._pump())
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def _append(self, text: str):
+        if not text:
+            return
+        self.chunks.append((self.offset, text))
+        self.offset += len(text)
+        self.size += len(text)
+        while self.size > TMUX_RING_CHARS and len(self.chunks) > 1:
+            self.size -= len(self.chunks.popleft()[1])
+        self._notify()
+
+    async def _pump(self):
+        err = []
+        try:
+            async with use_async_client(self.target, streams=True) as cli:
+                chunks = cli.exec_stream(_watch_command(self.session))
+                try:
+                    async for name, data in chunks:
+                        if name == "stdout":
+                            self._append(self._decoder.decode(data))
+                        elif name == "stderr":
+                            err.append(data)
+                        elif data != 0:
+                            self.ended = b"".join(err).decode("utf-8", errors="replace").strip() or f"exit {data}"
+                finally:
+                    await chunks.aclose()
+            self._append(self._decoder.decode(b"", True))
+            self.ended = self.ended or "session ended"
+        except asyncio.CancelledError:
+            self.ended = "stopped"
+        except Exception as e:
+            self.ended = str(e) or type(e).__name__
+        finally:
+            if _watchers.get((self.target, self.session)) is self:
+                del _watchers[(self.target, self.session)]
+            self._notify()
+
+    def first_offset(self) -> int:
+        return self.chunks[0][0] if self.chunks else self.offset
+
+    def since(self, offset: int) -> str:
+        return "".join(text[max(0, offset - start):] for start, text in self.chunks if start + len(text) > offset)
+
+    def subscribe(self):
+        self.subscribers += 1
+        if self._linger is not None:
+            self._linger.cancel()
+            self._linger = None
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+        if self.subscribers == 0 and self.ended is None:
+            self._linger = self.loop.call_later(TMUX_LINGER, self._stop_if_idle)
+
+    def _stop_if_idle(self):
+        if self.subscribers == 0:
+            self.task.cancel()
+
+_watchers: Dict[Tuple[str, str], PaneWatcher] = {}
+
+def watch_pane(target: str, session: str) -> PaneWatcher:
+    w = _watchers.get((target, session))
+    if w is None or w.ended is not None or w.loop is not asyncio.get_running_loop():
+        w = _watchers[(target, session)] = PaneWatcher(target, session)
+    return w
+
+def pane_watchers() -> Dict[str, Any]:
+    return {f"{t}/{s}": {"watch": w.id, "subscribers": w.subscribers, "offset": w.offset, "buffered": w.size, "ended": w.ended}
+            for (t, s), w in _watchers.items()}
+
+async def tmux_stream(req: TmuxStreamRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {"data": text, "offset": n, "watch": id} as the pane prints, then {"done": true, "reason": ...}
+    when the session ends or duration runs out. Pass the last offset and watch back to resume without gaps.
+    The first event carries "reset": true when that watch has ended (output restarts from history), or
+    "gap": n when n characters after the offset have already left the buffer.
+    """
+    use_async_client(req.target)  # unknown targets fail here, before a watcher is made
+    watcher = watch_pane(req.target, _full_session(req.session))
+    watcher.subscribe()
+    flags: Dict[str, Any] = {}
+    if req.offset is None:
+        offset = watcher.first_offset() if req.history else watcher.offset
+    elif (req.watch is not None and req.watch != watcher.id) or req.offset > watcher.offset:
+        # Counted by another watch of this pane: no position here matches it
+        offset = watcher.first_offset()
+        flags["reset"] = True
+    else:
+        offset = max(req.offset, watcher.first_offset())
+        if offset > req.offset:
+            flags["gap"] = offset - req.offset
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + req.duration if req.duration else None
+    try:
+        while True:
+            changed = watcher.changed
+            text = watcher.since(offset)
+            if text:
+                offset = watcher.offset
+                yield {"data": text, "offset": offset, "watch": watcher.id, **flags}
+                flags = {}
+            if watcher.ended is not None:
+                yield {"done": True, "reason": watcher.ended, "offset": offset, "watch": watcher.id, **flags}
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), deadline - loop.time() if deadline else None)
+            except asyncio.TimeoutError:
+                yield {"done": True, "reason": "duration", "offset": offset, "watch": watcher.id, **flags}
+                return
+    finally:
+        watcher.unsubscribe()
+
+def tmux_stream_event_name(evt: Dict[str, Any]) -> str:
+    return "done" if evt.get("done") else "output"
+
+async def tmux_stream_async(req: TmuxStreamRequest) -> TmuxStreamResponse:
+    if req.duration is None:
+        req = req.model_copy(update={"duration": TMUX_COLLECT})
+    parts = []
+    offset, ended, watch, reset, gap = 0, None, None, False, 0
+    async for evt in tmux_stream(req):
+        offset, watch = evt["offset"], evt["watch"]
+        reset, gap = reset or evt.get("reset", False), gap + evt.get("gap", 0)
+        if evt.get("done"):
+            ended = evt["reason"] if evt["reason"] != "duration" else None
+        else:
+            parts.append(evt["data"])
+    return TmuxStreamResponse(session=_full_session(req.session), output="".join(parts), offset=offset,
+                              watch=watch, reset=reset, gap=gap, ended=ended)
+
+def tmux_stream_collect(req: TmuxStreamRequest) -> TmuxStreamResponse:
+    # Blocking entry point (threadpool mode): the watcher lives only as long as this call's event loop
+    return asyncio.run(tmux_stream_async(req))
+
 TMUX_ENSURE_SCHEMA = {
     "name": "tmux_ensure",
     "description": "Ensure a tmux session exists (create if needed).",
@@ -93,4 +374,42 @@ TMUX_KILL_SCHEMA = {
         "required": ["target", "session"]
     },
     "output_schema": TMUX_ENSURE_SCHEMA["output_schema"]
-}
\ No newline at end of file
+}
+
+TMUX_LIST_SCHEMA = {
+    "name": "tmux_list",
+    "description": "List the tmux sessions this server manages (names start with 'mcp_').",
+    "input_schema": {
+        "type": "object",
+        "properties": {"target": {"type": "string"}},
+        "required": ["target"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {"sessions": {"type": "array", "items": {"type": "string"}}},
+        "required": ["sessions"]
+    }
+}
+
+TMUX_STREAM_SCHEMA = {
+    "name": "tmux_stream",
+    "description": "Read a tmux session's output: recent scrollback plus whatever it prints for `duration` seconds. Pass the returned offset and watch back to get only newer output; reset in the reply means the watch had ended and the output starts over from scrollback.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "target": {"type": "string"},
+            "session": {"type": "string"},
+            "history": {"type": "boolean"},
+            "offset": {"type": "integer", "minimum": 0},
+            "watch": {"type": "string"},
+            "duration": {"type": "number"},
+        },
+        "required": ["target", "session"]
+    },
+    "output_schema": {
+        "type": "object",
+        "properties": {"session": {"type": "string"}, "output": {"type": "string"}, "offset": {"type": "integer"}, "watch": {"type": "string"},
+                       "reset": {"type": "boolean"}, "gap": {"type": "integer"}, "ended": {"type": "string"}},
+        "required": ["session", "output", "offset"]
+    }
+}
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+GPIO agent that runs on the Raspberry Pi (copy it to the policy's agent_path).
+
+One-shot mode (spawned per operation):
+    python3 gpio_agent.py <base64 json {"op": ..., "data": {...}}>
+
+Resident mode (one process per target, newline-delimited JSON on stdin/stdout):
+    python3 -u gpio_agent.py --serve
+    -> {"ready": true, "pid": 1234}
+    <- {"id": 1, "op": "read", "data": {"pin": 17, "mode": "BCM"}}
+    -> {"id": 1, "ok": true, "op": "read", "pin": 17, "value": 0}
+
+Watch mode (stream pin changes until the channel closes or duration elapses):
+    python3 -u gpio_agent.py --watch <base64 json {"pins": [17, 18], "rate_hz": 50, "edge": false}>
+    -> {"t": 0, "s": {"17": 0, "18": 1}}     snapshot; t is ms since start
+    -> {"t": 412, "d": {"17": 1}}            only pins that changed
+    -> {"t": 5000}                           heartbeat
+    -> {"t": 9000, "end": true}
+"""
+
+import base64
+import json
+import os
+import queue
+import sys
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:  # not on a Pi
+    GPIO = None
+
+_mode = None
+
+
+def _setup(mode):
+    global _mode
+    mode = (mode or "BCM").upper()
+    if _mode != mode:
+        if _mode is not None:
+            GPIO.cleanup()
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM if mode == "BCM" else GPIO.BOARD)
+        _mode = mode
+
+
+def _pull(name):
+    return {"up": GPIO.PUD_UP, "down": GPIO.PUD_DOWN}.get(name or "off", GPIO.PUD_OFF)
+
+
+def op_write(d):
+    _setup(d.get("mode"))
+    pin, value = int(d["pin"]), 1 if int(d.get("value", 0)) else 0
+    GPIO.setup(pin, GPIO.OUT)
+    GPIO.output(pin, value)
+    return {"pin": pin, "value": value}
+
+
+def op_read(d):
+    _setup(d.get("mode"))
+    pin = int(d["pin"])
+    GPIO.setup(pin, GPIO.IN, pull_up_down=_pull(d.get("pull")))
+    return {"pin": pin, "value": int(GPIO.input(pin))}
+
+
+def op_pwm(d):
+    _setup(d.get("mode"))
+    pin = int(d["pin"])
+    GPIO.setup(pin, GPIO.OUT)
+    pwm = GPIO.PWM(pin, float(d.get("freq", 1000.0)))
+    pwm.start(float(d["duty"]))
+    time.sleep(float(d.get("duration", 0.2)))
+    pwm.stop()
+    return {"pin": pin, "duty": float(d["duty"]), "freq": float(d.get("freq", 1000.0))}
+
+
+def op_blink(d):
+    _setup(d.get("mode"))
+    pin = int(d["pin"])
+    GPIO.setup(pin, GPIO.OUT)
+    for _ in range(int(d.get("count", 5))):
+        GPIO.output(pin, 1)
+        time.sleep(float(d.get("on_time", 0.5)))
+        GPIO.output(pin, 0)
+        time.sleep(float(d.get("off_time", 0.5)))
+    return {"pin": pin, "count": int(d.get("count", 5))}
+
+
+def op_macro(d):
+    results = []
+    for step in d.get("steps", []):
+        results.append(handle({"op": step.get("op"), "data": step.get("data") or {}}))
+    return {"steps": results}
+
+
+OPS = {"write": op_write, "read": op_read, "pwm": op_pwm, "blink": op_blink, "macro": op_macro}
+
+
+def handle(req):
+    op = req.get("op")
+    fn = OPS.get(op)
+    if fn is None:
+        return {"ok": False, "op": op, "error": f"unknown op {op}"}
+    if GPIO is None:
+        return {"ok": False, "op": op, "error": "RPi.GPIO not available"}
+    try:
+        out = fn(req.get("data") or {})
+        out.update({"ok": True, "op": op})
+        return out
+    except Exception as e:
+        return {"ok": False, "op": op, "error": str(e)}
+
+
+def serve():
+    # Resident mode: keep the interpreter and RPi.GPIO loaded, one JSON object per line
+    sys.stdout.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            resp = {"ok": False, "error": f"invalid json: {e}"}
+        else:
+            resp = handle(req)
+            if "id" in req:
+                resp["id"] = req["id"]
+        sys.stdout.write(json.dumps(resp, separators=(",", ":")) + "\n")
+        sys.stdout.flush()
+    # No GPIO.cleanup() on EOF: the server restarting its channel must not reset the outputs it set
+
+
+def _emit(obj):
+    sys.stdout.write(json.dumps(obj, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+
+def watch(d):
+    # Sample (or listen for edges on) a set of pins and emit delta-encoded, timestamped events
+    if GPIO is None:
+        _emit({"ok": False, "error": "RPi.GPIO not available"})
+        return
+    _setup(d.get("mode"))
+    pins = [int(p) for p in d["pins"]]
+    for pin in pins:
+        GPIO.setup(pin, GPIO.IN, pull_up_down=_pull(d.get("pull")))
+    interval = 1.0 / max(0.1, min(float(d.get("rate_hz", 20)), 1000.0))
+    heartbeat = float(d.get("heartbeat", 5.0))
+    duration = float(d.get("duration") or 0)
+    start = time.monotonic()
+
+    def ms():
+        return int((time.monotonic() - start) * 1000)
+
+    last = {pin: int(GPIO.input(pin)) for pin in pins}
+    _emit({"t": 0, "s": {str(p): v for p, v in last.items()}})
+    edges = queue.Queue()
+    if d.get("edge"):
+        bounce = int(d.get("bounce_ms") or 0)
+        for pin in pins:
+            kwargs = {"callback": lambda ch: edges.put(ch)}
+            if bounce:
+                kwargs["bouncetime"] = bounce
+            GPIO.add_event_detect(pin, GPIO.BOTH, **kwargs)
+
+    last_emit = time.monotonic()
+    try:
+        while not duration or time.monotonic() - start < duration:
+            if d.get("edge"):
+                try:
+                    changed_pins = {edges.get(timeout=heartbeat)}
+                except queue.Empty:
+                    changed_pins = set()
+                while not edges.empty():
+                    changed_pins.add(edges.get_nowait())
+            else:
+                time.sleep(interval)
+                changed_pins = pins
+            delta = {}
+            for pin in changed_pins:
+                value = int(GPIO.input(pin))
+                if value != last[pin]:
+                    last[pin] = value
+                    delta[str(pin)] = value
+            if delta:
+                _emit({"t": ms(), "d": delta})
+                last_emit = time.monotonic()
+            elif time.monotonic() - last_emit >= heartbeat:
+                _emit({"t": ms()})
+                last_emit = time.monotonic()
+        _emit({"t": ms(), "end": True})
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass  # server closed the channel
+    finally:
+        if d.get("edge"):
+            for pin in pins:
+                GPIO.remove_event_detect(pin)
+
+
+def main(argv):
+    if len(argv) > 1 and argv[1] == "--serve":
+        serve()
+        return 0
+    if len(argv) > 2 and argv[1] == "--watch":
+        try:
+            d = json.loads(base64.b64decode(argv[2]).decode("utf-8"))
+        except Exception as e:
+            _emit({"ok": False, "error": f"invalid payload: {e}"})
+            return 1
+        watch(d)
+        return 0
+    try:
+        req = json.loads(base64.b64decode(argv[1]).decode("utf-8"))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": f"invalid payload: {e}"}))
+        return 1
+    print(json.dumps(handle(req)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+In-process SSH server for tests: runs exec requests with the local shell and serves
+SFTP straight from the local filesystem.
+Accepts any public key, so point a TargetConfig at it with make_target().
+SSHTestServer(latency=0.01) adds that one-way delay in each direction, like a Wi-Fi link.
+"""
+
+import collections
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+import paramiko
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from mcp_server.config import TargetConfig
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=_run, args=(channel, command.decode("utf-8")), daemon=True).start()
+        return True
+
+
+def _sftp_errors(func):
+    def wrapper(*args):
+        try:
+            return func(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+    return wrapper
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class _LocalSFTP(paramiko.SFTPServerInterface):
+    @_sftp_errors
+    def open(self, path, flags, attr):
+        fd = os.open(path, flags | getattr(os, "O_BINARY", 0), 0o644)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = _Handle(flags)
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    @_sftp_errors
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(path))
+
+    @_sftp_errors
+    def lstat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+
+    @_sftp_errors
+    def list_folder(self, path):
+        return [paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(path, n)), n) for n in os.listdir(path)]
+
+    @_sftp_errors
+    def remove(self, path):
+        os.remove(path)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def rename(self, oldpath, newpath):
+        if os.path.exists(newpath):
+            return paramiko.SFTP_FAILURE
+        os.rename(oldpath, newpath)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def posix_rename(self, oldpath, newpath):
+        os.rename(oldpath, newpath)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def mkdir(self, path, attr):
+        os.mkdir(path)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def rmdir(self, path):
+        os.rmdir(path)
+        return paramiko.SFTP_OK
+
+    def canonicalize(self, path):
+        # realpath, as OpenSSH's sftp-server resolves symlinks
+        return os.path.realpath(path)
+
+    @_sftp_errors
+    def chattr(self, path, attr):
+        if attr.st_mode is not None:
+            os.chmod(path, attr.st_mode)
+        return paramiko.SFTP_OK
+
+
+def _pump(src, send):
+    for chunk in iter(lambda: src.read1(32768), b""):
+        send(chunk)
+
+
+def _feed(channel, dst):
+    # Client stdin -> command stdin, closed when the client sends EOF or the channel goes away
+    try:
+        for chunk in iter(lambda: channel.recv(32768), b""):
+            dst.write(chunk)
+            dst.flush()
+    except Exception:
+        pass
+    finally:
+        try:
+            dst.close()
+        except Exception:
+            pass
+
+
+def _run(channel, command):
+    proc = subprocess.Popen(["/bin/sh", "-c", command], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    threading.Thread(target=_feed, args=(channel, proc.stdin), daemon=True).start()
+    err = threading.Thread(target=_pump, args=(proc.stderr, channel.sendall_stderr), daemon=True)
+    err.start()
+    try:
+        _pump(proc.stdout, channel.sendall)
+        err.join()
+        channel.send_exit_status(proc.wait())
+    except Exception:
+        proc.kill()  # client closed the channel
+    finally:
+        channel.close()
+
+
+def _delay_line(src, dst, latency):
+    # Forward bytes src -> dst, each chunk held back by latency without limiting throughput
+    pending = collections.deque()
+    ready = threading.Condition()
+
+    def reader():
+        while True:
+            try:
+                data = src.recv(65536)
+            except OSError:
+                data = b""
+            with ready:
+                pending.append((time.monotonic() + latency, data))
+                ready.notify()
+            if not data:
+                return
+
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        with ready:
+            while not pending:
+                ready.wait()
+            due, data = pending.popleft()
+        time.sleep(max(0.0, due - time.monotonic()))
+        if not data:
+            break
+        try:
+            dst.sendall(data)
+        except OSError:
+            break
+    for sock in (src, dst):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _LatencyProxy:
+    def __init__(self, port, latency):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        self._upstream = port
+        self._latency = latency
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            up = socket.create_connection(("127.0.0.1", self._upstream))
+            for a, b in ((conn, up), (up, conn)):
+                threading.Thread(target=_delay_line, args=(a, b, self._latency), daemon=True).start()
+
+    def close(self):
+        self._sock.close()
+
+
+class SSHTestServer:
+    def __init__(self, latency: float = 0.0):
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        self.transports = []
+        self._dir = tempfile.TemporaryDirectory()
+        self.key_path = os.path.join(self._dir.name, "id_ed25519")
+        pem = ed25519.Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.OpenSSH, serialization.NoEncryption())
+        with open(self.key_path, "wb") as f:
+            f.write(pem)
+        threading.Thread(target=self._accept, daemon=True).start()
+        self._proxy = _LatencyProxy(self.port, latency) if latency else None
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            t = paramiko.Transport(conn)
+            t.add_server_key(self._host_key)
+            t.set_subsystem_handler("sftp", paramiko.SFTPServer, _LocalSFTP)
+            t.start_server(server=_Server())
+            self.transports.append(t)
+
+    def make_target(self) -> TargetConfig:
+        port = self._proxy.port if self._proxy else self.port
+        return TargetConfig(host="127.0.0.1", port=port, username="test", private_key_path=self.key_path)
+
+    def close(self):
+        self._sock.close()
+        if self._proxy:
+            self._proxy.close()
+        for t in self.transports:
+            t.close()
+        self._dir.cleanup()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test POST /tools/batch: one connection per target, targets in parallel, ordering and dependencies
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+
+
+SSH_TARGETS = ("a", "b")
+
+
+@pytest.fixture
+def client(ssh_config):
+    return TestClient(main.app)
+
+
+def _exec(target, command, **extra):
+    return {"name": "ssh_exec", "arguments": {"target": target, "command": command}, **extra}
+
+
+def test_batch_groups_by_target_and_runs_targets_in_parallel(client):
+    calls = [_exec("a", "sleep 0.4; echo a1"), _exec("b", "sleep 0.4; echo b1"),
+             _exec("a", "echo a2"), _exec("b", "sleep 0.4; echo b2")]
+    r = client.post("/tools/batch", json={"calls": calls})
+    assert r.status_code == 200
+    body = r.json()
+    assert [c["result"]["stdout"] for c in body["results"]] == ["a1\n", "b1\n", "a2\n", "b2\n"]
+    assert (body["ok"], body["failed"], body["skipped"]) == (4, 0, 0)
+    assert set(body["connect"]) == {"a", "b"}
+    # b's two calls ran in order (~0.8s) while a ran alongside, not 4 calls back to back
+    assert body["results"][3]["start"] >= body["results"][1]["start"] + 0.4
+    assert body["elapsed"] < 1.6
+    assert ssh_transport.get_pool().stats()["connects"] == 2
+
+
+def test_batch_dependencies_and_errors(client):
+    calls = [
+        _exec("a", "exit 0", id="ok"),
+        {"name": "nope", "arguments": {"target": "a"}, "id": "bad"},
+        _exec("a", "echo after-bad", depends_on=["bad"]),
+        _exec("a", "echo after-ok", depends_on=["ok"]),
+        {"name": "ssh_exec", "arguments": {"target": "b"}},
+    ]
+    body = client.post("/tools/batch", json={"calls": calls}).json()
+    status = [c["status"] for c in body["results"]]
+    assert status == ["ok", "error", "skipped", "ok", "error"]
+    assert "Unknown tool" in body["results"][1]["error"]
+    assert "missing required parameters: command" in body["results"][4]["error"]
+    assert body["results"][3]["result"]["stdout"] == "after-ok\n"
+
+
+def test_batch_stop_on_error_skips_rest_of_target(client):
+    calls = [{"name": "nope", "arguments": {"target": "a"}}, _exec("a", "echo a"), _exec("b", "echo b")]
+    body = client.post("/tools/batch", json={"calls": calls, "stop_on_error": True}).json()
+    assert [c["status"] for c in body["results"]] == ["error", "skipped", "ok"]
+    body = client.post("/tools/batch", json={"calls": calls}).json()
+    assert [c["status"] for c in body["results"]] == ["error", "ok", "ok"]
+
+
+def test_batch_failed_results_count_as_errors(client):
+    calls = [_exec("a", "echo oops >&2; exit 3", id="fails"), _exec("b", "echo never", depends_on=["fails"]),
+             _exec("b", "echo b")]
+    body = client.post("/tools/batch", json={"calls": calls}).json()
+    assert [c["status"] for c in body["results"]] == ["error", "skipped", "ok"]
+    failed = body["results"][0]
+    assert failed["error"] == "exit code 3" and failed["result"]["stderr"] == "oops\n"
+    assert (body["ok"], body["failed"], body["skipped"]) == (1, 1, 1)
+
+
+def test_batch_rejects_bad_dependencies(client):
+    r = client.post("/tools/batch", json={"calls": [_exec("a", "true", depends_on=["later"]), _exec("a", "true", id="later")]})
+    assert r.status_code == 400 and "earlier call" in r.json()["detail"]
+    r = client.post("/tools/batch", json={"calls": [_exec("a", "true", id="x"), _exec("a", "true", id="x")]})
+    assert r.status_code == 400 and "duplicate id" in r.json()["detail"]
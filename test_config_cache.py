@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test hosts.yaml caching in load_config
+"""
+
+import os
+
+from mcp_server.config import FileCache, load_config, reload_config, _parse_config
+
+HOSTS = """targets:
+  pi-lan:
+    host: {host}
+    username: pi
+    private_key_path: /dev/null
+"""
+
+
+def test_load_config_cached_until_file_changes(tmp_path):
+    path = tmp_path / "hosts.yaml"
+    path.write_text(HOSTS.format(host="10.0.0.1"))
+
+    cfg1 = load_config(str(path))
+    cfg2 = load_config(str(path))
+    assert cfg1 is cfg2
+
+    # Different size and a bumped mtime invalidate the entry
+    path.write_text(HOSTS.format(host="10.0.0.200"))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    cfg3 = load_config(str(path))
+    assert cfg3 is not cfg1
+    assert cfg3.targets["pi-lan"].host == "10.0.0.200"
+
+    cfg4 = reload_config(str(path))
+    assert cfg4 is not cfg3
+
+
+def test_file_cache_counts_parses_and_hits(tmp_path):
+    path = tmp_path / "hosts.yaml"
+    path.write_text(HOSTS.format(host="10.0.0.1"))
+    cache = FileCache(_parse_config)
+
+    for _ in range(5):
+        cache.get(str(path))
+    assert cache.stats()["parses"] == 1
+    assert cache.stats()["hits"] == 4
+
+    cache.invalidate(str(path))
+    cache.get(str(path))
+    assert cache.stats()["parses"] == 2
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test fleet fan-out: target selection, concurrency limit, partial failures and streamed results
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, registry
+from mcp_server.config import AppConfig, TargetConfig, select_targets
+from mcp_server.tools import fleet
+from mcp_server.tools.fleet import FleetRunRequest, fleet_run_async, fleet_run_stream
+from mcp_server.tools.ssh_exec import SSHExecResponse
+
+
+def _target(**labels):
+    return TargetConfig(host="h", username="u", private_key_path="k", labels=labels)
+
+
+CFG = AppConfig(targets={
+    "pi-1": _target(role="kiosk", site="lab"),
+    "pi-2": _target(role="kiosk", site="shop"),
+    "pi-3": _target(role="kiosk", site="shop", camera=True),
+    "pi-4": _target(role="sensor"),
+})
+
+
+@pytest.fixture
+def fake_exec(monkeypatch):
+    monkeypatch.setattr(fleet, "load_config", lambda: CFG)
+    monkeypatch.setattr(main, "load_config", lambda: CFG)
+    state = {"running": 0, "peak": 0}
+
+    async def fake(req):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            delay = {"pi-1": 0.3, "pi-2": 0.05, "pi-3": 0.1, "pi-4": 0.0}[req.target]
+            await asyncio.sleep(delay)
+            if req.target == "pi-4":
+                raise ConnectionError("host unreachable")
+            return SSHExecResponse(stdout=req.target, stderr="", exit_code=1 if req.target == "pi-3" else 0)
+        finally:
+            state["running"] -= 1
+
+    monkeypatch.setattr(registry.get_tool("ssh_exec"), "async_handler", fake)
+    return state
+
+
+def test_select_targets():
+    assert select_targets(CFG, "role=kiosk") == ["pi-1", "pi-2", "pi-3"]
+    assert select_targets(CFG, "role=kiosk, site!=lab") == ["pi-2", "pi-3"]
+    assert select_targets(CFG, "camera") == ["pi-3"]
+    assert select_targets(CFG, "!site") == ["pi-4"]
+    assert select_targets(CFG, "camera=True") == ["pi-3"]
+
+
+def test_fan_out_streams_in_completion_order(fake_exec):
+    req = FleetRunRequest(tool="ssh_exec", arguments={"command": "uptime"}, selector="role", concurrency=2)
+
+    async def go():
+        return [evt async for evt in fleet_run_stream(req)]
+
+    events = asyncio.run(go())
+    assert [e["target"] for e in events[:-1]] == ["pi-2", "pi-3", "pi-4", "pi-1"]
+    assert events[-1]["done"] and events[-1]["succeeded"] == ["pi-2", "pi-1"]
+    assert events[-1]["failed"] == ["pi-3", "pi-4"]
+    assert events[2]["error"] == "host unreachable"
+    assert fake_exec["peak"] == 2
+
+
+def test_fleet_response_keeps_target_order_and_timeouts(fake_exec):
+    req = FleetRunRequest(tool="ssh_exec", arguments={"command": "uptime"}, targets=["pi-1", "pi-2", "pi-4"], timeout=0.2)
+    r = asyncio.run(fleet_run_async(req))
+    assert [x.target for x in r.results] == ["pi-1", "pi-2", "pi-4"]
+    assert r.succeeded == ["pi-2"] and r.failed == ["pi-1", "pi-4"]
+    assert "timed out" in r.results[0].error
+
+    with pytest.raises(ValueError):
+        asyncio.run(fleet_run_async(FleetRunRequest(tool="ssh_exec", arguments={}, targets=["pi-1"])))
+    with pytest.raises(ValueError):
+        asyncio.run(fleet_run_async(FleetRunRequest(tool="fleet_run", targets=["pi-1"])))
+    with pytest.raises(ValueError):
+        asyncio.run(fleet_run_async(FleetRunRequest(tool="ssh_exec", arguments={"command": "x"}, targets=["nope"])))
+
+
+def test_fleet_routes(fake_exec):
+    client = TestClient(main.app)
+    body = {"tool": "ssh_exec", "arguments": {"command": "uptime"}, "selector": "site=shop"}
+    r = client.post("/tools/fleet_run", json=body)
+    assert r.status_code == 200 and r.json()["succeeded"] == ["pi-2"] and r.json()["failed"] == ["pi-3"]
+
+    with client.stream("POST", "/tools/fleet_run/stream", json=body) as r:
+        text = "".join(r.iter_text())
+    events = [line.split(": ", 1)[1] for line in text.splitlines() if line.startswith("event: ")]
+    assert events == ["result", "result", "done"]
+    data = [json.loads(line.split(": ", 1)[1]) for line in text.splitlines() if line.startswith("data: ")]
+    assert data[0]["target"] == "pi-2"
+
+    assert client.post("/tools/fleet_run/stream", json={"tool": "ssh_exec", "selector": "role=none"}).status_code == 400
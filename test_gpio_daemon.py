@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test the resident GPIO agent protocol and the spawn fallback
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mcp_server import gpio_daemon
+from mcp_server.config import TargetConfig
+
+
+def test_agent_serve_protocol():
+    # Off-Pi the agent answers with an error, but the NDJSON framing is what we check
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "scripts/gpio_agent.py", "--serve"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        hello = json.loads(proc.stdout.readline())
+        assert hello["ready"] is True
+        for rid in (1, 2):
+            proc.stdin.write(json.dumps({"id": rid, "op": "read", "data": {"pin": 17}}) + "\n")
+            proc.stdin.flush()
+            resp = json.loads(proc.stdout.readline())
+            assert resp["id"] == rid
+            assert resp["op"] == "read"
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=5)
+
+
+def test_manager_falls_back_and_backs_off(monkeypatch):
+    starts = []
+
+    class BrokenSession:
+        def __init__(self, key, cfg, agent_path):
+            starts.append(key)
+            raise gpio_daemon.DaemonUnavailable("no --serve")
+
+    monkeypatch.setattr(gpio_daemon, "GPIODaemonSession", BrokenSession)
+    mgr = gpio_daemon.GPIODaemonManager()
+    cfg = TargetConfig(host="10.0.0.1", username="pi", private_key_path="/dev/null")
+
+    assert mgr.request("pi-lan", cfg, "/a.py", {"op": "read", "data": {}}) is None
+    assert mgr.request("pi-lan", cfg, "/a.py", {"op": "read", "data": {}}) is None
+    assert starts == ["pi-lan"]
+    assert "pi-lan" in mgr.stats()["backoff"]
+
+
+def test_manager_reuses_live_session(monkeypatch):
+    class EchoSession:
+        def __init__(self, key, cfg, agent_path):
+            self.cfg, self.agent_path, self.calls = cfg, agent_path, 0
+
+        def alive(self):
+            return True
+
+        def request(self, payload, timeout):
+            self.calls += 1
+            return {"ok": True, "op": payload["op"], "n": self.calls}
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(gpio_daemon, "GPIODaemonSession", EchoSession)
+    mgr = gpio_daemon.GPIODaemonManager()
+    cfg = TargetConfig(host="10.0.0.1", username="pi", private_key_path="/dev/null")
+
+    assert mgr.request("pi-lan", cfg, "/a.py", {"op": "write"})["n"] == 1
+    assert mgr.request("pi-lan", cfg, "/a.py", {"op": "write"})["n"] == 2
+
+
+def test_op_seconds_and_long_ops_skip_the_resident_channel(monkeypatch):
+    from mcp_server.tools import gpio_tools
+
+    blink = {"op": "blink", "data": {"count": 10, "on_time": 0.5, "off_time": 0.5}}
+    macro = {"op": "macro", "data": {"steps": [{"op": "write", "data": {}}, {"op": "pwm", "data": {"duration": 2}}]}}
+    assert gpio_daemon.op_seconds(blink) == 10 and gpio_daemon.op_seconds(macro) == 2
+    assert gpio_daemon.request_timeout(blink) == gpio_daemon.DAEMON_REQUEST_TIMEOUT + 10
+    cfg = TargetConfig(host="10.0.0.1", username="pi", private_key_path="/dev/null")
+    monkeypatch.setattr(gpio_tools, "load_config", lambda: type("Cfg", (), {"targets": {"pi": cfg}})())
+    assert gpio_tools._daemon_target("pi", {}, {"op": "read", "data": {"pin": 17}}) is cfg
+    assert gpio_tools._daemon_target("pi", {}, blink) is None
+    assert gpio_tools._daemon_target("pi", {}, macro) is None
+
+
+def test_serve_keeps_outputs_on_eof(tmp_path):
+    # A stand-in RPi.GPIO that logs every call
+    pkg = tmp_path / "RPi"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "GPIO.py").write_text(
+        "import os\n"
+        "BCM, BOARD, OUT, IN, PUD_UP, PUD_DOWN, PUD_OFF = 11, 10, 0, 1, 22, 21, 20\n"
+        "def _log(name):\n"
+        "    with open(os.environ['GPIO_LOG'], 'a') as f:\n"
+        "        f.write(name + '\\n')\n"
+        "def __getattr__(name):\n"
+        "    return lambda *a, **k: _log(name)\n")
+    log = tmp_path / "gpio.log"
+    env = dict(os.environ, PYTHONPATH=str(tmp_path), GPIO_LOG=str(log))
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "scripts/gpio_agent.py", "--serve"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env,
+    )
+    try:
+        assert json.loads(proc.stdout.readline())["ready"] is True
+        proc.stdin.write(json.dumps({"id": 1, "op": "write", "data": {"pin": 17, "value": 1}}) + "\n")
+        proc.stdin.flush()
+        assert json.loads(proc.stdout.readline())["ok"] is True
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=5)
+    assert "output" in log.read_text().split() and "cleanup" not in log.read_text().split()
+
+
+# Resident agent stand-in: answers each request in order, "sleep" ops after data.s seconds
+FAKE_SERVE = f'''#!{sys.executable}
+import json, sys, time
+print(json.dumps({{"ready": True}}), flush=True)
+for line in sys.stdin:
+    req = json.loads(line)
+    if req["op"] == "sleep":
+        time.sleep(req["data"]["s"])
+    print(json.dumps({{"id": req["id"], "ok": True, "op": req["op"]}}), flush=True)
+'''
+
+
+def test_late_answer_keeps_the_session(ssh_server, tmp_path):
+    agent = tmp_path / "agent.py"
+    agent.write_text(FAKE_SERVE)
+    agent.chmod(0o755)
+    mgr = gpio_daemon.GPIODaemonManager()
+    try:
+        cfg = ssh_server.make_target()
+        with pytest.raises(TimeoutError, match="did not answer within 0.2s"):
+            mgr.request("pi", cfg, str(agent), {"op": "sleep", "data": {"s": 0.6}}, timeout=0.2)
+        # The late answer to the sleep is skipped; the same agent answers the next request
+        assert mgr.request("pi", cfg, str(agent), {"op": "read", "data": {}}) == {"ok": True, "op": "read"}
+        assert mgr.stats()["sessions"] == ["pi"]
+    finally:
+        mgr.close_all()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the precompiled GPIO policy index
+"""
+
+import functools
+
+import pytest
+
+from mcp_server.tools import gpio_tools
+from mcp_server.tools.gpio_tools import GPIOTargetPolicy
+
+RAW = {
+    "agent_path": "/home/pi/gpio_agent.py",
+    "default_mode": "BCM",
+    "allowed_pins": {"BCM": [17, 18], "BOARD": ["11"]},
+    "capabilities": {"17": ["read", "write"], "18": ["read", "write", "pwm"], "11": ["read"]},
+}
+
+
+def test_policy_validate():
+    pol = GPIOTargetPolicy(RAW)
+    assert pol.allowed["BCM"] == frozenset({17, 18})
+    assert pol.validate(18, None, "pwm") == "BCM"
+    assert pol.validate(11, "board", "read") == "BOARD"
+    with pytest.raises(ValueError, match="not allowed"):
+        pol.validate(4, "BCM", "read")
+    with pytest.raises(ValueError, match="lacks capability 'pwm'"):
+        pol.validate(17, "BCM", "pwm")
+    with pytest.raises(ValueError, match="BCM or BOARD"):
+        pol.validate(17, "WIRING", "read")
+
+
+def test_policy_is_immutable():
+    pol = GPIOTargetPolicy(RAW)
+    with pytest.raises(AttributeError):
+        pol.default_mode = "BOARD"
+    with pytest.raises(TypeError):
+        pol.caps[17] = 0
+
+
+def test_index_swaps_when_policies_change(tmp_path, monkeypatch):
+    from mcp_server import config
+
+    path = tmp_path / "policies.yaml"
+    path.write_text("gpio:\n  targets:\n    pi-lan:\n      allowed_pins:\n        BCM: [17]\n      capabilities:\n        '17': [read]\n")
+    # _gpio_index looks load_policies up on each call, so it reads this file through the real cache
+    monkeypatch.setattr(config, "load_policies", functools.partial(config.load_policies, str(path)))
+
+    first = gpio_tools._gpio_index()
+    assert gpio_tools._gpio_index() is first
+    gpio_tools._validate_pin("pi-lan", 17, "", "read")
+
+    path.write_text("gpio:\n  targets:\n    pi-lan:\n      allowed_pins:\n        BCM: [17, 27]\n      capabilities:\n        '27': [write]\n")
+    second = gpio_tools._gpio_index()
+    assert second is not first
+    gpio_tools._validate_pin("pi-lan", 27, "BCM", "write")
+
+
+def test_validate_pins_reports_all_bad_pins(monkeypatch):
+    monkeypatch.setattr(gpio_tools, "_gpio_index", lambda: {"pi-lan": GPIOTargetPolicy(RAW)})
+    mode, raw = gpio_tools._validate_pins("pi-lan", [17, 18], None, "write")
+    assert mode == "BCM" and raw is RAW
+    with pytest.raises(ValueError) as exc:
+        gpio_tools._validate_pins("pi-lan", [17, 4, 5], None, "read")
+    assert "pin 4" in str(exc.value) and "pin 5" in str(exc.value)
+
+
+def test_read_many_single_agent_payload(monkeypatch):
+    monkeypatch.setattr(gpio_tools, "_gpio_index", lambda: {"pi-lan": GPIOTargetPolicy(RAW)})
+    sent = []
+
+    def fake_run_agent(target, pol, payload):
+        sent.append(payload)
+        steps = [{"ok": True, "op": "read", "pin": s["data"]["pin"], "value": 1} for s in payload["data"]["steps"]]
+        return gpio_tools.GPIOSimpleResponse(ok=True, result={"ok": True, "steps": steps})
+
+    monkeypatch.setattr(gpio_tools, "_run_agent", fake_run_agent)
+    resp = gpio_tools.gpio_read_many(gpio_tools.GPIOReadManyRequest(target="pi-lan", pins=[17, 18]))
+    assert resp.ok and resp.values == {17: 1, 18: 1}
+    assert len(sent) == 1 and sent[0]["op"] == "macro"
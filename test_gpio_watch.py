@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test GPIO watch: one shared agent channel per pin set, counted apart from the exec channel slots
+"""
+
+import asyncio
+import json
+import stat
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+from mcp_server.tools import common, gpio_tools
+from mcp_server.tools.gpio_tools import GPIOTargetPolicy, GPIOWatchRequest, gpio_sample, gpio_watch
+
+# Watch mode only: pin values come from $PINS_FILE (JSON), every start is logged
+FAKE_AGENT = f'''#!{sys.executable}
+import base64, json, os, sys, time
+d = json.loads(base64.b64decode(sys.argv[2]))
+with open(os.environ["AGENT_LOG"], "a") as log:
+    log.write(json.dumps(d["pins"]) + "\\n")
+
+def values():
+    with open(os.environ["PINS_FILE"]) as f:
+        pins = json.load(f)
+    return {{str(p): pins.get(str(p), 0) for p in d["pins"]}}
+
+start = time.monotonic()
+last = values()
+print(json.dumps({{"t": 0, "s": last}}), flush=True)
+try:
+    while time.monotonic() - start < 20:
+        time.sleep(0.05)
+        now = values()
+        delta = {{k: v for k, v in now.items() if last[k] != v}}
+        last = now
+        print(json.dumps({{"t": int((time.monotonic() - start) * 1000), "d": delta}} if delta else {{"t": 0, "hb": 1}}), flush=True)
+except BrokenPipeError:
+    os._exit(0)
+'''
+
+
+@pytest.fixture
+def pi(ssh_config, monkeypatch, tmp_path):
+    agent = tmp_path / "gpio_agent.py"
+    agent.write_text(FAKE_AGENT)
+    agent.chmod(agent.stat().st_mode | stat.S_IEXEC)
+    pins = tmp_path / "pins.json"
+    pins.write_text("{}")
+    log = tmp_path / "agent.log"
+    log.write_text("")
+    monkeypatch.setenv("PINS_FILE", str(pins))
+    monkeypatch.setenv("AGENT_LOG", str(log))
+    monkeypatch.setattr(ssh_transport, "_pool", ssh_transport.SSHConnectionPool(max_channels=1, channel_wait=2, max_streams=2))
+    policy = GPIOTargetPolicy({"agent_path": str(agent), "allowed_pins": {"BCM": [17, 18, 27]},
+                               "capabilities": {17: ["read"], 18: ["read"], 27: ["read"]}})
+    monkeypatch.setattr(gpio_tools, "_gpio_index", lambda: {"pi": policy})
+
+    def set_pins(**values):
+        pins.write_text(json.dumps({k.lstrip("p"): v for k, v in values.items()}))
+
+    def agents():
+        return [json.loads(line) for line in log.read_text().splitlines()]
+
+    yield type("Pi", (), {"set_pins": staticmethod(set_pins), "agents": staticmethod(agents)})
+
+
+async def _next(stream, timeout=5):
+    return await asyncio.wait_for(stream.__anext__(), timeout)
+
+
+def test_subscribers_share_one_agent(pi):
+    pi.set_pins(p17=0, p27=1)
+
+    async def go():
+        a = gpio_watch(GPIOWatchRequest(target="pi", pins=[17, 27]))
+        first = await _next(a)
+        pi.set_pins(p17=1, p27=1)
+        delta = await _next(a)
+        b = gpio_watch(GPIOWatchRequest(target="pi", pins=[27, 17], heartbeat=0.2))
+        joined = await _next(b)
+        pi.set_pins(p17=1, p27=0)
+        both = [await _next(a), await _next(b)]
+        beat = await _next(b)
+        await a.aclose()
+        await b.aclose()
+        return first, delta, joined, both, beat
+
+    first, delta, joined, both, beat = asyncio.run(go())
+    assert first == {"t": 0, "s": {"17": 0, "27": 1}} and delta["d"] == {"17": 1}
+    # A late subscriber starts from the current values, on the same agent
+    assert joined["s"] == {"17": 1, "27": 1} and joined["t"] == 0
+    assert [e["d"] for e in both] == [{"27": 0}, {"27": 0}]
+    assert set(beat) == {"t"}
+    assert pi.agents() == [[17, 27]]
+
+
+def test_streams_do_not_take_exec_slots(pi):
+    async def go():
+        watches = [gpio_watch(GPIOWatchRequest(target="pi", pins=p)) for p in ([17], [18])]
+        for w in watches:
+            await _next(w)
+        # The only exec slot is free while both watches run
+        async with common.use_async_client("pi") as cli:
+            r = await cli.exec("echo hi")
+        # Past the stream cap the watch fails at once instead of waiting
+        extra = await gpio_sample(GPIOWatchRequest(target="pi", pins=[27], duration=1))
+        for w in watches:
+            await w.aclose()
+        return r, extra
+
+    r, extra = asyncio.run(go())
+    assert r.stdout == "hi\n"
+    assert extra == [{"ok": False, "error": "stream slots exhausted on pi#streams: all 2 stayed in use for 0s"}]
+
+
+def test_sse_route(pi):
+    pi.set_pins(p18=1)
+    with TestClient(main.app) as client:
+        params = {"target": "pi", "pins": "18", "duration": 0.5, "heartbeat": 0.2}
+        with client.stream("GET", "/tools/gpio/watch", params=params) as r:
+            text = "".join(r.iter_text())
+        assert client.get("/tools/gpio/watch", params={"target": "pi", "pins": "4"}).status_code == 400
+    names = [line for line in text.splitlines() if line.startswith("event: ")]
+    assert names[0] == "event: snapshot" and names[-1] == "event: end" and "event: heartbeat" in names
+    data = [json.loads(line[len("data: "):]) for line in text.splitlines() if line.startswith("data: ")]
+    assert data[0]["s"] == {"18": 1}
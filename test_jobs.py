@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test background jobs: submit/poll, per-target queues, live logs, cancellation and the persistent store
+"""
+
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import jobs, main
+from mcp_server.jobs import JobManager, JobRecord, JobStore
+
+
+SSH_TARGETS = ("a", "b")
+
+
+@pytest.fixture
+def client(ssh_config, monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "_manager", JobManager(JobStore(str(tmp_path / "jobs.db"))))
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _submit(client, target, command):
+    r = client.post("/jobs", json={"tool": "ssh_exec", "arguments": {"target": target, "command": command}})
+    assert r.status_code == 202
+    return r.json()
+
+
+def _wait(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_submit_returns_at_once_and_result_is_kept(client):
+    start = time.monotonic()
+    job = _submit(client, "a", "echo one; sleep 0.5; echo two >&2")
+    assert job["status"] == "queued" and time.monotonic() - start < 0.4
+    done = _wait(client, job["id"])
+    assert done["status"] == "succeeded" and done["result"]["stdout"] == "one\n"
+    logs = client.get(f"/jobs/{job['id']}/logs").json()
+    assert logs["entries"] == [{"stream": "stdout", "data": "one\n"}, {"stream": "stderr", "data": "two\n"}]
+    assert client.get(f"/jobs/{job['id']}/logs", params={"offset": logs["offset"]}).json()["entries"] == []
+    failed = _wait(client, _submit(client, "a", "exit 3")["id"])
+    assert failed["status"] == "failed" and failed["result"]["exit_code"] == 3
+    assert [j["id"] for j in client.get("/jobs", params={"target": "a"}).json()["jobs"]] == [failed["id"], job["id"]]
+
+
+def test_same_target_jobs_queue_other_targets_run_alongside(client):
+    a1 = _submit(client, "a", "sleep 0.4")
+    a2 = _submit(client, "a", "true")
+    b1 = _submit(client, "b", "true")
+    a1, a2, b1 = (_wait(client, j["id"]) for j in (a1, a2, b1))
+    assert a2["started"] >= a1["finished"]
+    assert b1["finished"] < a1["finished"]
+
+
+def test_cancel_running_and_queued_jobs(client, tmp_path):
+    pid_file = tmp_path / "sleep.pid"
+    running = _submit(client, "a", f"sleep 30 & echo $! > {pid_file}; echo started; wait")
+    queued = _submit(client, "a", "echo never")
+    deadline = time.monotonic() + 5
+    while not client.get(f"/jobs/{running['id']}/logs").json()["entries"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    r = client.post(f"/jobs/{queued['id']}/cancel")
+    assert r.json()["status"] == "cancelled"
+    start = time.monotonic()
+    cancelled = client.post(f"/jobs/{running['id']}/cancel").json()
+    assert cancelled["status"] == "cancelled" and time.monotonic() - start < 3
+    # The remote command and its children are stopped, not just cut off from the channel
+    assert cancelled["error"].startswith("cancelled; signalled ")
+    sleeper = f"/proc/{pid_file.read_text().strip()}"
+    deadline = time.monotonic() + 3
+    while os.path.exists(sleeper) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not os.path.exists(sleeper)
+    assert client.post(f"/jobs/{running['id']}/cancel").status_code == 409
+    assert client.get(f"/jobs/{running['id']}/logs").json()["entries"][0]["data"] == "started\n"
+    assert client.get("/jobs/nope").status_code == 404
+
+
+def test_stream_logs_then_done(client):
+    job = _submit(client, "a", "for i in 1 2 3; do echo $i; sleep 0.1; done")
+    with client.stream("GET", f"/jobs/{job['id']}/logs/stream") as r:
+        text = "".join(r.iter_text())
+    events = [line[len("event: "):].strip() for line in text.splitlines() if line.startswith("event: ")]
+    data = [json.loads(line[len("data: "):]) for line in text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "done" and set(events[:-1]) == {"log"}
+    assert "".join(d["data"] for d in data[:-1]) == "1\n2\n3\n"
+    assert data[-1]["status"] == "succeeded"
+
+
+def test_submit_validation(client):
+    assert client.post("/jobs", json={"tool": "nope"}).status_code == 400
+    r = client.post("/jobs", json={"tool": "ssh_exec", "arguments": {"target": "a"}})
+    assert r.status_code == 400 and "command" in r.json()["detail"]
+
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    done = JobRecord(id="j1", tool="ssh_exec", target="a", arguments={}, status="succeeded", created=1.0,
+                     result={"exit_code": 0})
+    store.save(done, [("stdout", "hi\n")])
+    store.save(JobRecord(id="j2", tool="ssh_exec", target="a", arguments={}, status="running", created=2.0))
+    manager = JobManager(JobStore(path))
+    assert manager.get("j1").result == {"exit_code": 0}
+    assert manager.logs("j1").entries == [{"stream": "stdout", "data": "hi\n"}]
+    j2 = manager.get("j2")
+    assert j2.status == "failed" and "restarted" in j2.error
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test journal_tail: remote-side filters, incremental parsing into compact entries, follow mode and cursor resume
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+from mcp_server.tools.journal import JournalTailRequest, journal_command, journal_stream, journal_tail, journal_tail_async, parse_entry
+
+# Prints the JSON lines of $JOURNAL_FILE the way journalctl -o json would: --lines, --after-cursor, --follow
+FAKE_JOURNALCTL = f'''#!{sys.executable}
+import json, os, sys, time
+args = sys.argv[1:]
+with open(os.environ["JOURNAL_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+opts = dict(a[2:].split("=", 1) for a in args if a.startswith("--") and "=" in a)
+if opts.get("grep") == "(":
+    sys.exit("Failed to compile pattern")
+f = open(os.environ["JOURNAL_FILE"])
+lines = f.read().splitlines()
+if "after-cursor" in opts:
+    cursors = [json.loads(l)["__CURSOR"] for l in lines]
+    lines = lines[cursors.index(opts["after-cursor"]) + 1:]
+elif "lines" in opts:
+    lines = lines[len(lines) - int(opts["lines"]):]
+for line in lines:
+    print(line, flush=True)
+deadline = time.time() + 20
+while "--follow" in args and time.time() < deadline:
+    line = f.readline()
+    if line:
+        print(line, end="", flush=True)
+    else:
+        time.sleep(0.05)
+'''
+
+
+@pytest.fixture
+def journal(ssh_config, monkeypatch, tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "journalctl"
+    script.write_text(FAKE_JOURNALCTL)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    path = tmp_path / "journal"
+    path.write_text("")
+    log = tmp_path / "calls.log"
+    log.write_text("")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("JOURNAL_FILE", str(path))
+    monkeypatch.setenv("JOURNAL_LOG", str(log))
+    count = [0]
+
+    def write(message, unit="myproj.service", priority=6):
+        count[0] += 1
+        rec = {"__CURSOR": f"s=abc;i={count[0]}", "__REALTIME_TIMESTAMP": str(1792296000000000 + count[0] * 1000),
+               "PRIORITY": str(priority), "_SYSTEMD_UNIT": unit, "SYSLOG_IDENTIFIER": "python", "_PID": "812", "MESSAGE": message}
+        with path.open("a") as f:
+            f.write(json.dumps(rec) + "\n")
+
+    def calls():
+        return log.read_text().splitlines()
+
+    yield type("Journal", (), {"write": staticmethod(write), "calls": staticmethod(calls)})
+
+
+def test_command_pushes_filters_to_the_target():
+    req = JournalTailRequest(target="pi", units=["nginx", "my proj*"], priority="warning..err", since="-1h", grep="it's")
+    assert journal_command(req) == (
+        "journalctl -o json --all --no-pager -q --output-fields=MESSAGE,PRIORITY,_SYSTEMD_UNIT,SYSLOG_IDENTIFIER,_PID "
+        "--unit=nginx '--unit=my proj*' --priority=warning..err '--grep=it'\"'\"'s' --since=-1h")
+    assert journal_command(JournalTailRequest(target="pi", cursor="s=1;i=2", since="-1h", follow=True)).endswith(
+        "'--after-cursor=s=1;i=2' --follow")
+    assert journal_command(JournalTailRequest(target="pi")).endswith("--lines=100")
+    with pytest.raises(ValueError):
+        JournalTailRequest(target="pi", priority="err; reboot")
+
+
+def test_parse_entry():
+    line = json.dumps({"__CURSOR": "c", "__REALTIME_TIMESTAMP": "1500000", "MESSAGE": [104, 105, 255],
+                       "_PID": ["7", "8"], "PRIORITY": None})
+    assert parse_entry(line) == {"ts": 1.5, "pid": 7, "message": "hi�", "cursor": "c"}
+    assert parse_entry("-- No entries --") is None and parse_entry("[1]") is None
+
+
+def test_tail_resume_and_limits(journal):
+    for i in range(5):
+        journal.write(f"line {i}", priority=3 if i == 4 else 6)
+    r = journal_tail(JournalTailRequest(target="pi", lines=2))
+    assert [(e.message, e.priority, e.pid, e.unit) for e in r.entries] == [
+        ("line 3", 6, 812, "myproj.service"), ("line 4", 3, 812, "myproj.service")]
+    assert r.entries[1].ts == 1792296000.005 and r.cursor == "s=abc;i=5" and not r.truncated
+    journal.write("line 5")
+    newer = journal_tail(JournalTailRequest(target="pi", cursor=r.cursor))
+    assert [e.message for e in newer.entries] == ["line 5"] and newer.cursor == "s=abc;i=6"
+    assert "--after-cursor=s=abc;i=5" in journal.calls()[-1] and "--lines" not in journal.calls()[-1]
+    # Nothing new: the cursor comes back unchanged
+    assert journal_tail(JournalTailRequest(target="pi", cursor=newer.cursor)).cursor == newer.cursor
+    capped = journal_tail(JournalTailRequest(target="pi", lines=6, max_entries=2))
+    assert [e.message for e in capped.entries] == ["line 0", "line 1"] and capped.truncated and capped.cursor == "s=abc;i=2"
+    bad = journal_tail(JournalTailRequest(target="pi", grep="("))
+    assert bad.entries == [] and bad.error == "Failed to compile pattern"
+
+
+def test_follow_streams_new_entries(journal):
+    journal.write("old")
+
+    async def go():
+        stream = journal_stream(JournalTailRequest(target="pi", lines=1, follow=True, duration=3))
+        first = await asyncio.wait_for(stream.__anext__(), 5)
+        journal.write("new", unit="nginx.service", priority=4)
+        second = await asyncio.wait_for(stream.__anext__(), 5)
+        rest = [evt async for evt in stream]
+        return first, second, rest
+
+    first, second, rest = asyncio.run(go())
+    assert first["message"] == "old" and (second["message"], second["unit"], second["priority"]) == ("new", "nginx.service", 4)
+    assert rest == [{"done": True, "reason": "duration", "cursor": "s=abc;i=2", "count": 2}]
+
+
+def test_sse_route_resumes_from_last_event_id(journal):
+    for i in range(3):
+        journal.write(f"line {i}")
+    with TestClient(main.app) as client:
+        params = {"target": "pi", "follow": False}
+        with client.stream("GET", "/tools/journal/stream", params=params, headers={"Last-Event-ID": "s=abc;i=1"}) as r:
+            text = "".join(r.iter_text())
+        assert client.get("/tools/journal/stream", params={"target": "pi", "priority": "loud"}).status_code == 400
+        tail = client.post("/tools/journal/tail", json={"target": "pi", "lines": 1}).json()
+    lines = text.splitlines()
+    assert [line for line in lines if line.startswith("event: ")] == ["event: entry", "event: entry", "event: done"]
+    assert [line for line in lines if line.startswith("id: ")] == ["id: s=abc;i=2", "id: s=abc;i=3", "id: s=abc;i=3"]
+    data = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+    assert [d.get("message") for d in data] == ["line 1", "line 2", None] and data[-1]["count"] == 2
+    assert [e["message"] for e in tail["entries"]] == ["line 2"]
+
+
+def test_follows_are_capped_by_stream_slots(journal, monkeypatch):
+    monkeypatch.setattr(ssh_transport, "_pool", ssh_transport.SSHConnectionPool(max_channels=1, max_streams=1))
+    journal.write("old")
+
+    async def go():
+        held = journal_stream(JournalTailRequest(target="pi", lines=1, follow=True, duration=3))
+        first = await asyncio.wait_for(held.__anext__(), 5)
+        over = [evt async for evt in journal_stream(JournalTailRequest(target="pi", follow=True, duration=3))]
+        # A one-shot read still gets the exec slot while the follow runs
+        tail = await journal_tail_async(JournalTailRequest(target="pi", lines=1))
+        await held.aclose()
+        return first, over, tail
+
+    first, over, tail = asyncio.run(go())
+    assert first["message"] == "old" and [e.message for e in tail.entries] == ["old"]
+    assert over == [{"done": True, "reason": "stream slots exhausted on pi#streams: all 1 stayed in use for 0s",
+                     "cursor": None, "count": 0}]
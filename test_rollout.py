@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test rolling/canary deploys: wave planning, health gates, failure thresholds and rollback
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main
+from mcp_server.config import AppConfig, TargetConfig
+from mcp_server.tools import fleet, rollout
+from mcp_server.tools.git_tools import DeployHookResponse
+from mcp_server.tools.rollout import HealthCheck, RolloutRequest, plan_waves, rollout_deploy_async
+
+CFG = AppConfig(targets={f"pi-{i}": TargetConfig(host="h", username="u", private_key_path="k", labels={"role": "kiosk"})
+                         for i in range(1, 8)})
+NAMES = list(CFG.targets)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(fleet, "load_config", lambda: CFG)
+    state = {"running": 0, "peak": 0, "calls": [], "bad": set(), "unhealthy": set()}
+
+    async def deploy(req):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        state["calls"].append((req.script, req.target))
+        try:
+            await asyncio.sleep(0.02)
+            code = 1 if req.script == "deploy.sh" and req.target in state["bad"] else 0
+            return DeployHookResponse(stdout="", stderr="boom" if code else "", exit_code=code,
+                                      script_path=f"{req.project_dir}/{req.script}")
+        finally:
+            state["running"] -= 1
+
+    async def health(target, check):
+        return "inactive" if target in state["unhealthy"] else None
+
+    monkeypatch.setattr(rollout, "deploy_hook_async", deploy)
+    monkeypatch.setattr(rollout, "check_health", health)
+    return state
+
+
+def _run(**kw):
+    return asyncio.run(rollout_deploy_async(RolloutRequest(project_dir="/app", **kw)))
+
+
+def test_plan_waves():
+    assert plan_waves(NAMES, 1, 3) == [["pi-1"], ["pi-2", "pi-3", "pi-4"], ["pi-5", "pi-6", "pi-7"]]
+    assert plan_waves(NAMES[:5], 0, 2) == [["pi-1", "pi-2"], ["pi-3", "pi-4"], ["pi-5"]]
+    assert plan_waves(NAMES[:2], 3, 2) == [["pi-1", "pi-2"]]
+
+
+def test_rollout_completes_in_waves_within_max_unavailable(fake):
+    r = _run(selector="role=kiosk", canary=1, batch_size=3, max_unavailable=2, health=HealthCheck(service="app"))
+    assert r.status == "completed" and r.reason is None
+    assert sorted(r.succeeded) == NAMES and r.failed == [] and r.skipped == []
+    assert [h.wave for h in r.results] == [0, 1, 1, 1, 2, 2, 2]
+    assert fake["peak"] == 2
+
+
+def test_canary_failure_halts(fake):
+    fake["unhealthy"].add("pi-1")
+    r = _run(targets=NAMES, canary=1, batch_size=3, max_failures=5, health=HealthCheck(service="app"))
+    assert r.status == "halted" and "canary" in r.reason
+    assert r.failed == ["pi-1"] and r.skipped == NAMES[1:]
+    assert r.results[0].error == "health check failed: inactive"
+
+
+def test_failure_threshold_rolls_back_deployed_hosts(fake):
+    fake["bad"].add("pi-3")
+    r = _run(targets=NAMES, canary=1, batch_size=2, on_failure="rollback", rollback_script="rollback.sh")
+    assert r.status == "rolled_back" and "max_failures=0" in r.reason
+    assert r.failed == ["pi-3"] and r.skipped == NAMES[3:]
+    assert "boom" in r.results[-1].error
+    # Latest wave first, every host that ran the deploy
+    assert [t for s, t in fake["calls"] if s == "rollback.sh"] == ["pi-3", "pi-2", "pi-1"]
+    assert sorted(h.target for h in r.rollbacks) == ["pi-1", "pi-2", "pi-3"]
+    assert all(h.ok for h in r.rollbacks)
+
+
+def test_tolerated_failures_count_against_max_unavailable(fake):
+    fake["bad"].update({"pi-2", "pi-4"})
+    r = _run(targets=NAMES, canary=0, batch_size=2, max_unavailable=2, max_failures=3)
+    assert r.status == "halted" and "max_unavailable=2" in r.reason
+    assert sorted(r.failed) == ["pi-2", "pi-4"] and r.skipped == NAMES[4:]
+
+
+def test_rollout_validation(fake):
+    with pytest.raises(ValueError, match="rollback_script"):
+        _run(targets=NAMES, on_failure="rollback")
+    with pytest.raises(ValueError, match="service or url"):
+        _run(targets=NAMES, health=HealthCheck())
+    cmd = rollout._health_command(HealthCheck(service="app.service", url="http://x/health?a=1&b=2", timeout=3))
+    assert cmd == "systemctl is-active --quiet app.service && curl -fsS -o /dev/null --max-time 3 'http://x/health?a=1&b=2'"
+
+
+def test_rollout_stream_route(fake):
+    fake["bad"].add("pi-2")
+    body = {"project_dir": "/app", "targets": NAMES[:3], "canary": 1, "batch_size": 2}
+    with TestClient(main.app).stream("POST", "/tools/rollout_deploy/stream", json=body) as r:
+        text = "".join(r.iter_text())
+    events = [line[len("event: "):].strip() for line in text.splitlines() if line.startswith("event: ")]
+    assert events == ["wave", "host", "wave", "host", "host", "done"]
+    done = json.loads([line for line in text.splitlines() if line.startswith("data: ")][-1][len("data: "):])
+    assert done["status"] == "halted" and done["failed"] == ["pi-2"]
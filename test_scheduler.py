@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the tool scheduler: per-target and global caps, priority lane, fair turns across clients, metrics
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, scheduler
+from mcp_server.scheduler import Scheduler, current_client, tool_lane, PRIORITY, NORMAL, BULK
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _call(sched, order, target, tool, client="c", hold=0.05):
+    current_client.set(client)
+    async with sched.slot(target, tool):
+        order.append((client, tool, target))
+        await asyncio.sleep(hold)
+
+
+def test_lanes():
+    assert tool_lane("gpio_write") == tool_lane("macro_run") == PRIORITY
+    assert tool_lane("ssh_exec") == NORMAL
+    assert tool_lane("scp_put") == tool_lane("sync_dir") == BULK
+
+
+def test_per_target_and_global_limits():
+    limits = {"zero": 1, "pi4": 3}
+    sched = Scheduler(global_limit=3, reserve=0, limit_for=lambda t: limits[t])
+    running = {"zero": 0, "pi4": 0, "all": 0}
+    peaks = {"zero": 0, "pi4": 0, "all": 0}
+
+    async def call(target):
+        async with sched.slot(target, "ssh_exec"):
+            for k in (target, "all"):
+                running[k] += 1
+                peaks[k] = max(peaks[k], running[k])
+            await asyncio.sleep(0.02)
+            for k in (target, "all"):
+                running[k] -= 1
+
+    async def go():
+        await asyncio.gather(*(call(t) for t in ["zero"] * 4 + ["pi4"] * 6))
+
+    _run(go())
+    assert peaks["zero"] == 1 and peaks["pi4"] <= 3 and peaks["all"] == 3
+    stats = sched.stats()
+    assert stats["targets"]["zero"]["calls"] == 4 and stats["targets"]["zero"]["waited"] == 3
+    assert stats["targets"]["pi4"]["peak"] == peaks["pi4"] and stats["global"]["inflight"] == 0
+
+
+def test_priority_lane_jumps_queue_and_uses_reserve():
+    sched = Scheduler(global_limit=10, reserve=1, limit_for=lambda t: 1)
+    order = []
+
+    async def go():
+        bulk = [asyncio.ensure_future(_call(sched, order, "pi", "scp_put", hold=0.2))]
+        await asyncio.sleep(0.01)
+        bulk += [asyncio.ensure_future(_call(sched, order, "pi", "scp_put")) for _ in range(2)]
+        normal = asyncio.ensure_future(_call(sched, order, "pi", "ssh_exec"))
+        await asyncio.sleep(0.01)
+        gpio = asyncio.ensure_future(_call(sched, order, "pi", "gpio_write"))
+        await asyncio.sleep(0.01)
+        # The gpio call took the reserved slot while the first upload is still running
+        assert [o[1] for o in order] == ["scp_put", "gpio_write"]
+        q = sched.stats()["targets"]["pi"]["queued"]
+        assert q == {"priority": 0, "normal": 1, "bulk": 2}
+        await asyncio.gather(*bulk, normal, gpio)
+
+    _run(go())
+    assert [o[1] for o in order] == ["scp_put", "gpio_write", "ssh_exec", "scp_put", "scp_put"]
+
+
+def test_flows_take_turns():
+    sched = Scheduler(global_limit=10, reserve=0, limit_for=lambda t: 1)
+    order = []
+
+    async def go():
+        hog = [asyncio.ensure_future(_call(sched, order, "pi", "ssh_exec", client="hog", hold=0.01)) for _ in range(5)]
+        await asyncio.sleep(0.001)
+        other = [asyncio.ensure_future(_call(sched, order, "pi", "ssh_exec", client="other", hold=0.01)) for _ in range(2)]
+        await asyncio.gather(*hog, *other)
+
+    _run(go())
+    clients = [o[0] for o in order]
+    # The second client is not stuck behind the whole burst
+    assert clients.index("other") <= 2
+    assert clients[:5].count("other") == 2
+
+
+def test_cancelled_waiter_leaves_queue():
+    sched = Scheduler(global_limit=10, reserve=0, limit_for=lambda t: 1)
+    order = []
+
+    async def go():
+        first = asyncio.ensure_future(_call(sched, order, "pi", "ssh_exec", hold=0.1))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(_call(sched, order, "pi", "ssh_exec"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await first
+        await _call(sched, order, "pi", "ssh_exec", client="after")
+
+    _run(go())
+    assert [o[0] for o in order] == ["c", "after"]
+    assert sched.stats()["targets"]["pi"]["inflight"] == 0
+
+
+def test_stats_route(monkeypatch):
+    sched = Scheduler(limit_for=lambda t: 2)
+    monkeypatch.setattr(scheduler, "_scheduler", sched)
+
+    async def go():
+        async with sched.slot("pi", "ssh_exec"):
+            pass
+
+    _run(go())
+    r = TestClient(main.app).get("/scheduler/stats").json()
+    assert r["targets"]["pi"]["limit"] == 2 and r["targets"]["pi"]["calls"] == 1
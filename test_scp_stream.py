@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test streamed scp_put uploads and scp_get downloads against an in-process SSH/SFTP server
+"""
+
+import asyncio
+import base64
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+from mcp_server.ssh_async import AsyncSSHClientWrapper
+from mcp_server.ssh_transport import SSHClientWrapper
+from ssh_test_server import SSHTestServer
+
+
+SSH_TARGETS = ("stub",)
+
+
+def test_put_stream_writes_chunks_and_reports_progress(ssh_server, tmp_path):
+    dest = tmp_path / "sub" / "out.bin"
+    seen = []
+    with SSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+        size = cli.put_stream((bytes([i]) * 100000 for i in range(10)), str(dest), mode=0o600, progress=seen.append)
+    assert size == 1000000 and dest.stat().st_size == 1000000
+    assert seen[-1] == 1000000 and len(seen) == 10
+    assert dest.stat().st_mode & 0o777 == 0o600
+    assert not os.path.exists(str(dest) + ssh_transport.UPLOAD_SUFFIX)
+
+
+def test_uploads_keep_mode_and_symlinks(ssh_server, tmp_path):
+    script = tmp_path / "run.sh"
+    script.write_bytes(b"old")
+    script.chmod(0o755)
+    link = tmp_path / "current.sh"
+    link.symlink_to(script)
+    with SSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+        cli.put_bytes(b"#!/bin/sh\n", str(script))
+        assert script.stat().st_mode & 0o777 == 0o755
+        cli.put_stream([b"new"], str(link))
+        assert link.is_symlink() and script.read_bytes() == b"new" and script.stat().st_mode & 0o777 == 0o755
+        cli.put_bytes(b"newer", str(link))
+    assert link.is_symlink() and script.read_bytes() == b"newer"
+    assert script.stat().st_mode & 0o777 == 0o755
+    assert sorted(os.listdir(tmp_path)) == ["current.sh", "run.sh"]
+
+
+def test_failed_async_upload_leaves_nothing(ssh_server, tmp_path):
+    dest = tmp_path / "fw.bin"
+    dest.write_bytes(b"old")
+
+    async def chunks():
+        yield b"x" * 1000
+        raise ConnectionError("client went away")
+
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            await cli.put_stream(chunks(), str(dest))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(go())
+    assert dest.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["fw.bin"]
+
+
+def test_stream_route_raw_and_multipart(ssh_config, tmp_path):
+    client = TestClient(main.app)
+    data = os.urandom(3 * 1024 * 1024)
+
+    def body():
+        for i in range(0, len(data), 65536):
+            yield data[i:i + 65536]
+
+    r = client.post("/tools/scp_put/stream", params={"target": "stub", "remote_path": str(tmp_path / "raw.bin")},
+                    content=body(), headers={"content-type": "application/octet-stream"})
+    assert r.status_code == 200 and r.json()["size"] == len(data)
+    assert (tmp_path / "raw.bin").read_bytes() == data
+
+    r = client.post("/tools/scp_put/stream", params={"target": "stub", "remote_path": str(tmp_path / "form.bin"), "mode": 0o640},
+                    files={"file": ("form.bin", data[:5000])})
+    assert r.status_code == 200 and r.json() == {"remote_path": str(tmp_path / "form.bin"), "size": 5000, "mode": 0o640}
+    assert (tmp_path / "form.bin").read_bytes() == data[:5000]
+
+    assert client.post("/tools/scp_put/stream", params={"target": "nope", "remote_path": "/tmp/x"}, content=b"x").status_code == 400
+    assert client.get("/tools/scp_put/uploads").json() == {"uploads": []}
+
+
+def test_get_stream_route_ranges(ssh_config, tmp_path):
+    data = os.urandom(2 * 1024 * 1024 + 123)
+    src = tmp_path / "big.log"
+    src.write_bytes(data)
+    client = TestClient(main.app)
+    params = {"target": "stub", "remote_path": str(src)}
+
+    r = client.get("/tools/scp_get/stream", params=params)
+    assert r.status_code == 200 and r.content == data
+    etag = r.headers["etag"]
+    assert r.headers["accept-ranges"] == "bytes"
+
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": "bytes=1000000-", "If-Range": etag})
+    assert r.status_code == 206 and r.content == data[1000000:]
+    assert r.headers["content-range"] == f"bytes 1000000-{len(data) - 1}/{len(data)}"
+
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": "bytes=-100"})
+    assert r.status_code == 206 and r.content == data[-100:]
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": "bytes=10-19"})
+    assert r.content == data[10:20]
+
+    # A stale If-Range falls back to the whole file
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": "bytes=10-19", "If-Range": '"0-0"'})
+    assert r.status_code == 200 and len(r.content) == len(data)
+
+    # An invalid range (last before first) is ignored, not refused
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": "bytes=500-100"})
+    assert r.status_code == 200 and len(r.content) == len(data)
+
+    r = client.get("/tools/scp_get/stream", params=params, headers={"Range": f"bytes={len(data)}-"})
+    assert r.status_code == 416 and r.headers["content-range"] == f"bytes */{len(data)}"
+    assert client.get("/tools/scp_get/stream", params={"target": "stub", "remote_path": str(tmp_path / "nope")}).status_code == 404
+
+
+def test_scp_get_range_tool_pages(ssh_config, tmp_path, monkeypatch):
+    from mcp_server.tools import scp_get as scp_get_mod
+    from mcp_server.tools.scp_get import ScpGetRangeRequest, scp_get_range, scp_get_range_async
+
+    data = os.urandom(250000)
+    (tmp_path / "f").write_bytes(data)
+    monkeypatch.setattr(scp_get_mod, "MAX_RANGE_BYTES", 100000)
+
+    r = scp_get_range(ScpGetRangeRequest(target="stub", remote_path=str(tmp_path / "f"), offset=5))
+    assert (r.length, r.size, r.eof) == (100000, 250000, False)
+    assert base64.b64decode(r.content_b64) == data[5:100005]
+
+    r = asyncio.run(scp_get_range_async(ScpGetRangeRequest(target="stub", remote_path=str(tmp_path / "f"), offset=200000, length=70000)))
+    assert (r.length, r.eof) == (50000, True) and base64.b64decode(r.content_b64) == data[200000:]
+
+
+def test_pipelined_transfers_beat_link_latency(monkeypatch, tmp_path):
+    # 10 ms one-way: a sequential 32 KiB-per-round-trip transfer of 2 MiB would take over 1.2 s each way
+    srv = SSHTestServer(latency=0.01)
+    monkeypatch.setattr(ssh_transport, "_pool", ssh_transport.SSHConnectionPool(max_channels=8))
+    monkeypatch.setattr(ssh_transport, "SFTP_BLOCK_SIZE", 65536)
+    data = os.urandom(2 * 1024 * 1024)
+    path = str(tmp_path / "blob")
+    try:
+        with SSHClientWrapper(srv.make_target(), name="slow") as cli:
+            cli.sftp()
+            start = time.monotonic()
+            cli.put_bytes(data, path)
+            assert cli.get_bytes(path) == data
+            assert [len(b) for b in cli.get_stream(path, 100, 200000)][:2] == [65536, 65536]
+            elapsed = time.monotonic() - start
+    finally:
+        ssh_transport.get_pool().close_all()
+        srv.close()
+    assert elapsed < 1.5
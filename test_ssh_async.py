@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio SSH path against an in-process SSH server
+"""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+from mcp_server import ssh_transport
+from mcp_server.ssh_async import AsyncSSHClientWrapper
+
+SSH_TARGETS = ("stub",)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_async_exec_collects_output_and_exit_code(ssh_server):
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            return await cli.exec("echo out; echo err >&2; exit 3", env={"X": "1"})
+
+    r = _run(go())
+    assert (r.stdout, r.stderr, r.exit_code) == ("out\n", "err\n", 3)
+
+
+def test_async_exec_large_output(ssh_server):
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            return await cli.exec("head -c 1000000 /dev/zero | tr '\\0' x")
+
+    assert len(_run(go()).stdout) == 1000000
+
+
+def test_concurrent_commands_share_one_transport(ssh_server):
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            await cli.exec("true")  # connect first
+            start = time.monotonic()
+            results = await cli.exec_many(["sleep 0.5; echo ok"] * 8)
+            return results, time.monotonic() - start
+
+    results, elapsed = _run(go())
+    assert [r.stdout for r in results] == ["ok\n"] * 8
+    assert elapsed < 2.0  # ran concurrently, not 8 x 0.5s
+    assert ssh_transport.get_pool().stats()["connects"] == 1
+
+
+def test_async_exec_timeout_and_cancel_close_channel(ssh_server):
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            with pytest.raises(socket.timeout):
+                await cli.exec("sleep 5", timeout=0.2)
+            task = asyncio.ensure_future(cli.exec("sleep 5"))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await cli.exec("echo still-usable")
+
+    start = time.monotonic()
+    assert _run(go()).stdout == "still-usable\n"
+    assert time.monotonic() - start < 3
+    assert ssh_transport.get_pool().stats()["targets"]["stub"]["channels"] == 0
+
+
+def test_async_exec_timeout_is_per_read(ssh_server):
+    async def go():
+        async with AsyncSSHClientWrapper(ssh_server.make_target(), name="stub") as cli:
+            # Runs longer than the timeout in total, but never goes quiet for that long
+            return await cli.exec("for i in 1 2 3 4; do echo $i; sleep 0.2; done", timeout=0.6)
+
+    assert _run(go()).stdout == "1\n2\n3\n4\n"
+
+
+def test_mcp_call_tool_runs_concurrently_and_cancels(ssh_config):
+    from mcp_server import mcp_complete_server
+
+    async def go():
+        slow = asyncio.ensure_future(mcp_complete_server.call_tool("ssh_exec", {"target": "stub", "command": "sleep 5"}))
+        await asyncio.sleep(0.3)
+        # The loop stays responsive while the slow call is in flight
+        fast = await mcp_complete_server.call_tool("ssh_exec", {"target": "stub", "command": "echo fast"})
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        return fast
+
+    start = time.monotonic()
+    fast = _run(go())
+    assert "fast" in fast[0].text
+    assert time.monotonic() - start < 3
+    assert ssh_transport.get_pool().stats()["targets"]["stub"]["channels"] == 0
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test streaming ssh_exec output (SSE and MCP progress) against an in-process SSH server
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from mcp_server import main, mcp_complete_server, ssh_transport
+from mcp_server.streaming import sse_events
+from mcp_server.tools.ssh_exec import SSHExecRequest, SSHExecStreamRequest, _OutputCollector, ssh_exec, ssh_exec_async, ssh_exec_stream
+
+
+SSH_TARGETS = ("stub",)
+
+
+async def _collect(req):
+    return [evt async for evt in ssh_exec_stream(req)]
+
+
+def test_stream_yields_chunks_then_summary(ssh_config):
+    req = SSHExecStreamRequest(target="stub", command="echo one; sleep 0.2; echo two >&2; exit 4")
+    events = asyncio.run(_collect(req))
+    assert [e["stream"] for e in events[:-1]] == ["stdout", "stderr"]
+    assert events[-1] == {"exit_code": 4, "stdout_bytes": 4, "stderr_bytes": 4, "truncated": False}
+
+
+def test_max_bytes_stops_command(ssh_config):
+    start = time.monotonic()
+    r = asyncio.run(ssh_exec_async(SSHExecRequest(target="stub", command="yes", max_bytes=10000)))
+    assert r.truncated and len(r.stdout) == 10000 and r.exit_code == -1
+    assert time.monotonic() - start < 3
+    assert ssh_transport.get_pool().stats()["targets"]["stub"]["channels"] == 0
+
+
+def test_one_chunk_past_max_bytes_truncates():
+    col = _OutputCollector(10, None)
+    assert col.feed("stdout", b"x" * 50) == "x" * 10
+    col.feed("exit", 0)
+    assert col.summary() == {"exit_code": 0, "stdout_bytes": 10, "stderr_bytes": 0, "truncated": True,
+                             "stdout": "x" * 10, "stderr": ""}
+
+
+def test_one_chunk_past_max_bytes_stops_command(ssh_config):
+    # The whole output arrives in one chunk, then the command would sit there until the timeout
+    start = time.monotonic()
+    r = ssh_exec(SSHExecRequest(target="stub", command="printf 0123456789abcdef; sleep 10", max_bytes=10, timeout=20))
+    assert (r.stdout, r.truncated, r.exit_code) == ("0123456789", True, -1)
+    events = asyncio.run(_collect(SSHExecStreamRequest(target="stub", command="printf 0123456789abcdef; sleep 10", max_bytes=10)))
+    assert events[0]["data"] == "0123456789" and events[-1]["truncated"]
+    r = asyncio.run(ssh_exec_async(SSHExecRequest(target="stub", command="printf 0123456789abcdef", max_bytes=10)))
+    assert (r.stdout, r.truncated) == ("0123456789", True)
+    assert time.monotonic() - start < 3
+
+
+def test_sync_exec_keeps_tail_and_drains_stderr(ssh_config):
+    # More stderr than one channel window: reading stdout alone would stall
+    cmd = "head -c 3000000 /dev/zero >&2; echo done"
+    r = ssh_exec(SSHExecRequest(target="stub", command=cmd, tail_bytes=100))
+    assert r.stdout == "done\n" and len(r.stderr) == 100 and r.exit_code == 0
+
+
+def test_sse_route_streams_events(ssh_config):
+    client = TestClient(main.app)
+    body = {"target": "stub", "command": "printf a; printf b >&2", "tail_bytes": 10}
+    with client.stream("POST", "/tools/ssh_exec/stream", json=body) as r:
+        text = "".join(r.iter_text())
+    events = [line.split(": ", 1)[1] for line in text.splitlines() if line.startswith("event: ")]
+    assert events[-1] == "exit" and set(events[:-1]) == {"stdout", "stderr"}
+    assert client.post("/tools/ssh_exec/stream", json={"target": "nope", "command": "true"}).status_code == 400
+
+
+def test_sse_events_reports_error():
+    async def broken():
+        yield {"n": 1}
+        raise RuntimeError("boom")
+
+    async def go():
+        return [evt async for evt in sse_events(broken())]
+
+    events = asyncio.run(go())
+    assert events[0] == {"event": "message", "data": '{"n":1}'}
+    assert events[1]["event"] == "error" and json.loads(events[1]["data"])["error"] == "boom"
+
+
+def test_mcp_progress_notifications(ssh_config, monkeypatch):
+    sent = []
+
+    class Session:
+        async def send_progress_notification(self, token, progress, total=None, message=None, related_request_id=None):
+            sent.append((token, progress, message))
+
+    ctx = SimpleNamespace(meta=SimpleNamespace(progressToken="t1"), session=Session(), request_id=7)
+    monkeypatch.setattr(type(mcp_complete_server.server), "request_context", property(lambda self: ctx))
+
+    out = asyncio.run(mcp_complete_server.call_tool("ssh_exec", {"target": "stub", "command": "echo a; sleep 0.2; echo b"}))
+    assert [m for _, _, m in sent] == ["a\n", "b\n"]
+    assert [p for _, p, _ in sent] == [2, 4]
+    assert "Exit Code: 0" in out[0].text and "a\nb\n" in out[0].text
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Test the SSH connection pool, mostly without a real host (fake paramiko clients)
+"""
+
+from mcp_server import ssh_transport
+from mcp_server.config import TargetConfig
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def send_ignore(self):
+        if not self.active:
+            raise EOFError("dead")
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+def _cfg(host="10.0.0.1"):
+    return TargetConfig(host=host, username="pi", private_key_path="/dev/null")
+
+
+def _fake_connect(monkeypatch):
+    made = []
+
+    def connect(cfg):
+        c = FakeClient()
+        made.append(c)
+        return c
+
+    monkeypatch.setattr(ssh_transport, "_connect", connect)
+    return made
+
+
+def test_pool_reuses_transport(monkeypatch):
+    made = _fake_connect(monkeypatch)
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60)
+
+    e1 = pool.acquire("pi-lan", _cfg())
+    pool.release("pi-lan", e1)
+    e2 = pool.acquire("pi-lan", _cfg())
+    pool.release("pi-lan", e2)
+
+    assert e1 is e2
+    assert len(made) == 1
+    assert pool.stats()["reuses"] == 1
+
+
+def test_pool_reconnects_dead_transport(monkeypatch):
+    made = _fake_connect(monkeypatch)
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60)
+
+    e1 = pool.acquire("pi-lan", _cfg())
+    pool.release("pi-lan", e1)
+    made[0].transport.active = False
+
+    e2 = pool.acquire("pi-lan", _cfg())
+    assert e2 is not e1
+    assert made[0].closed
+    assert len(made) == 2
+
+
+def test_pool_drops_changed_config_and_idle(monkeypatch):
+    made = _fake_connect(monkeypatch)
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=0)
+
+    e1 = pool.acquire("pi-lan", _cfg())
+    pool.release("pi-lan", e1)
+    e2 = pool.acquire("pi-lan", _cfg(host="10.0.0.2"))
+    assert e2 is not e1 and made[0].closed
+    pool.release("pi-lan", e2)
+
+    # idle_ttl=0: next acquire reaps the idle transport
+    e3 = pool.acquire("pi-lan", _cfg(host="10.0.0.2"))
+    assert e3 is not e2 and made[1].closed
+
+
+def test_pool_max_size_evicts_lru(monkeypatch):
+    made = _fake_connect(monkeypatch)
+    pool = ssh_transport.SSHConnectionPool(max_size=1, idle_ttl=60)
+
+    a = pool.acquire("a", _cfg())
+    # "a" is busy, so "b" cannot be pooled and is closed after use
+    b = pool.acquire("b", _cfg())
+    pool.release("b", b)
+    assert made[1].closed
+    pool.release("a", a)
+
+    c = pool.acquire("c", _cfg())
+    assert made[0].closed
+    assert pool.stats()["size"] == 1
+    pool.release("c", c)
+    pool.close_all()
+    assert made[2].closed
+
+
+def test_concurrent_acquire_single_handshake(monkeypatch):
+    import threading, time
+    made = []
+
+    def slow_connect(cfg):
+        time.sleep(0.05)
+        c = FakeClient()
+        made.append(c)
+        return c
+
+    monkeypatch.setattr(ssh_transport, "_connect", slow_connect)
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60)
+    entries = []
+
+    def worker():
+        e = pool.acquire("pi-lan", _cfg())
+        entries.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(made) == 1
+    assert all(e is entries[0] for e in entries)
+    assert entries[0].users == 6
+
+
+def test_channel_slots_bound_concurrency():
+    import threading, time
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60, max_channels=2)
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def worker():
+        with pool.channel_slot("pi-lan"):
+            with lock:
+                state["now"] += 1
+                state["peak"] = max(state["peak"], state["now"])
+            time.sleep(0.02)
+            with lock:
+                state["now"] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert state["peak"] == 2
+
+
+def test_channel_slot_wait_is_bounded():
+    import asyncio
+    import pytest
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60, max_channels=1, channel_wait=0.1)
+    with pool.channel_slot("pi-lan"):
+        with pytest.raises(ssh_transport.ChannelsExhausted, match="channel slots exhausted on pi-lan"):
+            with pool.channel_slot("pi-lan"):
+                pass
+
+        async def wait_async():
+            async with pool.channel_slot("pi-lan"):
+                pass
+
+        with pytest.raises(ssh_transport.ChannelsExhausted):
+            asyncio.run(wait_async())
+    # The slot is free again once released
+    with pool.channel_slot("pi-lan"):
+        assert pool.stats()["max_channels"] == 1
+
+
+def test_channel_slot_waiters_are_served_in_order():
+    import asyncio
+    import threading
+    import time
+    pool = ssh_transport.SSHConnectionPool(max_size=4, idle_ttl=60, max_channels=1, channel_wait=1)
+    order = []
+    holder = pool.channel_slot("pi-lan").__enter__()
+
+    def sync_waiter(name):
+        with pool.channel_slot("pi-lan"):
+            order.append(name)
+
+    async def main():
+        async def async_waiter(name):
+            async with pool.channel_slot("pi-lan"):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        first = asyncio.ensure_future(async_waiter("async-1"))
+        await asyncio.sleep(0.05)
+        t = threading.Thread(target=sync_waiter, args=("sync-2",))
+        t.start()
+        time.sleep(0.05)
+        third = asyncio.ensure_future(async_waiter("async-3"))
+        await asyncio.sleep(0.05)
+        # A cancelled waiter gives up its place without losing a permit
+        cancelled = asyncio.ensure_future(async_waiter("never"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        holder.__exit__(None, None, None)
+        await asyncio.gather(first, third)
+        await asyncio.get_running_loop().run_in_executor(None, t.join)
+
+    asyncio.run(main())
+    assert order == ["async-1", "sync-2", "async-3"]
+    with pool.channel_slot("pi-lan"):
+        pass  # the permit came back
+
+
+def test_exec_many_reconnects_once_when_the_transport_drops(ssh_server):
+    target = ssh_server.make_target()
+    with ssh_transport.SSHClientWrapper(target, name="stub") as cli:
+        cli.exec("true")
+        cli._client.get_transport().close()
+        # Every worker finds the transport dead at once; each drops only its own lease and they share one new transport
+        results = cli.exec_many(["sleep 0.2; echo ok"] * 8)
+    stats = ssh_transport.get_pool().stats()
+    assert [r.stdout for r in results] == ["ok\n"] * 8
+    assert stats["connects"] == 2 and stats["targets"]["stub"]["users"] == 0
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the SSE helper used by the streaming endpoints
+"""
+
+import asyncio
+import json
+
+from mcp_server.streaming import sse_events
+from mcp_server.tools.gpio_tools import gpio_watch_event_name
+
+
+class FakeStream:
+    def __init__(self, items):
+        self._it = iter(items)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._it)
+
+    def close(self):
+        self.closed = True
+
+
+def _collect(agen, limit=None):
+    async def run():
+        out = []
+        async for evt in agen:
+            out.append(evt)
+            if limit and len(out) >= limit:
+                break
+        await agen.aclose()
+        return out
+    return asyncio.run(run())
+
+
+def test_sse_events_names_and_closes():
+    stream = FakeStream([{"t": 0, "s": {"17": 0}}, {"t": 40, "d": {"17": 1}}, {"t": 5000}, {"t": 6000, "end": True}])
+    events = _collect(sse_events(stream, event_for=gpio_watch_event_name))
+    assert [e["event"] for e in events] == ["snapshot", "delta", "heartbeat", "end"]
+    assert json.loads(events[1]["data"]) == {"t": 40, "d": {"17": 1}}
+    assert stream.closed
+
+
+def test_sse_events_closes_on_disconnect():
+    stream = FakeStream([{"t": i} for i in range(100)])
+    events = _collect(sse_events(stream, event="tick"), limit=3)
+    assert len(events) == 3 and events[0]["event"] == "tick"
+    assert stream.closed
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test sync_dir delta sync against an in-process SSH/SFTP server
+"""
+
+import asyncio
+import os
+import random
+
+import pytest
+
+from mcp_server.tools import sync_dir as sync_dir_mod
+from mcp_server.tools.sync_dir import SyncDirRequest, _strong, _weak, delta_ops, sync_dir, sync_dir_async
+
+
+SSH_TARGETS = ("stub",)
+
+
+@pytest.fixture
+def target(ssh_config):
+    return "stub"
+
+
+def _sigs(old, bs):
+    return [[_weak(old[i:i + bs]), _strong(old[i:i + bs])] for i in range(0, len(old), bs)]
+
+
+def _rebuild(old, ops, bs):
+    out = b""
+    for kind, value in ops:
+        out += old[value[0] * bs:(value[0] + value[1]) * bs] if kind == "copy" else value
+    return out
+
+
+def test_delta_ops_finds_shifted_blocks():
+    rnd = random.Random(7)
+    for _ in range(200):
+        bs = rnd.choice([4, 16, 64])
+        old = bytes(rnd.getrandbits(8) for _ in range(rnd.randint(0, 500)))
+        new = bytearray(old)
+        for _ in range(rnd.randint(0, 4)):
+            p = rnd.randint(0, len(new))
+            if rnd.random() < 0.5:
+                new[p:p] = bytes(rnd.getrandbits(8) for _ in range(rnd.randint(1, 20)))
+            else:
+                del new[p:p + rnd.randint(1, 20)]
+        ops = delta_ops(bytes(new), _sigs(old, bs), len(old), bs)
+        assert _rebuild(old, ops, bs) == bytes(new)
+
+    old = os.urandom(100000)
+    ops = delta_ops(old[:50000] + b"hello" + old[50000:], _sigs(old, 1024), len(old), 1024)
+    assert sum(len(v) for k, v in ops if k == "data") < 2 * 1024
+
+
+def test_delta_reads_in_windows_and_sends_unmatched_files_whole(monkeypatch):
+    monkeypatch.setattr(sync_dir_mod, "_DELTA_WINDOW", 4096)
+    old = os.urandom(50000)
+    # Matches past the first window are still found while the file is read a window at a time
+    new = old[:20000] + b"hello" + old[20000:]
+    ops = delta_ops(new, _sigs(old, 1024), len(old), 1024)
+    assert _rebuild(old, ops, 1024) == new and sum(len(v) for k, v in ops if k == "data") < 2 * 1024
+    # Nothing known in the first window: the file is sent as data without searching the rest
+    other = os.urandom(20000) + old
+    ops = delta_ops(other, _sigs(old, 1024), len(old), 1024)
+    assert [k for k, _ in ops] == ["data"] and ops[0][1] == other
+
+
+def _write(path, data, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    os.chmod(path, mode)
+
+
+def test_sync_dir_sends_only_changes(target, tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    big = os.urandom(400000)
+    _write(str(src / "app.bin"), big)
+    _write(str(src / "run.sh"), b"#!/bin/sh\necho hi\n", 0o755)
+    _write(str(src / "lib" / "util.py"), b"x = 1\n")
+    _write(str(src / ".git" / "HEAD"), b"ref\n")
+
+    def req(**kw):
+        return SyncDirRequest(target=target, local_dir=str(src), remote_dir=str(dst), exclude=[".git"], **kw)
+
+    first = sync_dir(req())
+    assert first.created == ["app.bin", "lib/util.py", "run.sh"] and first.unchanged == 0
+    assert (dst / "app.bin").read_bytes() == big and not (dst / ".git").exists()
+    assert os.stat(dst / "run.sh").st_mode & 0o777 == 0o755
+
+    # Insert bytes in the middle of the big file, change a mode, drop a file
+    _write(str(src / "app.bin"), big[:200000] + b"patch" + big[200000:])
+    os.chmod(src / "run.sh", 0o700)
+    os.remove(src / "lib" / "util.py")
+    _write(str(dst / "stale.txt"), b"old")
+
+    dry = sync_dir(req(delete=True, dry_run=True))
+    assert dry.updated == ["app.bin"] and (dst / "stale.txt").exists()
+
+    second = asyncio.run(sync_dir_async(req(delete=True)))
+    assert second.updated == ["app.bin"] and second.mode_changed == ["run.sh"]
+    assert sorted(second.deleted) == ["lib/util.py", "stale.txt"]
+    assert second.bytes_sent == dry.bytes_sent < 20000 and second.saved_pct > 95
+    assert (dst / "app.bin").read_bytes() == big[:200000] + b"patch" + big[200000:]
+    assert os.stat(dst / "run.sh").st_mode & 0o777 == 0o700
+    assert not (dst / "stale.txt").exists()
+    assert [n for n in os.listdir(dst) if n.startswith(".mcp-sync")] == []
+
+    third = sync_dir(req())
+    assert third.unchanged == 2 and third.bytes_sent == 0
+
+
+def test_failed_apply_leaves_no_part_files(target, tmp_path, monkeypatch):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    data = os.urandom(100000)
+    _write(str(src / "app.bin"), data)
+    _write(str(dst / "app.bin"), data[:50000])
+    # A part file left by an older, interrupted sync is neither reported nor deleted as a stray
+    _write(str(dst / ".mcp-sync-old.bin.part"), b"partial")
+
+    apply_args = sync_dir_mod._SyncPlan.apply_args
+
+    def remove_then_apply(self):
+        os.remove(dst / "app.bin")  # the copy records now have no file to copy from
+        return apply_args(self)
+
+    monkeypatch.setattr(sync_dir_mod._SyncPlan, "apply_args", remove_then_apply)
+    req = SyncDirRequest(target=target, local_dir=str(src), remote_dir=str(dst), delete=True)
+    with pytest.raises(RuntimeError, match="helper failed"):
+        sync_dir(req)
+    assert os.listdir(dst) == [".mcp-sync-old.bin.part"]
+
+    monkeypatch.setattr(sync_dir_mod._SyncPlan, "apply_args", apply_args)
+    r = sync_dir(req)
+    assert r.created == ["app.bin"] and r.deleted == [] and (dst / "app.bin").read_bytes() == data
+
+
+def test_long_path_lists_go_on_stdin(target, tmp_path):
+    # ~200 KiB of changed paths: more than one argv string may hold
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    names = [f"{i:04d}-" + "x" * 180 for i in range(1100)]
+    for n in names:
+        _write(str(src / n), b"new")
+        _write(str(dst / n), b"old")
+    r = sync_dir(SyncDirRequest(target=target, local_dir=str(src), remote_dir=str(dst)))
+    assert len(r.updated) == 1100 and (dst / names[-1]).read_bytes() == b"new"
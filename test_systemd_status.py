@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test systemd_status_many: one systemctl show for many units, parsing, and the per-target state cache
+"""
+
+import asyncio
+import os
+import stat
+
+import pytest
+
+from mcp_server.tools import systemd
+from mcp_server.tools.systemd import (
+    ServiceActionRequest, ServiceStatusManyRequest, UnitStateCache,
+    parse_show, service_action, systemd_status_many, systemd_status_many_async,
+)
+
+FAKE_SYSTEMCTL = r'''#!/bin/sh
+echo "$*" >> "$SYSTEMCTL_LOG"
+[ "$1" = show ] || exit 0
+while [ "$1" != "--" ]; do shift; done; shift
+first=1
+for u in "$@"; do
+  [ $first = 1 ] || echo
+  first=0
+  case "$u" in
+    nginx.service) printf 'MainPID=812\nId=nginx.service\nLoadState=loaded\nActiveState=active\nSubState=running\nUnitFileState=enabled\nNRestarts=2\nMemoryCurrent=5242880\nActiveEnterTimestamp=Sun 2026-10-18 04:00:00 UTC\nDescription=A high performance web server\n' ;;
+    myproj) printf 'Id=myproj.service\nLoadState=loaded\nActiveState=failed\nSubState=failed\nMainPID=0\nExecMainStatus=1\nMemoryCurrent=[not set]\nNRestarts=18446744073709551615\n' ;;
+    *) printf 'Id=%s\nLoadState=not-found\nActiveState=inactive\nSubState=dead\n' "$u" ;;
+  esac
+done
+'''
+
+
+@pytest.fixture
+def host(ssh_config, monkeypatch, tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "systemctl"
+    script.write_text(FAKE_SYSTEMCTL)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "calls.log"
+    log.write_text("")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("SYSTEMCTL_LOG", str(log))
+    monkeypatch.setattr(systemd, "_status_cache", UnitStateCache())
+    yield lambda: log.read_text().splitlines()
+
+
+def test_one_call_for_all_units(host):
+    r = systemd_status_many(ServiceStatusManyRequest(target="pi", names=["nginx.service", "myproj", "ghost.service"]))
+    assert host() == ["show --no-pager --property=Id,Description,LoadState,ActiveState,SubState,UnitFileState,"
+                      "MainPID,ExecMainStatus,NRestarts,MemoryCurrent,ActiveEnterTimestamp -- nginx.service myproj ghost.service"]
+    nginx, myproj, ghost = r.units
+    assert (nginx.active_state, nginx.sub_state, nginx.main_pid, nginx.n_restarts) == ("active", "running", 812, 2)
+    assert nginx.active_enter_timestamp == "Sun 2026-10-18 04:00:00 UTC" and nginx.memory_current == 5242880
+    assert myproj.id == "myproj.service" and myproj.active_state == "failed" and myproj.exec_main_status == 1
+    assert myproj.memory_current is None and myproj.n_restarts is None
+    assert ghost.load_state == "not-found"
+    assert r.fetched == 3
+
+
+def test_cache_serves_polls_and_reads_only_missing_units(host):
+    req = ServiceStatusManyRequest(target="pi", names=["nginx.service", "myproj"])
+    systemd_status_many(req)
+    again = asyncio.run(systemd_status_many_async(req))
+    assert again.fetched == 0 and again.units[0].main_pid == 812 and len(host()) == 1
+    more = systemd_status_many(ServiceStatusManyRequest(target="pi", names=["myproj", "redis.service"]))
+    assert more.fetched == 1 and host()[-1].endswith("-- redis.service")
+    fresh = systemd_status_many(ServiceStatusManyRequest(target="pi", names=["myproj"], max_age=0))
+    assert fresh.fetched == 1 and fresh.units[0].age == 0.0
+    # An action through systemd_service drops the unit's cached state
+    assert service_action(ServiceActionRequest(target="pi", name="nginx", action="restart")).ok
+    after = systemd_status_many(req)
+    assert after.fetched == 1 and host()[-1].endswith("-- nginx.service")
+
+
+def test_rejects_bad_unit_names(host):
+    with pytest.raises(ValueError):
+        systemd_status_many(ServiceStatusManyRequest(target="pi", names=["x; reboot"]))
+    assert host() == []
+
+
+def test_parse_show_falls_back_to_ids():
+    out = "Id=b.service\nActiveState=active\n"
+    a, b = parse_show(["a.service", "b"], out)
+    assert a.active_state is None and b.active_state == "active"
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test the systemd watcher: snapshot then pushed changes, status lookups from its table, resume and resync
+"""
+
+import asyncio
+import json
+import os
+import stat
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+from mcp_server.tools import systemd, systemd_watch
+from mcp_server.tools.systemd import ServiceStatusManyRequest, UnitStateCache, systemd_status_many_async
+from mcp_server.tools.systemd_watch import SystemdWatchRequest, systemd_watch_async, systemd_watch_stream
+
+FAKE_SYSTEMCTL = r'''#!/bin/sh
+echo "$1" >> "$UNIT_DIR/../calls.log"
+case "$1" in
+  list-units) ls "$UNIT_DIR" ;;
+  show)
+    while [ "$1" != "--" ]; do shift; done; shift
+    first=1
+    for u in "$@"; do
+      [ $first = 1 ] || echo
+      first=0
+      echo "Id=$u"
+      if [ -f "$UNIT_DIR/$u" ]; then cat "$UNIT_DIR/$u"; else echo LoadState=not-found; fi
+    done ;;
+esac
+'''
+
+FAKE_JOURNALCTL = '''#!/bin/sh
+exec timeout 20 tail -n 0 -f "$JOURNAL_FILE"
+'''
+
+
+@pytest.fixture
+def host(ssh_config, monkeypatch, tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, body in (("systemctl", FAKE_SYSTEMCTL), ("journalctl", FAKE_JOURNALCTL)):
+        script = bin_dir / name
+        script.write_text(body)
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    units = tmp_path / "units"
+    units.mkdir()
+    journal = tmp_path / "journal"
+    journal.write_text("")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("UNIT_DIR", str(units))
+    monkeypatch.setenv("JOURNAL_FILE", str(journal))
+    monkeypatch.setattr(systemd, "_status_cache", UnitStateCache())
+
+    def set_state(unit, active, sub, pid=0, log=True):
+        (units / unit).write_text(f"LoadState=loaded\nActiveState={active}\nSubState={sub}\nMainPID={pid}\nMemoryCurrent={pid * 7}\n")
+        if log:
+            with journal.open("a") as f:
+                f.write(f"{unit}\n\nsomething.target\n")
+
+    def calls():
+        return (tmp_path / "calls.log").read_text().split()
+
+    set_state("web.service", "active", "running", 100, log=False)
+    set_state("db.service", "active", "running", 200, log=False)
+    set_state("other.service", "inactive", "dead", log=False)
+    host = type("Host", (), {"set_state": staticmethod(set_state), "calls": staticmethod(calls)})
+    yield host
+
+
+async def _next(stream, timeout=5):
+    return await asyncio.wait_for(stream.__anext__(), timeout)
+
+
+def test_snapshot_changes_and_local_status_reads(host):
+    async def go():
+        stream = systemd_watch_stream(SystemdWatchRequest(target="pi", units=["web", "db"]))
+        snap = await _next(stream)
+        await asyncio.sleep(0.3)  # journalctl is following
+        host.set_state("other.service", "active", "running", 300)  # filtered out
+        host.set_state("web.service", "failed", "failed")
+        change = await _next(stream)
+        reads = len(host.calls())
+        status = await systemd_status_many_async(ServiceStatusManyRequest(target="pi", names=["web", "other", "gone"]))
+        targets = ssh_transport.get_pool().stats()["targets"]
+        await stream.aclose()
+        return snap, change, reads, status, targets
+
+    snap, change, reads, status, targets = asyncio.run(go())
+    assert [u["name"] for u in snap["snapshot"]] == ["db.service", "web.service"]
+    assert snap["snapshot"][1]["main_pid"] == 100 and snap["seq"] == 0
+    assert change["unit"] == "web.service" and change["seq"] == 2
+    assert change["old"]["active_state"] == "active" and change["new"]["active_state"] == "failed"
+    web, other, gone = status.units
+    assert web.active_state == "failed" and other.main_pid == 300 and gone.load_state == "not-found"
+    # Only the unit the watcher does not track was read from the host
+    assert status.fetched == 1 and host.calls()[reads:] == ["show"]
+    # The resident watch channel counts against the stream slots, not the exec ones
+    assert targets["pi#streams"]["channels"] == 1 and targets["pi"]["channels"] == 0
+
+
+def test_resume_after_seq_and_collect_tool(host):
+    async def go():
+        first = await systemd_watch_async(SystemdWatchRequest(target="pi", duration=0.5))
+        host.set_state("db.service", "activating", "start", 0)
+        host.set_state("db.service", "active", "running", 201)
+        later = await systemd_watch_async(SystemdWatchRequest(target="pi", since=first.seq, watch=first.watch, duration=1))
+        stale = await systemd_watch_async(SystemdWatchRequest(target="pi", since=999, watch=first.watch, units=["db"], duration=0.2))
+        return first, later, stale
+
+    first, later, stale = asyncio.run(go())
+    assert [u.name for u in first.units] == ["db.service", "other.service", "web.service"] and first.changes == []
+    assert [(c["new"]["sub_state"], c["new"]["main_pid"]) for c in later.changes][-1] == ("running", 201)
+    assert later.changes[0]["seq"] == first.seq + 1 and later.seq == later.changes[-1]["seq"]
+    assert later.watch == first.watch
+    # A seq this watcher never issued gets a fresh snapshot instead of silently missing changes
+    assert [u.main_pid for u in stale.units] == [201] and stale.changes == []
+
+
+def test_seq_from_an_ended_watch_gets_a_snapshot(host):
+    async def go():
+        first = await systemd_watch_async(SystemdWatchRequest(target="pi", duration=0.5))
+        systemd_watch._watchers.pop("pi").task.cancel()
+        await asyncio.sleep(0.2)
+        stream = systemd_watch_stream(SystemdWatchRequest(target="pi"))
+        await _next(stream)
+        await asyncio.sleep(0.3)  # journalctl is following
+        host.set_state("web.service", "failed", "failed")
+        await _next(stream)
+        # The new watch has counted past first.seq, but its numbers are not the old watch's
+        later = await systemd_watch_async(SystemdWatchRequest(target="pi", since=first.seq, watch=first.watch, duration=0.3))
+        await stream.aclose()
+        return first, later
+
+    first, later = asyncio.run(go())
+    assert later.watch != first.watch and later.changes == []
+    assert [(u.name, u.active_state) for u in later.units] == [
+        ("db.service", "active"), ("other.service", "inactive"), ("web.service", "failed")]
+
+
+def test_resync_catches_changes_without_journal_entries(host, monkeypatch):
+    monkeypatch.setattr(systemd_watch, "SYSTEMD_WATCH_RESYNC", 1)
+
+    async def go():
+        stream = systemd_watch_stream(SystemdWatchRequest(target="pi", units=["web"]))
+        await _next(stream)
+        host.set_state("web.service", "inactive", "dead", log=False)
+        change = await _next(stream, timeout=4)
+        await stream.aclose()
+        return change
+
+    assert asyncio.run(go())["new"]["active_state"] == "inactive"
+
+
+def test_sse_route(host):
+    with TestClient(main.app) as client:
+        with client.stream("GET", "/tools/systemd/watch", params={"target": "pi", "units": "web", "duration": 0.5}) as r:
+            text = "".join(r.iter_text())
+        assert client.get("/tools/systemd/watch", params={"target": "zz"}).status_code == 400
+    lines = text.splitlines()
+    assert [line for line in lines if line.startswith("event: ")] == ["event: snapshot", "event: done"]
+    data = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+    assert data[0]["snapshot"][0]["name"] == "web.service" and data[1]["reason"] == "duration"
+    assert [line for line in lines if line.startswith("id: ")] == [f"id: {data[0]['watch']}:0"] * 2
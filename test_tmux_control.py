@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the tmux control-mode driver: one resident channel for ensure/send/kill/list, the session cache and the exec fallback
+"""
+
+import asyncio
+import shutil
+import subprocess
+import time
+
+import pytest
+
+import ssh_test_server
+from mcp_server import ssh_transport, tmux_control
+from mcp_server.tmux_control import TmuxControlManager, key_commands
+from mcp_server.tools.django import DjangoRunserverRequest, django_runserver_tmux_async
+from mcp_server.tools.tmux import (
+    TmuxEnsureRequest, TmuxKillRequest, TmuxListRequest, TmuxSendKeysRequest,
+    tmux_ensure, tmux_kill, tmux_list_async, tmux_send_keys,
+)
+
+
+def _pane(session):
+    return subprocess.run(["tmux", "capture-pane", "-p", "-t", session], capture_output=True, text=True).stdout
+
+
+def _wait_for(check, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_key_commands():
+    assert key_commands("=s:", "ls", enter=True) == [["send-keys", "-t", "=s:", "-l", "--", "ls"], ["send-keys", "-t", "=s:", "Enter"]]
+    assert key_commands("=s:", "\x03make\t-x", enter=False) == [
+        ["send-keys", "-t", "=s:", "C-c"], ["send-keys", "-t", "=s:", "-l", "--", "make"],
+        ["send-keys", "-t", "=s:", "Tab"], ["send-keys", "-t", "=s:", "-l", "--", "-x"],
+    ]
+
+
+@pytest.fixture
+def tmux(ssh_config, monkeypatch, tmp_path):
+    if shutil.which("tmux") is None:
+        pytest.skip("tmux not installed")
+    monkeypatch.setenv("TMUX_TMPDIR", str(tmp_path))
+    monkeypatch.delenv("TMUX", raising=False)
+    # A plain shell in the panes: a slow rc file can swallow keys typed before its prompt
+    monkeypatch.setenv("SHELL", "/bin/sh")
+    execs = []
+    run = ssh_test_server._run
+
+    def recording_run(channel, command):
+        execs.append(command)
+        run(channel, command)
+
+    monkeypatch.setattr(ssh_test_server, "_run", recording_run)
+    monkeypatch.setattr(tmux_control, "_manager", TmuxControlManager())
+    yield execs
+    tmux_control.get_tmux_control().close_all()
+    subprocess.run(["tmux", "kill-server"], stderr=subprocess.DEVNULL)
+
+
+def test_runserver_uses_one_channel(tmux):
+    req = DjangoRunserverRequest(target="pi", project_dir="/tmp", session="web", extra_args="--noreload 'a b' $HOME")
+    r = asyncio.run(django_runserver_tmux_async(req))
+    assert r.ok and r.session == "mcp_web"
+    _wait_for(lambda: "runserver 0.0.0.0:8000 --noreload 'a b' $HOME" in _pane("mcp_web"))
+    again = asyncio.run(django_runserver_tmux_async(req))
+    assert again.ok
+    assert len(tmux) == 1 and tmux[0].startswith("tmux -C")
+    assert ssh_transport.get_pool().stats()["connects"] == 1
+
+
+def test_session_cache_follows_notifications(tmux):
+    assert tmux_ensure(TmuxEnsureRequest(target="pi", session="a")).ok
+    subprocess.run(["tmux", "new-session", "-d", "-s", "mcp_b"], check=True)
+    subprocess.run(["tmux", "new-session", "-d", "-s", "other"], check=True)
+    _wait_for(lambda: asyncio.run(tmux_list_async(TmuxListRequest(target="pi"))).sessions == ["mcp_a", "mcp_b"])
+    subprocess.run(["tmux", "kill-session", "-t", "mcp_a"], check=True)
+    _wait_for(lambda: tmux_control.get_tmux_control().stats()["targets"]["pi"]["sessions"] == ["mcp_b", "other"])
+    # The cache no longer has mcp_a, so ensure creates it again
+    assert tmux_ensure(TmuxEnsureRequest(target="pi", session="a")).ok
+    assert subprocess.run(["tmux", "has-session", "-t", "=mcp_a"]).returncode == 0
+    assert tmux_kill(TmuxKillRequest(target="pi", session="a")).ok
+    assert not tmux_kill(TmuxKillRequest(target="pi", session="a")).ok
+    # Exact names: "mcp_b" must not match a "mcp_" prefix lookup
+    r = tmux_send_keys(TmuxSendKeysRequest(target="pi", session="", keys="true"))
+    assert not r.ok and "can't find" in r.detail
+    assert len(tmux) == 1
+
+
+def test_keys_starting_with_a_dash_are_typed(tmux):
+    assert tmux_ensure(TmuxEnsureRequest(target="pi", session="d")).ok
+    assert tmux_send_keys(TmuxSendKeysRequest(target="pi", session="d", keys="echo x", enter=False)).ok
+    # "-la" is a literal run of its own; tmux must not read it as flags
+    assert tmux_send_keys(TmuxSendKeysRequest(target="pi", session="d", keys="-la\x7fz")).ok
+    _wait_for(lambda: "x-lz" in _pane("mcp_d"))
+
+
+def test_falls_back_to_exec(tmux, monkeypatch):
+    class Broken:
+        def __init__(self, key, cfg):
+            raise tmux_control.ControlUnavailable("no tmux -C")
+
+    monkeypatch.setattr(tmux_control, "TmuxControlSession", Broken)
+    assert tmux_ensure(TmuxEnsureRequest(target="pi", session="f")).ok
+    assert tmux_send_keys(TmuxSendKeysRequest(target="pi", session="f", keys="echo 'it''s' \"$((6*7))\"")).ok
+    _wait_for(lambda: "its 42" in _pane("mcp_f"))
+    assert tmux_send_keys(TmuxSendKeysRequest(target="pi", session="f", keys="-n dash")).ok
+    _wait_for(lambda: "-n dash" in _pane("mcp_f"))
+    assert asyncio.run(tmux_list_async(TmuxListRequest(target="pi"))).sessions == ["mcp_f"]
+    assert "pi" in tmux_control.get_tmux_control().stats()["backoff"]
+    assert not any(c.startswith("tmux -C") for c in tmux)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test tmux pane streaming against a real tmux server reached through the in-process SSH server
+"""
+
+import asyncio
+import json
+import shutil
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_server import main, ssh_transport
+from mcp_server.tools import tmux
+from mcp_server.tools.tmux import TmuxStreamRequest, tmux_stream, tmux_stream_async
+
+pytestmark = pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux not installed")
+
+
+@pytest.fixture
+def pane(ssh_config, monkeypatch, tmp_path):
+    monkeypatch.setenv("TMUX_TMPDIR", str(tmp_path))
+    monkeypatch.delenv("TMUX", raising=False)
+    subprocess.run(["tmux", "new-session", "-d", "-s", "mcp_t", "-x", "120", "-y", "20"], check=True)
+    subprocess.run(["tmux", "send-keys", "-t", "mcp_t", "echo early-line", "Enter"], check=True)
+
+    def send(keys):
+        subprocess.run(["tmux", "send-keys", "-t", "mcp_t", keys, "Enter"], check=True)
+
+    yield send
+    subprocess.run(["tmux", "kill-server"], stderr=subprocess.DEVNULL)
+
+
+async def _until(stream, text, timeout=5):
+    seen = ""
+    async def read():
+        nonlocal seen
+        async for evt in stream:
+            seen += evt.get("data", "")
+            if text in seen:
+                return evt
+    evt = await asyncio.wait_for(read(), timeout)
+    return seen, evt
+
+
+def test_stream_scrollback_then_live_output(pane):
+    async def go():
+        await asyncio.sleep(0.3)  # let the shell print early-line
+        stream = tmux_stream(TmuxStreamRequest(target="pi", session="t"))
+        seen, _ = await _until(stream, "early-line")
+        pane("echo live-$((40+2))")
+        seen, evt = await _until(stream, "live-42")
+        await stream.aclose()
+        return evt
+
+    evt = asyncio.run(go())
+    assert evt["offset"] > 0
+
+
+def test_subscribers_share_one_channel_and_late_joiner_gets_buffer(pane):
+    async def go():
+        first = tmux_stream(TmuxStreamRequest(target="pi", session="t", history=False))
+        task = asyncio.ensure_future(_until(first, "shared-1"))
+        await asyncio.sleep(0.5)
+        pane("echo shared-1")
+        await task
+        # Joins after the output was printed; gets it from the ring buffer without a new watch
+        late = tmux_stream(TmuxStreamRequest(target="pi", session="t"))
+        seen, _ = await _until(late, "shared-1")
+        stats = tmux.pane_watchers()["pi/mcp_t"]
+        channels = ssh_transport.get_pool().stats()["targets"]
+        channels = (channels["pi#streams"]["channels"], channels.get("pi", {}).get("channels", 0))
+        await first.aclose()
+        await late.aclose()
+        return stats, channels
+
+    stats, channels = asyncio.run(go())
+    # One stream channel, and no exec channel slot held
+    assert stats["subscribers"] == 2 and channels == (1, 0)
+
+
+def test_resume_from_offset_and_session_end(pane):
+    async def go():
+        stream = tmux_stream(TmuxStreamRequest(target="pi", session="t", history=False))
+        task = asyncio.ensure_future(_until(stream, "before"))
+        await asyncio.sleep(0.5)
+        pane("echo before")
+        _, evt = await task
+        await stream.aclose()
+        pane("echo after")
+        resumed = tmux_stream(TmuxStreamRequest(target="pi", session="t", offset=evt["offset"], watch=evt["watch"]))
+        seen, _ = await _until(resumed, "after")
+        subprocess.run(["tmux", "kill-session", "-t", "mcp_t"], check=True)
+        done = [e async for e in resumed][-1]
+        return seen, done
+
+    seen, done = asyncio.run(go())
+    assert "before" not in seen.replace("echo before", "")
+    assert done["done"] and done["reason"] == "session ended"
+
+
+def test_offsets_from_an_ended_watch_restart_from_history(pane):
+    async def go():
+        stream = tmux_stream(TmuxStreamRequest(target="pi", session="t", history=False))
+        task = asyncio.ensure_future(_until(stream, "old-watch"))
+        await asyncio.sleep(0.5)
+        pane("echo old-watch")
+        _, evt = await task
+        await stream.aclose()
+        tmux._watchers.pop(("pi", "mcp_t")).task.cancel()
+        await asyncio.sleep(0.2)
+        pane("echo new-watch")
+        # The old watch's offset does not line up with anything the new watch has counted
+        resumed = tmux_stream(TmuxStreamRequest(target="pi", session="t", offset=evt["offset"], watch=evt["watch"]))
+        seen, first = await _until(resumed, "new-watch")
+        await resumed.aclose()
+        return evt, first, seen
+
+    evt, first, seen = asyncio.run(go())
+    assert first["watch"] != evt["watch"] and first["reset"] is True
+    assert "old-watch" in seen  # history again, from scrollback
+
+
+def test_offsets_older_than_the_buffer_report_a_gap(pane, monkeypatch):
+    monkeypatch.setattr(tmux, "TMUX_RING_CHARS", 64)
+
+    async def go():
+        stream = tmux_stream(TmuxStreamRequest(target="pi", session="t", history=False))
+        task = asyncio.ensure_future(_until(stream, "x" * 100))
+        await asyncio.sleep(0.5)
+        pane("printf 'x%.0s' $(seq 300)")
+        _, evt = await task
+        resumed = tmux_stream(TmuxStreamRequest(target="pi", session="t", offset=0, watch=evt["watch"]))
+        first = await asyncio.wait_for(resumed.__anext__(), 5)
+        await resumed.aclose()
+        await stream.aclose()
+        return first
+
+    first = asyncio.run(go())
+    assert first["gap"] > 0 and "reset" not in first
+
+
+def test_collect_tool_and_missing_session(pane):
+    # A session whose name merely starts with the requested one is not a match
+    subprocess.run(["tmux", "new-session", "-d", "-s", "mcp_nope_2"], check=True)
+
+    async def go():
+        await asyncio.sleep(0.3)
+        ok = await tmux_stream_async(TmuxStreamRequest(target="pi", session="t", duration=0.5))
+        missing = await tmux_stream_async(TmuxStreamRequest(target="pi", session="nope", duration=0.5))
+        return ok, missing
+
+    ok, missing = asyncio.run(go())
+    assert "early-line" in ok.output and ok.ended is None and ok.session == "mcp_t"
+    assert missing.output == "" and "no tmux session mcp_nope" in missing.ended
+
+
+def test_sse_route(pane):
+    with TestClient(main.app) as client:
+        with client.stream("GET", "/tools/tmux/stream", params={"target": "pi", "session": "t", "duration": 1}) as r:
+            text = "".join(r.iter_text())
+        assert client.get("/tools/tmux/stream", params={"target": "zz", "session": "t"}).status_code == 400
+    lines = text.splitlines()
+    assert [line for line in lines if line.startswith("event: ")][-1] == "event: done"
+    ids = [line[len("id: "):] for line in lines if line.startswith("id: ")]
+    done = json.loads([line for line in lines if line.startswith("data: ")][-1][len("data: "):])
+    assert done["reason"] == "duration" and ids[-1] == f"{done['watch']}:{done['offset']}"
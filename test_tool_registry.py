@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test that both servers advertise and dispatch tools from the shared registry
+"""
+
+from fastapi.testclient import TestClient
+
+from mcp_server import main, registry
+from mcp_server.mcp_complete_server import MCP_TOOLS, _FORMATTERS
+from mcp_server.tools.ssh_exec import SSHExecResponse
+
+
+def test_registry_covers_both_servers():
+    names = list(registry.TOOL_REGISTRY)
+    assert len(names) == len(set(names))
+    assert [t.name for t in MCP_TOOLS] == names
+    assert set(_FORMATTERS) <= set(names)
+
+    client = TestClient(main.app)
+    listed = [t["name"] for t in client.get("/.well-known/mcp/tools").json()["tools"]]
+    assert listed == names
+
+
+def test_schema_descriptions_filled_from_fields():
+    props = registry.get_tool("git_pull").schema["input_schema"]["properties"]
+    assert all(p.get("description") for p in props.values())
+
+
+def test_call_tool_dispatches_through_registry(monkeypatch):
+    seen = []
+
+    async def fake_ssh_exec(req):
+        seen.append(req)
+        return SSHExecResponse(stdout="hi\n", stderr="", exit_code=0)
+
+    spec = registry.get_tool("ssh_exec")
+    monkeypatch.setattr(spec, "async_handler", fake_ssh_exec)
+    client = TestClient(main.app)
+
+    r = client.post("/tools", json={"name": "ssh_exec", "arguments": {"target": "pi-lan", "command": "echo hi"}})
+    assert r.status_code == 200 and r.json()["stdout"] == "hi\n"
+    assert seen[0].command == "echo hi"
+
+    assert client.post("/tools", json={"name": "ssh_exec", "arguments": {"target": "pi-lan"}}).status_code == 400
+    assert client.post("/tools", json={"name": "nope", "arguments": {}}).status_code == 404